@@ -0,0 +1,128 @@
+"""
+Карточки записей на занятия.
+
+Карточка записи ("📚 Предмет … 👤 Ученик … 📅 Дата … 🕒 Время … 💰 Стоимость") выводится
+в списках записей родителя, заявках репетитора, меню отмены занятий и напоминаниях.
+Шаблоны всех вариантов карточки собраны здесь и разбираются один раз при импорте.
+
+Готовый текст кэшируется по (id записи, версия, вариант). Booking.version увеличивается
+при изменении полей записи, которые выводятся в карточках, и данных ученика, репетитора
+и родителя (см. common/database.py), поэтому при листании списков неизмененные карточки
+не форматируются заново, а измененные - сразу показываются в новом виде.
+"""
+from collections import OrderedDict
+from string import Formatter
+from typing import Callable, Dict, Tuple
+
+from common.database import Booking
+
+# Варианты карточки
+PARENT = "parent"  # Список записей родителя
+PARENT_APPROVED = "parent_approved"  # Подтвержденная запись в списке родителя
+PARENT_REJECTED = "parent_rejected"  # Отклоненная запись в списке родителя
+TUTOR_PENDING = "tutor_pending"  # Заявка, ожидающая подтверждения репетитора
+CANCEL_LESSON_LINE = "cancel_lesson_line"  # Строка занятия в меню отмены занятий репетитора
+REMINDER_TUTOR = "reminder_tutor"  # Напоминание репетитору
+REMINDER_PARENT = "reminder_parent"  # Напоминание родителю
+
+_PARENT_CARD = (
+    "📚 {subject} ({lesson_type})\n"
+    "👤 Ученик: {child}\n"
+    "👨‍🏫 Репетитор: {tutor}\n"
+    "📅 Дата: {date}\n"
+    "🕒 Время: {start} - {end}\n"
+    "💰 Стоимость: {price} ₽\n"
+)
+
+TEMPLATES = {
+    PARENT: _PARENT_CARD,
+    PARENT_APPROVED: _PARENT_CARD + "✅ Подтверждено: {approved_at}\n",
+    PARENT_REJECTED: _PARENT_CARD + "❌ Причина: {rejection_reason}\n",
+    TUTOR_PENDING: (
+        "📚 {subject} ({lesson_type})\n"
+        "👤 Ученик: {child}\n"
+        "👨‍👩‍👧‍👦 Родитель: {parent}\n"
+        "📅 Дата: {date}\n"
+        "🕒 Время: {start} - {end}\n"
+        "💰 Стоимость: {price} ₽"
+    ),
+    CANCEL_LESSON_LINE: "⏰ {start}-{end} | {child} ({child_grade} класс) | {subject}",
+    REMINDER_TUTOR: (
+        "👤 Ученик: {child}\n"
+        "📚 Предмет: {subject} ({lesson_type})\n"
+        "📅 Дата: {date}\n"
+        "🕒 Время: {start} - {end}\n"
+        "💰 Стоимость: {price} ₽\n\n"
+        "📱 Контакт родителя: {parent_phone}"
+    ),
+    REMINDER_PARENT: (
+        "👤 Ученик: {child}\n"
+        "👨‍🏫 Репетитор: {tutor}\n"
+        "📚 Предмет: {subject} ({lesson_type})\n"
+        "📅 Дата: {date}\n"
+        "🕒 Время: {start} - {end}\n"
+        "💰 Стоимость: {price} ₽"
+    ),
+}
+
+# Значения полей шаблонов
+FIELDS: Dict[str, Callable[[Booking], object]] = {
+    "subject": lambda b: b.subject_name,
+    "lesson_type": lambda b: "Подготовка к экзамену" if b.lesson_type == "exam" else "Стандартное занятие",
+    "child": lambda b: f"{b.child.name} {b.child.surname}",
+    "child_grade": lambda b: b.child.grade,
+    "tutor": lambda b: f"{b.tutor.name} {b.tutor.surname}",
+    "parent": lambda b: f"{b.parent.name} {b.parent.surname}",
+    "parent_phone": lambda b: b.parent.phone if b.parent.phone else "Не указан",
+    "date": lambda b: b.date.strftime("%d.%m.%Y"),
+    "start": lambda b: b.start_time.strftime("%H:%M"),
+    "end": lambda b: b.end_time.strftime("%H:%M"),
+    "price": lambda b: b.price,
+    "approved_at": lambda b: b.approved_at.strftime("%d.%m.%Y %H:%M") if b.approved_at else "Дата не указана",
+    "rejection_reason": lambda b: b.rejection_reason,
+}
+
+
+def _compile(template: str) -> Tuple[Callable[..., str], Tuple[Tuple[str, Callable], ...]]:
+    """Разбирает шаблон: функция форматирования и только те поля, которые в нем используются"""
+    names = {name for _, name, _, _ in Formatter().parse(template) if name}
+    return template.format_map, tuple((name, FIELDS[name]) for name in sorted(names))
+
+
+_COMPILED = {variant: _compile(template) for variant, template in TEMPLATES.items()}
+
+# Число карточек в кэше (вытесняются давно не показанные)
+CARD_CACHE_SIZE = 4096
+
+_cache: "OrderedDict[Tuple[int, int, str], str]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def render_card(booking: Booking, variant: str) -> str:
+    """Возвращает текст карточки записи в заданном варианте"""
+    key = (booking.id, booking.version, variant)
+    text = _cache.get(key)
+    if text is not None:
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return text
+
+    _stats["misses"] += 1
+    format_map, fields = _COMPILED[variant]
+    text = format_map({name: value(booking) for name, value in fields})
+    # Несохраненные записи (без id и версии) не кэшируем
+    if booking.id is not None and booking.version is not None:
+        _cache[key] = text
+        if len(_cache) > CARD_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
+
+
+def card_cache_info() -> dict:
+    """Статистика кэша карточек: попадания, промахи и размер"""
+    return {**_stats, "size": len(_cache)}
+
+
+def clear_card_cache() -> None:
+    _cache.clear()
+    _stats["hits"] = _stats["misses"] = 0
@@ -0,0 +1,109 @@
+"""
+Реестр клиентов Telegram Bot API.
+
+На каждый токен в процессе создается ровно один Bot (при первом обращении), все боты
+используют одну HTTP-сессию с общим пулом соединений. Обработчики одного бота,
+отправляющие сообщения пользователям другого, берут его отсюда, а не из main.py:
+
+    await get_parent_bot().send_message(chat_id, text)
+
+При остановке процесса вызывается close_bots().
+"""
+import asyncio
+import ssl
+from typing import Dict, Optional
+
+import certifi
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+from aiogram import Bot, __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.enums import ParseMode
+
+from common.config import get_settings
+from common.edit_dedup import EditDedupMiddleware
+from common.metrics import ApiMetricsMiddleware
+
+
+class BotApiSession(AiohttpSession):
+    """
+    HTTP-сессия Bot API с настраиваемым пулом соединений.
+
+    aiogram создает TCPConnector с параметрами по умолчанию, поэтому клиентская сессия
+    создается здесь: create_session() и close() - публичные методы, через которые
+    AiohttpSession получает и закрывает клиентскую сессию.
+    """
+
+    def __init__(self, limit: int, keepalive_timeout: float, ttl_dns_cache: int = 300, **kwargs):
+        super().__init__(**kwargs)
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self._client: Optional[ClientSession] = None
+
+    async def create_session(self) -> ClientSession:
+        if self._client is None or self._client.closed:
+            self._client = ClientSession(
+                connector=TCPConnector(
+                    ssl=ssl.create_default_context(cafile=certifi.where()),
+                    limit=self.limit,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.ttl_dns_cache,
+                ),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{aiogram_version}"},
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+            # Как в AiohttpSession: даем SSL-соединениям закрыться
+            await asyncio.sleep(0.25)
+
+
+_session: Optional[BotApiSession] = None
+_bots: Dict[str, Bot] = {}
+
+
+def get_session() -> BotApiSession:
+    """Возвращает общую HTTP-сессию ботов"""
+    global _session
+    if _session is None:
+        settings = get_settings()
+        _session = BotApiSession(
+            limit=settings.bot_api_connection_limit,
+            keepalive_timeout=settings.bot_api_keepalive_seconds,
+        )
+        # Первый middleware - внешний: пропущенные редактирования не попадают в метрики запросов
+        _session.middleware(EditDedupMiddleware())
+        _session.middleware(ApiMetricsMiddleware())
+    return _session
+
+
+def get_bot(token: str, parse_mode: Optional[str] = None) -> Bot:
+    """
+    Возвращает Bot для токена, создавая его при первом вызове.
+
+    Настройки (parse_mode) задаются первым вызовом, поэтому в коде используются
+    get_tutor_bot() и get_parent_bot().
+    """
+    bot = _bots.get(token)
+    if bot is None:
+        bot = Bot(token=token, session=get_session(), parse_mode=parse_mode)
+        _bots[token] = bot
+    return bot
+
+
+def get_tutor_bot() -> Bot:
+    return get_bot(get_settings().tutor_bot_token)
+
+
+def get_parent_bot() -> Bot:
+    return get_bot(get_settings().parent_bot_token, parse_mode=ParseMode.HTML)
+
+
+async def close_bots() -> None:
+    """Закрывает общую HTTP-сессию (при следующем запросе она откроется заново)"""
+    if _session is not None:
+        await _session.close()
@@ -0,0 +1,378 @@
+"""
+Компактный формат callback_data.
+
+Telegram ограничивает callback_data 64 байтами, а кириллица занимает по 2 байта на символ,
+поэтому кнопки вида book_subject_<название предмета> могут не поместиться. Вместо этого
+каждое действие получает короткий числовой код, а параметры упаковываются:
+- целые числа (id) - в системе счисления по основанию 36;
+- даты - номер дня от 2000-01-01, время - минуты от полуночи (тоже base36);
+- значения из фиксированного списка - индекс в списке;
+- длинные строки (названия предметов) - id из таблицы interned_strings.
+
+Например, BOOK_TIME.pack(time(15, 30), time(16, 30)) дает "7:pu:ri" вместо
+"book_time_15:30_16:30". Разбор выполняет только CallbackAction.unpack, который
+проверяет код действия, число и формат полей.
+
+Обработчики регистрируются через CallbackRouter.action() и получают разобранные
+значения в аргументе callback_data.
+
+Кнопки в сообщениях, отправленных до перехода на этот формат, несут прежние строки
+(approve_booking_15, book_time_15:30_16:30). Для них у действия регистрируются старые
+форматы (CallbackAction.legacy), которые разбираются в те же значения.
+"""
+from collections import namedtuple
+from datetime import date, time
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from common.database import async_session_maker, InternedString
+
+SEPARATOR = ":"
+DATE_EPOCH = date(2000, 1, 1).toordinal()
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class CallbackDataError(ValueError):
+    """callback_data не соответствует формату действия"""
+
+
+def to_base36(value: int) -> str:
+    if value < 0:
+        raise CallbackDataError(f"Отрицательное значение {value} нельзя упаковать")
+    if value == 0:
+        return "0"
+    digits = []
+    while value:
+        value, rest = divmod(value, 36)
+        digits.append(_DIGITS[rest])
+    return "".join(reversed(digits))
+
+
+def from_base36(raw: str) -> int:
+    if not raw or any(char not in _DIGITS for char in raw):
+        raise CallbackDataError(f"Некорректное число: {raw!r}")
+    return int(raw, 36)
+
+
+# Кэш интернированных строк (в обе стороны), общий для процесса
+_interned_ids: Dict[str, int] = {}
+_interned_values: Dict[int, str] = {}
+
+
+def _remember_interned(rows: Iterable) -> None:
+    for interned_id, value in rows:
+        _interned_ids[value] = interned_id
+        _interned_values[interned_id] = value
+
+
+async def intern_strings(values: Iterable[str]) -> None:
+    """
+    Гарантирует, что у строк есть id в таблице interned_strings.
+
+    Вызывается до построения клавиатур с такими строками (например, при запуске бота
+    для списка предметов). Если все строки уже известны, к БД не обращается.
+    """
+    missing = {value for value in values if value not in _interned_ids}
+    if not missing:
+        return
+
+    async with async_session_maker() as session:
+        await session.execute(
+            insert(InternedString)
+            .values([{"value": value} for value in missing])
+            .on_conflict_do_nothing(index_elements=[InternedString.value])
+        )
+        result = await session.execute(
+            select(InternedString.id, InternedString.value).where(InternedString.value.in_(missing))
+        )
+        _remember_interned(result.all())
+        await session.commit()
+
+
+async def _lookup_interned(interned_id: int) -> str:
+    value = _interned_values.get(interned_id)
+    if value is None:
+        # Строку мог интернировать другой процесс
+        async with async_session_maker() as session:
+            value = await session.scalar(select(InternedString.value).where(InternedString.id == interned_id))
+        if value is None:
+            raise CallbackDataError(f"Неизвестный id строки: {interned_id}")
+        _remember_interned([(interned_id, value)])
+    return value
+
+
+class Field:
+    """Поле callback_data: упаковка значения в строку без разделителя и обратно"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def encode(self, value: Any) -> str:
+        raise NotImplementedError
+
+    async def decode(self, raw: str) -> Any:
+        raise NotImplementedError
+
+
+class IntField(Field):
+    def encode(self, value: int) -> str:
+        return to_base36(int(value))
+
+    async def decode(self, raw: str) -> int:
+        return from_base36(raw)
+
+
+class DateField(Field):
+    def encode(self, value: date) -> str:
+        return to_base36(value.toordinal() - DATE_EPOCH)
+
+    async def decode(self, raw: str) -> date:
+        try:
+            return date.fromordinal(from_base36(raw) + DATE_EPOCH)
+        except (ValueError, OverflowError):
+            raise CallbackDataError(f"Некорректная дата: {raw!r}")
+
+
+class TimeField(Field):
+    def encode(self, value: time) -> str:
+        return to_base36(value.hour * 60 + value.minute)
+
+    async def decode(self, raw: str) -> time:
+        minutes = from_base36(raw)
+        if minutes >= 24 * 60:
+            raise CallbackDataError(f"Некорректное время: {raw!r}")
+        return time(minutes // 60, minutes % 60)
+
+
+class ChoiceField(Field):
+    """Одно из фиксированных значений; в callback_data передается его индекс"""
+
+    def __init__(self, name: str, choices: Sequence[str]):
+        super().__init__(name)
+        self.choices = list(choices)
+
+    def encode(self, value: str) -> str:
+        try:
+            return to_base36(self.choices.index(value))
+        except ValueError:
+            raise CallbackDataError(f"Значение {value!r} не входит в {self.choices}")
+
+    async def decode(self, raw: str) -> str:
+        index = from_base36(raw)
+        if index >= len(self.choices):
+            raise CallbackDataError(f"Некорректный индекс {index} для поля {self.name}")
+        return self.choices[index]
+
+
+class InternedField(Field):
+    """Длинная строка, передаваемая по id из таблицы interned_strings (см. intern_strings)"""
+
+    def encode(self, value: str) -> str:
+        interned_id = _interned_ids.get(value)
+        if interned_id is None:
+            raise CallbackDataError(f"Строка {value!r} не интернирована, вызовите intern_strings()")
+        return to_base36(interned_id)
+
+    async def decode(self, raw: str) -> str:
+        return await _lookup_interned(from_base36(raw))
+
+
+class CallbackAction:
+    """Действие кнопки: числовой код и типизированные параметры"""
+
+    _codes: Dict[int, "CallbackAction"] = {}
+
+    def __init__(self, code: int, name: str, *fields: Field):
+        if code in CallbackAction._codes:
+            raise ValueError(f"Код действия {code} уже занят ({CallbackAction._codes[code].name})")
+        CallbackAction._codes[code] = self
+
+        self.code = code
+        self.name = name
+        self.fields = fields
+        self.prefix = f"{code}{SEPARATOR}"
+        self.data_class = namedtuple(name, [field.name for field in fields])
+        self.legacy_formats = []  # [(префикс, разбор), ...]
+
+    def legacy(self, prefix: str, parse: Callable[[str], tuple]) -> None:
+        """
+        Добавляет прежний формат callback_data этого действия (кнопки старых сообщений).
+
+        parse получает часть строки после prefix и возвращает значения полей действия
+        или выбрасывает ValueError, если строка не подходит.
+        """
+        self.legacy_formats.append((prefix, parse))
+
+    def unpack_legacy(self, data: Optional[str]):
+        """Разбирает callback_data в прежнем формате, возвращает namedtuple или None"""
+        for prefix, parse in self.legacy_formats:
+            if not data or not data.startswith(prefix):
+                continue
+            try:
+                values = parse(data[len(prefix):])
+            except ValueError:
+                continue
+            if len(values) == len(self.fields):
+                return self.data_class(*values)
+        return None
+
+    def pack(self, *values: Any) -> str:
+        """Возвращает callback_data для кнопки"""
+        if len(values) != len(self.fields):
+            raise CallbackDataError(f"{self.name}: ожидается {len(self.fields)} значений, передано {len(values)}")
+        data = self.prefix + SEPARATOR.join(field.encode(value) for field, value in zip(self.fields, values))
+        if len(data.encode()) > 64:
+            raise CallbackDataError(f"{self.name}: callback_data длиннее 64 байт")
+        return data
+
+    async def unpack(self, data: Optional[str]):
+        """Разбирает и проверяет callback_data, возвращает namedtuple с полями действия"""
+        if not data or not data.startswith(self.prefix):
+            legacy = self.unpack_legacy(data)
+            if legacy is not None:
+                return legacy
+            raise CallbackDataError(f"{data!r} не относится к действию {self.name}")
+        parts = data[len(self.prefix):].split(SEPARATOR)
+        if len(parts) != len(self.fields):
+            raise CallbackDataError(f"{self.name}: ожидается {len(self.fields)} полей в {data!r}")
+        return self.data_class(*[await field.decode(raw) for field, raw in zip(self.fields, parts)])
+
+
+LESSON_TYPES = ["standard", "exam"]
+SCHEDULE_PERIODS = ["today", "tomorrow", "week", "month"]
+PENDING_QUEUE_DIRECTIONS = ["at", "next", "prev"]
+STUDENT_ORDERS = ["name", "recent"]
+
+# Действия кнопок. Коды не меняйте и не используйте повторно: они уже могут быть
+# в кнопках отправленных сообщений.
+
+# Запись на занятие (бот родителя)
+BOOK_CHILD = CallbackAction(1, "BookChild", IntField("child_id"))
+BOOK_TUTOR = CallbackAction(2, "BookTutor", IntField("tutor_id"))
+BOOK_SUBJECT = CallbackAction(3, "BookSubject", InternedField("subject"))
+BOOK_LESSON_TYPE = CallbackAction(4, "BookLessonType", ChoiceField("lesson_type", LESSON_TYPES))
+BOOK_CALENDAR = CallbackAction(5, "BookCalendar", IntField("year"), IntField("month"))
+BOOK_DATE = CallbackAction(6, "BookDate", DateField("date"))
+BOOK_TIME = CallbackAction(7, "BookTime", TimeField("start"), TimeField("end"))
+CANCEL_BOOKING = CallbackAction(8, "CancelBooking", IntField("booking_id"))
+CONFIRM_CANCEL_BOOKING = CallbackAction(9, "ConfirmCancelBooking", IntField("booking_id"))
+
+# Заявки и расписание (бот репетитора)
+APPROVE_BOOKING = CallbackAction(10, "ApproveBooking", IntField("booking_id"))
+REJECT_BOOKING = CallbackAction(11, "RejectBooking", IntField("booking_id"))
+PENDING_BOOKING_PAGE = CallbackAction(12, "PendingBookingPage", IntField("index"))
+CANCEL_LESSON = CallbackAction(13, "CancelLesson", IntField("booking_id"))
+CONFIRM_CANCEL_LESSON = CallbackAction(14, "ConfirmCancelLesson", IntField("booking_id"))
+SHOW_STUDENT = CallbackAction(15, "ShowStudent", IntField("child_id"))
+
+# Предметы и цены репетитора
+REGISTRATION_TOGGLE_SUBJECT = CallbackAction(
+    16, "RegistrationToggleSubject", InternedField("subject"), ChoiceField("lesson_type", LESSON_TYPES)
+)
+PROFILE_TOGGLE_SUBJECT = CallbackAction(
+    17, "ProfileToggleSubject", InternedField("subject"), ChoiceField("lesson_type", LESSON_TYPES)
+)
+PROFILE_EDIT_PRICE = CallbackAction(
+    18, "ProfileEditPrice", InternedField("subject"), ChoiceField("lesson_type", LESSON_TYPES)
+)
+REGISTRATION_EDIT_PRICE = CallbackAction(
+    19, "RegistrationEditPrice", InternedField("subject"), ChoiceField("lesson_type", LESSON_TYPES)
+)
+
+# Избранные репетиторы и дети (бот родителя)
+FAVORITE_TUTOR_INFO = CallbackAction(20, "FavoriteTutorInfo", IntField("tutor_id"))
+FAVORITE_DELETE_TUTOR = CallbackAction(21, "FavoriteDeleteTutor", IntField("tutor_id"))
+FAVORITE_CONFIRM_DELETE_TUTOR = CallbackAction(22, "FavoriteConfirmDeleteTutor", IntField("tutor_id"))
+EDIT_CHILD = CallbackAction(23, "EditChild", IntField("child_id"))
+DELETE_CHILD = CallbackAction(24, "DeleteChild", IntField("child_id"))
+CONFIRM_DELETE_CHILD = CallbackAction(25, "ConfirmDeleteChild", IntField("child_id"))
+
+# Страницы списков (common/pagination.py); номер страницы - последнее поле.
+# Очередь заявок репетитора - PENDING_BOOKING_CURSOR (PENDING_BOOKING_PAGE - кнопки старых сообщений)
+BOOKINGS_PAGE = CallbackAction(26, "BookingsPage", IntField("page"))
+REJECTED_BOOKINGS_PAGE = CallbackAction(27, "RejectedBookingsPage", IntField("page"))
+STUDENTS_PAGE = CallbackAction(28, "StudentsPage", IntField("page"))
+CANCEL_LESSONS_PAGE = CallbackAction(
+    29, "CancelLessonsPage", ChoiceField("period", SCHEDULE_PERIODS), IntField("page")
+)
+
+# Очередь заявок репетитора: направление, номер заявки курсора и ключ (дата, начало, id)
+PENDING_BOOKING_CURSOR = CallbackAction(
+    30, "PendingBookingCursor", ChoiceField("direction", PENDING_QUEUE_DIRECTIONS), IntField("index"),
+    DateField("date"), TimeField("start"), IntField("booking_id")
+)
+
+# Страницы списка учеников репетитора с порядком (STUDENTS_PAGE - кнопки старых сообщений)
+STUDENTS_SORTED_PAGE = CallbackAction(
+    31, "StudentsSortedPage", ChoiceField("order", STUDENT_ORDERS), IntField("page")
+)
+
+
+# Прежние форматы callback_data (до кодов действий). Кнопки с ними остаются в уже
+# отправленных сообщениях, поэтому разбираются в значения тех же действий.
+
+def _legacy_id(raw: str) -> tuple:
+    if not raw.isdigit():
+        raise ValueError(raw)
+    return (int(raw),)
+
+
+def _legacy_text(raw: str) -> tuple:
+    if not raw:
+        raise ValueError(raw)
+    return (raw,)
+
+
+def _legacy_lesson_type(raw: str) -> tuple:
+    if raw not in LESSON_TYPES:
+        raise ValueError(raw)
+    return (raw,)
+
+
+def _legacy_month(raw: str) -> tuple:
+    year, month = raw.split("_")
+    if not (year.isdigit() and month.isdigit()) or not 1 <= int(month) <= 12:
+        raise ValueError(raw)
+    return int(year), int(month)
+
+
+def _legacy_times(raw: str) -> tuple:
+    start, end = raw.split("_")
+    return time.fromisoformat(start), time.fromisoformat(end)
+
+
+def _legacy_subject_type(raw: str) -> tuple:
+    """<предмет>_<тип занятия>, название предмета может содержать "_" """
+    subject, lesson_type = raw.rsplit("_", 1)
+    if not subject or lesson_type not in LESSON_TYPES:
+        raise ValueError(raw)
+    return subject, lesson_type
+
+
+BOOK_CHILD.legacy("book_child_", _legacy_id)
+BOOK_TUTOR.legacy("book_tutor_", _legacy_id)
+BOOK_SUBJECT.legacy("book_subject_", _legacy_text)
+BOOK_LESSON_TYPE.legacy("book_type_", _legacy_lesson_type)
+BOOK_CALENDAR.legacy("calendar_", _legacy_month)
+BOOK_DATE.legacy("book_date_", lambda raw: (date.fromisoformat(raw),))
+BOOK_TIME.legacy("book_time_", _legacy_times)
+CANCEL_BOOKING.legacy("cancel_booking_", _legacy_id)
+CONFIRM_CANCEL_BOOKING.legacy("confirm_cancel_booking_", _legacy_id)
+APPROVE_BOOKING.legacy("approve_booking_", _legacy_id)
+REJECT_BOOKING.legacy("reject_booking_", _legacy_id)
+PENDING_BOOKING_PAGE.legacy("next_pending_booking_", _legacy_id)
+CANCEL_LESSON.legacy("schedule:cancel:", _legacy_id)
+CONFIRM_CANCEL_LESSON.legacy("schedule:confirm_cancel:", _legacy_id)
+SHOW_STUDENT.legacy("show_student_", _legacy_id)
+REGISTRATION_TOGGLE_SUBJECT.legacy("subject_", _legacy_subject_type)
+PROFILE_TOGGLE_SUBJECT.legacy("profile_subject_", _legacy_subject_type)
+PROFILE_EDIT_PRICE.legacy("price_edit_", _legacy_subject_type)
+REGISTRATION_EDIT_PRICE.legacy("registration_price_edit_", _legacy_subject_type)
+FAVORITE_TUTOR_INFO.legacy("favorite_tutor_info_", _legacy_id)
+FAVORITE_DELETE_TUTOR.legacy("favorite_delete_tutor_", _legacy_id)
+FAVORITE_CONFIRM_DELETE_TUTOR.legacy("favorite_confirm_delete_tutor_", _legacy_id)
+EDIT_CHILD.legacy("edit_child_", _legacy_id)
+DELETE_CHILD.legacy("delete_child_", _legacy_id)
+CONFIRM_DELETE_CHILD.legacy("confirm_delete_", _legacy_id)
@@ -0,0 +1,177 @@
+"""
+Маршрутизация callback-запросов по индексу.
+
+Вместо отдельного lambda-фильтра на каждый обработчик (aiogram проверяет их по очереди
+для каждого нажатия) в диспетчере регистрируется один обработчик callback_query, который
+находит нужную функцию по точному совпадению callback_data (словарь) или по самому
+длинному зарегистрированному префиксу (префиксное дерево) за O(len(data)).
+
+Пример:
+    router = get_callback_router(dp)
+    router.exact("my_profile", show_profile)
+    router.prefix("approve_booking_", approve_booking)
+    router.exact("cancel_rejection", cancel_rejection, BookingStates.waiting_for_rejection_reason)
+    router.action(APPROVE_BOOKING, approve_booking)  # см. common/callback_data.py
+    router.inert("ignore")  # кнопки-подписи: нажатие только снимает индикатор загрузки
+    router.fallback(show_stale_button_menu)  # все остальные нажатия
+
+Нажатие, для которого нет обработчика (кнопка из старого сообщения, обработчик с
+ограничением по состоянию вне этого состояния), получает ответ от fallback, иначе
+Telegram показывает индикатор загрузки, пока не истечет время ожидания.
+"""
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from aiogram import Dispatcher, types
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.fsm.state import State
+
+from common.callback_data import CallbackAction, CallbackDataError
+
+ROUTER_KEY = "callback_router"
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackRoute:
+    """Обработчик с необязательными ограничениями по состоянию FSM и дополнительной проверкой"""
+    __slots__ = ("handler", "states", "predicate", "name", "action")
+
+    def __init__(
+        self,
+        handler: Callable,
+        states: tuple,
+        predicate: Optional[Callable[[types.CallbackQuery], bool]],
+        action: Optional[CallbackAction] = None,
+    ):
+        self.handler = CallableObject(handler)
+        self.states = {s.state if isinstance(s, State) else s for s in states} if states else None
+        self.predicate = predicate
+        self.name = handler.__name__
+        self.action = action
+
+    def matches(self, callback: types.CallbackQuery, raw_state: Optional[str]) -> bool:
+        if self.states is not None and raw_state not in self.states and "*" not in self.states:
+            return False
+        return self.predicate is None or self.predicate(callback)
+
+
+class _TrieNode:
+    __slots__ = ("children", "routes")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.routes: List[CallbackRoute] = []
+
+
+class CallbackRouter:
+    """
+    Индекс обработчиков callback-запросов.
+
+    Приоритет: точное совпадение, затем префиксы от самого длинного к самому короткому.
+    Если у одного ключа несколько обработчиков, выбирается первый зарегистрированный,
+    для которого подходит состояние и дополнительная проверка.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, List[CallbackRoute]] = {}
+        self._root = _TrieNode()
+        self.routes: List[tuple] = []  # (тип, ключ, обработчик) в порядке регистрации
+        self._fallback: Optional[CallbackRoute] = None
+
+    def exact(self, data: str, handler: Callable, *states: Any, predicate: Optional[Callable] = None) -> None:
+        """Обработчик для callback_data, равной data"""
+        route = CallbackRoute(handler, states, predicate)
+        self._exact.setdefault(data, []).append(route)
+        self.routes.append(("exact", data, route))
+
+    def prefix(self, prefix: str, handler: Callable, *states: Any, predicate: Optional[Callable] = None) -> None:
+        """Обработчик для callback_data, начинающейся с prefix"""
+        self._add_prefix(prefix, CallbackRoute(handler, states, predicate))
+
+    def action(self, action: CallbackAction, handler: Callable, *states: Any) -> None:
+        """
+        Обработчик для кнопок действия из common/callback_data.py.
+
+        Перед вызовом callback_data разбирается action.unpack(), результат передается
+        обработчику в аргументе callback_data. Кнопки с некорректными данными
+        (например, устаревшие) до обработчика не доходят. Прежние форматы действия
+        (CallbackAction.legacy) направляются к тому же обработчику.
+        """
+        self._add_prefix(action.prefix, CallbackRoute(handler, states, None, action))
+        for prefix, _ in action.legacy_formats:
+            self._add_prefix(prefix, CallbackRoute(
+                handler, states, lambda c, action=action: action.unpack_legacy(c.data) is not None, action
+            ))
+
+    def inert(self, *data: str) -> None:
+        """Кнопки-подписи без действия: нажатие только снимает индикатор загрузки"""
+        for value in data:
+            self.exact(value, _answer_inert)
+
+    def fallback(self, handler: Callable) -> None:
+        """Обработчик нажатий, для которых не нашлось другого обработчика"""
+        self._fallback = CallbackRoute(handler, (), None)
+
+    def _add_prefix(self, prefix: str, route: CallbackRoute) -> None:
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+        node.routes.append(route)
+        self.routes.append(("prefix", prefix, route))
+
+    def resolve(self, callback: types.CallbackQuery, raw_state: Optional[str] = None) -> Optional[CallbackRoute]:
+        """Находит обработчик для callback-запроса или возвращает None"""
+        data = callback.data or ""
+
+        for route in self._exact.get(data, ()):
+            if route.matches(callback, raw_state):
+                return route
+
+        # Собираем узлы с обработчиками вдоль пути data, затем проверяем от самого длинного префикса
+        candidates = []
+        node = self._root
+        if node.routes:
+            candidates.append(node)
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.routes:
+                candidates.append(node)
+
+        for node in reversed(candidates):
+            for route in node.routes:
+                if route.matches(callback, raw_state):
+                    return route
+        return None
+
+    async def _filter(self, callback: types.CallbackQuery, raw_state: Optional[str] = None):
+        route = self.resolve(callback, raw_state) or self._fallback
+        if route is None:
+            return False
+        return {"callback_route": route}
+
+    async def _dispatch(self, callback: types.CallbackQuery, callback_route: CallbackRoute, **kwargs: Any) -> Any:
+        if callback_route.action is not None:
+            try:
+                kwargs["callback_data"] = await callback_route.action.unpack(callback.data)
+            except CallbackDataError as e:
+                logger.warning(f"Invalid callback data {callback.data!r}: {e}")
+                await callback.answer("Кнопка устарела, откройте меню заново", show_alert=True)
+                return None
+        return await callback_route.handler.call(callback, **kwargs)
+
+
+async def _answer_inert(callback: types.CallbackQuery):
+    await callback.answer()
+
+
+def get_callback_router(dp: Dispatcher) -> CallbackRouter:
+    """Возвращает маршрутизатор callback-запросов диспетчера, при первом вызове подключая его"""
+    router = dp.workflow_data.get(ROUTER_KEY)
+    if router is None:
+        router = CallbackRouter()
+        dp.workflow_data[ROUTER_KEY] = router
+        dp.callback_query.register(router._dispatch, router._filter)
+    return router
@@ -1,16 +1,179 @@
+"""
+Настройки ботов.
+
+Постоянные параметры (этапы напоминаний, размеры пачек и т.п.) - обычные константы модуля.
+Параметры из окружения собраны в Settings и читаются один раз при первом вызове
+get_settings(), поэтому импорт модулей бота не читает .env и не требует токенов:
+
+    from common.config import get_settings
+    settings = get_settings()
+    settings.tutor_bot_token
+
+Значения берутся из файла .env, переменные окружения процесса имеют приоритет.
+Старый вариант импорта (from common.config import TUTOR_BOT_TOKEN) тоже работает,
+но загружает настройки в момент импорта.
+"""
+import hashlib
+import logging
 import os
-from dotenv import find_dotenv, dotenv_values
+from dataclasses import dataclass
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+# Этапы напоминаний о занятиях.
+# bit - номер бита в масках отправленных напоминаний и отключенных пользователем этапов
+# (не меняйте bit у существующих этапов), min_hours/max_hours - окно отправки в часах до начала занятия.
+# Чтобы добавить новый этап (например, за 3 часа), достаточно дописать его в этот список:
+# {"key": "3h", "bit": 2, "title": "За 3 часа", "min_hours": 2.5, "max_hours": 3.5}
+REMINDER_STAGES = [
+    {"key": "24h", "bit": 0, "title": "За 24 часа", "min_hours": 23.5, "max_hours": 24.5},
+    {"key": "1h", "bit": 1, "title": "За 1 час", "min_hours": 0.05, "max_hours": 1.1},
+]
+
+# Напоминания, пропущенные во время простоя планировщика (политика - Settings.reminder_catchup_policy).
+# Опоздавшее напоминание отправляется, если опоздание не больше REMINDER_CATCHUP_MAX_DELAY_HOURS
+# и до занятия осталось не меньше REMINDER_CATCHUP_MIN_HOURS_LEFT
+REMINDER_CATCHUP_MAX_DELAY_HOURS = 3
+REMINDER_CATCHUP_MIN_HOURS_LEFT = 0.25
+REMINDER_CATCHUP_BATCH_SIZE = 100  # Сколько записей обрабатывается за один раз
+REMINDER_CATCHUP_BATCH_PAUSE = 1.0  # Пауза между пачками в секундах
+
+# Несколько экземпляров планировщика могут работать одновременно: напоминания захватываются
+# пачками по REMINDER_DELIVERY_CHUNK_SIZE записей непосредственно перед отправкой пачки на
+# REMINDER_CLAIM_LEASE_SECONDS, пока пачка отправляется, аренда продлевается. Записи упавшего
+# экземпляра подхватывает другой при проверке зависших захватов (Settings.reminder_failover_interval)
+# Записи, напоминания которых дошли не до всех получателей, освобождаются и отправляются
+# оставшимся получателям при следующей полной проверке
+REMINDER_CLAIM_LEASE_SECONDS = 30
+REMINDER_DELIVERY_CHUNK_SIZE = 50
+
+# Этапы напоминаний, которые заменяет ежедневная сводка (см. Settings.daily_digest_enabled)
+DAILY_DIGEST_REPLACES_STAGES = ["24h"]
+
+
+@dataclass(frozen=True)
+class Settings:
+    tutor_bot_token: str
+    parent_bot_token: str
+
+    # Напоминания, пропущенные во время простоя планировщика: deliver - отправить с опозданием,
+    # expire - только отметить как пропущенные
+    reminder_catchup_policy: str = "deliver"
+    notification_check_interval: int = 300  # Период проверки в секундах
+    reminder_failover_interval: int = 10  # Период проверки зависших захватов напоминаний в секундах
+
+    # Ежедневная сводка для репетиторов: одно сообщение с расписанием на завтра вместо
+    # отдельных напоминаний по каждому занятию для этапов из DAILY_DIGEST_REPLACES_STAGES
+    daily_digest_enabled: bool = False
+    daily_digest_time: str = "20:00"  # Время отправки сводки (ЧЧ:ММ)
+
+    # Хранилище состояний FSM (common/fsm_storage.py).
+    # fsm_cache_size - сколько состояний держать в памяти, fsm_flush_interval - задержка перед
+    # записью изменений в БД в секундах (0 - писать сразу), fsm_state_ttl_hours - через сколько часов
+    # без активности незавершенный диалог сбрасывается, fsm_cache_seconds - сколько секунд доверять
+    # кэшу без перечитывания из БД (0 - перечитывать всегда, если ботов обслуживает несколько процессов)
+    fsm_cache_size: int = 1000
+    fsm_flush_interval: float = 0.5
+    fsm_state_ttl_hours: float = 48
+    fsm_cache_seconds: float = 60
+
+    # Режим получения обновлений: polling (по умолчанию) или webhook - оба бота в одном
+    # aiohttp-приложении (common/webhook.py). webhook_base_url - публичный HTTPS-адрес, на который
+    # Telegram будет отправлять обновления, пути и секретные токены у каждого бота свои.
+    # Если секреты не заданы, они выводятся из токенов ботов и не меняются между перезапусками
+    bot_mode: str = "polling"
+    webhook_base_url: str = ""
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_tutor_path: str = "/webhook/tutor"
+    webhook_parent_path: str = "/webhook/parent"
+    webhook_tutor_secret: str = ""
+    webhook_parent_secret: str = ""
+
+    # Очередь обновлений (common/update_limiter.py), общая для ботов процесса.
+    # Обновления одного пользователя обрабатываются строго по очереди, всех пользователей -
+    # не больше max_concurrent_updates одновременно (SQLite выполняет запись по одной).
+    # Если ждут своей очереди update_queue_size обновлений или у одного пользователя их накопилось
+    # update_user_queue_size, новые отклоняются с просьбой повторить позже
+    max_concurrent_updates: int = 10
+    update_queue_size: int = 500
+    update_user_queue_size: int = 5
+
+    # HTTP-клиент Bot API (common/bots.py), общий для всех ботов процесса.
+    # bot_api_connection_limit - максимум одновременных соединений с api.telegram.org,
+    # bot_api_keepalive_seconds - сколько держать простаивающее соединение открытым
+    bot_api_connection_limit: int = 100
+    bot_api_keepalive_seconds: float = 60
+
+    # Метрики в формате Prometheus (common/metrics.py) на http://metrics_host:metrics_port/metrics,
+    # metrics_port=0 - не запускать HTTP-сервер
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9100
+
+    @classmethod
+    def from_values(cls, config: dict) -> "Settings":
+        """Создает настройки из словаря строковых значений (ключи как в .env)"""
+        tutor_bot_token = config.get("TUTOR_BOT_TOKEN")
+        parent_bot_token = config.get("PARENT_BOT_TOKEN")
+
+        if not tutor_bot_token:
+            raise ValueError("TUTOR_BOT_TOKEN not found in environment variables")
+
+        if not parent_bot_token:
+            raise ValueError("PARENT_BOT_TOKEN not found in environment variables")
+
+        return cls(
+            tutor_bot_token=tutor_bot_token,
+            parent_bot_token=parent_bot_token,
+            reminder_catchup_policy=config.get("REMINDER_CATCHUP_POLICY", "deliver"),
+            notification_check_interval=int(config.get("NOTIFICATION_CHECK_INTERVAL", 300)),
+            reminder_failover_interval=int(config.get("REMINDER_FAILOVER_INTERVAL", 10)),
+            daily_digest_enabled=config.get("DAILY_DIGEST_ENABLED", "false").lower() in ("1", "true", "yes"),
+            daily_digest_time=config.get("DAILY_DIGEST_TIME", "20:00"),
+            fsm_cache_size=int(config.get("FSM_CACHE_SIZE", 1000)),
+            fsm_flush_interval=float(config.get("FSM_FLUSH_INTERVAL", 0.5)),
+            fsm_state_ttl_hours=float(config.get("FSM_STATE_TTL_HOURS", 48)),
+            fsm_cache_seconds=float(config.get("FSM_CACHE_SECONDS", 60)),
+            bot_mode=config.get("BOT_MODE", "polling").lower(),
+            webhook_base_url=config.get("WEBHOOK_BASE_URL", ""),
+            webhook_host=config.get("WEBHOOK_HOST", "0.0.0.0"),
+            webhook_port=int(config.get("WEBHOOK_PORT", 8080)),
+            webhook_tutor_path=config.get("WEBHOOK_TUTOR_PATH", "/webhook/tutor"),
+            webhook_parent_path=config.get("WEBHOOK_PARENT_PATH", "/webhook/parent"),
+            webhook_tutor_secret=(
+                config.get("WEBHOOK_TUTOR_SECRET")
+                or hashlib.sha256(f"tutor:{tutor_bot_token}".encode()).hexdigest()
+            ),
+            webhook_parent_secret=(
+                config.get("WEBHOOK_PARENT_SECRET")
+                or hashlib.sha256(f"parent:{parent_bot_token}".encode()).hexdigest()
+            ),
+            max_concurrent_updates=int(config.get("MAX_CONCURRENT_UPDATES", 10)),
+            update_queue_size=int(config.get("UPDATE_QUEUE_SIZE", 500)),
+            update_user_queue_size=int(config.get("UPDATE_USER_QUEUE_SIZE", 5)),
+            bot_api_connection_limit=int(config.get("BOT_API_CONNECTION_LIMIT", 100)),
+            bot_api_keepalive_seconds=float(config.get("BOT_API_KEEPALIVE_SECONDS", 60)),
+            metrics_host=config.get("METRICS_HOST", "127.0.0.1"),
+            metrics_port=int(config.get("METRICS_PORT", 9100)),
+        )
+
 
-dotenv_path = find_dotenv()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Читает .env и переменные окружения при первом вызове, затем возвращает те же настройки"""
+    from dotenv import find_dotenv, dotenv_values
 
-print(dotenv_path)
-config = dotenv_values(dotenv_path)
- 
-TUTOR_BOT_TOKEN = config["TUTOR_BOT_TOKEN"]
-PARENT_BOT_TOKEN = config["PARENT_BOT_TOKEN"]
+    dotenv_path = find_dotenv()
+    logger.info(f"Loading settings from {dotenv_path or 'environment'}")
+    config = {key: value for key, value in dotenv_values(dotenv_path).items() if value is not None}
+    config.update(os.environ)
+    return Settings.from_values(config)
 
-if not TUTOR_BOT_TOKEN:
-    raise ValueError("TUTOR_BOT_TOKEN not found in environment variables") 
 
-if not PARENT_BOT_TOKEN:
-    raise ValueError("PARENT_BOT_TOKEN not found in environment variables") 
\ No newline at end of file
+def __getattr__(name: str):
+    # Совместимость со старыми константами: TUTOR_BOT_TOKEN -> get_settings().tutor_bot_token
+    if name.isupper() and name.lower() in Settings.__dataclass_fields__:
+        return getattr(get_settings(), name.lower())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
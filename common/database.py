@@ -1,10 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, JSON, ForeignKey, Enum, BigInteger, Date, Time, DateTime, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, JSON, ForeignKey, Enum, BigInteger, Date, Time, DateTime, Boolean, Index, event, func, inspect, select, update
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 import enum
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Set
 from datetime import datetime, date, time
 
 Base = declarative_base()
@@ -31,6 +31,9 @@ class Tutor(Base):
     subjects = Column(JSON)  # Список предметов
     schedule = Column(JSON)  # Расписание в формате {день: [время]}
     description = Column(String)  # Описание репетитора
+    reminders_muted = Column(Integer, default=0)  # Битовая маска отключенных этапов напоминаний
+    digest_sent_on = Column(Date, nullable=True)  # Дата, на которую уже отправлена ежедневная сводка
+    schedule_version = Column(Integer, default=0, nullable=False)  # Версия расписания (tutor_bot/utils/schedule_cache.py)
     favorited_by = relationship("FavoriteTutor", back_populates="tutor", cascade="all, delete-orphan")
     bookings = relationship("Booking", back_populates="tutor", cascade="all, delete-orphan")
 
@@ -43,6 +46,7 @@ class Parent(Base):
     surname = Column(String)
     patronymic = Column(String, nullable=True)
     phone = Column(String, nullable=True)
+    reminders_muted = Column(Integer, default=0)  # Битовая маска отключенных этапов напоминаний
     children = relationship("Child", back_populates="parent", cascade="all, delete-orphan")
     favorite_tutors = relationship("FavoriteTutor", back_populates="parent", cascade="all, delete-orphan")
     bookings = relationship("Booking", back_populates="parent", cascade="all, delete-orphan")
@@ -89,13 +93,148 @@ class Booking(Base):
     approved_at = Column(DateTime, nullable=True)
     rejection_reason = Column(String, nullable=True)
     cancelled_at = Column(DateTime, nullable=True)  # Новое поле для отметки времени отмены
-    notification_24h_sent = Column(Boolean, default=False)  # Флаг отправки уведомления за 24 часа
-    notification_1h_sent = Column(Boolean, default=False)   # Флаг отправки уведомления за 1 час
+    reminders_sent = Column(Integer, default=0)  # Битовая маска отправленных этапов напоминаний
+    starts_at = Column(DateTime, nullable=True)  # Дата и время начала занятия (заполняется автоматически)
+    reminder_claimed_by = Column(String, nullable=True)  # Экземпляр планировщика, отправляющий напоминание
+    reminder_claim_expires_at = Column(DateTime, nullable=True)  # Окончание аренды отправки напоминания
+    reminder_delivered_to = Column(Integer, default=0)  # Получатели, уже получившие напоминание незавершенного этапа
+    version = Column(Integer, default=1, nullable=False)  # Версия данных карточки записи (common/booking_cards.py)
 
     parent = relationship("Parent", back_populates="bookings")
     child = relationship("Child", back_populates="bookings")
     tutor = relationship("Tutor", back_populates="bookings")
 
+    __table_args__ = (
+        # Поиск подтвержденных занятий по времени начала (напоминания)
+        Index('ix_bookings_status_starts_at', 'status', 'starts_at'),
+        # Занятия репетитора за день (common/intervals.py), число и очередь заявок репетитора
+        Index('ix_bookings_tutor_status_date', 'tutor_id', 'status', 'date', 'start_time'),
+        # Записи ученика к репетитору (список учеников и карточка ученика)
+        Index('ix_bookings_tutor_child', 'tutor_id', 'child_id'),
+    )
+
+class InternedString(Base):
+    """Длинные строки (названия предметов), которые передаются в callback_data по короткому id"""
+    __tablename__ = 'interned_strings'
+
+    id = Column(Integer, primary_key=True)
+    value = Column(String, unique=True, nullable=False)
+
+class FsmState(Base):
+    """Состояние FSM пользователя (см. common/fsm_storage.py)"""
+    __tablename__ = 'fsm_states'
+
+    key = Column(String, primary_key=True)  # bot_id:chat_id:user_id:thread_id:destiny
+    state = Column(String, nullable=True)
+    data = Column(String, nullable=True)  # Данные состояния в формате JSON
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+@event.listens_for(Booking, 'before_insert')
+@event.listens_for(Booking, 'before_update')
+def _fill_booking_starts_at(mapper, connection, target):
+    """Поддерживает starts_at в соответствии с датой и временем начала занятия"""
+    if target.date and target.start_time:
+        target.starts_at = datetime.combine(target.date, target.start_time)
+
+# Поля записи и связанных таблиц, которые выводятся в карточках записей (common/booking_cards.py)
+BOOKING_CARD_FIELDS = (
+    'parent_id', 'child_id', 'tutor_id', 'subject_name', 'lesson_type', 'date', 'start_time',
+    'end_time', 'price', 'status', 'approved_at', 'rejection_reason'
+)
+RELATED_CARD_FIELDS = {
+    Child: ('child_id', ('name', 'surname', 'grade')),
+    Tutor: ('tutor_id', ('name', 'surname')),
+    Parent: ('parent_id', ('name', 'surname', 'phone')),
+}
+
+def _changed(target, fields) -> bool:
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+@event.listens_for(Booking, 'before_update')
+def _bump_booking_version(mapper, connection, target):
+    """Увеличивает версию записи при изменении данных ее карточки"""
+    if _changed(target, BOOKING_CARD_FIELDS):
+        target.version = (target.version or 1) + 1
+
+def _bump_related_bookings_version(mapper, connection, target):
+    """Увеличивает версию записей ученика, репетитора или родителя при изменении их данных в карточках"""
+    column, fields = RELATED_CARD_FIELDS[type(target)]
+    if _changed(target, fields):
+        bookings = Booking.__table__
+        connection.execute(
+            bookings.update()
+            .where(bookings.c[column] == target.id)
+            .values(version=func.coalesce(bookings.c.version, 1) + 1)
+        )
+        if column == 'child_id':
+            # Имя и класс ученика выводятся в расписании его репетиторов
+            _bump_schedule_version(
+                connection, select(bookings.c.tutor_id).where(bookings.c.child_id == target.id)
+            )
+
+# Поля записи, которые выводятся в расписании репетитора
+SCHEDULE_FIELDS = (
+    'tutor_id', 'child_id', 'subject_name', 'lesson_type', 'date', 'start_time', 'end_time', 'price', 'status'
+)
+
+def _bump_schedule_version(connection, tutor_ids) -> None:
+    """Увеличивает версию расписания репетиторов (список id или подзапрос)"""
+    tutors = Tutor.__table__
+    connection.execute(
+        tutors.update()
+        .where(tutors.c.id.in_(tutor_ids))
+        .values(schedule_version=func.coalesce(tutors.c.schedule_version, 0) + 1)
+    )
+
+@event.listens_for(Booking, 'after_insert')
+@event.listens_for(Booking, 'after_delete')
+def _booking_added_or_removed(mapper, connection, target):
+    """Новая или удаленная запись меняет расписание репетитора"""
+    if target.tutor_id is not None:
+        _bump_schedule_version(connection, [target.tutor_id])
+
+@event.listens_for(Booking, 'after_update')
+def _booking_schedule_changed(mapper, connection, target):
+    """Изменение записи (статус, время, перенос к другому репетитору) меняет расписание"""
+    if _changed(target, SCHEDULE_FIELDS):
+        tutor_ids = {target.tutor_id, *inspect(target).attrs.tutor_id.history.deleted} - {None}
+        if tutor_ids:
+            _bump_schedule_version(connection, tutor_ids)
+
+for _model in RELATED_CARD_FIELDS:
+    event.listen(_model, 'after_update', _bump_related_bookings_version)
+
+async def update_tutor_bookings(session, tutor_id: int, booking_ids, *criteria, **values) -> Set[int]:
+    """
+    Обновляет записи репетитора одним UPDATE (например, статус нескольких заявок сразу).
+
+    Массовый UPDATE не вызывает слушателей событий, поэтому версия карточек записей и версия
+    расписания репетитора увеличиваются здесь же. Записи, загруженные в сессию, получают
+    новые значения, только если строка действительно обновлена.
+
+    Returns:
+        Set[int]: id обновленных записей; записи, не прошедшие условия criteria
+        (например, уже обработанные или отмененные), в него не входят
+    """
+    if not booking_ids:
+        return set()
+    result = await session.execute(
+        update(Booking)
+        .where(Booking.id.in_(booking_ids), Booking.tutor_id == tutor_id, *criteria)
+        .values(version=Booking.version + 1, **values)
+        .returning(Booking.id)
+        .execution_options(synchronize_session='fetch')
+    )
+    updated_ids = set(result.scalars().all())
+    if updated_ids:
+        await session.execute(
+            update(Tutor)
+            .where(Tutor.id == tutor_id)
+            .values(schedule_version=func.coalesce(Tutor.schedule_version, 0) + 1)
+        )
+    return updated_ids
+
 # Создаем асинхронный движок для работы с базой данных
 engine = create_async_engine(
     'sqlite+aiosqlite:///tutors.db',
@@ -0,0 +1,114 @@
+"""
+Пропуск редактирований сообщений, которые ничего не меняют.
+
+Обработчики часто перерисовывают сообщение тем же содержимым: возврат к расписанию,
+повторное нажатие фильтра, календарь без изменений доступности. Каждое такое
+редактирование - лишний запрос к Bot API, а Telegram отвечает на него ошибкой
+"message is not modified".
+
+EditDedupMiddleware (middleware HTTP-сессии ботов) запоминает отпечаток последнего
+отправленного текста и клавиатуры каждого сообщения (бот, чат, сообщение) и не отправляет
+editMessageText/editMessageReplyMarkup с тем же содержимым. Отпечатки берутся из успешных
+sendMessage и редактирований, поэтому после перезапуска процесса первое редактирование
+сообщения отправляется как обычно. Пропущенные запросы видны в метрике
+telegram_api_calls_saved_total.
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import (
+    DeleteMessage,
+    EditMessageCaption,
+    EditMessageMedia,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    SendMessage,
+)
+from aiogram.types import Message
+
+from common.metrics import API_CALLS_SAVED_TOTAL
+
+# Число сообщений, для которых хранятся отпечатки (вытесняются давно не изменявшиеся)
+MAX_TRACKED_MESSAGES = 20000
+
+MessageKey = Tuple[int, Union[int, str], Optional[int]]
+
+
+def _markup_fingerprint(reply_markup) -> int:
+    if reply_markup is None:
+        return hash(None)
+    return hash(reply_markup.model_dump_json(exclude_none=True))
+
+
+def _text_fingerprint(method: Union[SendMessage, EditMessageText]) -> int:
+    entities = tuple(entity.model_dump_json() for entity in method.entities) if method.entities else None
+    preview = method.link_preview_options.model_dump_json() if method.link_preview_options else None
+    return hash((method.text, str(method.parse_mode), entities, preview, str(method.disable_web_page_preview)))
+
+
+class EditDedupMiddleware(BaseRequestMiddleware):
+    """Middleware HTTP-сессии ботов: не отправляет редактирования без изменений"""
+
+    def __init__(self, max_messages: int = MAX_TRACKED_MESSAGES):
+        self.max_messages = max_messages
+        # (id бота, чат или inline_message_id, id сообщения) -> (отпечаток текста, отпечаток клавиатуры)
+        self._shown: "OrderedDict[MessageKey, Tuple[Optional[int], int]]" = OrderedDict()
+
+    def _remember(self, key: MessageKey, text: Optional[int], markup: int) -> None:
+        self._shown[key] = (text, markup)
+        self._shown.move_to_end(key)
+        if len(self._shown) > self.max_messages:
+            self._shown.popitem(last=False)
+
+    @staticmethod
+    def _key(bot, method) -> Optional[MessageKey]:
+        if getattr(method, "inline_message_id", None):
+            return bot.id, method.inline_message_id, None
+        if method.chat_id is None or method.message_id is None:
+            return None
+        return bot.id, method.chat_id, method.message_id
+
+    async def __call__(self, make_request, bot, method):
+        if isinstance(method, EditMessageText):
+            return await self._edit(make_request, bot, method, _text_fingerprint(method))
+        if isinstance(method, EditMessageReplyMarkup):
+            return await self._edit(make_request, bot, method, None)
+
+        result = await make_request(bot, method)
+        if isinstance(method, SendMessage) and isinstance(result, Message):
+            self._remember(
+                (bot.id, result.chat.id, result.message_id),
+                _text_fingerprint(method),
+                _markup_fingerprint(method.reply_markup),
+            )
+        elif isinstance(method, (DeleteMessage, EditMessageCaption, EditMessageMedia)):
+            key = self._key(bot, method)
+            if key is not None:
+                self._shown.pop(key, None)
+        return result
+
+    async def _edit(self, make_request, bot, method, text: Optional[int]):
+        key = self._key(bot, method)
+        if key is None:
+            return await make_request(bot, method)
+
+        markup = _markup_fingerprint(method.reply_markup)
+        shown = self._shown.get(key)
+        # editMessageReplyMarkup не меняет текст: сравниваем только клавиатуру
+        if shown is not None and shown[1] == markup and (text is None or shown[0] == text):
+            API_CALLS_SAVED_TOTAL.inc((method.__api_method__,))
+            return True
+
+        try:
+            result = await make_request(bot, method)
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                # Сообщение уже показывает это содержимое (например, отправлено до перезапуска)
+                self._remember(key, text if text is not None else shown and shown[0], markup)
+            else:
+                self._shown.pop(key, None)
+            raise
+        self._remember(key, text if text is not None else shown and shown[0], markup)
+        return result
@@ -0,0 +1,221 @@
+"""
+Хранилище состояний FSM в базе данных.
+
+Состояния и данные диалогов (регистрация, запись на занятие и т.д.) сохраняются
+в таблице fsm_states, поэтому переживают перезапуск ботов и доступны нескольким
+процессам. Чтобы не обращаться к БД на каждом обновлении:
+- недавно использованные состояния хранятся в LRU-кэше в памяти;
+- изменения копятся и записываются одной транзакцией раз в flush_interval секунд;
+- состояния без активности дольше ttl считаются брошенными и удаляются.
+"""
+import asyncio
+import enum
+import importlib
+import json
+import logging
+import time as monotonic_time
+from collections import OrderedDict
+from datetime import datetime, date, time, timedelta
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+
+from common.database import async_session_maker, FsmState
+from common.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_value(value: Any) -> Any:
+    """Преобразует значения, которые не поддерживает JSON (даты, время, перечисления)"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, time):
+        return {"__time__": value.isoformat()}
+    if isinstance(value, enum.Enum):
+        return {"__enum__": f"{type(value).__module__}:{type(value).__qualname__}", "value": value.value}
+    raise TypeError(f"Значение типа {type(value).__name__} нельзя сохранить в состоянии FSM")
+
+
+def _decode_value(obj: Dict[str, Any]) -> Any:
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    if "__time__" in obj:
+        return time.fromisoformat(obj["__time__"])
+    if "__enum__" in obj:
+        module_name, class_name = obj["__enum__"].split(":")
+        return getattr(importlib.import_module(module_name), class_name)(obj["value"])
+    return obj
+
+
+def encode_data(data: Dict[str, Any]) -> str:
+    return json.dumps(data, default=_encode_value, ensure_ascii=False)
+
+
+def decode_data(raw: Optional[str]) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    return json.loads(raw, object_hook=_decode_value)
+
+
+class _Record:
+    """Запись кэша: состояние, данные и время загрузки из БД"""
+    __slots__ = ("state", "data", "loaded_at")
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.loaded_at = monotonic_time.monotonic()
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    Хранилище FSM в SQLite с кэшем чтения и отложенной записью.
+
+    Если ботов обслуживает несколько процессов, задайте cache_seconds=0 и flush_interval=0:
+    тогда каждое чтение идет в БД, а каждое изменение записывается сразу.
+    """
+
+    def __init__(
+        self,
+        session_maker=async_session_maker,
+        cache_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        ttl: Optional[timedelta] = None,
+        cache_seconds: Optional[float] = None,
+    ) -> None:
+        # Незаданные параметры берутся из настроек (fsm_* в common/config.py)
+        settings = get_settings()
+        self.session_maker = session_maker
+        self.cache_size = settings.fsm_cache_size if cache_size is None else cache_size
+        self.flush_interval = settings.fsm_flush_interval if flush_interval is None else flush_interval
+        self.ttl = timedelta(hours=settings.fsm_state_ttl_hours) if ttl is None else ttl
+        self.cache_seconds = settings.fsm_cache_seconds if cache_seconds is None else cache_seconds
+
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: Dict[str, _Record] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._last_purge = 0.0
+
+    @staticmethod
+    def _make_key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+    async def _get_record(self, key: StorageKey) -> _Record:
+        db_key = self._make_key(key)
+        record = self._dirty.get(db_key) or self._cache.get(db_key)
+        if record is not None and (
+            db_key in self._dirty
+            or monotonic_time.monotonic() - record.loaded_at < self.cache_seconds
+        ):
+            self._remember(db_key, record)
+            return record
+
+        async with self.session_maker() as session:
+            row = await session.get(FsmState, db_key)
+            if row is None or row.updated_at < datetime.utcnow() - self.ttl:
+                record = _Record()
+            else:
+                record = _Record(row.state, decode_data(row.data))
+
+        self._remember(db_key, record)
+        return record
+
+    def _remember(self, db_key: str, record: _Record) -> None:
+        self._cache[db_key] = record
+        self._cache.move_to_end(db_key)
+        # Несохраненные изменения остаются в _dirty до ближайшей записи в БД
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _mark_dirty(self, key: StorageKey, record: _Record) -> None:
+        db_key = self._make_key(key)
+        self._remember(db_key, record)
+        self._dirty[db_key] = record
+
+        if self.flush_interval <= 0:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error while saving FSM states: {e}")
+
+    async def flush(self) -> None:
+        """Записывает накопленные изменения в БД одной транзакцией"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            pending, self._dirty = self._dirty, {}
+            now = datetime.utcnow()
+
+            try:
+                async with self.session_maker() as session:
+                    empty_keys = [k for k, r in pending.items() if r.state is None and not r.data]
+                    if empty_keys:
+                        await session.execute(delete(FsmState).where(FsmState.key.in_(empty_keys)))
+
+                    rows = []
+                    for db_key, record in pending.items():
+                        if record.state is None and not record.data:
+                            continue
+                        try:
+                            data = encode_data(record.data)
+                        except TypeError as e:
+                            logger.error(f"FSM state {db_key} was not saved: {e}")
+                            continue
+                        rows.append({"key": db_key, "state": record.state, "data": data, "updated_at": now})
+                    if rows:
+                        stmt = insert(FsmState).values(rows)
+                        await session.execute(stmt.on_conflict_do_update(
+                            index_elements=[FsmState.key],
+                            set_={
+                                "state": stmt.excluded.state,
+                                "data": stmt.excluded.data,
+                                "updated_at": stmt.excluded.updated_at,
+                            }
+                        ))
+
+                    # Не чаще раза в час удаляем брошенные диалоги
+                    if monotonic_time.monotonic() - self._last_purge > 3600:
+                        await session.execute(delete(FsmState).where(FsmState.updated_at < now - self.ttl))
+                        self._last_purge = monotonic_time.monotonic()
+
+                    await session.commit()
+            except BaseException:
+                # Возвращаем изменения в очередь, если их не перезаписали новые
+                for db_key, record in pending.items():
+                    self._dirty.setdefault(db_key, record)
+                raise
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        new_record = _Record(state.state if isinstance(state, State) else state, record.data)
+        await self._mark_dirty(key, new_record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get_record(key)
+        await self._mark_dirty(key, _Record(record.state, data.copy()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get_record(key)).data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
@@ -0,0 +1,92 @@
+"""
+Поиск пересечений занятий одного дня репетитора.
+
+Занятия дня загружаются одним запросом (по индексу tutor_id, status, date, start_time)
+и хранятся отсортированными по времени начала вместе с префиксным максимумом времени
+окончания.
+Вопрос "что пересекается с [начало, конец)" решается бинарным поиском последнего
+занятия, начинающегося раньше конца интервала, и просмотром назад, пока префиксный
+максимум окончаний позже начала интервала. Подтвержденные занятия не пересекаются
+друг с другом, поэтому просмотр назад останавливается сразу за последним пересечением:
+O(log n + k), где k - число найденных пересечений.
+
+Интервалы полуоткрытые: занятие, которое заканчивается в 11:00, не пересекается
+с занятием, которое начинается в 11:00.
+"""
+from bisect import bisect_left
+from datetime import date, time
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from common.database import Booking, BookingStatus
+
+
+class DayIntervals:
+    """Занятия одного дня репетитора, отсортированные по времени начала"""
+
+    def __init__(self, bookings: Iterable[Booking] = ()):
+        self._bookings: List[Booking] = sorted(bookings, key=lambda b: (b.start_time, b.end_time, b.id or 0))
+        self._starts = [b.start_time for b in self._bookings]
+        self._max_ends: List[time] = []
+        self._reindex(0)
+
+    def __len__(self) -> int:
+        return len(self._bookings)
+
+    def __iter__(self):
+        return iter(self._bookings)
+
+    def _reindex(self, first: int) -> None:
+        """Пересчитывает префиксный максимум окончаний начиная с позиции first"""
+        del self._max_ends[first:]
+        for booking in self._bookings[first:]:
+            end = booking.end_time
+            if self._max_ends and self._max_ends[-1] > end:
+                end = self._max_ends[-1]
+            self._max_ends.append(end)
+
+    def add(self, booking: Booking) -> None:
+        """Добавляет занятие (например, только что подтвержденное)"""
+        i = bisect_left(self._starts, booking.start_time)
+        self._bookings.insert(i, booking)
+        self._starts.insert(i, booking.start_time)
+        self._reindex(i)
+
+    def conflicts(self, start: time, end: time, exclude_id: Optional[int] = None) -> List[Booking]:
+        """Занятия, пересекающиеся с интервалом [start, end), в порядке времени начала"""
+        found = []
+        i = bisect_left(self._starts, end) - 1
+        while i >= 0 and self._max_ends[i] > start:
+            booking = self._bookings[i]
+            if booking.end_time > start and booking.id != exclude_id:
+                found.append(booking)
+            i -= 1
+        found.reverse()
+        return found
+
+    def first_conflict(self, start: time, end: time, exclude_id: Optional[int] = None) -> Optional[Booking]:
+        """Самое раннее занятие, пересекающееся с интервалом [start, end), или None"""
+        conflicts = self.conflicts(start, end, exclude_id)
+        return conflicts[0] if conflicts else None
+
+
+async def load_day_intervals(
+    session: AsyncSession,
+    tutor_id: int,
+    day: date,
+    status: BookingStatus = BookingStatus.APPROVED
+) -> DayIntervals:
+    """Загружает занятия репетитора за день с заданным статусом (вместе с учениками)"""
+    result = await session.execute(
+        select(Booking)
+        .where(
+            Booking.tutor_id == tutor_id,
+            Booking.date == day,
+            Booking.status == status
+        )
+        .options(joinedload(Booking.child))
+    )
+    return DayIntervals(result.scalars().all())
@@ -0,0 +1,341 @@
+"""
+Метрики ботов в формате Prometheus.
+
+Что собирается:
+- длительность обработки обновления по обработчикам (bot_handler_duration_seconds)
+  и число обновлений по результату (bot_updates_total);
+- число SQL-запросов и время в БД на одно обновление, длительность отдельных
+  запросов по типу (SELECT, INSERT, ...) - через события SQLAlchemy;
+- число и длительность запросов к Telegram Bot API по методам;
+- глубина очереди обновлений, время ожидания и отклоненные обновления
+  (common/update_limiter.py).
+
+Подключение: setup_metrics(dp, "tutor") для каждого диспетчера и start_metrics_server()
+при запуске. Метрики отдаются на http://127.0.0.1:9100/metrics (см. metrics_* в common/config.py).
+Внешние зависимости не нужны: гистограммы и счетчики реализованы здесь же.
+"""
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Текущее значение (например, глубина очереди), меняется в обе стороны"""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами.
+
+    observe() увеличивает один счетчик корзины, накопительные значения
+    (как требует формат Prometheus) считаются только при выводе.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [счетчики корзин (+ корзина +Inf), сумма, количество]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+REGISTRY: list = []
+
+HANDLER_DURATION = Histogram(
+    "bot_handler_duration_seconds", "Время обработки обновления", ("bot", "handler")
+)
+UPDATES_TOTAL = Counter(
+    "bot_updates_total", "Обработанные обновления", ("bot", "handler", "status")
+)
+DB_STATEMENTS_PER_UPDATE = Histogram(
+    "bot_db_statements_per_update", "SQL-запросов на одно обновление", ("bot", "handler"), COUNT_BUCKETS
+)
+DB_SECONDS_PER_UPDATE = Histogram(
+    "bot_db_seconds_per_update", "Время в БД на одно обновление", ("bot", "handler")
+)
+API_CALLS_PER_UPDATE = Histogram(
+    "bot_api_calls_per_update", "Запросов к Bot API на одно обновление", ("bot", "handler"), COUNT_BUCKETS
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "Длительность SQL-запроса", ("operation",)
+)
+API_REQUEST_DURATION = Histogram(
+    "telegram_api_request_duration_seconds", "Длительность запроса к Bot API", ("method",)
+)
+API_ERRORS_TOTAL = Counter(
+    "telegram_api_errors_total", "Запросы к Bot API, завершившиеся ошибкой", ("method",)
+)
+API_CALLS_SAVED_TOTAL = Counter(
+    "telegram_api_calls_saved_total", "Редактирования сообщений без изменений, не отправленные в Bot API", ("method",)
+)
+# Очередь обновлений (common/update_limiter.py)
+UPDATES_WAITING = Gauge(
+    "bot_updates_waiting", "Обновления, ожидающие своей очереди", ("bot",)
+)
+UPDATES_IN_PROGRESS = Gauge(
+    "bot_updates_in_progress", "Обновления, обрабатываемые сейчас", ("bot",)
+)
+UPDATE_WAIT_DURATION = Histogram(
+    "bot_update_wait_seconds", "Время ожидания обновления в очереди", ("bot",)
+)
+UPDATES_REJECTED_TOTAL = Counter(
+    "bot_updates_rejected_total", "Обновления, отклоненные из-за переполнения очереди", ("bot", "reason")
+)
+
+
+def render_metrics() -> str:
+    """Текущие значения всех метрик в текстовом формате Prometheus"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _UpdateTrace:
+    """Счетчики одного обновления; доступны из событий БД и Bot API через _current_trace"""
+    __slots__ = ("handler", "db_statements", "db_seconds", "api_calls")
+
+    def __init__(self):
+        self.handler = "unhandled"
+        self.db_statements = 0
+        self.db_seconds = 0.0
+        self.api_calls = 0
+
+
+_current_trace: ContextVar[Optional[_UpdateTrace]] = ContextVar("metrics_update_trace", default=None)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware обновлений: замеряет обработку и записывает метрики по обработчику"""
+
+    def __init__(self, bot_name: str):
+        self.bot_name = bot_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace = _UpdateTrace()
+        token = _current_trace.set(trace)
+        status = "ok"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_trace.reset(token)
+            labels = (self.bot_name, trace.handler)
+            HANDLER_DURATION.observe(elapsed, labels)
+            UPDATES_TOTAL.inc(labels + (status,))
+            DB_STATEMENTS_PER_UPDATE.observe(trace.db_statements, labels)
+            DB_SECONDS_PER_UPDATE.observe(trace.db_seconds, labels)
+            API_CALLS_PER_UPDATE.observe(trace.api_calls, labels)
+
+
+class _HandlerNameMiddleware(BaseMiddleware):
+    """Внутренний middleware: запоминает, какой обработчик выбран для обновления"""
+
+    async def __call__(self, handler, event, data):
+        trace = _current_trace.get()
+        if trace is not None:
+            # Для callback-запросов обработчик выбирает CallbackRouter (common/callback_router.py)
+            route = data.get("callback_route")
+            trace.handler = route.name if route is not None else data["handler"].callback.__name__
+        return await handler(event, data)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware HTTP-сессии ботов: длительность и ошибки запросов к Bot API"""
+
+    async def __call__(self, make_request, bot, method):
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            API_ERRORS_TOTAL.inc((api_method,))
+            raise
+        finally:
+            API_REQUEST_DURATION.observe(time.perf_counter() - started, (api_method,))
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.api_calls += 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    DB_STATEMENT_DURATION.observe(elapsed, (statement.split(None, 1)[0].upper(),))
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.db_statements += 1
+        trace.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("metrics_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def install_db_metrics(engine) -> None:
+    """Подписывается на события выполнения SQL-запросов движка (повторный вызов ничего не делает)"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def uninstall_db_metrics(engine) -> None:
+    """Отписывается от событий движка (нужно для замеров без метрик)"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.remove(sync_engine, "handle_error", _handle_error)
+
+
+def setup_metrics(dp: Dispatcher, bot_name: str) -> None:
+    """Подключает сбор метрик к диспетчеру"""
+    from common.database import engine
+
+    dp.update.outer_middleware(UpdateMetricsMiddleware(bot_name))
+    for observer in (dp.message, dp.callback_query):
+        observer.middleware(_HandlerNameMiddleware())
+    install_db_metrics(engine)
+
+
+_server_runner = None
+
+
+async def start_metrics_server(host: Optional[str] = None, port: Optional[int] = None) -> None:
+    """
+    Запускает HTTP-сервер с /metrics (один на процесс, повторные вызовы ничего не делают).
+
+    Если порт занят (например, другим процессом бота), сервер не запускается,
+    а в лог пишется предупреждение.
+    """
+    global _server_runner
+    from aiohttp import web
+    from common.config import get_settings
+
+    settings = get_settings()
+    host = host or settings.metrics_host
+    port = settings.metrics_port if port is None else port
+    if _server_runner is not None or not port:
+        return
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.warning(f"Metrics server was not started on {host}:{port}: {e}")
+        await runner.cleanup()
+        return
+    _server_runner = runner
+    logger.info(f"Metrics are available at http://{host}:{port}/metrics")
+
+
+async def stop_metrics_server() -> None:
+    global _server_runner
+    if _server_runner is not None:
+        await _server_runner.cleanup()
+        _server_runner = None
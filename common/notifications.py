@@ -1,39 +1,46 @@
+import asyncio
+import logging
+import os
+import socket
+from contextlib import suppress
 from datetime import datetime, timedelta
-from sqlalchemy import select, and_
+from itertools import groupby
+from sqlalchemy import select, update, and_, or_, func
 from sqlalchemy.orm import selectinload
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from common.database import async_session_maker, Booking, BookingStatus
-from common.config import TUTOR_BOT_TOKEN, PARENT_BOT_TOKEN
+from common.database import async_session_maker, Booking, BookingStatus, Tutor
+from common.bots import get_tutor_bot, get_parent_bot
+from common import booking_cards
+from common.booking_cards import render_card
+from common.config import (
+    REMINDER_STAGES,
+    DAILY_DIGEST_REPLACES_STAGES,
+    REMINDER_CATCHUP_MAX_DELAY_HOURS,
+    REMINDER_CATCHUP_MIN_HOURS_LEFT,
+    REMINDER_CATCHUP_BATCH_SIZE,
+    REMINDER_CATCHUP_BATCH_PAUSE,
+    REMINDER_CLAIM_LEASE_SECONDS,
+    REMINDER_DELIVERY_CHUNK_SIZE,
+    get_settings
+)
+from tutor_bot.utils.schedule_utils import format_daily_schedule, format_date_with_month
 
-tutor_bot = Bot(token=TUTOR_BOT_TOKEN)
-parent_bot = Bot(token=PARENT_BOT_TOKEN)
+# Идентификатор экземпляра планировщика, под которым он захватывает напоминания
+SCHEDULER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+logger = logging.getLogger(__name__)
 
 async def format_lesson_notification(booking: Booking, hours_left: float, is_tutor: bool = False) -> tuple[str, InlineKeyboardMarkup]:
     """Форматирует уведомление о предстоящем занятии"""
     hours_text = "час" if 0.9 < hours_left < 1.1 else "часа" if 1 < hours_left < 5 else "часов"
 
-    if is_tutor:
-        text = (
-            f"🔔 Напоминание о предстоящем занятии через {int(hours_left)} {hours_text}!\n\n"
-            f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-            f"📚 Предмет: {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
-            f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-            f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-            f"💰 Стоимость: {booking.price} ₽\n\n"
-            f"📱 Контакт родителя: {booking.parent.phone if booking.parent.phone else 'Не указан'}"
-        )
-    else:
-        text = (
-            f"🔔 Напоминание о предстоящем занятии через {int(hours_left)} {hours_text}!\n\n"
-            f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-            f"👨‍🏫 Репетитор: {booking.tutor.name} {booking.tutor.surname}\n"
-            f"📚 Предмет: {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
-            f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-            f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-            f"💰 Стоимость: {booking.price} ₽"
-        )
+    text = (
+        f"🔔 Напоминание о предстоящем занятии через {int(hours_left)} {hours_text}!\n\n"
+        + render_card(booking, booking_cards.REMINDER_TUTOR if is_tutor else booking_cards.REMINDER_PARENT)
+    )
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Показать все записи", callback_data="my_bookings" if not is_tutor else "tutor_pending_bookings")]
@@ -41,116 +48,615 @@ async def format_lesson_notification(booking: Booking, hours_left: float, is_tut
 
     return text, keyboard
 
-async def check_and_send_notifications():
-    """Проверяет предстоящие занятия и отправляет уведомления"""
+# Максимальное число одновременных запросов к Telegram API при рассылке напоминаний
+NOTIFICATION_CONCURRENCY = 20
+
+# Ошибки, при которых повторная отправка не поможет (бот заблокирован, чат не найден)
+PERMANENT_SEND_ERRORS = (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound)
+
+# Биты Booking.reminder_delivered_to: кому уже отправлено напоминание незавершенного этапа
+REMINDER_TO_TUTOR = 1
+REMINDER_TO_PARENT = 2
+
+async def _send_to_recipient(
+    bot: Bot,
+    chat_id: int,
+    messages: list,
+    semaphore: asyncio.Semaphore,
+    failures: dict,
+    unfinished: set,
+    is_current=None
+):
+    """Последовательно отправляет сообщения одному получателю, сохраняя их порядок"""
+    for key, text, keyboard in messages:
+        async with semaphore:
+            if is_current is not None and not is_current(key):
+                unfinished.add(key)
+                continue
+            try:
+                # Тексты напоминаний не размечены, поэтому parse_mode бота не применяем
+                await bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    reply_markup=keyboard,
+                    parse_mode=None
+                )
+            except Exception as e:
+                failures.setdefault(key, []).append(f"chat {chat_id}: {e}")
+                if not isinstance(e, PERMANENT_SEND_ERRORS):
+                    unfinished.add(key)
+
+async def deliver_messages(
+    outgoing: list,
+    concurrency: int = NOTIFICATION_CONCURRENCY,
+    is_current=None
+) -> tuple[set, dict]:
+    """
+    Параллельно отправляет сообщения разным получателям
+
+    Args:
+        outgoing (list): Сообщения в формате [(bot, chat_id, key, text, keyboard), ...],
+            где key - идентификатор, по которому группируются ошибки (например, ID записи)
+        concurrency (int): Максимальное число одновременных запросов к API
+        is_current (callable): Проверка key непосредственно перед отправкой; сообщения,
+            для которых она вернула False, не отправляются (например, захват записи потерян)
+
+    Returns:
+        tuple: (ключи, сообщения которых доставлены, ошибки отправки в формате
+            {key: [описание ошибки, ...]}). Доставленным считается и сообщение, которое Telegram
+            отклонил окончательно (PERMANENT_SEND_ERRORS): повторять его бессмысленно. Ключ не
+            доставлен, если хотя бы одно его сообщение пропущено или не отправлено из-за
+            временной ошибки - такие сообщения нужно отправить повторно
+    """
+    # Группируем сообщения по получателям, чтобы сохранить порядок для каждого из них
+    by_recipient = {}
+    for bot, chat_id, key, text, keyboard in outgoing:
+        by_recipient.setdefault((bot, chat_id), []).append((key, text, keyboard))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures, unfinished = {}, set()
+    await asyncio.gather(*(
+        _send_to_recipient(bot, chat_id, messages, semaphore, failures, unfinished, is_current)
+        for (bot, chat_id), messages in by_recipient.items()
+    ))
+    delivered = {key for _, _, key, _, _ in outgoing} - unfinished
+    return delivered, failures
+
+def stage_mask(stage: dict) -> int:
+    """Возвращает битовую маску этапа напоминания"""
+    return 1 << stage["bit"]
+
+def find_due_stage(hours_to_lesson: float, reminders_sent: int) -> dict:
+    """Возвращает этап напоминания, окно которого наступило и который еще не отправлялся"""
+    for stage in REMINDER_STAGES:
+        if stage["min_hours"] <= hours_to_lesson <= stage["max_hours"] and not reminders_sent & stage_mask(stage):
+            return stage
+    return None
+
+async def build_reminder_messages(
+    booking: Booking,
+    stage: dict,
+    hours_to_lesson: float,
+    delivered_to: int = 0
+) -> list:
+    """
+    Формирует напоминания о занятии для репетитора и родителя с учетом их настроек
+
+    Args:
+        delivered_to (int): Получатели (REMINDER_TO_*), которым напоминание уже отправлено
+            при прошлой попытке; им оно не отправляется повторно
+
+    Returns:
+        list: Сообщения в формате deliver_messages с ключом (ID записи, получатель)
+    """
+    outgoing = []
+    # Сначала репетитору, затем родителю. При включенной ежедневной сводке
+    # репетитор получает ее вместо отдельных напоминаний о каждом занятии
+    tutor_gets_digest = get_settings().daily_digest_enabled and stage["key"] in DAILY_DIGEST_REPLACES_STAGES
+    if (
+        not tutor_gets_digest
+        and not (booking.tutor.reminders_muted or 0) & stage_mask(stage)
+        and not delivered_to & REMINDER_TO_TUTOR
+    ):
+        text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=True)
+        outgoing.append((get_tutor_bot(), booking.tutor.telegram_id, (booking.id, REMINDER_TO_TUTOR), text, keyboard))
+    if not (booking.parent.reminders_muted or 0) & stage_mask(stage) and not delivered_to & REMINDER_TO_PARENT:
+        text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=False)
+        outgoing.append((get_parent_bot(), booking.parent.telegram_id, (booking.id, REMINDER_TO_PARENT), text, keyboard))
+    return outgoing
+
+def approved_bookings_starting_between(start: datetime, end: datetime):
+    """Запрос подтвержденных занятий, начинающихся в интервале (start, end] (по индексу status, starts_at)"""
+    return (
+        select(Booking)
+        .options(
+            selectinload(Booking.tutor),
+            selectinload(Booking.parent),
+            selectinload(Booking.child)
+        )
+        .where(
+            and_(
+                Booking.status == BookingStatus.APPROVED,
+                Booking.starts_at > start,
+                Booking.starts_at <= end
+            )
+        )
+    )
+
+async def claim_reminders(session, booking_ids: list, mask: int) -> set:
+    """
+    Захватывает этапы напоминаний для отправки этим экземпляром планировщика.
+
+    Захват выполняется одним атомарным UPDATE ... RETURNING: запись достается только тому
+    экземпляру, который первым обновил ее, пока этапы из mask не отправлены и нет чужой
+    действующей аренды. Аренда выдается на REMINDER_CLAIM_LEASE_SECONDS и продлевается,
+    пока идет отправка (ReminderLease). Если экземпляр упадет, аренда истечет и запись
+    подхватит другой экземпляр (check_and_send_notifications(stale_only=True)).
+
+    Returns:
+        dict: {ID захваченной записи: получатели, которым напоминание уже отправлено (REMINDER_TO_*)}
+    """
+    if not booking_ids:
+        return {}
+
     now = datetime.now()
-    today = now.date()
-    tomorrow = today + timedelta(days=1)
+    result = await session.execute(
+        update(Booking)
+        .where(
+            Booking.id.in_(booking_ids),
+            func.coalesce(Booking.reminders_sent, 0).op('&')(mask) == 0,
+            or_(
+                Booking.reminder_claim_expires_at.is_(None),
+                Booking.reminder_claim_expires_at < now
+            )
+        )
+        .values(
+            reminder_claimed_by=SCHEDULER_ID,
+            reminder_claim_expires_at=now + timedelta(seconds=REMINDER_CLAIM_LEASE_SECONDS)
+        )
+        .returning(Booking.id, func.coalesce(Booking.reminder_delivered_to, 0))
+        .execution_options(synchronize_session=False)
+    )
+    claimed = dict(result.all())
+    # Фиксируем захват сразу, чтобы его увидели другие экземпляры
+    await session.commit()
+    return claimed
+
+async def extend_reminder_claims(session, booking_ids: set, mask: int) -> set:
+    """
+    Продлевает аренду записей, захваченных этим экземпляром
+
+    Returns:
+        set: ID записей, которые по-прежнему принадлежат этому экземпляру
+            (остальные уже подхватил другой экземпляр, и отправлять их нельзя)
+    """
+    if not booking_ids:
+        return set()
+
+    result = await session.execute(
+        update(Booking)
+        .where(
+            Booking.id.in_(booking_ids),
+            Booking.reminder_claimed_by == SCHEDULER_ID,
+            func.coalesce(Booking.reminders_sent, 0).op('&')(mask) == 0
+        )
+        .values(reminder_claim_expires_at=datetime.now() + timedelta(seconds=REMINDER_CLAIM_LEASE_SECONDS))
+        .returning(Booking.id)
+        .execution_options(synchronize_session=False)
+    )
+    held = set(result.scalars().all())
+    await session.commit()
+    return held
+
+class ReminderLease:
+    """
+    Аренда захваченных записей на время отправки пачки напоминаний.
+
+    Пока открыт контекст, аренда продлевается в фоне каждые REMINDER_CLAIM_LEASE_SECONDS / 3
+    секунды, поэтому долгая отправка (ограничения Telegram, много получателей) не отдает
+    записи другому экземпляру. holds() проверяет перед каждым сообщением, что запись все еще
+    за этим экземпляром и аренда не истекла.
+    """
+
+    def __init__(self, booking_ids: set, mask: int, claimed_at: datetime):
+        self.held = set(booking_ids)
+        self.mask = mask
+        # Момент до UPDATE захвата: локальный срок аренды не позже записанного в БД
+        self.expires_at = claimed_at + timedelta(seconds=REMINDER_CLAIM_LEASE_SECONDS)
+        self._task = None
+
+    def holds(self, booking_id: int) -> bool:
+        return booking_id in self.held and datetime.now() < self.expires_at
+
+    async def _renew(self):
+        async with async_session_maker() as session:
+            while self.held:
+                await asyncio.sleep(REMINDER_CLAIM_LEASE_SECONDS / 3)
+                renewed_at = datetime.now()
+                try:
+                    self.held &= await extend_reminder_claims(session, self.held, self.mask)
+                except Exception as e:
+                    # Не удалось продлить: отправка остановится, когда истечет текущая аренда
+                    logger.warning(f"Failed to extend reminder claims: {e}")
+                    await session.rollback()
+                    continue
+                self.expires_at = renewed_at + timedelta(seconds=REMINDER_CLAIM_LEASE_SECONDS)
+
+    async def __aenter__(self) -> "ReminderLease":
+        self._task = asyncio.create_task(self._renew())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+async def complete_reminders(session, booking_ids: set, mask: int) -> set:
+    """
+    Отмечает захваченные этапы напоминаний как отправленные и освобождает аренду
+
+    Returns:
+        set: ID отмеченных записей (записи, которые подхватил другой экземпляр, не отмечаются)
+    """
+    if not booking_ids:
+        return set()
+
+    result = await session.execute(
+        update(Booking)
+        .where(
+            Booking.id.in_(booking_ids),
+            Booking.reminder_claimed_by == SCHEDULER_ID
+        )
+        .values(
+            reminders_sent=func.coalesce(Booking.reminders_sent, 0).op('|')(mask),
+            reminder_claim_expires_at=None,
+            reminder_delivered_to=0
+        )
+        .returning(Booking.id)
+        .execution_options(synchronize_session=False)
+    )
+    completed = set(result.scalars().all())
+    await session.commit()
+    return completed
+
+async def release_reminders(session, delivered_to: dict) -> None:
+    """
+    Освобождает захваченные записи, напоминания которых отправлены не всем получателям
+
+    Этап не отмечается отправленным: запись снова захватит следующая полная проверка
+    (этого или другого экземпляра) и отправит напоминание только оставшимся получателям.
+
+    Args:
+        delivered_to (dict): {ID записи: получатели, которым напоминание уже отправлено (REMINDER_TO_*)}
+    """
+    by_recipients = {}
+    for booking_id, recipients in delivered_to.items():
+        by_recipients.setdefault(recipients, []).append(booking_id)
+    for recipients, booking_ids in by_recipients.items():
+        await session.execute(
+            update(Booking)
+            .where(
+                Booking.id.in_(booking_ids),
+                Booking.reminder_claimed_by == SCHEDULER_ID
+            )
+            .values(
+                reminder_claimed_by=None,
+                reminder_claim_expires_at=None,
+                reminder_delivered_to=recipients
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if by_recipients:
+        await session.commit()
+
+async def send_claimed_reminders(session, mask: int, items: list) -> tuple[set, dict]:
+    """
+    Захватывает и отправляет напоминания пачками по REMINDER_DELIVERY_CHUNK_SIZE записей.
+
+    Каждая пачка захватывается непосредственно перед отправкой, поэтому несколько экземпляров
+    планировщика делят записи между собой, а упавший экземпляр держит не больше одной пачки.
+    Отправленная пачка сразу отмечается в БД. Записи, напоминания которых не дошли до всех
+    получателей (аренда потеряна посреди пачки, временная ошибка Telegram), не отмечаются,
+    а освобождаются для повторной отправки оставшимся получателям.
+
+    Args:
+        mask (int): Этапы, которые отмечаются отправленными
+        items (list): [(booking, stage, hours_to_lesson), ...]; stage - этап, напоминание которого
+            отправляется, или None, если этапы из mask нужно только отметить
+
+    Returns:
+        tuple: (ID записей, обработанных этим экземпляром, ошибки отправки по ID записей)
+    """
+    processed, failures = set(), {}
+    for first in range(0, len(items), REMINDER_DELIVERY_CHUNK_SIZE):
+        chunk = items[first:first + REMINDER_DELIVERY_CHUNK_SIZE]
+        claimed_at = datetime.now()
+        claimed = await claim_reminders(session, [booking.id for booking, _, _ in chunk], mask)
+        if not claimed:
+            continue
+
+        outgoing = []
+        for booking, stage, hours_to_lesson in chunk:
+            if booking.id in claimed and stage is not None:
+                outgoing.extend(await build_reminder_messages(booking, stage, hours_to_lesson, claimed[booking.id]))
+
+        delivered = set()
+        if outgoing:
+            async with ReminderLease(set(claimed), mask, claimed_at) as lease:
+                delivered, chunk_failures = await deliver_messages(
+                    outgoing, is_current=lambda key: lease.holds(key[0])
+                )
+            for (booking_id, _), errors in chunk_failures.items():
+                failures.setdefault(booking_id, []).extend(errors)
+
+        delivered_to, unfinished = dict(claimed), set()
+        for _, _, (booking_id, recipient), _, _ in outgoing:
+            if (booking_id, recipient) in delivered:
+                delivered_to[booking_id] |= recipient
+            else:
+                unfinished.add(booking_id)
+
+        # Этап считается обработанным, даже если получатели отключили его в настройках
+        processed |= await complete_reminders(session, set(claimed) - unfinished, mask)
+        await release_reminders(session, {booking_id: delivered_to[booking_id] for booking_id in unfinished})
+    return processed, failures
+
+async def check_and_send_notifications(stale_only: bool = False) -> dict:
+    """
+    Проверяет предстоящие занятия и отправляет уведомления
+
+    Args:
+        stale_only (bool): Проверить только записи с истекшей арендой - напоминания, которые
+            захватил и не отправил упавший экземпляр планировщика. Такая проверка дешевая
+            и выполняется чаще полной (Settings.reminder_failover_interval)
+
+    Returns:
+        dict: Ошибки отправки по записям в формате {booking_id: [описание ошибки, ...]}
+    """
+    now = datetime.now()
+    # Одним запросом берем все занятия, в которые может попасть окно любого из этапов
+    window_start = now + timedelta(hours=min(stage["min_hours"] for stage in REMINDER_STAGES))
+    window_end = now + timedelta(hours=max(stage["max_hours"] for stage in REMINDER_STAGES))
+
+    query = approved_bookings_starting_between(window_start, window_end)
+    if stale_only:
+        query = query.where(Booking.reminder_claim_expires_at < now)
+
+    async with async_session_maker() as session:
+        upcoming_bookings = await session.execute(query)
+        upcoming_bookings = upcoming_bookings.scalars().all()
+
+        # Группируем записи по наступившему этапу, чтобы захватить их одним запросом на этап
+        due = {}
+        for booking in upcoming_bookings:
+            time_to_lesson = booking.starts_at - now
+            hours_to_lesson = time_to_lesson.total_seconds() / 3600
+
+            stage = find_due_stage(hours_to_lesson, booking.reminders_sent or 0)
+            if stage:
+                due.setdefault(stage_mask(stage), []).append((booking, stage, hours_to_lesson))
+
+        failures = {}
+        for mask, items in due.items():
+            _, mask_failures = await send_claimed_reminders(session, mask, items)
+            failures.update(mask_failures)
+
+    return failures
+
+def window_closed_after_approval(booking: Booking, stage: dict) -> bool:
+    """
+    Закрылось ли окно этапа уже после подтверждения занятия
+
+    Если занятие подтверждено, когда окно этапа уже прошло (например, за 10 часов до начала
+    для этапа "за 24 часа"), напоминание этого этапа не было положено и не считается пропущенным.
+    """
+    if booking.approved_at is None:
+        return True
+    return booking.starts_at - timedelta(hours=stage["min_hours"]) > booking.approved_at
+
+async def catch_up_missed_reminders() -> tuple[int, int, dict]:
+    """
+    Обрабатывает напоминания, окно отправки которых прошло, пока планировщик не работал.
+    Пропущенными считаются только этапы, окно которых закрылось после подтверждения занятия.
+
+    Просроченные этапы отправляются с опозданием или помечаются как пропущенные в зависимости
+    от настройки reminder_catchup_policy. Записи обрабатываются пачками, чтобы после долгого простоя
+    не отправлять все накопившиеся напоминания одновременно.
+
+    Returns:
+        tuple: (количество отправленных этапов, количество пропущенных этапов, ошибки отправки)
+    """
+    now = datetime.now()
+    # Просроченными могут быть только этапы занятий, которые еще не начались
+    # и окно хотя бы одного этапа которых уже закрылось
+    window_end = now + timedelta(hours=max(stage["min_hours"] for stage in REMINDER_STAGES))
+    delivered, expired, failures = 0, 0, {}
+    last_key = None
+
+    async with async_session_maker() as session:
+        while True:
+            query = approved_bookings_starting_between(now, window_end)
+            if last_key:
+                last_starts_at, last_id = last_key
+                query = query.where(or_(
+                    Booking.starts_at > last_starts_at,
+                    and_(Booking.starts_at == last_starts_at, Booking.id > last_id)
+                ))
+            batch = await session.execute(
+                query.order_by(Booking.starts_at, Booking.id).limit(REMINDER_CATCHUP_BATCH_SIZE)
+            )
+            batch = batch.scalars().all()
+            if not batch:
+                break
+            last_key = (batch[-1].starts_at, batch[-1].id)
+
+            # Группируем записи по набору пропущенных этапов, чтобы захватить их одним запросом на набор
+            overdue_by_mask = {}
+            for booking in batch:
+                hours_to_lesson = (booking.starts_at - now).total_seconds() / 3600
+                reminders_sent = booking.reminders_sent or 0
+                overdue = [
+                    stage for stage in REMINDER_STAGES
+                    if hours_to_lesson < stage["min_hours"]
+                    and not reminders_sent & stage_mask(stage)
+                    and window_closed_after_approval(booking, stage)
+                ]
+                if not overdue:
+                    continue
+
+                mask = 0
+                for stage in overdue:
+                    mask |= stage_mask(stage)
+                overdue_by_mask.setdefault(mask, []).append((booking, overdue, hours_to_lesson))
+
+            for mask, items in overdue_by_mask.items():
+                planned = {}
+                for booking, overdue, hours_to_lesson in items:
+                    # Отправляем не больше одного, самого позднего из пропущенных этапов
+                    latest = min(overdue, key=lambda stage: stage["min_hours"])
+                    if not (
+                        get_settings().reminder_catchup_policy == "deliver"
+                        and latest["min_hours"] - hours_to_lesson <= REMINDER_CATCHUP_MAX_DELAY_HOURS
+                        and hours_to_lesson >= REMINDER_CATCHUP_MIN_HOURS_LEFT
+                    ):
+                        latest = None
+                    planned[booking.id] = (booking, latest, hours_to_lesson, len(overdue))
+
+                processed, mask_failures = await send_claimed_reminders(
+                    session, mask, [(booking, latest, hours) for booking, latest, hours, _ in planned.values()]
+                )
+                failures.update(mask_failures)
+                for booking_id in processed:
+                    _, latest, _, overdue_count = planned[booking_id]
+                    delivered += latest is not None
+                    expired += overdue_count - (latest is not None)
+
+            if len(batch) < REMINDER_CATCHUP_BATCH_SIZE:
+                break
+            await asyncio.sleep(REMINDER_CATCHUP_BATCH_PAUSE)
+
+    return delivered, expired, failures
+
+async def send_daily_digests() -> dict:
+    """
+    Отправляет репетиторам сводку занятий на завтра, если наступило время рассылки.
+    Сводки, не доставленные из-за временной ошибки, отправляются при следующей проверке.
+
+    Returns:
+        dict: Ошибки отправки в формате {key: [описание ошибки, ...]}
+    """
+    settings = get_settings()
+    if not settings.daily_digest_enabled:
+        return {}
+
+    now = datetime.now()
+    if now.time() < datetime.strptime(settings.daily_digest_time, '%H:%M').time():
+        return {}
+
+    tomorrow = now.date() + timedelta(days=1)
+    # Репетиторы, отключившие заменяемые сводкой этапы, сводку тоже не получают
+    muted_mask = 0
+    for stage in REMINDER_STAGES:
+        if stage["key"] in DAILY_DIGEST_REPLACES_STAGES:
+            muted_mask |= stage_mask(stage)
 
     async with async_session_maker() as session:
-        # Получаем все подтвержденные записи на сегодня и завтра
-        upcoming_bookings = await session.execute(
+        # Одним запросом получаем завтрашние занятия всех репетиторов, которым сводка еще не отправлена
+        bookings = await session.execute(
             select(Booking)
+            .join(Booking.tutor)
             .options(
-                selectinload(Booking.tutor),
-                selectinload(Booking.parent),
-                selectinload(Booking.child)
+                selectinload(Booking.child),
+                selectinload(Booking.tutor)
             )
             .where(
-                and_(
-                    Booking.status == BookingStatus.APPROVED,
-                    Booking.date.in_([today, tomorrow])
-                )
+                Booking.date == tomorrow,
+                Booking.status.in_([BookingStatus.APPROVED, BookingStatus.PENDING]),
+                or_(Tutor.digest_sent_on.is_(None), Tutor.digest_sent_on < tomorrow),
+                Tutor.reminders_muted.op('&')(muted_mask) == 0
             )
+            .order_by(Booking.tutor_id, Booking.start_time)
         )
-        upcoming_bookings = upcoming_bookings.scalars().all()
+        bookings = bookings.scalars().all()
 
-        for booking in upcoming_bookings:
-            lesson_datetime = datetime.combine(booking.date, booking.start_time)
-            time_to_lesson = lesson_datetime - now
-            hours_to_lesson = time_to_lesson.total_seconds() / 3600
+        if not bookings:
+            return {}
 
-            # Проверяем, нужно ли отправлять уведомление за 24 часа
-            if 23.5 <= hours_to_lesson <= 24.5 and not booking.notification_24h_sent:
-                # Отправляем уведомление репетитору
-                text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=True)
-                try:
-                    await tutor_bot.send_message(
-                        chat_id=booking.tutor.telegram_id,
-                        text=text,
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    print(f"Error sending notification to tutor: {e}")
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="📅 Моё расписание", callback_data="show_schedule")]
+        ])
+        date_str = format_date_with_month(tomorrow)
 
-                # Отправляем уведомление родителю
-                text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=False)
-                try:
-                    await parent_bot.send_message(
-                        chat_id=booking.parent.telegram_id,
-                        text=text,
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    print(f"Error sending notification to parent: {e}")
+        # Захватываем сводки одним запросом до отправки, чтобы несколько экземпляров
+        # планировщика не отправили одну и ту же сводку дважды
+        claimed = await session.execute(
+            update(Tutor)
+            .where(
+                Tutor.id.in_({booking.tutor_id for booking in bookings}),
+                or_(Tutor.digest_sent_on.is_(None), Tutor.digest_sent_on < tomorrow)
+            )
+            .values(digest_sent_on=tomorrow)
+            .returning(Tutor.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = set(claimed.scalars().all())
+        await session.commit()
 
-                # Отмечаем, что уведомление за 24 часа отправлено
-                booking.notification_24h_sent = True
-                await session.commit()
+        outgoing = []
+        for tutor_id, tutor_bookings in groupby(bookings, key=lambda b: b.tutor_id):
+            if tutor_id not in claimed:
+                continue
+            tutor_bookings = list(tutor_bookings)
+            text = "🔔 Ваши занятия на завтра\n\n" + format_daily_schedule(tutor_bookings, date_str)
+            outgoing.append((get_tutor_bot(), tutor_bookings[0].tutor.telegram_id, f"digest_{tutor_id}", text, keyboard))
 
-            # Проверяем, нужно ли отправлять уведомление за 1 час
-            elif 0.9 <= hours_to_lesson <= 1.1 and not booking.notification_1h_sent:
-                # Отправляем уведомление репетитору
-                text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=True)
-                try:
-                    await tutor_bot.send_message(
-                        chat_id=booking.tutor.telegram_id,
-                        text=text,
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    print(f"Error sending notification to tutor: {e}")
+        if not outgoing:
+            return {}
+        delivered, failures = await deliver_messages(outgoing)
 
-                # Отправляем уведомление родителю
-                text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=False)
-                try:
-                    await parent_bot.send_message(
-                        chat_id=booking.parent.telegram_id,
-                        text=text,
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    print(f"Error sending notification to parent: {e}")
+        # Сводка заменяет напоминания за 24 часа: если она не дошла из-за временной ошибки,
+        # снимаем отметку, чтобы следующая проверка отправила ее снова
+        undelivered = claimed - {int(key[len("digest_"):]) for key in delivered}
+        if undelivered:
+            await session.execute(
+                update(Tutor)
+                .where(Tutor.id.in_(undelivered), Tutor.digest_sent_on == tomorrow)
+                .values(digest_sent_on=None)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
 
-                # Отмечаем, что уведомление за 1 час отправлено
-                booking.notification_1h_sent = True
-                await session.commit() 
+    return failures
 
-            # Проверяем, нужно ли отправлять уведомление меньше чем за 1 час
-            elif 0.05 <= hours_to_lesson <= 1.1 and not booking.notification_1h_sent:
-                print(hours_to_lesson)
-                # Отправляем уведомление репетитору
-                text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=True)
-                try:
-                    await tutor_bot.send_message(
-                        chat_id=booking.tutor.telegram_id,
-                        text=text,
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    print(f"Error sending notification to tutor: {e}")
+def get_reminder_settings_text(muted_mask: int) -> str:
+    """Форматирует текущие настройки напоминаний пользователя"""
+    lines = ["🔔 Напоминания о занятиях\n"]
+    for stage in REMINDER_STAGES:
+        enabled = not (muted_mask or 0) & stage_mask(stage)
+        lines.append(f"{'✅' if enabled else '🔕'} {stage['title']}")
+    lines.append("\nНажмите на этап, чтобы включить или отключить его.")
+    return "\n".join(lines)
 
-                # Отправляем уведомление родителю
-                text, keyboard = await format_lesson_notification(booking, hours_to_lesson, is_tutor=False)
-                try:
-                    await parent_bot.send_message(
-                        chat_id=booking.parent.telegram_id,
-                        text=text,
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    print(f"Error sending notification to parent: {e}")
+def parse_reminder_toggle(callback_data: str) -> int:
+    """
+    Возвращает номер бита этапа из кнопки reminders_toggle_<bit>
+
+    Returns:
+        int: Номер бита или None, если кнопка устарела или подделана (бита нет в REMINDER_STAGES)
+    """
+    raw = callback_data.rsplit('_', 1)[-1]
+    if not raw.isdigit() or int(raw) not in {stage["bit"] for stage in REMINDER_STAGES}:
+        return None
+    return int(raw)
 
-                # Отмечаем, что уведомление за 1 час отправлено
-                booking.notification_1h_sent = True
-                await session.commit() 
\ No newline at end of file
+def get_reminder_settings_keyboard(muted_mask: int, back_callback: str) -> InlineKeyboardMarkup:
+    """Создает клавиатуру для включения и отключения этапов напоминаний"""
+    keyboard = [
+        [InlineKeyboardButton(
+            text=f"{'🔕' if (muted_mask or 0) & stage_mask(stage) else '✅'} {stage['title']}",
+            callback_data=f"reminders_toggle_{stage['bit']}"
+        )]
+        for stage in REMINDER_STAGES
+    ]
+    keyboard.append([InlineKeyboardButton(text="◀️ Назад", callback_data=back_callback)])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
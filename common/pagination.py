@@ -0,0 +1,110 @@
+"""
+Постраничный просмотр списков в одном сообщении.
+
+Вместо одного длинного сообщения (и разбиения текста длиннее 4096 символов на несколько)
+список показывается страницами: запрашиваются и форматируются только записи текущей
+страницы, под ними - навигация "◀️ 2/7 ▶️". Номер страницы передается в callback_data
+действия страницы (последнее поле действия), остальные поля действия - параметры
+списка (например, период расписания).
+
+    BOOKINGS_VIEW = PagedView(BOOKINGS_PAGE, count=..., fetch=..., render=..., footer=[...])
+
+    async def show_bookings(callback_query):
+        await BOOKINGS_VIEW.show(callback_query)
+
+    async def show_bookings_page(callback_query, callback_data):
+        await BOOKINGS_VIEW.show(callback_query, page=callback_data.page)
+
+count(session, user_id, *args) возвращает число записей, fetch(session, user_id, *args,
+offset=..., limit=...) - записи страницы, render(page) - текст и кнопки записей страницы.
+"""
+from typing import Any, Awaitable, Callable, List, Sequence, Tuple
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.callback_data import CallbackAction
+from common.database import async_session_maker
+
+PAGE_SIZE = 5
+MAX_MESSAGE_LENGTH = 4096
+
+Rows = List[List[InlineKeyboardButton]]
+
+
+class Page:
+    """Записи одной страницы списка"""
+    __slots__ = ("items", "number", "count", "total", "offset", "args")
+
+    def __init__(self, items: list, number: int, count: int, total: int, offset: int, args: tuple):
+        self.items = items
+        self.number = number  # Номер страницы с 0
+        self.count = count  # Всего страниц
+        self.total = total  # Всего записей
+        self.offset = offset  # Номер первой записи страницы с 0
+        self.args = args
+
+
+class PagedView:
+    """Список, который показывается по page_size записей со страницами в callback_data действия"""
+
+    def __init__(
+        self,
+        action: CallbackAction,
+        count: Callable[..., Awaitable[int]],
+        fetch: Callable[..., Awaitable[list]],
+        render: Callable[[Page], Tuple[str, Rows]],
+        page_size: int = PAGE_SIZE,
+        footer: Sequence[Sequence[InlineKeyboardButton]] = (),
+    ):
+        self.action = action
+        self.count = count
+        self.fetch = fetch
+        self.render = render
+        self.page_size = page_size
+        self.footer = [list(row) for row in footer]
+
+    async def load(self, session: AsyncSession, user_id: int, *args: Any, page: int = 0) -> Page:
+        """Загружает страницу; номер за пределами списка заменяется последней страницей"""
+        total = await self.count(session, user_id, *args)
+        pages = max(1, -(-total // self.page_size))
+        number = min(max(page, 0), pages - 1)
+        offset = number * self.page_size
+        items = await self.fetch(session, user_id, *args, offset=offset, limit=self.page_size) if total else []
+        return Page(list(items), number, pages, total, offset, args)
+
+    def navigation(self, page: Page) -> Rows:
+        """Кнопки "◀️ 2/7 ▶️" (переход по кругу), если страниц больше одной"""
+        if page.count <= 1:
+            return []
+        return [[
+            InlineKeyboardButton(
+                text="◀️", callback_data=self.action.pack(*page.args, (page.number - 1) % page.count)
+            ),
+            InlineKeyboardButton(
+                text=f"{page.number + 1}/{page.count}", callback_data=self.action.pack(*page.args, page.number)
+            ),
+            InlineKeyboardButton(
+                text="▶️", callback_data=self.action.pack(*page.args, (page.number + 1) % page.count)
+            ),
+        ]]
+
+    async def show(self, callback_query: types.CallbackQuery, *args: Any, page: int = 0) -> Page:
+        """Показывает страницу списка в сообщении с кнопкой"""
+        async with async_session_maker() as session:
+            loaded = await self.load(session, callback_query.from_user.id, *args, page=page)
+            text, rows = self.render(loaded)
+
+        if len(text) > MAX_MESSAGE_LENGTH:
+            text = text[:MAX_MESSAGE_LENGTH - 1] + "…"
+        keyboard = rows + self.navigation(loaded) + self.footer
+        try:
+            await callback_query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
+        except TelegramBadRequest as e:
+            # Нажатие на номер текущей страницы: сообщение не изменилось
+            if "message is not modified" not in str(e):
+                raise
+            await callback_query.answer()
+        return loaded
@@ -0,0 +1,106 @@
+"""
+Бюджеты SQL-запросов обработчиков.
+
+Обработчик объявляет, сколько запросов и загруженных строк ему достаточно:
+
+    @query_budget(statements=3, rows=50)
+    async def show_my_students(callback_query: types.CallbackQuery):
+        ...
+
+Сами по себе бюджеты на работу бота не влияют. Их проверяет scripts/check_query_budgets.py:
+прогоняет обработчики на тестовых данных, считает запросы через capture_queries()
+и сообщает о превышениях и о повторяющихся запросах одной формы (признак N+1).
+"""
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Сколько одинаковых по форме SELECT в одном обновлении считается признаком N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+
+class QueryBudget:
+    __slots__ = ("statements", "rows")
+
+    def __init__(self, statements: int, rows: Optional[int] = None):
+        self.statements = statements
+        self.rows = rows
+
+    def __repr__(self) -> str:
+        return f"QueryBudget(statements={self.statements}, rows={self.rows})"
+
+
+def query_budget(statements: int, rows: Optional[int] = None) -> Callable:
+    """Объявляет бюджет обработчика: не больше statements SQL-запросов и rows загруженных строк"""
+
+    def decorator(handler: Callable) -> Callable:
+        handler.query_budget = QueryBudget(statements, rows)
+        return handler
+
+    return decorator
+
+
+def get_query_budget(handler: Callable) -> Optional[QueryBudget]:
+    return getattr(handler, "query_budget", None)
+
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|:\w+|%\(\w+\)s)\s*,)+\s*(?:\?|:\w+|%\(\w+\)s)\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL-запрос без различий в пробелах и длине списков IN (...)"""
+    return _IN_LIST.sub("(?)", _SPACES.sub(" ", statement).strip())
+
+
+class QueryLog:
+    """Запросы, выполненные внутри capture_queries()"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.rows = 0  # Строк, загруженных в ORM-объекты
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """SELECT-запросы одной формы, выполненные threshold и больше раз"""
+        shapes = Counter(
+            statement_shape(statement) for statement in self.statements
+            if statement.lstrip().upper().startswith("SELECT")
+        )
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+
+@contextmanager
+def capture_queries(engine=None, base=None) -> Iterator[QueryLog]:
+    """
+    Записывает SQL-запросы движка и считает загруженные ORM-объекты.
+
+    Подписка на события действует только внутри блока with.
+    """
+    if engine is None or base is None:
+        from common.database import engine as default_engine, Base
+        engine = engine or default_engine
+        base = base or Base
+
+    log = QueryLog()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)
+
+    def on_load(target, context):
+        log.rows += 1
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(base, "load", on_load, propagate=True)
+    try:
+        yield log
+    finally:
+        event.remove(sync_engine, "after_cursor_execute", after_cursor_execute)
+        event.remove(base, "load", on_load)
@@ -0,0 +1,153 @@
+"""
+Очередь обновлений ботов.
+
+- Обновления одного пользователя обрабатываются по одному, в порядке поступления:
+  двойное нажатие кнопки не запускает обработчик дважды параллельно.
+- Всех обновлений процесса (обоих ботов в режиме webhook) одновременно обрабатывается
+  не больше max_concurrent_updates, остальные ждут.
+- Очередь ограничена: при переполнении (всего или у одного пользователя) обновление
+  отклоняется, пользователь получает просьбу повторить позже.
+
+Подключение: setup_update_limiter(dp, "tutor") до setup_metrics, чтобы время ожидания
+не попадало во время обработки. Глубина очереди - в метриках bot_updates_waiting,
+bot_updates_in_progress, bot_update_wait_seconds и bot_updates_rejected_total.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import Update
+
+from common.metrics import (
+    UPDATES_WAITING,
+    UPDATES_IN_PROGRESS,
+    UPDATE_WAIT_DURATION,
+    UPDATES_REJECTED_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_TEXT = "⏳ Слишком много запросов, повторите через несколько секунд"
+
+
+class _UserQueue:
+    """Блокировка пользователя и число его обновлений (ожидающих и выполняемых)"""
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class UpdateLimiter:
+    """Ограничения, общие для всех диспетчеров процесса"""
+
+    def __init__(self, max_concurrent: int, queue_size: int, user_queue_size: int):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.user_queue_size = user_queue_size
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.waiting = 0
+        # (бот, id пользователя) -> очередь; запись удаляется, когда обновлений не осталось
+        self._users: Dict[Tuple[str, int], _UserQueue] = {}
+
+
+_limiter: Optional[UpdateLimiter] = None
+
+
+def get_update_limiter() -> UpdateLimiter:
+    """Возвращает ограничитель процесса, при первом вызове создавая его по настройкам"""
+    global _limiter
+    if _limiter is None:
+        from common.config import get_settings
+
+        settings = get_settings()
+        _limiter = UpdateLimiter(
+            settings.max_concurrent_updates,
+            settings.update_queue_size,
+            settings.update_user_queue_size,
+        )
+    return _limiter
+
+
+class UpdateLimiterMiddleware(BaseMiddleware):
+    """Внешний middleware обновлений: очередь пользователя и общее ограничение"""
+
+    def __init__(self, bot_name: str, limiter: UpdateLimiter):
+        self.bot_name = bot_name
+        self.limiter = limiter
+        self.labels = (bot_name,)
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        limiter = self.limiter
+        if limiter.waiting >= limiter.queue_size:
+            return await self._reject(event, "queue_full")
+
+        # Пользователя определяет UserContextMiddleware диспетчера, он выполняется раньше
+        user = data.get("event_from_user")
+        queue = None
+        if user is not None:
+            key = (self.bot_name, user.id)
+            queue = limiter._users.get(key)
+            if queue is None:
+                queue = limiter._users[key] = _UserQueue()
+            elif queue.pending >= limiter.user_queue_size:
+                return await self._reject(event, "user_queue_full")
+            queue.pending += 1
+
+        limiter.waiting += 1
+        UPDATES_WAITING.inc(self.labels)
+        waiting = True
+        started = time.perf_counter()
+        try:
+            if queue is not None:
+                await queue.lock.acquire()
+            try:
+                async with limiter.semaphore:
+                    limiter.waiting -= 1
+                    UPDATES_WAITING.dec(self.labels)
+                    waiting = False
+                    UPDATE_WAIT_DURATION.observe(time.perf_counter() - started, self.labels)
+                    UPDATES_IN_PROGRESS.inc(self.labels)
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        UPDATES_IN_PROGRESS.dec(self.labels)
+            finally:
+                if queue is not None:
+                    queue.lock.release()
+        finally:
+            # Ожидание могло прерваться отменой задачи
+            if waiting:
+                limiter.waiting -= 1
+                UPDATES_WAITING.dec(self.labels)
+            if queue is not None:
+                queue.pending -= 1
+                if not queue.pending:
+                    limiter._users.pop(key, None)
+
+    async def _reject(self, event: Update, reason: str) -> None:
+        UPDATES_REJECTED_TOTAL.inc((self.bot_name, reason))
+        logger.warning(f"Update {event.update_id} of bot {self.bot_name} rejected: {reason}")
+        try:
+            # На callback-запрос нужно ответить, иначе кнопка "зависнет". На сообщения отвечаем
+            # только при общей перегрузке: пользователю, который шлет много сообщений подряд, - нет
+            if event.callback_query is not None:
+                await event.callback_query.answer(OVERLOAD_TEXT)
+            elif event.message is not None and reason == "queue_full":
+                await event.message.answer(OVERLOAD_TEXT)
+        except Exception as e:
+            logger.warning(f"Failed to notify user about rejected update: {e}")
+        return None
+
+
+def setup_update_limiter(dp: Dispatcher, bot_name: str) -> None:
+    """Подключает очередь обновлений к диспетчеру"""
+    dp.update.outer_middleware(UpdateLimiterMiddleware(bot_name, get_update_limiter()))
@@ -0,0 +1,123 @@
+"""
+Запуск обоих ботов в режиме webhook в одном aiohttp-приложении.
+
+Telegram отправляет обновления каждого бота на свой путь (webhook_tutor_path,
+webhook_parent_path) с секретным токеном в заголовке X-Telegram-Bot-Api-Secret-Token.
+Запросы с неверным токеном отклоняются, на остальные сразу отвечаем 200, а обработку
+запускаем в фоне. Сколько обновлений обрабатывается одновременно, ограничивает очередь
+обновлений диспетчеров (common/update_limiter.py), общая для обоих ботов.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from common.bots import get_tutor_bot, get_parent_bot, close_bots
+from common.config import get_settings
+from common.metrics import start_metrics_server, stop_metrics_server
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRequestHandler(SimpleRequestHandler):
+    """Обработчик webhook: обновление обрабатывается в фоне, ошибки пишутся в лог"""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, **kwargs: Any) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot=bot, update=update)
+        except Exception as e:
+            logger.error(f"Error while handling webhook update {update.get('update_id')}: {e}")
+
+
+def build_webhook_app(
+    bots: List[Dict[str, Any]],
+    base_url: Optional[str] = None,
+) -> web.Application:
+    """
+    Создает aiohttp-приложение для нескольких ботов.
+
+    Args:
+        bots: список словарей с ключами bot, dispatcher, path и secret
+        base_url: публичный адрес, по которому Telegram доступен сервер (по умолчанию webhook_base_url)
+
+    Returns:
+        web.Application: приложение, регистрирующее webhook при запуске
+    """
+    settings = get_settings()
+    base_url = base_url or settings.webhook_base_url
+    if not base_url:
+        raise ValueError("WEBHOOK_BASE_URL not found in environment variables")
+
+    app = web.Application()
+
+    for entry in bots:
+        bot, dispatcher = entry["bot"], entry["dispatcher"]
+        BackgroundRequestHandler(
+            dispatcher=dispatcher,
+            bot=bot,
+            secret_token=entry["secret"],
+        ).register(app, path=entry["path"])
+        setup_application(app, dispatcher, bot=bot)
+
+        async def set_webhook(app, bot=bot, dispatcher=dispatcher, path=entry["path"], secret=entry["secret"]):
+            await bot.set_webhook(
+                url=base_url.rstrip("/") + path,
+                secret_token=secret,
+                allowed_updates=dispatcher.resolve_used_update_types(),
+            )
+            logger.info(f"Webhook for bot {bot.id} set to {path}")
+
+        app.on_startup.append(set_webhook)
+
+    return app
+
+
+async def run_webhook(host: Optional[str] = None, port: Optional[int] = None, base_url: Optional[str] = None):
+    """Запускает оба бота в режиме webhook и работает до остановки процесса"""
+    from common.database import init_db
+    from common.callback_data import intern_strings
+    from tutor_bot.keyboards import SUBJECTS
+    from tutor_bot.main import setup_dispatcher as setup_tutor
+    from parent_bot.main import setup_dispatcher as setup_parent
+
+    settings = get_settings()
+    host = host or settings.webhook_host
+    port = port or settings.webhook_port
+
+    await init_db()
+    await intern_strings(SUBJECTS)
+    tutor_dp = setup_tutor()
+    parent_dp = setup_parent()
+
+    app = build_webhook_app(
+        [
+            {
+                "bot": get_tutor_bot(), "dispatcher": tutor_dp,
+                "path": settings.webhook_tutor_path, "secret": settings.webhook_tutor_secret,
+            },
+            {
+                "bot": get_parent_bot(), "dispatcher": parent_dp,
+                "path": settings.webhook_parent_path, "secret": settings.webhook_parent_secret,
+            },
+        ],
+        base_url=base_url,
+    )
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Webhook server started on {host}:{port}")
+    await start_metrics_server()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_metrics_server()
+        await runner.cleanup()
+        await close_bots()
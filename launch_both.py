@@ -1,4 +1,5 @@
 import asyncio
+from common.config import get_settings
 from parent_bot.main import main as parent_main
 from tutor_bot.main import main as tutor_main
 
@@ -10,4 +11,9 @@ async def run_both():
     )
 
 if __name__ == "__main__":
-    asyncio.run(run_both())
+    if get_settings().bot_mode == "webhook":
+        # Оба бота в одном aiohttp-приложении (см. common/webhook.py)
+        from common.webhook import run_webhook
+        asyncio.run(run_webhook())
+    else:
+        asyncio.run(run_both())
@@ -4,6 +4,9 @@ import calendar
 from typing import List, Dict, Any
 
 from common.database import Child, Tutor
+from common.callback_data import (
+    BOOK_CHILD, BOOK_TUTOR, BOOK_SUBJECT, BOOK_LESSON_TYPE, BOOK_CALENDAR, BOOK_DATE, BOOK_TIME
+)
 
 def get_children_keyboard(children: List[Child]) -> InlineKeyboardMarkup:
     """Создает клавиатуру со списком детей для выбора"""
@@ -17,7 +20,7 @@ def get_children_keyboard(children: List[Child]) -> InlineKeyboardMarkup:
         keyboard.append([
             InlineKeyboardButton(
                 text=child_name,
-                callback_data=f"book_child_{child.id}"
+                callback_data=BOOK_CHILD.pack(child.id)
             )
         ])
     
@@ -36,7 +39,7 @@ def get_tutors_keyboard(tutors: List[Tutor]) -> InlineKeyboardMarkup:
         keyboard.append([
             InlineKeyboardButton(
                 text=tutor_name,
-                callback_data=f"book_tutor_{tutor.id}"
+                callback_data=BOOK_TUTOR.pack(tutor.id)
             )
         ])
     
@@ -45,7 +48,10 @@ def get_tutors_keyboard(tutors: List[Tutor]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 def get_subjects_keyboard(subjects: List[Dict[str, Any]]) -> InlineKeyboardMarkup:
-    """Создает клавиатуру с предметами репетитора"""
+    """
+    Создает клавиатуру с предметами репетитора.
+    Названия предметов должны быть интернированы заранее (см. common.callback_data.intern_strings)
+    """
     keyboard = []
     
     for subject in subjects:
@@ -54,7 +60,7 @@ def get_subjects_keyboard(subjects: List[Dict[str, Any]]) -> InlineKeyboardMarku
             keyboard.append([
                 InlineKeyboardButton(
                     text=subject['name'],
-                    callback_data=f"book_subject_{subject['name']}"
+                    callback_data=BOOK_SUBJECT.pack(subject['name'])
                 )
             ])
     
@@ -87,21 +93,21 @@ def get_lesson_type_keyboard(subject_info: dict = None) -> tuple:
             keyboard.append([
                 InlineKeyboardButton(
                     text=f"📚 Стандартное занятие ({subject_info['standard_price']} ₽)",
-                    callback_data="book_type_standard"
+                    callback_data=BOOK_LESSON_TYPE.pack("standard")
                 )
             ])
         if subject_info.get('is_exam'):
             keyboard.append([
                 InlineKeyboardButton(
                     text=f"📝 Подготовка к экзамену ({subject_info['exam_price']} ₽)",
-                    callback_data="book_type_exam"
+                    callback_data=BOOK_LESSON_TYPE.pack("exam")
                 )
             ])
     else:
         # Базовая клавиатура без цен
         keyboard.append([
-            InlineKeyboardButton(text="📚 Стандартное занятие", callback_data="book_type_standard"),
-            InlineKeyboardButton(text="📝 Подготовка к экзамену", callback_data="book_type_exam")
+            InlineKeyboardButton(text="📚 Стандартное занятие", callback_data=BOOK_LESSON_TYPE.pack("standard")),
+            InlineKeyboardButton(text="📝 Подготовка к экзамену", callback_data=BOOK_LESSON_TYPE.pack("exam"))
         ])
     
     # Добавляем кнопки навигации
@@ -165,7 +171,7 @@ def create_calendar_keyboard(year: int, month: int, available_dates: List[dateti
                 if date in available_dates:
                     row.append(InlineKeyboardButton(
                         text=str(day),
-                        callback_data=f"book_date_{date.isoformat()}"
+                        callback_data=BOOK_DATE.pack(date)
                     ))
                 else:
                     row.append(InlineKeyboardButton(text="❌", callback_data="ignore"))
@@ -181,7 +187,7 @@ def create_calendar_keyboard(year: int, month: int, available_dates: List[dateti
         prev_year -= 1
     nav_row.append(InlineKeyboardButton(
         text="◀️",
-        callback_data=f"calendar_{prev_year}_{prev_month}"
+        callback_data=BOOK_CALENDAR.pack(prev_year, prev_month)
     ))
     
     # Следующий месяц
@@ -192,7 +198,7 @@ def create_calendar_keyboard(year: int, month: int, available_dates: List[dateti
         next_year += 1
     nav_row.append(InlineKeyboardButton(
         text="▶️",
-        callback_data=f"calendar_{next_year}_{next_month}"
+        callback_data=BOOK_CALENDAR.pack(next_year, next_month)
     ))
     keyboard.append(nav_row)
     
@@ -218,7 +224,7 @@ def get_time_slots_keyboard(available_slots: List[tuple]) -> InlineKeyboardMarku
         keyboard.append([
             InlineKeyboardButton(
                 text=f"🕒 {start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}",
-                callback_data=f"book_time_{start_time.strftime('%H:%M')}_{end_time.strftime('%H:%M')}"
+                callback_data=BOOK_TIME.pack(start_time, end_time)
             )
         ])
     
@@ -1,13 +1,25 @@
 from aiogram import types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import selectinload, joinedload
 from datetime import datetime, timedelta
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from typing import List
 
 from common.database import Parent, Child, Tutor, Booking, BookingStatus, FavoriteTutor, async_session_maker
+from common.query_budget import query_budget
+from common.intervals import DayIntervals, load_day_intervals
+from common.pagination import Page, PagedView
+from common import booking_cards
+from common.booking_cards import render_card
+from common.callback_router import get_callback_router
+from common.bots import get_tutor_bot
+from common.callback_data import (
+    BOOK_CHILD, BOOK_TUTOR, BOOK_SUBJECT, BOOK_LESSON_TYPE, BOOK_CALENDAR, BOOK_DATE, BOOK_TIME,
+    CANCEL_BOOKING, CONFIRM_CANCEL_BOOKING, APPROVE_BOOKING, REJECT_BOOKING, BOOKINGS_PAGE,
+    REJECTED_BOOKINGS_PAGE, intern_strings
+)
 from parent_bot.booking_kb import (
     get_children_keyboard,
     get_tutors_keyboard,
@@ -68,14 +80,8 @@ async def calculate_available_slots(
         
     available_slots = []
     
-    # Преобразуем существующие подтвержденные записи в список занятых интервалов
-    busy_slots = []
-    for booking in existing_bookings:
-        if booking.status == BookingStatus.APPROVED:
-            busy_slots.append((booking.start_time, booking.end_time))
-    
-    # Сортируем занятые слоты по времени начала
-    busy_slots.sort(key=lambda x: x[0])
+    # Занятые интервалы - подтвержденные записи
+    busy = DayIntervals(booking for booking in existing_bookings if booking.status == BookingStatus.APPROVED)
     
     try:
         # Парсим время начала и конца рабочего дня
@@ -119,14 +125,7 @@ async def calculate_available_slots(
             slot_end_time = datetime.strptime(f"{end_slot_hour:02d}:{end_slot_minute:02d}", '%H:%M').time()
             
             # Проверяем, не пересекается ли слот с существующими записями
-            is_available = True
-            for busy_start, busy_end in busy_slots:
-                if (current_time < busy_end and 
-                    slot_end_time > busy_start):
-                    is_available = False
-                    break
-            
-            if is_available:
+            if busy.first_conflict(current_time, slot_end_time) is None:
                 available_slots.append((current_time, slot_end_time))
             
             # Увеличиваем текущее время на 30 минут
@@ -153,214 +152,133 @@ async def is_date_available(date: datetime.date, tutor_id: int, lesson_duration:
     # TODO: Реализовать проверку доступности даты
     pass
 
-async def show_bookings(callback_query: types.CallbackQuery):
-    """Показывает активные записи пользователя (ожидающие и подтвержденные)"""
-    async with async_session_maker() as session:
-        # Получаем данные о родителе
-        parent = await session.execute(
-            select(Parent)
-            .options(
-                selectinload(Parent.bookings)
-                .selectinload(Booking.tutor),
-                selectinload(Parent.bookings)
-                .selectinload(Booking.child)
-            )
-            .where(Parent.telegram_id == callback_query.from_user.id)
+def parent_bookings_query(query, telegram_id: int, statuses: List[BookingStatus]):
+    """Ограничивает запрос записями родителя с заданными статусами"""
+    return query.join(Booking.parent).where(
+        Parent.telegram_id == telegram_id,
+        Booking.status.in_(statuses)
+    )
+
+ACTIVE_STATUSES = [BookingStatus.PENDING, BookingStatus.APPROVED]
+
+async def count_active_bookings(session, telegram_id: int) -> int:
+    return await session.scalar(
+        parent_bookings_query(select(func.count(Booking.id)), telegram_id, ACTIVE_STATUSES)
+    )
+
+async def fetch_active_bookings(session, telegram_id: int, offset: int, limit: int) -> List[Booking]:
+    # Сначала ожидающие подтверждения, затем подтвержденные, внутри - по дате и времени
+    result = await session.execute(
+        parent_bookings_query(select(Booking), telegram_id, ACTIVE_STATUSES)
+        .options(joinedload(Booking.tutor), joinedload(Booking.child))
+        .order_by(
+            case((Booking.status == BookingStatus.PENDING, 0), else_=1),
+            Booking.date,
+            Booking.start_time,
+            Booking.id
         )
-        parent = parent.scalar_one_or_none()
-        
-        if not parent:
-            await callback_query.message.edit_text(
-                "❌ Ошибка: не удалось найти ваши данные.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-                ])
-            )
-            return
-        
-        # Разделяем записи по статусам
-        pending_bookings = []
-        approved_bookings = []
-        
-        for booking in sorted(parent.bookings, key=lambda b: (b.date, b.start_time)):
-            if booking.status == BookingStatus.PENDING:
-                pending_bookings.append(booking)
-            elif booking.status == BookingStatus.APPROVED:
-                approved_bookings.append(booking)
-        
-        text = ""
-        keyboard = []
-        
-        # Добавляем ожидающие записи
-        if pending_bookings:
-            text += "📋 Ожидающие подтверждения:\n\n"
-            for booking in pending_bookings:
-                text += (
-                    f"📚 {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
-                    f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-                    f"👨‍🏫 Репетитор: {booking.tutor.name} {booking.tutor.surname}\n"
-                    f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-                    f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-                    f"💰 Стоимость: {booking.price} ₽\n"
-                    "-------------------\n"
-                )
-        
-        # Добавляем подтвержденные записи
-        if approved_bookings:
-            text += "\n✅ Подтвержденные записи:\n\n"
-            for booking in approved_bookings:
-                text += (
-                    f"📚 {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
-                    f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-                    f"👨‍🏫 Репетитор: {booking.tutor.name} {booking.tutor.surname}\n"
-                    f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-                    f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-                    f"💰 Стоимость: {booking.price} ₽\n"
-                    f"✅ Подтверждено: {booking.approved_at.strftime('%d.%m.%Y %H:%M') if booking.approved_at else 'Дата не указана'}\n"
-                    "-------------------\n"
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+def render_active_bookings(page: Page):
+    if not page.items:
+        return "У вас нет активных записей на занятия.", []
+
+    text = ""
+    keyboard = []
+    status = None
+    for booking in page.items:
+        # Заголовок группы на каждой странице, где она встречается
+        if booking.status != status:
+            status = booking.status
+            if status == BookingStatus.PENDING:
+                text += "📋 Ожидающие подтверждения:\n\n"
+            else:
+                text += "\n✅ Подтвержденные записи:\n\n" if text else "✅ Подтвержденные записи:\n\n"
+
+        if booking.status == BookingStatus.APPROVED:
+            text += render_card(booking, booking_cards.PARENT_APPROVED)
+            keyboard.append([
+                InlineKeyboardButton(
+                    text=f"❌ Отменить запись на {booking.date.strftime('%d.%m.%Y')} {booking.start_time.strftime('%H:%M')}",
+                    callback_data=CANCEL_BOOKING.pack(booking.id)
                 )
-                keyboard.append([
-                    InlineKeyboardButton(
-                        text=f"❌ Отменить запись на {booking.date.strftime('%d.%m.%Y')} {booking.start_time.strftime('%H:%M')}",
-                        callback_data=f"cancel_booking_{booking.id}"
-                    )
-                ])
-        
-        if not text:
-            text = "У вас нет активных записей на занятия."
-        
-        # Добавляем кнопки управления
-        keyboard.extend([
-            [InlineKeyboardButton(text="✖ Отклоненные записи", callback_data="show_rejected_bookings")],
-            [InlineKeyboardButton(text="📝 Записаться на занятие", callback_data="start_booking")],
-            [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-        ])
-        
-        # Разбиваем длинное сообщение при необходимости
-        if len(text) > 4096:
-            parts = []
-            while text:
-                if len(text) > 4096:
-                    part = text[:4096]
-                    last_newline = part.rfind('\n')
-                    if last_newline != -1:
-                        parts.append(part[:last_newline])
-                        text = text[last_newline + 1:]
-                    else:
-                        parts.append(part)
-                        text = text[4096:]
-                else:
-                    parts.append(text)
-                    break
-            
-            # Отправляем части сообщения
-            for i, part in enumerate(parts):
-                if i == len(parts) - 1:  # Последняя часть
-                    await callback_query.message.edit_text(
-                        part,
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-                    )
-                else:
-                    await callback_query.message.answer(part)
+            ])
         else:
-            await callback_query.message.edit_text(
-                text,
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-            )
+            text += render_card(booking, booking_cards.PARENT)
+        text += "-------------------\n"
+    return text, keyboard
+
+ACTIVE_BOOKINGS_VIEW = PagedView(
+    BOOKINGS_PAGE,
+    count=count_active_bookings,
+    fetch=fetch_active_bookings,
+    render=render_active_bookings,
+    footer=[
+        [InlineKeyboardButton(text="✖ Отклоненные записи", callback_data="show_rejected_bookings")],
+        [InlineKeyboardButton(text="📝 Записаться на занятие", callback_data="start_booking")],
+        [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
+    ]
+)
+
+async def count_rejected_bookings(session, telegram_id: int) -> int:
+    return await session.scalar(
+        parent_bookings_query(select(func.count(Booking.id)), telegram_id, [BookingStatus.REJECTED])
+    )
+
+async def fetch_rejected_bookings(session, telegram_id: int, offset: int, limit: int) -> List[Booking]:
+    result = await session.execute(
+        parent_bookings_query(select(Booking), telegram_id, [BookingStatus.REJECTED])
+        .options(joinedload(Booking.tutor), joinedload(Booking.child))
+        .order_by(Booking.date, Booking.start_time, Booking.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+def render_rejected_bookings(page: Page):
+    if not page.items:
+        return "У вас нет отклоненных записей.", []
+
+    text = "❌ Отклоненные записи:\n\n"
+    for booking in page.items:
+        text += render_card(booking, booking_cards.PARENT_REJECTED) + "-------------------\n"
+    return text, []
+
+REJECTED_BOOKINGS_VIEW = PagedView(
+    REJECTED_BOOKINGS_PAGE,
+    count=count_rejected_bookings,
+    fetch=fetch_rejected_bookings,
+    render=render_rejected_bookings,
+    footer=[
+        [InlineKeyboardButton(text="📋 Вернуться к моим записям", callback_data="my_bookings")],
+        [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
+    ]
+)
+
+@query_budget(statements=2)
+async def show_bookings(callback_query: types.CallbackQuery):
+    """Показывает активные записи пользователя (ожидающие и подтвержденные)"""
+    await ACTIVE_BOOKINGS_VIEW.show(callback_query)
 
+@query_budget(statements=2)
+async def show_bookings_page(callback_query: types.CallbackQuery, callback_data):
+    """Показывает страницу активных записей"""
+    await ACTIVE_BOOKINGS_VIEW.show(callback_query, page=callback_data.page)
+
+@query_budget(statements=2)
 async def show_rejected_bookings(callback_query: types.CallbackQuery):
     """Показывает отклоненные записи пользователя"""
-    async with async_session_maker() as session:
-        # Получаем данные о родителе
-        parent = await session.execute(
-            select(Parent)
-            .options(
-                selectinload(Parent.bookings)
-                .selectinload(Booking.tutor),
-                selectinload(Parent.bookings)
-                .selectinload(Booking.child)
-            )
-            .where(Parent.telegram_id == callback_query.from_user.id)
-        )
-        parent = parent.scalar_one_or_none()
-        
-        if not parent:
-            await callback_query.message.edit_text(
-                "❌ Ошибка: не удалось найти ваши данные.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-                ])
-            )
-            return
-        
-        # Получаем только отклоненные записи
-        rejected_bookings = sorted(
-            [b for b in parent.bookings if b.status == BookingStatus.REJECTED],
-            key=lambda b: (b.date, b.start_time)
-        )
-        
-        if not rejected_bookings:
-            await callback_query.message.edit_text(
-                "У вас нет отклоненных записей.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="📋 Вернуться к моим записям", callback_data="my_bookings")],
-                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-                ])
-            )
-            return
-        
-        text = "❌ Отклоненные записи:\n\n"
-        keyboard = []
-        
-        for booking in rejected_bookings:
-            text += (
-                f"📚 {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
-                f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-                f"👨‍🏫 Репетитор: {booking.tutor.name} {booking.tutor.surname}\n"
-                f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-                f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-                f"💰 Стоимость: {booking.price} ₽\n"
-                f"❌ Причина: {booking.rejection_reason}\n"
-                "-------------------\n"
-            )
-        
-        keyboard.extend([
-            [InlineKeyboardButton(text="📋 Вернуться к моим записям", callback_data="my_bookings")],
-            [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-        ])
-        
-        # Разбиваем длинное сообщение при необходимости
-        if len(text) > 4096:
-            parts = []
-            while text:
-                if len(text) > 4096:
-                    part = text[:4096]
-                    last_newline = part.rfind('\n')
-                    if last_newline != -1:
-                        parts.append(part[:last_newline])
-                        text = text[last_newline + 1:]
-                    else:
-                        parts.append(part)
-                        text = text[4096:]
-                else:
-                    parts.append(text)
-                    break
-            
-            # Отправляем части сообщения
-            for i, part in enumerate(parts):
-                if i == len(parts) - 1:  # Последняя часть
-                    await callback_query.message.edit_text(
-                        part,
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-                    )
-                else:
-                    await callback_query.message.answer(part)
-        else:
-            await callback_query.message.edit_text(
-                text,
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-            )
+    await REJECTED_BOOKINGS_VIEW.show(callback_query)
 
+@query_budget(statements=2)
+async def show_rejected_bookings_page(callback_query: types.CallbackQuery, callback_data):
+    """Показывает страницу отклоненных записей"""
+    await REJECTED_BOOKINGS_VIEW.show(callback_query, page=callback_data.page)
+
+@query_budget(statements=2)
 async def start_booking(callback_query: types.CallbackQuery, state: FSMContext):
     """Начинает процесс бронирования занятия"""
     async with async_session_maker() as session:
@@ -396,9 +314,10 @@ async def start_booking(callback_query: types.CallbackQuery, state: FSMContext):
         # Устанавливаем состояние ожидания выбора ребенка
         await state.set_state(BookingStates.waiting_for_child)
 
-async def process_child_selection(callback_query: types.CallbackQuery, state: FSMContext):
+@query_budget(statements=4)
+async def process_child_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Обрабатывает выбор ребенка"""
-    child_id = int(callback_query.data.split('_')[-1])
+    child_id = callback_data.child_id
     
     async with async_session_maker() as session:
         # Получаем данные о ребенке
@@ -451,9 +370,10 @@ async def process_child_selection(callback_query: types.CallbackQuery, state: FS
         # Переходим к следующему состоянию
         await state.set_state(BookingStates.waiting_for_tutor)
 
-async def process_tutor_selection(callback_query: types.CallbackQuery, state: FSMContext):
+@query_budget(statements=2, rows=2)
+async def process_tutor_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Обрабатывает выбор репетитора"""
-    tutor_id = int(callback_query.data.split('_')[-1])
+    tutor_id = callback_data.tutor_id
     
     async with async_session_maker() as session:
         # Получаем данные о репетиторе
@@ -488,6 +408,7 @@ async def process_tutor_selection(callback_query: types.CallbackQuery, state: FS
             return
         
         # Создаем клавиатуру с предметами
+        await intern_strings(subject['name'] for subject in subjects)
         keyboard = get_subjects_keyboard(subjects)
         
         # Получаем данные о ребенке для сообщения
@@ -524,9 +445,10 @@ async def process_tutor_selection(callback_query: types.CallbackQuery, state: FS
         # Переходим к следующему состоянию
         await state.set_state(BookingStates.waiting_for_subject)
 
-async def process_subject_selection(callback_query: types.CallbackQuery, state: FSMContext):
+@query_budget(statements=2, rows=2)
+async def process_subject_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Обрабатывает выбор предмета"""
-    subject_name = callback_query.data.split('_')[2]
+    subject_name = callback_data.subject
     state_data = await state.get_data()
     
     # Находим выбранный предмет в списке предметов репетитора
@@ -589,9 +511,10 @@ async def process_subject_selection(callback_query: types.CallbackQuery, state:
         )
         await state.set_state(BookingStates.waiting_for_lesson_type)
 
-async def process_lesson_type_selection(callback_query: types.CallbackQuery, state: FSMContext):
+@query_budget(statements=3)
+async def process_lesson_type_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Обрабатывает выбор типа занятия"""
-    lesson_type = callback_query.data.split('_')[-1]  # standard или exam
+    lesson_type = callback_data.lesson_type  # standard или exam
     state_data = await state.get_data()
     subject_info = state_data['subject_info']
     
@@ -708,34 +631,37 @@ async def get_available_dates(
     available_dates = []
     current_date = start_date
 
+    # Подтвержденные записи за весь диапазон одним запросом
     async with async_session_maker() as session:
-        while current_date <= end_date:
-            # Проверяем, работает ли репетитор в этот день недели
-            weekday = current_date.strftime('%A').lower()  # Получаем день недели в нижнем регистре
-            if weekday in tutor_schedule:
-                # Получаем существующие подтвержденные записи на эту дату
-                existing_bookings = await session.execute(
-                    select(Booking)
-                    .where(
-                        Booking.tutor_id == tutor_id,
-                        Booking.date == current_date,
-                        Booking.status == BookingStatus.APPROVED
-                    )
-                )
-                existing_bookings = existing_bookings.scalars().all()
+        result = await session.execute(
+            select(Booking)
+            .where(
+                Booking.tutor_id == tutor_id,
+                Booking.date >= start_date,
+                Booking.date <= end_date,
+                Booking.status == BookingStatus.APPROVED
+            )
+        )
+        bookings_by_date = {}
+        for booking in result.scalars():
+            bookings_by_date.setdefault(booking.date, []).append(booking)
 
-                # Проверяем, есть ли свободные слоты в этот день
-                day_slots = await calculate_available_slots(
-                    tutor_schedule,
-                    existing_bookings,
-                    lesson_duration,
-                    current_date
-                )
+    while current_date <= end_date:
+        # Проверяем, работает ли репетитор в этот день недели
+        weekday = current_date.strftime('%A').lower()  # Получаем день недели в нижнем регистре
+        if weekday in tutor_schedule:
+            # Проверяем, есть ли свободные слоты в этот день
+            day_slots = await calculate_available_slots(
+                tutor_schedule,
+                bookings_by_date.get(current_date, []),
+                lesson_duration,
+                current_date
+            )
 
-                if day_slots:  # Если есть свободные слоты
-                    available_dates.append(current_date)
+            if day_slots:  # Если есть свободные слоты
+                available_dates.append(current_date)
 
-            current_date += timedelta(days=1)
+        current_date += timedelta(days=1)
 
     return available_dates
 
@@ -839,6 +765,7 @@ async def back_to_subject_selection(callback_query: types.CallbackQuery, state:
             return
         
         # Создаем клавиатуру с предметами
+        await intern_strings(subject['name'] for subject in tutor.subjects)
         keyboard = get_subjects_keyboard(tutor.subjects)
         
         # Формируем текст с доступными типами занятий для каждого предмета
@@ -878,9 +805,9 @@ async def cancel_booking(callback_query: types.CallbackQuery, state: FSMContext)
         ])
     )
 
-async def process_calendar_navigation(callback_query: types.CallbackQuery, state: FSMContext):
+async def process_calendar_navigation(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Обрабатывает навигацию по календарю"""
-    year, month = map(int, callback_query.data.split('_')[1:])
+    year, month = callback_data.year, callback_data.month
     state_data = await state.get_data()
     
     async with async_session_maker() as session:
@@ -933,12 +860,10 @@ async def process_calendar_navigation(callback_query: types.CallbackQuery, state
         # Обновляем сообщение с календарем
         await callback_query.message.edit_reply_markup(reply_markup=keyboard)
 
-async def process_date_selection(callback_query: types.CallbackQuery, state: FSMContext):
+@query_budget(statements=3)
+async def process_date_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Обрабатывает выбор даты"""
-    selected_date = datetime.strptime(
-        callback_query.data.split('_')[-1],
-        '%Y-%m-%d'
-    ).date()
+    selected_date = callback_data.date
     
     state_data = await state.get_data()
     
@@ -959,16 +884,8 @@ async def process_date_selection(callback_query: types.CallbackQuery, state: FSM
             await state.clear()
             return
         
-        # Получаем существующие записи на эту дату
-        existing_bookings = await session.execute(
-            select(Booking)
-            .where(
-                Booking.tutor_id == tutor.id,
-                Booking.date == selected_date,
-                Booking.status == 'active'
-            )
-        )
-        existing_bookings = existing_bookings.scalars().all()
+        # Получаем подтвержденные записи на эту дату
+        existing_bookings = await load_day_intervals(session, tutor.id, selected_date)
         
         # Получаем доступные временные слоты
         available_slots = await calculate_available_slots(
@@ -1021,14 +938,13 @@ async def process_date_selection(callback_query: types.CallbackQuery, state: FSM
         # Переходим к следующему состоянию
         await state.set_state(BookingStates.waiting_for_time)
 
-async def process_time_selection(callback_query: types.CallbackQuery, state: FSMContext):
+@query_budget(statements=2, rows=2)
+async def process_time_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Обрабатывает выбор времени и показывает подтверждение бронирования"""
     # Получаем выбранное время из callback_data
-    start_time_str, end_time_str = callback_query.data.split('_')[2:]
-    
-    # Преобразуем строки времени в объекты time
-    start_time = datetime.strptime(start_time_str, '%H:%M').time()
-    end_time = datetime.strptime(end_time_str, '%H:%M').time()
+    start_time, end_time = callback_data.start, callback_data.end
+    start_time_str = start_time.strftime('%H:%M')
+    end_time_str = end_time.strftime('%H:%M')
     
     # Получаем сохраненные данные
     state_data = await state.get_data()
@@ -1086,10 +1002,18 @@ async def process_time_selection(callback_query: types.CallbackQuery, state: FSM
         # Переходим к состоянию подтверждения
         await state.set_state(BookingStates.confirmation)
 
+# Поиск репетитора и ребенка, вставка записи и увеличение версии расписания репетитора
+@query_budget(statements=4, rows=2)
 async def confirm_booking(callback_query: types.CallbackQuery, state: FSMContext):
     """Подтверждает создание записи"""
+    # Повторное нажатие: обновления пользователя обрабатываются по очереди
+    # (common/update_limiter.py), к этому моменту первое уже создало запись и сбросило состояние
+    if await state.get_state() != BookingStates.confirmation.state:
+        await callback_query.answer("Запись уже отправлена репетитору")
+        return
+
     state_data = await state.get_data()
-    
+
     async with async_session_maker() as session:
         try:
             
@@ -1144,7 +1068,7 @@ async def confirm_booking(callback_query: types.CallbackQuery, state: FSMContext
             await session.commit()
             
             # Уведомляем репетитора о новой записи
-            from tutor_bot.main import bot as tutor_bot
+            tutor_bot = get_tutor_bot()
             
             notification_text = (
                 "🔔 Новая запись на занятие!\n\n"
@@ -1160,11 +1084,11 @@ async def confirm_booking(callback_query: types.CallbackQuery, state: FSMContext
                 [
                     InlineKeyboardButton(
                         text="✅ Подтвердить",
-                        callback_data=f"approve_booking_{booking.id}"
+                        callback_data=APPROVE_BOOKING.pack(booking.id)
                     ),
                     InlineKeyboardButton(
                         text="❌ Отклонить",
-                        callback_data=f"reject_booking_{booking.id}"
+                        callback_data=REJECT_BOOKING.pack(booking.id)
                     )
                 ],
                 [
@@ -1224,9 +1148,9 @@ def get_booking_confirmation_keyboard() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_booking")]
     ])
 
-async def cancel_existing_booking(callback_query: types.CallbackQuery):
+async def cancel_existing_booking(callback_query: types.CallbackQuery, callback_data):
     """Обрабатывает отмену существующей записи"""
-    booking_id = int(callback_query.data.split('_')[-1])
+    booking_id = callback_data.booking_id
     
     async with async_session_maker() as session:
         # Получаем данные о родителе
@@ -1295,7 +1219,7 @@ async def cancel_existing_booking(callback_query: types.CallbackQuery):
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(
                 text="❌ Да, отменить запись",
-                callback_data=f"confirm_cancel_booking_{booking_id}"
+                callback_data=CONFIRM_CANCEL_BOOKING.pack(booking_id)
             )],
             [InlineKeyboardButton(
                 text="◀️ Нет, вернуться к списку записей",
@@ -1308,9 +1232,9 @@ async def cancel_existing_booking(callback_query: types.CallbackQuery):
             reply_markup=keyboard
         )
 
-async def confirm_cancel_booking(callback_query: types.CallbackQuery):
+async def confirm_cancel_booking(callback_query: types.CallbackQuery, callback_data):
     """Подтверждает отмену записи"""
-    booking_id = int(callback_query.data.split('_')[-1])
+    booking_id = callback_data.booking_id
     
     async with async_session_maker() as session:
         try:
@@ -1365,7 +1289,7 @@ async def confirm_cancel_booking(callback_query: types.CallbackQuery):
             await session.commit()
             
             # Уведомляем репетитора об отмене
-            from tutor_bot.main import bot as tutor_bot
+            tutor_bot = get_tutor_bot()
             notification_text = (
                 "❌ Запись отменена родителем\n\n"
                 f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
@@ -1488,22 +1412,25 @@ async def back_to_lesson_type(callback_query: types.CallbackQuery, state: FSMCon
 
 def register_booking_handlers(dp):
     """Регистрирует обработчики для процесса бронирования"""
-    dp.callback_query.register(show_bookings, lambda c: c.data == "my_bookings")
-    dp.callback_query.register(show_rejected_bookings, lambda c: c.data == "show_rejected_bookings")
-    dp.callback_query.register(start_booking, lambda c: c.data == "start_booking")
-    dp.callback_query.register(process_child_selection, lambda c: c.data.startswith("book_child_"))
-    dp.callback_query.register(process_tutor_selection, lambda c: c.data.startswith("book_tutor_"))
-    dp.callback_query.register(process_subject_selection, lambda c: c.data.startswith("book_subject_"))
-    dp.callback_query.register(process_lesson_type_selection, lambda c: c.data.startswith("book_type_"))
-    dp.callback_query.register(process_calendar_navigation, lambda c: c.data.startswith("calendar_"))
-    dp.callback_query.register(process_date_selection, lambda c: c.data.startswith("book_date_"))
-    dp.callback_query.register(process_time_selection, lambda c: c.data.startswith("book_time_"))
-    dp.callback_query.register(confirm_booking, lambda c: c.data == "confirm_booking")
-    dp.callback_query.register(cancel_existing_booking, lambda c: c.data.startswith("cancel_booking_"))
-    dp.callback_query.register(confirm_cancel_booking, lambda c: c.data.startswith("confirm_cancel_booking_"))
-    dp.callback_query.register(back_to_child_selection, lambda c: c.data == "back_to_child_selection")
-    dp.callback_query.register(back_to_tutor_selection, lambda c: c.data == "back_to_tutor_selection")
-    dp.callback_query.register(back_to_subject_selection, lambda c: c.data == "back_to_subject_selection")
-    dp.callback_query.register(back_to_lesson_type, lambda c: c.data == "back_to_lesson_type")
-    dp.callback_query.register(back_to_date_selection, lambda c: c.data == "back_to_date_selection")
-    dp.callback_query.register(cancel_booking, lambda c: c.data == "cancel_booking") 
\ No newline at end of file
+    router = get_callback_router(dp)
+    router.exact("my_bookings", show_bookings)
+    router.action(BOOKINGS_PAGE, show_bookings_page)
+    router.exact("show_rejected_bookings", show_rejected_bookings)
+    router.action(REJECTED_BOOKINGS_PAGE, show_rejected_bookings_page)
+    router.exact("start_booking", start_booking)
+    router.action(BOOK_CHILD, process_child_selection)
+    router.action(BOOK_TUTOR, process_tutor_selection)
+    router.action(BOOK_SUBJECT, process_subject_selection)
+    router.action(BOOK_LESSON_TYPE, process_lesson_type_selection)
+    router.action(BOOK_CALENDAR, process_calendar_navigation)
+    router.action(BOOK_DATE, process_date_selection)
+    router.action(BOOK_TIME, process_time_selection)
+    router.exact("confirm_booking", confirm_booking)
+    router.action(CANCEL_BOOKING, cancel_existing_booking)
+    router.action(CONFIRM_CANCEL_BOOKING, confirm_cancel_booking)
+    router.exact("back_to_child_selection", back_to_child_selection)
+    router.exact("back_to_tutor_selection", back_to_tutor_selection)
+    router.exact("back_to_subject_selection", back_to_subject_selection)
+    router.exact("back_to_lesson_type", back_to_lesson_type)
+    router.exact("back_to_date_selection", back_to_date_selection)
+    router.exact("cancel_booking", cancel_booking) 
\ No newline at end of file
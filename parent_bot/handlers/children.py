@@ -9,6 +9,9 @@ from sqlalchemy.orm import selectinload
 import asyncio
 
 from common.database import Parent, Child, Gender, async_session_maker
+from common.query_budget import query_budget
+from common.callback_router import get_callback_router
+from common.callback_data import EDIT_CHILD, DELETE_CHILD, CONFIRM_DELETE_CHILD
 from parent_bot.keyboards import (
     get_children_list_keyboard, get_gender_keyboard, 
     get_grade_keyboard, get_child_edit_keyboard,
@@ -132,9 +135,9 @@ async def process_add_textbook(message: types.Message, state: FSMContext):
 
 # === Handlers for editing child information ===
 
-async def start_edit_child(callback_query: types.CallbackQuery, state: FSMContext):
+async def start_edit_child(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Начинает процесс редактирования данных ребенка"""
-    child_id = int(callback_query.data.split('_')[2])
+    child_id = callback_data.child_id
     
     async with async_session_maker() as session:
         child = await session.execute(
@@ -365,9 +368,9 @@ async def process_edit_textbook(message: types.Message, state: FSMContext):
 
 # === Delete child handlers ===
 
-async def confirm_delete_child(callback_query: types.CallbackQuery):
+async def confirm_delete_child(callback_query: types.CallbackQuery, callback_data):
     """Запрашивает подтверждение удаления ребенка"""
-    child_id = int(callback_query.data.split('_')[2])
+    child_id = callback_data.child_id
     
     async with async_session_maker() as session:
         child = await session.execute(
@@ -384,15 +387,15 @@ async def confirm_delete_child(callback_query: types.CallbackQuery):
                 f"Вы уверены, что хотите удалить {child_name}?",
                 reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                     [
-                        InlineKeyboardButton(text="Да", callback_data=f"confirm_delete_{child_id}"),
+                        InlineKeyboardButton(text="Да", callback_data=CONFIRM_DELETE_CHILD.pack(child_id)),
                         InlineKeyboardButton(text="Нет", callback_data="show_children")
                     ]
                 ])
             )
 
-async def delete_child(callback_query: types.CallbackQuery):
+async def delete_child(callback_query: types.CallbackQuery, callback_data):
     """Удаляет ребенка"""
-    child_id = int(callback_query.data.split('_')[2])
+    child_id = callback_data.child_id
     
     async with async_session_maker() as session:
         async with session.begin():
@@ -407,6 +410,7 @@ async def delete_child(callback_query: types.CallbackQuery):
     await callback_query.answer("Ребенок удален")
     await show_children_list(callback_query)
 
+@query_budget(statements=2)
 async def show_children_list(callback_query: types.CallbackQuery):
     """Показывает список детей родителя"""
     async with async_session_maker() as session:
@@ -432,36 +436,37 @@ async def show_children_list(callback_query: types.CallbackQuery):
 
 def register_children_handlers(dp):
     """Регистрирует обработчики для управления детьми"""
+    router = get_callback_router(dp)
     # Просмотр списка детей
-    dp.callback_query.register(show_children_list, lambda c: c.data == "children")
-    dp.callback_query.register(show_children_list, lambda c: c.data == "show_children")
+    router.exact("children", show_children_list)
+    router.exact("show_children", show_children_list)
     
     # Добавление ребенка
-    dp.callback_query.register(start_add_child, lambda c: c.data == "add_child")
+    router.exact("add_child", start_add_child)
     dp.message.register(process_add_name, AddChildStates.waiting_for_name)
     dp.message.register(process_add_surname, AddChildStates.waiting_for_surname)
     dp.message.register(process_add_patronymic, AddChildStates.waiting_for_patronymic)
-    dp.callback_query.register(skip_add_patronymic, lambda c: c.data == "skip_add_patronymic")
-    dp.callback_query.register(process_add_gender, lambda c: c.data.startswith("add_gender_"))
-    dp.callback_query.register(process_add_grade, lambda c: c.data.startswith("add_grade_"))
+    router.exact("skip_add_patronymic", skip_add_patronymic)
+    router.prefix("add_gender_", process_add_gender)
+    router.prefix("add_grade_", process_add_grade)
     dp.message.register(process_add_textbook, AddChildStates.waiting_for_textbook)
     
     # Редактирование ребенка
-    dp.callback_query.register(start_edit_child, lambda c: c.data.startswith("edit_child_"))
-    dp.callback_query.register(edit_fio, lambda c: c.data == "edit_fio")
-    dp.callback_query.register(edit_back, lambda c: c.data == "edit_back")
-    dp.callback_query.register(edit_name, lambda c: c.data == "child_edit_name")
-    dp.callback_query.register(edit_surname, lambda c: c.data == "child_edit_surname")
-    dp.callback_query.register(edit_patronymic, lambda c: c.data == "child_edit_patronymic")
-    dp.callback_query.register(edit_grade, lambda c: c.data == "edit_grade")
-    dp.callback_query.register(edit_textbook, lambda c: c.data == "edit_textbook")
+    router.action(EDIT_CHILD, start_edit_child)
+    router.exact("edit_fio", edit_fio)
+    router.exact("edit_back", edit_back)
+    router.exact("child_edit_name", edit_name)
+    router.exact("child_edit_surname", edit_surname)
+    router.exact("child_edit_patronymic", edit_patronymic)
+    router.exact("edit_grade", edit_grade)
+    router.exact("edit_textbook", edit_textbook)
     dp.message.register(process_edit_name, EditChildStates.editing_name)
     dp.message.register(process_edit_surname, EditChildStates.editing_surname)
     dp.message.register(process_edit_patronymic, EditChildStates.editing_patronymic)
-    dp.callback_query.register(skip_edit_patronymic, lambda c: c.data == "skip_edit_patronymic")
-    dp.callback_query.register(process_edit_grade, lambda c: c.data.startswith("edit_grade_"))
+    router.exact("skip_edit_patronymic", skip_edit_patronymic)
+    router.prefix("edit_grade_", process_edit_grade)
     dp.message.register(process_edit_textbook, EditChildStates.editing_textbook_input)
     
     # Удаление ребенка
-    dp.callback_query.register(confirm_delete_child, lambda c: c.data.startswith("delete_child_"))
-    dp.callback_query.register(delete_child, lambda c: c.data.startswith("confirm_delete_")) 
\ No newline at end of file
+    router.action(DELETE_CHILD, confirm_delete_child)
+    router.action(CONFIRM_DELETE_CHILD, delete_child) 
\ No newline at end of file
@@ -6,6 +6,9 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 import re
 
 from common.database import Parent, get_session
+from common.query_budget import query_budget
+from common.callback_router import get_callback_router
+from common.notifications import get_reminder_settings_text, get_reminder_settings_keyboard, parse_reminder_toggle
 from parent_bot.keyboards import get_main_menu_keyboard
 from parent_bot.handlers.registration import validate_phone, format_phone
 
@@ -19,6 +22,7 @@ def get_profile_menu_keyboard() -> InlineKeyboardMarkup:
     keyboard = [
         [InlineKeyboardButton(text="👤 Изменить ФИО", callback_data="edit_profile_name")],
         [InlineKeyboardButton(text="📱 Изменить телефон", callback_data="edit_profile_phone")],
+        [InlineKeyboardButton(text="🔔 Напоминания", callback_data="reminders_settings")],
         [InlineKeyboardButton(text="◀️ Вернуться в главное меню", callback_data="back_to_main")]
     ]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -41,6 +45,7 @@ def get_profile_edit_keyboard(name: str = "", surname: str = "", patronymic: str
     ]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+@query_budget(statements=1, rows=1)
 async def show_profile(callback_query: types.CallbackQuery):
     async for session in get_session():
         parent = await session.execute(
@@ -253,24 +258,69 @@ async def process_phone_input(message: types.Message, state: FSMContext):
     )
     await state.clear()
 
+async def show_reminder_settings(callback_query: types.CallbackQuery):
+    async for session in get_session():
+        parent = await session.execute(
+            select(Parent).where(Parent.telegram_id == callback_query.from_user.id)
+        )
+        parent = parent.scalar_one_or_none()
+
+        if not parent:
+            await callback_query.answer("❌ Профиль не найден!")
+            return
+
+        await callback_query.message.edit_text(
+            get_reminder_settings_text(parent.reminders_muted),
+            reply_markup=get_reminder_settings_keyboard(parent.reminders_muted, "profile")
+        )
+
+async def toggle_reminder_stage(callback_query: types.CallbackQuery):
+    bit = parse_reminder_toggle(callback_query.data)
+    if bit is None:
+        await callback_query.answer("Кнопка устарела, откройте настройки заново", show_alert=True)
+        return
+
+    async for session in get_session():
+        parent = await session.execute(
+            select(Parent).where(Parent.telegram_id == callback_query.from_user.id)
+        )
+        parent = parent.scalar_one_or_none()
+
+        if not parent:
+            await callback_query.answer("❌ Профиль не найден!")
+            return
+
+        parent.reminders_muted = (parent.reminders_muted or 0) ^ (1 << bit)
+        await session.commit()
+
+        await callback_query.message.edit_text(
+            get_reminder_settings_text(parent.reminders_muted),
+            reply_markup=get_reminder_settings_keyboard(parent.reminders_muted, "profile")
+        )
+
 def register_profile_handlers(dp):
+    router = get_callback_router(dp)
     # Показ профиля
-    dp.callback_query.register(show_profile, lambda c: c.data == "profile")
+    router.exact("profile", show_profile)
     
     # Редактирование ФИО
-    dp.callback_query.register(edit_profile_name, lambda c: c.data == "edit_profile_name")
-    dp.callback_query.register(process_edit_name, lambda c: c.data == "profile_edit_name")
-    dp.callback_query.register(process_edit_surname, lambda c: c.data == "profile_edit_surname")
-    dp.callback_query.register(process_edit_patronymic, lambda c: c.data == "profile_edit_patronymic")
+    router.exact("edit_profile_name", edit_profile_name)
+    router.exact("profile_edit_name", process_edit_name)
+    router.exact("profile_edit_surname", process_edit_surname)
+    router.exact("profile_edit_patronymic", process_edit_patronymic)
     dp.message.register(process_name_input, lambda m: True, ProfileEditing.editing_name)
     dp.message.register(process_surname_input, lambda m: True, ProfileEditing.editing_surname)
     dp.message.register(process_patronymic_input, lambda m: True, ProfileEditing.editing_patronymic)
-    dp.callback_query.register(cancel_patronymic_edit, lambda c: c.data == "profile_cancel_patronymic")
-    dp.callback_query.register(save_profile_name_surname, lambda c: c.data == "profile_save_name_surname")
+    router.exact("profile_cancel_patronymic", cancel_patronymic_edit)
+    router.exact("profile_save_name_surname", save_profile_name_surname)
     
     # Редактирование телефона
-    dp.callback_query.register(edit_profile_phone, lambda c: c.data == "edit_profile_phone")
+    router.exact("edit_profile_phone", edit_profile_phone)
     dp.message.register(process_phone_input, lambda m: True, ProfileEditing.editing_phone)
+
+    # Настройки напоминаний
+    router.exact("reminders_settings", show_reminder_settings)
+    router.prefix("reminders_toggle_", toggle_reminder_stage)
     
     # Возврат в главное меню
-    dp.callback_query.register(back_to_main, lambda c: c.data == "back_to_main") 
\ No newline at end of file
+    router.exact("back_to_main", back_to_main) 
\ No newline at end of file
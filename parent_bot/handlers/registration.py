@@ -9,6 +9,7 @@ import re
 
 from parent_bot.keyboards import get_registration_form_keyboard, get_registration_menu_keyboard, get_main_menu_keyboard
 from common.database import Parent, get_session
+from common.callback_router import get_callback_router
 
 router = Router()
 
@@ -154,13 +155,14 @@ async def process_phone_input(message: Message, state: FSMContext):
     await state.clear()
 
 def register_registration_handlers(dp):
-    dp.callback_query.register(process_start_registration, lambda c: c.data == "start_registration")
-    dp.callback_query.register(process_edit_name, lambda c: c.data == "edit_name")
-    dp.callback_query.register(process_edit_surname, lambda c: c.data == "edit_surname")
-    dp.callback_query.register(process_edit_patronymic, lambda c: c.data == "edit_patronymic")
+    router = get_callback_router(dp)
+    router.exact("start_registration", process_start_registration)
+    router.exact("edit_name", process_edit_name)
+    router.exact("edit_surname", process_edit_surname)
+    router.exact("edit_patronymic", process_edit_patronymic)
     dp.message.register(process_name_input, ParentRegistration.waiting_for_name_input)
     dp.message.register(process_surname_input, ParentRegistration.waiting_for_surname_input)
     dp.message.register(process_patronymic_input, ParentRegistration.waiting_for_patronymic_input)
     dp.message.register(process_phone_input, ParentRegistration.waiting_for_phone)
-    dp.callback_query.register(process_finish_name_surname, lambda c: c.data == "finish_name_surname")
-    dp.callback_query.register(skip_patronymic, lambda c: c.data == "skip_patronymic") 
\ No newline at end of file
+    router.exact("finish_name_surname", process_finish_name_surname)
+    router.exact("skip_patronymic", skip_patronymic) 
\ No newline at end of file
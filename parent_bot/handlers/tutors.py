@@ -6,6 +6,9 @@ from sqlalchemy.orm import selectinload
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from common.database import Parent, Tutor, FavoriteTutor, async_session_maker
+from common.query_budget import query_budget
+from common.callback_router import get_callback_router
+from common.callback_data import BOOK_TUTOR, FAVORITE_TUTOR_INFO, FAVORITE_DELETE_TUTOR, FAVORITE_CONFIRM_DELETE_TUTOR
 from parent_bot.keyboards import get_tutors_list_keyboard, get_confirm_delete_tutor_keyboard
 
 class TutorManagement(StatesGroup):
@@ -58,6 +61,7 @@ async def format_tutor_info(tutor: Tutor) -> str:
         f"{chr(10).join(schedule_info) if schedule_info else '   Расписание не указано'}"
     )
 
+@query_budget(statements=3)
 async def show_tutors_list(callback_query: types.CallbackQuery):
     """Показывает список репетиторов родителя"""
     async with async_session_maker() as session:
@@ -85,9 +89,10 @@ async def show_tutors_list(callback_query: types.CallbackQuery):
                 reply_markup=get_tutors_list_keyboard(tutors)
             )
 
-async def show_tutor_info(callback_query: types.CallbackQuery):
+@query_budget(statements=1, rows=1)
+async def show_tutor_info(callback_query: types.CallbackQuery, callback_data):
     """Показывает информацию о репетиторе"""
-    tutor_id = int(callback_query.data.split('_')[-1])
+    tutor_id = callback_data.tutor_id
     
     async with async_session_maker() as session:
         tutor = await session.execute(
@@ -109,7 +114,7 @@ async def show_tutor_info(callback_query: types.CallbackQuery):
         
         # Создаем клавиатуру
         keyboard = [
-            [InlineKeyboardButton(text="📝 Записаться", callback_data=f"book_tutor_{tutor.id}")],
+            [InlineKeyboardButton(text="📝 Записаться", callback_data=BOOK_TUTOR.pack(tutor.id))],
             [InlineKeyboardButton(text="◀️ Вернуться к списку", callback_data="tutors")],
             [InlineKeyboardButton(text="🏠 В главное меню", callback_data="back_to_main")]
         ]
@@ -250,9 +255,9 @@ async def cancel_add_tutor(callback_query: types.CallbackQuery, state: FSMContex
         ])
     )
 
-async def confirm_delete_tutor(callback_query: types.CallbackQuery):
+async def confirm_delete_tutor(callback_query: types.CallbackQuery, callback_data):
     """Запрашивает подтверждение удаления репетитора"""
-    tutor_id = int(callback_query.data.split('_')[-1])
+    tutor_id = callback_data.tutor_id
     
     async with async_session_maker() as session:
         tutor = await session.execute(
@@ -270,9 +275,9 @@ async def confirm_delete_tutor(callback_query: types.CallbackQuery):
                 reply_markup=get_confirm_delete_tutor_keyboard(tutor_id)
             )
 
-async def delete_tutor(callback_query: types.CallbackQuery):
+async def delete_tutor(callback_query: types.CallbackQuery, callback_data):
     """Удаляет репетитора из избранного"""
-    tutor_id = int(callback_query.data.split('_')[-1])
+    tutor_id = callback_data.tutor_id
     
     async with async_session_maker() as session:
         async with session.begin():
@@ -298,11 +303,12 @@ async def delete_tutor(callback_query: types.CallbackQuery):
 
 def register_tutors_handlers(dp):
     """Регистрирует обработчики для управления репетиторами"""
-    dp.callback_query.register(show_tutors_list, lambda c: c.data == "tutors")
-    dp.callback_query.register(show_tutor_info, lambda c: c.data.startswith("favorite_tutor_info_"))
-    dp.callback_query.register(start_add_tutor, lambda c: c.data == "add_tutor")
+    router = get_callback_router(dp)
+    router.exact("tutors", show_tutors_list)
+    router.action(FAVORITE_TUTOR_INFO, show_tutor_info)
+    router.exact("add_tutor", start_add_tutor)
     dp.message.register(process_tutor_id, TutorManagement.waiting_for_tutor_id)
-    dp.callback_query.register(confirm_add_tutor, lambda c: c.data == "confirm_add_tutor", TutorManagement.waiting_for_confirmation)
-    dp.callback_query.register(cancel_add_tutor, lambda c: c.data == "cancel_add_tutor", TutorManagement.waiting_for_confirmation)
-    dp.callback_query.register(confirm_delete_tutor, lambda c: c.data.startswith("favorite_delete_tutor_"))
-    dp.callback_query.register(delete_tutor, lambda c: c.data.startswith("favorite_confirm_delete_tutor_")) 
\ No newline at end of file
+    router.exact("confirm_add_tutor", confirm_add_tutor, TutorManagement.waiting_for_confirmation)
+    router.exact("cancel_add_tutor", cancel_add_tutor, TutorManagement.waiting_for_confirmation)
+    router.action(FAVORITE_DELETE_TUTOR, confirm_delete_tutor)
+    router.action(FAVORITE_CONFIRM_DELETE_TUTOR, delete_tutor) 
\ No newline at end of file
@@ -1,5 +1,6 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from common.database import Child, Gender
+from common.callback_data import EDIT_CHILD, DELETE_CHILD, FAVORITE_TUTOR_INFO, FAVORITE_DELETE_TUTOR, FAVORITE_CONFIRM_DELETE_TUTOR
 
 def get_start_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для начала регистрации"""
@@ -71,8 +72,8 @@ def get_children_list_keyboard(children: list[Child]) -> InlineKeyboardMarkup:
         # Добавляем строку с именем и кнопками управления
         keyboard.append([
             InlineKeyboardButton(text=child_name, callback_data=f"child_info_{child.id}"),
-            InlineKeyboardButton(text="✏️", callback_data=f"edit_child_{child.id}"),
-            InlineKeyboardButton(text="❌", callback_data=f"delete_child_{child.id}")
+            InlineKeyboardButton(text="✏️", callback_data=EDIT_CHILD.pack(child.id)),
+            InlineKeyboardButton(text="❌", callback_data=DELETE_CHILD.pack(child.id))
         ])
     
     # Добавляем кнопку добавления нового ребенка
@@ -158,8 +159,8 @@ def get_tutors_list_keyboard(tutors: list) -> InlineKeyboardMarkup:
             
         # Добавляем строку с именем и кнопкой удаления
         keyboard.append([
-            InlineKeyboardButton(text=tutor_name, callback_data=f"favorite_tutor_info_{tutor.id}"),
-            InlineKeyboardButton(text="❌", callback_data=f"favorite_delete_tutor_{tutor.id}")
+            InlineKeyboardButton(text=tutor_name, callback_data=FAVORITE_TUTOR_INFO.pack(tutor.id)),
+            InlineKeyboardButton(text="❌", callback_data=FAVORITE_DELETE_TUTOR.pack(tutor.id))
         ])
     
     # Добавляем кнопку добавления нового репетитора
@@ -174,7 +175,7 @@ def get_confirm_delete_tutor_keyboard(tutor_id: int) -> InlineKeyboardMarkup:
     """Создает клавиатуру для подтверждения удаления репетитора"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="Да", callback_data=f"favorite_confirm_delete_tutor_{tutor_id}"),
+            InlineKeyboardButton(text="Да", callback_data=FAVORITE_CONFIRM_DELETE_TUTOR.pack(tutor_id)),
             InlineKeyboardButton(text="Нет", callback_data="tutors")
         ]
     ]) 
\ No newline at end of file
@@ -1,9 +1,8 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
+from aiogram import Dispatcher
 
-from common.config import PARENT_BOT_TOKEN
+from common.bots import get_parent_bot, close_bots
 from parent_bot.handlers.registration import register_registration_handlers
 from parent_bot.handlers.common import register_common_handlers
 from parent_bot.handlers.profile import register_profile_handlers
@@ -11,27 +10,46 @@ from parent_bot.handlers.children import register_children_handlers
 from parent_bot.handlers.tutors import register_tutors_handlers
 from parent_bot.handlers.booking import register_booking_handlers
 from common.database import init_db
+from common.fsm_storage import DatabaseStorage
+from common.metrics import setup_metrics, start_metrics_server, stop_metrics_server
+from common.update_limiter import setup_update_limiter
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 
-# Инициализация бота и диспетчера
-bot = Bot(token=PARENT_BOT_TOKEN, parse_mode=ParseMode.HTML)
-dp = Dispatcher()
+def setup_dispatcher() -> Dispatcher:
+    """
+    Создает диспетчер и регистрирует обработчики (общая для polling и webhook)
 
-async def main():
-    # Инициализация базы данных
-    await init_db()
-    
-    # Регистрация обработчиков
+    Хранилище состояний читает настройки, поэтому диспетчер создается при запуске,
+    а не при импорте модуля (бот создается в common/bots.py при первом обращении)
+    """
+    dp = Dispatcher(storage=DatabaseStorage())
+    setup_update_limiter(dp, "parent")
+    setup_metrics(dp, "parent")
     register_common_handlers(dp)
     register_registration_handlers(dp)
     register_profile_handlers(dp)
     register_children_handlers(dp)
     register_tutors_handlers(dp)
     register_booking_handlers(dp)
-    # Запуск бота
-    await dp.start_polling(bot)
+    return dp
+
+async def main():
+    # Инициализация базы данных
+    await init_db()
+    
+    # Регистрация обработчиков
+    dp = setup_dispatcher()
+    # Запуск бота (если до этого работал webhook, снимаем его, иначе getUpdates вернет ошибку)
+    bot = get_parent_bot()
+    await bot.delete_webhook()
+    await start_metrics_server()
+    try:
+        await dp.start_polling(bot, close_bot_session=False)
+    finally:
+        await stop_metrics_server()
+        await close_bots()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+Время выбора обработчика callback-запроса: цепочка lambda-фильтров против CallbackRouter.
+
+Берет реальные таблицы маршрутов обоих ботов (после вызова register_*_handlers)
+и строит из них два диспетчера с пустыми обработчиками:
+- "до": каждый маршрут зарегистрирован отдельным фильтром, как раньше (линейный перебор);
+- "после": один обработчик с CallbackRouter.
+Через оба диспетчера прогоняются одинаковые callback-запросы, при этом проверяется,
+что выбран один и тот же обработчик.
+
+Запуск: python scripts/benchmark_callback_router.py [повторов]
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher
+from aiogram.filters import StateFilter
+from aiogram.types import Update, CallbackQuery, User
+
+from common.callback_router import get_callback_router
+from tutor_bot.main import setup_dispatcher as setup_tutor
+from parent_bot.main import setup_dispatcher as setup_parent
+
+# Примеры значений для параметризованных callback_data (префиксов)
+SUFFIXES = ["1", "42", "today", "cancel:week", "cancel:17", "2024-09-01", "15:30_16:30", "M", "standard"]
+
+
+def build_dispatchers(routes):
+    """Два диспетчера с одинаковыми маршрутами и обработчиками, записывающими свое имя"""
+    hits = []
+
+    def make_handler(name):
+        async def handler(callback: CallbackQuery):
+            hits.append(name)
+        return handler
+
+    linear = Dispatcher()
+    indexed = Dispatcher()
+    router = get_callback_router(indexed)
+
+    for kind, key, route in routes:
+        handler = make_handler(route.name)
+        states = tuple(route.states or ())
+        if kind == "exact":
+            check = lambda c, key=key: c.data == key
+            router.exact(key, handler, *states, predicate=route.predicate)
+        else:
+            check = lambda c, key=key: c.data.startswith(key)
+            router.prefix(key, handler, *states, predicate=route.predicate)
+        if route.predicate is not None:
+            check = lambda c, check=check, predicate=route.predicate: check(c) and predicate(c)
+        linear.callback_query.register(handler, check, *([StateFilter(*states)] if states else []))
+
+    return linear, indexed, hits
+
+
+def make_updates(routes):
+    user = User(id=1, is_bot=False, first_name="Тест")
+    samples = []
+    for kind, key, _ in routes:
+        samples.extend([key] if kind == "exact" else [key + suffix for suffix in SUFFIXES])
+    samples.append("unknown_callback")
+    return [
+        Update(update_id=i, callback_query=CallbackQuery(id=str(i), from_user=user, chat_instance="1", data=data))
+        for i, data in enumerate(samples)
+    ]
+
+
+async def measure(dp: Dispatcher, bot: Bot, updates, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for update in updates:
+            await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / (repeats * len(updates)) * 1_000_000
+
+
+async def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    bot = Bot(token="123456:benchmark")
+
+    tutor_dp = setup_tutor()
+    parent_dp = setup_parent()
+
+    failed = False
+    for name, dp in [("tutor_bot", tutor_dp), ("parent_bot", parent_dp)]:
+        routes = get_callback_router(dp).routes
+        linear, indexed, hits = build_dispatchers(routes)
+        updates = make_updates(routes)
+
+        # Проверяем, что оба способа выбирают одинаковые обработчики
+        for update in updates:
+            hits.clear()
+            await linear.feed_update(bot, update)
+            await indexed.feed_update(bot, update)
+            if len(hits) == 2 and hits[0] != hits[1] or len(hits) == 1:
+                print(f"❌ {name}: {update.callback_query.data!r} -> {hits}")
+                failed = True
+
+        before = await measure(linear, bot, updates, repeats)
+        after = await measure(indexed, bot, updates, repeats)
+        print(f"{name}: маршрутов {len(routes)}, запросов {len(updates)}")
+        print(f"  lambda-фильтры:  {before:8.1f} мкс/запрос")
+        print(f"  CallbackRouter:  {after:8.1f} мкс/запрос")
+
+    await bot.session.close()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Сравнение накладных расходов хранилищ FSM на одно обновление.
+
+Каждое "обновление" повторяет типичный шаг мастера записи: чтение состояния и данных,
+update_data и переход в следующее состояние. Сравниваются MemoryStorage и DatabaseStorage
+с отложенной записью и без кэша (режим для нескольких процессов). В конце проверяется,
+что состояние переживает перезапуск (новый экземпляр хранилища на той же БД).
+
+Запуск: python scripts/benchmark_fsm_storage.py [пользователей] [обновлений_на_пользователя]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from common.database import Base, Gender
+from common.fsm_storage import DatabaseStorage
+
+BOT_ID = 1
+
+
+def make_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+
+
+async def run_updates(storage, users: int, updates: int) -> float:
+    """Возвращает среднее время одного обновления в микросекундах"""
+    started = time.perf_counter()
+    for step in range(updates):
+        for user_id in range(users):
+            key = make_key(user_id)
+            await storage.get_state(key)
+            data = await storage.get_data(key)
+            data.update(step=step, selected_date=date(2024, 9, 1), gender=Gender.FEMALE)
+            await storage.update_data(key, data)
+            await storage.set_state(key, f"BookingStates:step_{step}")
+    elapsed = time.perf_counter() - started
+    await storage.close()
+    return elapsed / (users * updates) * 1_000_000
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    workdir = tempfile.mkdtemp()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'fsm.db')}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    results = {
+        "MemoryStorage": await run_updates(MemoryStorage(), users, updates),
+        "DatabaseStorage (кэш + отложенная запись)": await run_updates(
+            DatabaseStorage(session_maker=session_maker), users, updates
+        ),
+        "DatabaseStorage (без кэша, запись сразу)": await run_updates(
+            DatabaseStorage(session_maker=session_maker, flush_interval=0, cache_seconds=0), users, updates
+        ),
+    }
+
+    print(f"Пользователей: {users}, обновлений на пользователя: {updates}")
+    for name, per_update in results.items():
+        print(f"{name:45} {per_update:10.1f} мкс/обновление")
+
+    # Новый экземпляр хранилища должен увидеть состояние, сохраненное предыдущим
+    restarted = DatabaseStorage(session_maker=session_maker)
+    state = await restarted.get_state(make_key(0))
+    data = await restarted.get_data(make_key(0))
+    await engine.dispose()
+
+    expected_state = f"BookingStates:step_{updates - 1}"
+    if state != expected_state or data.get("selected_date") != date(2024, 9, 1) or data.get("gender") != Gender.FEMALE:
+        print(f"❌ После перезапуска: state={state!r}, data={data!r}")
+        sys.exit(1)
+    print("✅ Состояние и данные сохранились после перезапуска")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
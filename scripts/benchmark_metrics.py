@@ -0,0 +1,176 @@
+"""
+Накладные расходы и корректность сбора метрик (common/metrics.py).
+
+1. Прогоняет одинаковые обновления (сообщение и callback-запрос, обработчики делают
+   один SQL-запрос) через диспетчер без метрик и с метриками и сравнивает время
+   обработки. Разница - накладные расходы middleware и событий SQLAlchemy, она должна
+   укладываться в бюджет.
+2. Проверяет, что в выводе /metrics есть имена обработчиков, число SQL-запросов
+   и запросы к Bot API (к локальному имитатору).
+
+Запуск: python scripts/benchmark_metrics.py [обновлений] [бюджет_мкс]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+from aiohttp import web, ClientSession
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update, Message, CallbackQuery, Chat, User
+from sqlalchemy import select, func
+
+from common.callback_router import get_callback_router
+from common.database import init_db, async_session_maker, engine, Tutor
+from common.metrics import (
+    setup_metrics,
+    start_metrics_server,
+    stop_metrics_server,
+    install_db_metrics,
+    uninstall_db_metrics,
+    ApiMetricsMiddleware
+)
+
+# Накладные расходы на одно обновление, мкс
+DEFAULT_BUDGET_US = 50
+ROUNDS = 5
+
+
+def build_dispatcher(with_metrics: bool) -> Dispatcher:
+    dp = Dispatcher()
+    if with_metrics:
+        setup_metrics(dp, "benchmark")
+
+    async def count_tutors(message: Message):
+        async with async_session_maker() as session:
+            await session.scalar(select(func.count(Tutor.id)))
+
+    async def show_menu(callback: CallbackQuery):
+        async with async_session_maker() as session:
+            await session.scalar(select(func.count(Tutor.id)))
+
+    dp.message.register(count_tutors)
+    get_callback_router(dp).exact("menu", show_menu)
+    return dp
+
+
+def make_updates(count: int):
+    user = User(id=1, is_bot=False, first_name="Тест")
+    chat = Chat(id=1, type="private")
+    updates = []
+    for i in range(count):
+        if i % 2:
+            updates.append(Update(update_id=i, callback_query=CallbackQuery(
+                id=str(i), from_user=user, chat_instance="1", data="menu"
+            )))
+        else:
+            updates.append(Update(update_id=i, message=Message(
+                message_id=i, date=0, chat=chat, from_user=user, text="привет"
+            )))
+    return updates
+
+
+async def measure(dp: Dispatcher, bot: Bot, updates) -> float:
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / len(updates) * 1_000_000
+
+
+async def check_output(count: int) -> list:
+    """Обработчик с запросом к Bot API через имитатор; возвращает список проблем в выводе /metrics"""
+
+    async def fake_api(request: web.Request) -> web.Response:
+        return web.json_response({"ok": True, "result": True})
+
+    fake_app = web.Application()
+    fake_app.router.add_post("/bot{token}/{method}", fake_api)
+    fake_runner = web.AppRunner(fake_app)
+    await fake_runner.setup()
+    site = web.TCPSite(fake_runner, "127.0.0.1", 0)
+    await site.start()
+    fake_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(fake_url))
+    session.middleware(ApiMetricsMiddleware())
+    bot = Bot(token="123456:benchmark", session=session)
+
+    dp = Dispatcher()
+    setup_metrics(dp, "check")
+
+    async def answer_with_action(message: Message, bot: Bot):
+        async with async_session_maker() as db:
+            await db.scalar(select(func.count(Tutor.id)))
+            await db.scalar(select(func.count(Tutor.id)))
+        await bot.send_chat_action(message.chat.id, "typing")
+
+    dp.message.register(answer_with_action)
+    for update in make_updates(count * 2)[::2]:
+        await dp.feed_update(bot, update)
+
+    await start_metrics_server(port=19100)
+    async with ClientSession() as http:
+        async with http.get("http://127.0.0.1:19100/metrics") as response:
+            text = await response.text()
+    await stop_metrics_server()
+    await bot.session.close()
+    await fake_runner.cleanup()
+
+    expected = [
+        f'bot_updates_total{{bot="check",handler="answer_with_action",status="ok"}} {count}',
+        f'bot_db_statements_per_update_sum{{bot="check",handler="answer_with_action"}} {2.0 * count}',
+        f'bot_api_calls_per_update_sum{{bot="check",handler="answer_with_action"}} {1.0 * count}',
+        f'telegram_api_request_duration_seconds_count{{method="sendChatAction"}} {count}',
+        'db_statement_duration_seconds_count{operation="SELECT"}',
+    ]
+    return [line for line in expected if line not in text]
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    budget_us = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_US
+    await init_db()
+
+    bot = Bot(token="123456:benchmark")
+    updates = make_updates(count)
+    plain = build_dispatcher(with_metrics=False)
+    instrumented = build_dispatcher(with_metrics=True)
+    await measure(plain, bot, updates[:100])  # прогрев
+
+    # Замеры чередуются, берется лучший результат каждого варианта. События SQLAlchemy
+    # включаются для всего движка, поэтому без метрик их на время замера отключаем
+    before = after = float("inf")
+    for _ in range(ROUNDS):
+        uninstall_db_metrics(engine)
+        before = min(before, await measure(plain, bot, updates))
+        install_db_metrics(engine)
+        after = min(after, await measure(instrumented, bot, updates))
+    await bot.session.close()
+
+    overhead = after - before
+    print(f"Обновлений: {count}")
+    print(f"  без метрик:   {before:8.1f} мкс/обновление")
+    print(f"  с метриками:  {after:8.1f} мкс/обновление")
+    print(f"  накладные расходы: {overhead:.1f} мкс (бюджет {budget_us:.0f} мкс)")
+
+    problems = await check_output(20)
+    for line in problems:
+        print(f"❌ Нет в /metrics: {line}")
+    if overhead > budget_us:
+        print("❌ Накладные расходы превышают бюджет")
+    if problems or overhead > budget_us:
+        sys.exit(1)
+    print("✅ Метрики собираются, накладные расходы в пределах бюджета")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+"""
+Бенчмарк форматирования расписания (ScheduleStats в tutor_bot/utils/schedule_utils.py).
+
+Сравнивает прежние форматтеры недели и месяца, которые перебирали записи отдельно для
+каждого показателя, с текущими (один проход ScheduleStats) на месяце из 5000 записей
+и проверяет, что текст расписания не изменился.
+
+Запуск: python scripts/benchmark_schedule_stats.py [--bookings 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+from typing import Dict, List
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.database import Booking, BookingStatus
+from tutor_bot.utils.schedule_utils import (
+    ScheduleStats,
+    format_date_with_month,
+    format_weekly_schedule,
+    format_monthly_schedule,
+)
+
+SUBJECTS = ["Математика", "Физика", "Русский язык", "Английский язык", "Химия", "Информатика"]
+STATUSES = [BookingStatus.APPROVED] * 6 + [BookingStatus.PENDING] * 3 + [BookingStatus.CANCELLED]
+
+
+def legacy_weekly_schedule(bookings: List[Booking], week_range: str) -> str:
+    """format_weekly_schedule до появления ScheduleStats"""
+    if not bookings:
+        return f"📊 Расписание на неделю ({week_range})\n\n🚫 Нет занятий"
+    
+    # Группируем записи по дням
+    bookings_by_day: Dict[date, List[Booking]] = {}
+    for booking in bookings:
+        if booking.date not in bookings_by_day:
+            bookings_by_day[booking.date] = []
+        bookings_by_day[booking.date].append(booking)
+    
+    # Статистика
+    total_confirmed = sum(1 for b in bookings if b.status == BookingStatus.APPROVED)
+    total_pending = sum(1 for b in bookings if b.status == BookingStatus.PENDING)
+    total_income = sum(b.price for b in bookings if b.status == BookingStatus.APPROVED)
+    
+    text = [f"📊 Расписание на неделю ({week_range})\n"]
+    
+    # Дни недели на русском
+    weekdays = ["ПОНЕДЕЛЬНИК", "ВТОРНИК", "СРЕДА", "ЧЕТВЕРГ", "ПЯТНИЦА", "СУББОТА", "ВОСКРЕСЕНЬЕ"]
+    
+    for day_date in sorted(bookings_by_day.keys()):
+        day_bookings = bookings_by_day[day_date]
+        text.append(f"\n🗓 {weekdays[day_date.weekday()]}, {day_date.strftime('%d.%m')}")
+        
+        for booking in sorted(day_bookings, key=lambda b: b.start_time):
+            text.append(
+                f"⏰ {booking.start_time.strftime('%H:%M')}-{booking.end_time.strftime('%H:%M')} | "
+                f"{booking.child.name} {booking.child.surname[0]}. | "
+                f"{booking.subject_name}"
+                + (" (экз.)" if booking.lesson_type == "exam" else "")
+            )
+    
+    text.extend([
+        "\n━━━━━━━━━━━━━━━━━━━━━━",
+        f"Всего занятий на неделю: {len(bookings)}",
+        f"Подтверждено: {total_confirmed} | Ожидает: {total_pending}",
+        f"Доход за неделю: {total_income} руб."
+    ])
+    
+    return "\n".join(text)
+
+
+def legacy_monthly_schedule(bookings: List[Booking], month_str: str) -> str:
+    """format_monthly_schedule до появления ScheduleStats"""
+    if not bookings:
+        return f"🗓 Расписание на {month_str}\n\n🚫 Нет занятий"
+    
+    # Статистика
+    total_confirmed = sum(1 for b in bookings if b.status == BookingStatus.APPROVED)
+    total_pending = sum(1 for b in bookings if b.status == BookingStatus.PENDING)
+    total_cancelled = sum(1 for b in bookings if b.status == BookingStatus.CANCELLED)
+    total_income = sum(b.price for b in bookings if b.status == BookingStatus.APPROVED)
+    
+    # Группируем записи по неделям
+    bookings_by_week: Dict[int, List[Booking]] = {}
+    for booking in bookings:
+        week_num = booking.date.isocalendar()[1]
+        if week_num not in bookings_by_week:
+            bookings_by_week[week_num] = []
+        bookings_by_week[week_num].append(booking)
+    
+    # Группируем записи по предметам
+    subjects: Dict[str, int] = {}
+    for booking in bookings:
+        if booking.subject_name not in subjects:
+            subjects[booking.subject_name] = 0
+        subjects[booking.subject_name] += 1
+    
+    text = [
+        f"🗓 Расписание на {month_str}\n",
+        "\n📊 Статистика:",
+        f"- Всего занятий: {len(bookings)}",
+        f"- Подтверждено: {total_confirmed}",
+        f"- Ожидает подтверждения: {total_pending}",
+        f"- Отменено: {total_cancelled}",
+        f"- Доход за месяц: {total_income} руб.",
+        "\n📈 По неделям:"
+    ]
+    
+    for week_num in sorted(bookings_by_week.keys()):
+        week_bookings = bookings_by_week[week_num]
+        week_income = sum(b.price for b in week_bookings if b.status == BookingStatus.APPROVED)
+        # Находим первый и последний день недели
+        first_date = min(b.date for b in week_bookings)
+        last_date = max(b.date for b in week_bookings)
+        if first_date == last_date:
+            text.append(
+                f"🗓 {format_date_with_month(first_date)}: "
+                f"{len(week_bookings)} занятий ({week_income} руб.)"
+            )
+        else:
+            text.append(
+                f"🗓 {format_date_with_month(first_date)}-{format_date_with_month(last_date)}: "
+                f"{len(week_bookings)} занятий ({week_income} руб.)"
+            )
+    
+    text.extend([
+        "\n📚 По предметам:"
+    ])
+    
+    for subject, count in sorted(subjects.items(), key=lambda x: x[1], reverse=True):
+        text.append(f"- {subject}: {count} занятий")
+    
+    return "\n".join(text)
+
+
+def make_bookings(count: int, seed: int = 1) -> list:
+    """Записи на месяц, упорядоченные по дате и времени, как их возвращает get_bookings_for_period"""
+    rng = random.Random(seed)
+    month_start = date.today().replace(day=1)
+    bookings = []
+    for i in range(count):
+        start = rng.randrange(8, 21)
+        bookings.append(SimpleNamespace(
+            date=month_start + timedelta(days=rng.randrange(28)),
+            start_time=time(start),
+            end_time=time(start + 1),
+            status=rng.choice(STATUSES),
+            price=rng.choice([1000, 1500, 2000]),
+            subject_name=rng.choice(SUBJECTS),
+            lesson_type=rng.choice(["standard", "exam"]),
+            child=SimpleNamespace(name=f"Ученик{i % 50}", surname="Тестов", grade=5 + i % 7),
+        ))
+    bookings.sort(key=lambda b: (b.date, b.start_time))
+    return bookings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    bookings = make_bookings(args.bookings)
+    week = [b for b in bookings if b.date < bookings[0].date + timedelta(days=7)]
+    cases = [
+        ("месяц", bookings, legacy_monthly_schedule, format_monthly_schedule),
+        ("неделя", week, legacy_weekly_schedule, format_weekly_schedule),
+    ]
+
+    problems = []
+    print(f"{'Период':<8} {'Записей':>8} {'Было, мс':>10} {'Стало, мс':>10} {'Ускорение':>10}")
+    for title, items, legacy, current in cases:
+        if legacy(items, "период") != current(items, "период"):
+            problems.append(f"расписание на {title} отличается от прежнего")
+        before = timeit.timeit(lambda: legacy(items, "период"), number=args.repeat) / args.repeat
+        after = timeit.timeit(lambda: current(items, "период"), number=args.repeat) / args.repeat
+        print(f"{title:<8} {len(items):>8} {before * 1000:>10.2f} {after * 1000:>10.2f} {before / after:>9.1f}x")
+
+    stats_time = timeit.timeit(lambda: ScheduleStats(bookings), number=args.repeat) / args.repeat
+    print(f"ScheduleStats на {len(bookings)} записях: {stats_time * 1000:.2f} мс")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Текст расписания не изменился")
+
+
+if __name__ == "__main__":
+    main()
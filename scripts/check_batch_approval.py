@@ -0,0 +1,209 @@
+"""
+Проверка массового подтверждения заявок (tutor_bot/utils/batch_approval.py).
+
+1. На случайных наборах заявок подтверждаемые занятия не пересекаются друг с другом
+   и с уже подтвержденными, каждая отклоненная заявка пересекается с указанным занятием,
+   а число подтвержденных совпадает с максимумом, найденным перебором.
+2. Подтверждение и отклонение записываются в БД двумя UPDATE в одной транзакции,
+   версии карточек записей и расписания репетитора увеличиваются.
+3. Заявки, отмененные между разбором и записью, не меняются и не попадают в итог
+   (родители получают уведомления только по фактически обновленным записям), а заявка,
+   пересекавшаяся только с отмененной, остается в ожидании.
+
+Запуск: python scripts/check_batch_approval.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+from itertools import combinations
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+from sqlalchemy import select, update
+
+from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+from common.query_budget import capture_queries
+from tutor_bot.utils.batch_approval import plan_batch_approval, apply_batch_plan, OVERLAP_REJECTION_REASON
+
+RANDOM_CASES = 2000
+SEED = 46
+
+
+def overlaps(a: Booking, b: Booking) -> bool:
+    return a.date == b.date and a.start_time < b.end_time and b.start_time < a.end_time
+
+
+def random_booking(rng: random.Random, booking_id: int, day: date, status: BookingStatus) -> Booking:
+    start = rng.randrange(8 * 4, 20 * 4)
+    length = rng.choice((2, 3, 4, 6))
+    end = min(start + length, 24 * 4 - 1)
+    return Booking(
+        id=booking_id, date=day, status=status,
+        start_time=time(start // 4, start % 4 * 15), end_time=time(end // 4, end % 4 * 15),
+    )
+
+
+def best_count(pending: list, approved: list) -> int:
+    """Максимальное число непересекающихся заявок (перебор)"""
+    free = [b for b in pending if not any(overlaps(b, a) for a in approved)]
+    for size in range(len(free), 0, -1):
+        for chosen in combinations(free, size):
+            if not any(overlaps(a, b) for a, b in combinations(chosen, 2)):
+                return size
+    return 0
+
+
+def check_random_plans(problems: list) -> None:
+    rng = random.Random(SEED)
+    days = [date.today() + timedelta(days=i) for i in range(2)]
+    for case in range(RANDOM_CASES):
+        pending = [random_booking(rng, i, rng.choice(days), BookingStatus.PENDING) for i in range(rng.randrange(1, 9))]
+        approved = []
+        for i in range(rng.randrange(0, 4)):
+            booking = random_booking(rng, 100 + i, rng.choice(days), BookingStatus.APPROVED)
+            if not any(overlaps(booking, a) for a in approved):
+                approved.append(booking)
+
+        plan = plan_batch_approval(pending, approved)
+        chosen = plan.approve
+        if sorted(b.id for b in chosen + [b for b, _ in plan.reject]) != sorted(b.id for b in pending):
+            problems.append(f"случай {case}: заявки потерялись или повторились")
+        if any(overlaps(a, b) for a, b in combinations(chosen + approved, 2)):
+            problems.append(f"случай {case}: подтвержденные занятия пересекаются")
+        if any(not overlaps(b, conflict) for b, conflict in plan.reject):
+            problems.append(f"случай {case}: заявка отклонена без пересечения")
+        if len(chosen) != best_count(pending, approved):
+            problems.append(f"случай {case}: подтверждено {len(chosen)} из возможных {best_count(pending, approved)}")
+        if len(problems) > 5:
+            return
+    print(f"Случайных наборов заявок: {RANDOM_CASES}")
+
+
+async def seed_tutor(telegram_id: int) -> tuple:
+    """Репетитор с занятием 10:00-11:00 и заявками 10:30-11:30 (пересекается), 12:00-13:00 и 12:30-13:30"""
+    day = date.today() + timedelta(days=1)
+    async with async_session_maker() as session:
+        tutor = Tutor(telegram_id=telegram_id, name="Анна", surname="Иванова", subjects=[], schedule={})
+        parent = Parent(telegram_id=telegram_id + 1, name="Петр", surname="Петров")
+        session.add_all([tutor, parent])
+        await session.flush()
+        child = Child(parent_id=parent.id, name="Маша", surname="Петрова", gender=Gender.FEMALE, grade=7)
+        session.add(child)
+        await session.flush()
+        for start, end, status in ((10, 11, BookingStatus.APPROVED), (10.5, 11.5, BookingStatus.PENDING),
+                                   (12, 13, BookingStatus.PENDING), (12.5, 13.5, BookingStatus.PENDING)):
+            session.add(Booking(
+                parent_id=parent.id, child_id=child.id, tutor_id=tutor.id, subject_name="Математика",
+                lesson_type="standard", date=day, price=1500, status=status,
+                start_time=time(int(start), int(start % 1 * 60)), end_time=time(int(end), int(end % 1 * 60)),
+            ))
+        await session.commit()
+        return tutor.id, tutor.schedule_version
+
+
+async def load_plan(session, tutor_id: int):
+    bookings = (await session.execute(select(Booking).where(Booking.tutor_id == tutor_id))).scalars().all()
+    return plan_batch_approval(
+        [b for b in bookings if b.status == BookingStatus.PENDING],
+        [b for b in bookings if b.status == BookingStatus.APPROVED],
+    )
+
+
+async def stored_rows(tutor_id: int) -> list:
+    async with async_session_maker() as session:
+        rows = (await session.execute(
+            select(Booking.start_time, Booking.status, Booking.version, Booking.rejection_reason)
+            .where(Booking.tutor_id == tutor_id).order_by(Booking.start_time)
+        )).all()
+        return [tuple(row) for row in rows]
+
+
+async def check_database(problems: list) -> None:
+    await init_db()
+    tutor_id, schedule_version = await seed_tutor(1)
+
+    async with async_session_maker() as session:
+        plan = await load_plan(session, tutor_id)
+        with capture_queries() as log:
+            applied, stale = await apply_batch_plan(session, tutor_id, plan)
+            await session.commit()
+        print(f"Подтверждено {len(applied.approve)}, отклонено {len(applied.reject)} за {log.count} SQL-запросов")
+        if [b.status for b in applied.approve] != [BookingStatus.APPROVED]:
+            problems.append("записи в сессии не получили новый статус")
+        if stale or len(applied.reject) != len(plan.reject):
+            problems.append(f"без изменений в БД устаревшими считаются {len(stale)} заявок")
+
+    rows = await stored_rows(tutor_id)
+    expected = [
+        (time(10), BookingStatus.APPROVED, 1, None),
+        (time(10, 30), BookingStatus.REJECTED, 2, OVERLAP_REJECTION_REASON),
+        (time(12), BookingStatus.APPROVED, 2, None),
+        (time(12, 30), BookingStatus.REJECTED, 2, OVERLAP_REJECTION_REASON),
+    ]
+    if rows != expected:
+        problems.append(f"записи в БД: {rows}")
+    async with async_session_maker() as session:
+        tutor = await session.get(Tutor, tutor_id)
+        if tutor.schedule_version <= schedule_version:
+            problems.append("версия расписания репетитора не изменилась")
+
+
+async def check_stale_plan(problems: list) -> None:
+    tutor_id, _ = await seed_tutor(10)
+
+    async with async_session_maker() as session:
+        plan = await load_plan(session, tutor_id)
+        # Родитель отменяет заявки 10:30 и 12:00 после того, как репетитор открыл подтверждение
+        async with async_session_maker() as other:
+            await other.execute(
+                update(Booking)
+                .where(Booking.tutor_id == tutor_id, Booking.start_time.in_([time(10, 30), time(12)]))
+                .values(status=BookingStatus.CANCELLED)
+            )
+            await other.commit()
+        applied, stale = await apply_batch_plan(session, tutor_id, plan)
+        await session.commit()
+        print(
+            f"Устаревший план: подтверждено {len(applied.approve)}, отклонено {len(applied.reject)}, "
+            f"уже обработано {len(stale)}"
+        )
+        if applied.approve or applied.reject:
+            problems.append("уведомления получили бы родители отмененных или неизмененных заявок")
+        if sorted(b.start_time for b in stale) != [time(10, 30), time(12)]:
+            problems.append(f"устаревшими считаются {sorted(b.start_time for b in stale)}")
+        if any(b.status == BookingStatus.APPROVED for b in plan.approve):
+            problems.append("отмененная запись в сессии получила статус подтвержденной")
+
+    rows = await stored_rows(tutor_id)
+    expected = [
+        (time(10), BookingStatus.APPROVED, 1, None),
+        (time(10, 30), BookingStatus.CANCELLED, 1, None),
+        (time(12), BookingStatus.CANCELLED, 1, None),
+        # Пересекалась только с отмененной заявкой - остается в ожидании
+        (time(12, 30), BookingStatus.PENDING, 1, None),
+    ]
+    if rows != expected:
+        problems.append(f"записи в БД после устаревшего плана: {rows}")
+
+
+async def main():
+    problems = []
+    check_random_plans(problems)
+    await check_database(problems)
+    await check_stale_plan(problems)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Массовое подтверждение выбирает максимум непересекающихся заявок")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""
+Проверка карточек записей (common/booking_cards.py).
+
+1. Карточки совпадают с прежним форматированием f-строками.
+2. Изменение записи, имени ученика или репетитора меняет версию записи и текст карточки,
+   изменение служебных полей (напоминания) - нет.
+3. Время показа страницы из 5 карточек с кэшем и без него.
+
+Запуск: python scripts/check_booking_cards.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import timeit
+from datetime import date, datetime, time, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from common import booking_cards
+from common.booking_cards import render_card, card_cache_info, clear_card_cache
+from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+
+PAGE_RENDERS = 2000
+
+
+def legacy_parent_approved(booking: Booking) -> str:
+    """Карточка подтвержденной записи в списке родителя до появления common/booking_cards.py"""
+    return (
+        f"📚 {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
+        f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
+        f"👨‍🏫 Репетитор: {booking.tutor.name} {booking.tutor.surname}\n"
+        f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
+        f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
+        f"💰 Стоимость: {booking.price} ₽\n"
+        f"✅ Подтверждено: {booking.approved_at.strftime('%d.%m.%Y %H:%M') if booking.approved_at else 'Дата не указана'}\n"
+    )
+
+
+def legacy_reminder_tutor(booking: Booking) -> str:
+    return (
+        f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
+        f"📚 Предмет: {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
+        f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
+        f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
+        f"💰 Стоимость: {booking.price} ₽\n\n"
+        f"📱 Контакт родителя: {booking.parent.phone if booking.parent.phone else 'Не указан'}"
+    )
+
+
+async def load_bookings(session) -> list:
+    result = await session.execute(
+        select(Booking)
+        .options(joinedload(Booking.child), joinedload(Booking.tutor), joinedload(Booking.parent))
+        .order_by(Booking.id)
+    )
+    return list(result.scalars().all())
+
+
+async def main():
+    await init_db()
+    async with async_session_maker() as session:
+        tutor = Tutor(telegram_id=1, name="Анна", surname="Иванова", subjects=[], schedule={})
+        parent = Parent(telegram_id=2, name="Петр", surname="Петров", phone=None)
+        session.add_all([tutor, parent])
+        await session.flush()
+        child = Child(parent_id=parent.id, name="Маша", surname="Петрова", gender=Gender.FEMALE, grade=7)
+        session.add(child)
+        await session.flush()
+        session.add_all(
+            Booking(
+                parent_id=parent.id, child_id=child.id, tutor_id=tutor.id,
+                subject_name="Математика", lesson_type="exam" if i % 2 else "standard",
+                date=date.today() + timedelta(days=i), start_time=time(10 + i), end_time=time(11 + i),
+                price=1500 + i, status=BookingStatus.APPROVED, approved_at=datetime(2024, 1, 1, 12, 0),
+            )
+            for i in range(5)
+        )
+        await session.commit()
+
+    problems = []
+    async with async_session_maker() as session:
+        bookings = await load_bookings(session)
+        for booking in bookings:
+            if render_card(booking, booking_cards.PARENT_APPROVED) != legacy_parent_approved(booking):
+                problems.append(f"карточка записи {booking.id} для родителя отличается от прежней")
+            if render_card(booking, booking_cards.REMINDER_TUTOR) != legacy_reminder_tutor(booking):
+                problems.append(f"напоминание репетитору о записи {booking.id} отличается от прежнего")
+
+        booking = bookings[0]
+        versions = [booking.version]
+        booking.price = 2000
+        await session.commit()
+        versions.append(booking.version)
+        if "2000 ₽" not in render_card(booking, booking_cards.PARENT_APPROVED):
+            problems.append("после изменения цены карточка не обновилась")
+
+        booking.reminders_sent = 1
+        await session.commit()
+        if booking.version != versions[-1]:
+            problems.append("изменение напоминаний изменило версию карточки")
+
+        booking.child.name = "Мария"
+        await session.commit()
+
+    async with async_session_maker() as session:
+        booking = (await load_bookings(session))[0]
+        versions.append(booking.version)
+        if "Мария Петрова" not in render_card(booking, booking_cards.PARENT_APPROVED):
+            problems.append("после переименования ученика карточка не обновилась")
+        if len(set(versions)) != len(versions):
+            problems.append(f"версии записи не менялись: {versions}")
+        print(f"Версии записи после изменения цены и имени ученика: {versions}")
+
+        bookings = await load_bookings(session)
+
+        def render_page():
+            return "".join(render_card(b, booking_cards.PARENT_APPROVED) for b in bookings)
+
+        def render_page_uncached():
+            clear_card_cache()
+            return render_page()
+
+        uncached = timeit.timeit(render_page_uncached, number=PAGE_RENDERS) / PAGE_RENDERS
+        clear_card_cache()
+        cached = timeit.timeit(render_page, number=PAGE_RENDERS) / PAGE_RENDERS
+        print(f"Страница из {len(bookings)} карточек: без кэша {uncached * 1e6:.1f} мкс, с кэшем {cached * 1e6:.1f} мкс")
+        print(f"Кэш: {card_cache_info()}")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Карточки записей совпадают с прежними и обновляются при изменении данных")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Проверка повторной отправки ежедневной сводки (send_daily_digests в common/notifications.py).
+
+Сводка заменяет напоминания за 24 часа, поэтому репетитор, которому она не дошла из-за
+временной ошибки (сеть, ограничение частоты), должен получить ее при следующей проверке.
+Репетитору, который заблокировал бота, сводка повторно не отправляется.
+
+Запуск: python scripts/check_daily_digest.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, time, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для настроек, запросы в Telegram не уходят; сводка рассылается в любое время
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+os.environ["DAILY_DIGEST_ENABLED"] = "true"
+os.environ["DAILY_DIGEST_TIME"] = "00:00"
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+from aiogram.methods import SendMessage
+from sqlalchemy import select
+
+from common import notifications
+from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+
+DELIVERED, NETWORK_ERROR, BLOCKED = 1, 2, 3
+
+
+class FlakyBot:
+    """Заглушка бота: у репетитора NETWORK_ERROR первая отправка не проходит, BLOCKED заблокировал бота"""
+
+    def __init__(self):
+        self.sent = []
+        self.network_errors = 0
+
+    async def send_message(self, chat_id, text, reply_markup=None, parse_mode=None):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if chat_id == BLOCKED:
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        if chat_id == NETWORK_ERROR and not self.network_errors:
+            self.network_errors += 1
+            raise TelegramNetworkError(method=method, message="Request timeout error")
+        self.sent.append(chat_id)
+
+
+async def seed():
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    async with async_session_maker() as session:
+        parent = Parent(telegram_id=100, name="Петр", surname="Петров")
+        child = Child(parent=parent, name="Маша", surname="Петрова", gender=Gender.FEMALE, grade=7)
+        for telegram_id in (DELIVERED, NETWORK_ERROR, BLOCKED):
+            tutor = Tutor(telegram_id=telegram_id, name="Анна", surname="Иванова", subjects=[], schedule={})
+            session.add(Booking(
+                parent=parent, child=child, tutor=tutor, subject_name="Математика", lesson_type="standard",
+                date=tomorrow, start_time=time(10), end_time=time(11), price=1000, status=BookingStatus.APPROVED,
+            ))
+        await session.commit()
+
+
+async def digest_marks() -> dict:
+    async with async_session_maker() as session:
+        return dict((await session.execute(select(Tutor.telegram_id, Tutor.digest_sent_on))).all())
+
+
+async def main():
+    await init_db()
+    await seed()
+    bot = FlakyBot()
+    notifications.get_tutor_bot = lambda: bot
+    tomorrow = datetime.now().date() + timedelta(days=1)
+
+    problems = []
+    failures = await notifications.send_daily_digests()
+    marks = await digest_marks()
+    print(f"Первая проверка: отправлено {bot.sent}, ошибок {len(failures)}")
+    if marks[NETWORK_ERROR] is not None:
+        problems.append("сводка с временной ошибкой отмечена отправленной")
+    if marks[DELIVERED] != tomorrow or marks[BLOCKED] != tomorrow:
+        problems.append(f"отметки после первой проверки: {marks}")
+
+    failures = await notifications.send_daily_digests()
+    marks = await digest_marks()
+    print(f"Вторая проверка: отправлено {bot.sent}, ошибок {len(failures)}")
+    if bot.sent != [DELIVERED, NETWORK_ERROR]:
+        problems.append(f"сводки получили {bot.sent} вместо {[DELIVERED, NETWORK_ERROR]}")
+    if any(mark != tomorrow for mark in marks.values()):
+        problems.append(f"отметки после второй проверки: {marks}")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Недоставленная сводка отправляется повторно, заблокировавшим бота - нет")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""
+Проверка пропуска редактирований без изменений (common/edit_dedup.py).
+
+Сценарий расписания бота репетитора (повторные нажатия фильтра, возврат к расписанию)
+прогоняется с имитатором Bot API, который, как Telegram, отвечает ошибкой
+"message is not modified" на редактирование тем же содержимым. Печатается число
+запросов и ошибок без EditDedupMiddleware и с ним.
+
+Сейчас сценарий дает 8 редактирований и 5 ошибок без пропуска, 3 редактирования
+без ошибок с пропуском (5 сэкономленных запросов): "schedule:back" показывает
+расписание на сегодня, поэтому повторяет содержимое предыдущего экрана. Каждое
+пропущенное редактирование должно соответствовать ровно одной ошибке без пропуска.
+
+Запуск: python scripts/check_edit_dedup.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для создания объектов Bot, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from common.database import init_db, async_session_maker, Tutor
+from common.edit_dedup import EditDedupMiddleware
+from common.metrics import render_metrics
+
+TUTOR_USER_ID = 1001
+SCENARIO = [
+    "show_schedule",
+    "schedule:today",
+    "schedule:today",
+    "schedule:week",
+    "schedule:week",
+    "schedule:back",
+    "schedule:back",
+    "schedule:today",
+]
+
+
+class TelegramLikeSession(BaseSession):
+    """Сессия Bot API без сети: хранит содержимое сообщений и отклоняет редактирования без изменений"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+        self.not_modified = 0
+        self.failed_updates = 0
+        self.messages = {}
+
+    async def make_request(self, bot, method, timeout=None):
+        api_method = method.__api_method__
+        self.calls[api_method] += 1
+        if api_method == "editMessageText":
+            key = (method.chat_id, method.message_id)
+            content = (method.text, method.reply_markup.model_dump_json() if method.reply_markup else None)
+            if self.messages.get(key) == content:
+                self.not_modified += 1
+                return self.check_response(bot=bot, method=method, status_code=400, content=json.dumps({
+                    "ok": False,
+                    "error_code": 400,
+                    "description": "Bad Request: message is not modified",
+                }))
+            self.messages[key] = content
+            result = {
+                "message_id": method.message_id,
+                "date": int(time.time()),
+                "chat": {"id": method.chat_id, "type": "private"},
+                "text": method.text,
+            }
+        else:
+            result = True
+        return self.check_response(
+            bot=bot, method=method, status_code=200, content=json.dumps({"ok": True, "result": result})
+        ).result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def make_callback(update_id: int, data: str) -> Update:
+    return Update.model_validate({"update_id": update_id, "callback_query": {
+        "id": str(update_id),
+        "from": {"id": TUTOR_USER_ID, "is_bot": False, "first_name": "Тест"},
+        "chat_instance": str(TUTOR_USER_ID),
+        "data": data,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": TUTOR_USER_ID, "type": "private"},
+            "text": "меню",
+        },
+    }})
+
+
+async def run_scenario(with_dedup: bool) -> TelegramLikeSession:
+    from tutor_bot.handlers.schedule import register_schedule_handlers
+
+    session = TelegramLikeSession()
+    if with_dedup:
+        session.middleware(EditDedupMiddleware())
+    bot = Bot("111111:check-tutor", session=session)
+    dp = Dispatcher(storage=MemoryStorage())
+    register_schedule_handlers(dp)
+    # Обработчики печатают ошибки "message is not modified" - в отчете они не нужны
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for update_id, data in enumerate(SCENARIO):
+            try:
+                await dp.feed_update(bot, make_callback(update_id, data))
+            except TelegramBadRequest:
+                session.failed_updates += 1
+    return session
+
+
+async def main():
+    await init_db()
+    async with async_session_maker() as db:
+        db.add(Tutor(telegram_id=TUTOR_USER_ID, name="Репетитор", surname="Тестов", subjects=[], schedule={}))
+        await db.commit()
+
+    without_dedup = await run_scenario(with_dedup=False)
+    with_dedup = await run_scenario(with_dedup=True)
+    for title, session in (("без пропуска", without_dedup), ("с пропуском", with_dedup)):
+        print(
+            f"{title}: editMessageText {session.calls['editMessageText']}, "
+            f"ошибок \"message is not modified\" {session.not_modified}, "
+            f"обновлений с ошибкой {session.failed_updates}"
+        )
+    saved_lines = [
+        line for line in render_metrics().splitlines() if line.startswith("telegram_api_calls_saved_total")
+    ]
+    print("\n".join(saved_lines))
+    saved = sum(int(float(line.rsplit(" ", 1)[1])) for line in saved_lines)
+
+    problems = []
+    if with_dedup.not_modified:
+        problems.append("редактирования без изменений отправлены в Bot API")
+    if with_dedup.messages != without_dedup.messages:
+        problems.append("итоговое содержимое сообщений отличается")
+    if with_dedup.calls["editMessageText"] >= without_dedup.calls["editMessageText"]:
+        problems.append("число запросов не уменьшилось")
+    if with_dedup.calls["editMessageText"] + saved != without_dedup.calls["editMessageText"]:
+        problems.append(
+            f"отправлено {with_dedup.calls['editMessageText']} и пропущено {saved} редактирований, "
+            f"а без пропуска их {without_dedup.calls['editMessageText']}"
+        )
+    if saved != without_dedup.not_modified:
+        problems.append(f"пропущено {saved} редактирований, а ошибок без пропуска {without_dedup.not_modified}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Редактирования без изменений не отправляются")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+Проверка времени импорта модулей ботов (python -X importtime).
+
+В отдельном процессе импортирует точки входа и обработчики обоих ботов и общие модули
+и проверяет, что:
+- импорт не читает настройки (.env, токены) и не создает объекты Bot и диспетчеры;
+- суммарное время импорта и собственное время модулей проекта не превышают бюджетов.
+Почти все время уходит на aiogram (pydantic-модели Bot API), на модули проекта - около 100 мс.
+Время импорта зависит от загрузки машины, поэтому импорт повторяется несколько раз
+и с бюджетами сравнивается лучший результат.
+Печатает самые медленные модули, чтобы было видно, что стоит импортировать лениво.
+
+Запуск: python scripts/check_import_time.py [бюджет_мс [бюджет_проекта_мс [повторов]]]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджеты по умолчанию (с запасом относительно ~2200 и ~100 мс на момент добавления проверки)
+DEFAULT_BUDGET_MS = 3000
+DEFAULT_PROJECT_BUDGET_MS = 200
+DEFAULT_RUNS = 3
+
+MODULES = [
+    "launch_both",
+    "tutor_bot.main",
+    "parent_bot.main",
+    "tutor_bot.handlers.common",
+    "tutor_bot.handlers.registration",
+    "tutor_bot.handlers.profile",
+    "tutor_bot.handlers.booking",
+    "tutor_bot.handlers.students",
+    "tutor_bot.handlers.schedule",
+    "parent_bot.handlers.common",
+    "parent_bot.handlers.registration",
+    "parent_bot.handlers.profile",
+    "parent_bot.handlers.children",
+    "parent_bot.handlers.tutors",
+    "parent_bot.handlers.booking",
+    "common.notifications",
+    "common.webhook",
+]
+
+# Выполняется в дочернем процессе после импорта модулей
+CHECK_SIDE_EFFECTS = """
+import sys
+from common import bots
+from common.config import get_settings
+problems = []
+if get_settings.cache_info().currsize:
+    problems.append("при импорте загружены настройки (get_settings)")
+if bots._bots:
+    problems.append("при импорте созданы боты")
+for module in ("tutor_bot.main", "parent_bot.main"):
+    if hasattr(sys.modules[module], "dp"):
+        problems.append("при импорте создан диспетчер " + module)
+if "dotenv" in sys.modules:
+    problems.append("при импорте загружен dotenv")
+if problems:
+    print("\\n".join(problems))
+    sys.exit(1)
+"""
+
+
+def parse_importtime(stderr: str):
+    """Возвращает [(модуль, собственное время мкс, суммарное время мкс, уровень вложенности)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(code: str):
+    """Импортирует модули в новом процессе; возвращает (результат процесса, строки importtime, всего мс)"""
+    # Отдельная пустая директория и чистый PYTHONPATH: импорт не должен зависеть от окружения
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=tempfile.mkdtemp(),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    rows = parse_importtime(result.stderr)
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    return result, rows, total_ms
+
+
+def project_rows(rows):
+    return [row for row in rows if row[0].split(".")[0] in ("common", "tutor_bot", "parent_bot", "launch_both")]
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    project_budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PROJECT_BUDGET_MS
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_RUNS
+    code = "\n".join(f"import {module}" for module in MODULES) + "\n" + CHECK_SIDE_EFFECTS
+
+    measurements = [measure(code) for _ in range(runs)]
+    for result, _, _ in measurements:
+        if result.returncode != 0:
+            print(f"❌ {result.stdout.strip() or result.stderr.strip().splitlines()[-1]}")
+            sys.exit(1)
+    print("Время импорта по запускам: " + ", ".join(f"{total_ms:.1f} мс" for _, _, total_ms in measurements))
+
+    # Отчет по самому быстрому запуску: остальные замедлены посторонней нагрузкой
+    _, rows, total_ms = min(measurements, key=lambda measurement: measurement[2])
+    project = project_rows(rows)
+    print("Самые медленные модули проекта (собственное время):")
+    for name, self_us, cumulative_us, _ in sorted(project, key=lambda row: -row[1])[:10]:
+        print(f"  {self_us / 1000:7.1f} мс  (с зависимостями {cumulative_us / 1000:7.1f} мс)  {name}")
+    print("Самые медленные сторонние пакеты:")
+    for name, _, cumulative_us, _ in sorted(
+        (row for row in rows if "." not in row[0] and row not in project), key=lambda row: -row[2]
+    )[:5]:
+        print(f"  {cumulative_us / 1000:7.1f} мс  {name}")
+    project_ms = min(
+        sum(self_us for _, self_us, _, _ in project_rows(rows)) for _, rows, _ in measurements
+    ) / 1000
+    print(f"Модули проекта (лучший запуск): {project_ms:.1f} мс (бюджет {project_budget_ms:.0f} мс)")
+    print(f"Всего (лучший запуск): {total_ms:.1f} мс (бюджет {budget_ms:.0f} мс)")
+
+    if total_ms > budget_ms or project_ms > project_budget_ms:
+        print("❌ Время импорта превышает бюджет")
+        sys.exit(1)
+    print("✅ Импорт без побочных эффектов и в пределах бюджета")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Проверка поиска пересечений занятий (common/intervals.py).
+
+1. На случайных занятиях (в том числе пересекающихся между собой, как в старых данных)
+   DayIntervals находит те же записи, что и прежний SQL-запрос проверки при подтверждении.
+2. Добавление занятий через DayIntervals.add дает тот же результат, что и построение заново.
+3. Время проверки пачки заявок дня: SQL-запрос на каждую заявку и одна загрузка дня.
+
+Запуск: python scripts/check_intervals.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time as timer
+from datetime import date, time, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+from sqlalchemy import select, and_, or_
+
+from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+from common.intervals import DayIntervals, load_day_intervals
+
+SEED = 47
+TUTORS = 3
+DAYS = 4
+BOOKINGS = 600
+QUERIES = 3000
+STATUSES = (BookingStatus.APPROVED, BookingStatus.APPROVED, BookingStatus.PENDING, BookingStatus.CANCELLED)
+
+
+def random_interval(rng: random.Random) -> tuple:
+    """Интервал положительной длины с шагом 5 минут"""
+    start = rng.randrange(8 * 12, 21 * 12)
+    end = start + rng.randrange(1, 3 * 12)
+    return time(start // 12, start % 12 * 5), time(end // 12, end % 12 * 5)
+
+
+def legacy_conflicts_query(tutor_id: int, day: date, start: time, end: time, exclude_id: int):
+    """Проверка пересечения из approve_booking до появления common/intervals.py"""
+    return (
+        select(Booking.id)
+        .where(
+            and_(
+                Booking.tutor_id == tutor_id,
+                Booking.date == day,
+                Booking.status == BookingStatus.APPROVED,
+                or_(
+                    and_(Booking.start_time <= start, Booking.end_time > start),
+                    and_(Booking.start_time < end, Booking.end_time >= end),
+                    and_(Booking.start_time >= start, Booking.end_time <= end)
+                ),
+                Booking.id != exclude_id
+            )
+        )
+    )
+
+
+async def seed(rng: random.Random) -> tuple:
+    async with async_session_maker() as session:
+        tutors = [Tutor(telegram_id=i + 1, name=f"Репетитор{i}", surname="Тестов", subjects=[], schedule={})
+                  for i in range(TUTORS)]
+        parent = Parent(telegram_id=100, name="Родитель", surname="Тестов")
+        session.add_all(tutors + [parent])
+        await session.flush()
+        child = Child(parent_id=parent.id, name="Маша", surname="Петрова", gender=Gender.FEMALE, grade=7)
+        session.add(child)
+        await session.flush()
+        days = [date.today() + timedelta(days=i) for i in range(DAYS)]
+        for _ in range(BOOKINGS):
+            start, end = random_interval(rng)
+            session.add(Booking(
+                parent_id=parent.id, child_id=child.id, tutor_id=rng.choice(tutors).id, subject_name="Математика",
+                lesson_type="standard", date=rng.choice(days), start_time=start, end_time=end, price=1500,
+                status=rng.choice(STATUSES),
+            ))
+        await session.commit()
+        return [t.id for t in tutors], days
+
+
+async def check_against_sql(rng: random.Random, tutor_ids: list, days: list, problems: list) -> None:
+    async with async_session_maker() as session:
+        loaded = {
+            (tutor_id, day): await load_day_intervals(session, tutor_id, day)
+            for tutor_id in tutor_ids for day in days
+        }
+        for _ in range(QUERIES):
+            tutor_id, day = rng.choice(tutor_ids), rng.choice(days)
+            start, end = random_interval(rng)
+            exclude_id = rng.randrange(1, BOOKINGS + 1)
+            expected = set((await session.execute(
+                legacy_conflicts_query(tutor_id, day, start, end, exclude_id)
+            )).scalars().all())
+            found = loaded[(tutor_id, day)].conflicts(start, end, exclude_id)
+            if {b.id for b in found} != expected or len(found) != len(expected):
+                problems.append(f"{day} {start}-{end}: найдено {sorted(b.id for b in found)}, SQL {sorted(expected)}")
+                return
+            first = loaded[(tutor_id, day)].first_conflict(start, end, exclude_id)
+            if found and first is not found[0]:
+                problems.append(f"{day} {start}-{end}: first_conflict вернул не самое раннее занятие")
+                return
+    print(f"Запросов пересечений: {QUERIES}, совпадают с SQL")
+
+
+def check_incremental(rng: random.Random, problems: list) -> None:
+    for case in range(200):
+        bookings = []
+        incremental = DayIntervals()
+        for i in range(rng.randrange(1, 30)):
+            start, end = random_interval(rng)
+            booking = Booking(id=i + 1, start_time=start, end_time=end)
+            bookings.append(booking)
+            incremental.add(booking)
+        rebuilt = DayIntervals(bookings)
+        for _ in range(20):
+            start, end = random_interval(rng)
+            if {b.id for b in incremental.conflicts(start, end)} != {b.id for b in rebuilt.conflicts(start, end)}:
+                problems.append(f"случай {case}: add дает другой результат")
+                return
+
+
+async def benchmark(tutor_id: int, day: date) -> None:
+    rng = random.Random(SEED)
+    requests = [random_interval(rng) for _ in range(20)]
+    async with async_session_maker() as session:
+        started = timer.perf_counter()
+        for start, end in requests:
+            (await session.execute(legacy_conflicts_query(tutor_id, day, start, end, 0))).scalars().all()
+        per_request = timer.perf_counter() - started
+
+        started = timer.perf_counter()
+        busy = await load_day_intervals(session, tutor_id, day)
+        for start, end in requests:
+            busy.conflicts(start, end)
+        loaded_once = timer.perf_counter() - started
+    print(f"{len(requests)} заявок дня: SQL на каждую {per_request * 1e3:.1f} мс, загрузка дня {loaded_once * 1e3:.1f} мс")
+
+
+async def main():
+    await init_db()
+    rng = random.Random(SEED)
+    tutor_ids, days = await seed(rng)
+    problems = []
+    await check_against_sql(rng, tutor_ids, days, problems)
+    check_incremental(rng, problems)
+    await benchmark(tutor_ids[0], days[0])
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ DayIntervals совпадает с SQL-проверкой пересечений")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
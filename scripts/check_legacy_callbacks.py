@@ -0,0 +1,130 @@
+"""
+Проверка кнопок из сообщений, отправленных до перехода на коды действий (common/callback_data.py).
+
+1. Прежние строки callback_data (approve_booking_15, book_time_15:30_16:30, ...) попадают
+   в тот же обработчик и разбираются в те же значения, что и кнопки в новом формате.
+2. Новые кнопки с похожими строками (schedule:cancel:today, cancel_booking) по-прежнему
+   попадают в свои обработчики.
+3. Кнопки-подписи снимают индикатор загрузки, а нажатия без обработчика получают ответ
+   "кнопка устарела" (fallback), а не остаются без ответа.
+
+Запуск: python scripts/check_legacy_callbacks.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для импорта обработчиков, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+
+from datetime import date, time
+
+from aiogram.types import CallbackQuery, User
+
+from common.callback_data import (
+    intern_strings,
+    BOOK_CHILD, BOOK_TUTOR, BOOK_SUBJECT, BOOK_LESSON_TYPE, BOOK_CALENDAR, BOOK_DATE, BOOK_TIME,
+    CANCEL_BOOKING, CONFIRM_CANCEL_BOOKING, APPROVE_BOOKING, REJECT_BOOKING, PENDING_BOOKING_PAGE,
+    CANCEL_LESSON, CONFIRM_CANCEL_LESSON, SHOW_STUDENT, REGISTRATION_TOGGLE_SUBJECT, PROFILE_TOGGLE_SUBJECT,
+    PROFILE_EDIT_PRICE, REGISTRATION_EDIT_PRICE, FAVORITE_TUTOR_INFO, FAVORITE_DELETE_TUTOR,
+    FAVORITE_CONFIRM_DELETE_TUTOR, EDIT_CHILD, DELETE_CHILD, CONFIRM_DELETE_CHILD,
+)
+from common.callback_router import get_callback_router
+from common.database import init_db
+
+# (прежняя строка, действие, значения)
+TUTOR_LEGACY = [
+    ("approve_booking_15", APPROVE_BOOKING, (15,)),
+    ("reject_booking_15", REJECT_BOOKING, (15,)),
+    ("next_pending_booking_3", PENDING_BOOKING_PAGE, (3,)),
+    ("schedule:cancel:17", CANCEL_LESSON, (17,)),
+    ("schedule:confirm_cancel:17", CONFIRM_CANCEL_LESSON, (17,)),
+    ("show_student_5", SHOW_STUDENT, (5,)),
+    ("subject_Математика_exam", REGISTRATION_TOGGLE_SUBJECT, ("Математика", "exam")),
+    ("profile_subject_Математика_standard", PROFILE_TOGGLE_SUBJECT, ("Математика", "standard")),
+    ("price_edit_Русский язык_exam", PROFILE_EDIT_PRICE, ("Русский язык", "exam")),
+    ("registration_price_edit_Русский язык_standard", REGISTRATION_EDIT_PRICE, ("Русский язык", "standard")),
+]
+PARENT_LEGACY = [
+    ("book_child_3", BOOK_CHILD, (3,)),
+    ("book_tutor_4", BOOK_TUTOR, (4,)),
+    ("book_subject_Математика", BOOK_SUBJECT, ("Математика",)),
+    ("book_type_exam", BOOK_LESSON_TYPE, ("exam",)),
+    ("calendar_2024_9", BOOK_CALENDAR, (2024, 9)),
+    ("book_date_2024-09-01", BOOK_DATE, (date(2024, 9, 1),)),
+    ("book_time_15:30_16:30", BOOK_TIME, (time(15, 30), time(16, 30))),
+    ("cancel_booking_8", CANCEL_BOOKING, (8,)),
+    ("confirm_cancel_booking_8", CONFIRM_CANCEL_BOOKING, (8,)),
+    ("favorite_tutor_info_2", FAVORITE_TUTOR_INFO, (2,)),
+    ("favorite_delete_tutor_2", FAVORITE_DELETE_TUTOR, (2,)),
+    ("favorite_confirm_delete_tutor_2", FAVORITE_CONFIRM_DELETE_TUTOR, (2,)),
+    ("edit_child_3", EDIT_CHILD, (3,)),
+    ("delete_child_3", DELETE_CHILD, (3,)),
+    ("confirm_delete_3", CONFIRM_DELETE_CHILD, (3,)),
+]
+# Строки, которые должны попасть в свой обработчик, а не в прежний формат
+TUTOR_CURRENT = {"schedule:cancel:today": "handle_cancel_menu", "price_header": "_answer_inert"}
+PARENT_CURRENT = {"cancel_booking": "cancel_booking", "ignore": "_answer_inert"}
+STALE = ["book_time_25:00_26:00", "approve_booking_abc", "subject_name_Математика", "old_button_1"]
+
+
+def callback(data: str) -> CallbackQuery:
+    return CallbackQuery(
+        id="1", from_user=User(id=1, is_bot=False, first_name="Тест"), chat_instance="1", data=data
+    )
+
+
+async def check_bot(title: str, dp, legacy: list, current: dict, problems: list) -> None:
+    router = get_callback_router(dp)
+    for data, action, values in legacy:
+        new = router.resolve(callback(action.pack(*values)))
+        old = router.resolve(callback(data))
+        if old is None or old.name != new.name:
+            problems.append(f"{title}: {data} -> {old and old.name}, новая кнопка -> {new.name}")
+            continue
+        decoded = await old.action.unpack(data)
+        if tuple(decoded) != values:
+            problems.append(f"{title}: {data} разобрана как {tuple(decoded)}")
+    for data, name in current.items():
+        route = router.resolve(callback(data))
+        if route is None or route.name != name:
+            problems.append(f"{title}: {data} -> {route and route.name} вместо {name}")
+    for data in STALE:
+        if router.resolve(callback(data)) is not None:
+            problems.append(f"{title}: {data} неожиданно нашла обработчик")
+        route = (await router._filter(callback(data)) or {}).get("callback_route")
+        if route is None:
+            problems.append(f"{title}: {data} осталась без ответа")
+    print(f"{title}: прежних форматов {len(legacy)}, устаревших кнопок {len(STALE)}")
+
+
+async def main():
+    await init_db()
+    await intern_strings(["Математика", "Русский язык"])
+
+    from tutor_bot.main import setup_dispatcher as setup_tutor
+    from parent_bot.main import setup_dispatcher as setup_parent
+    tutor_dp = setup_tutor()
+    parent_dp = setup_parent()
+
+    problems = []
+    await check_bot("Бот репетитора", tutor_dp, TUTOR_LEGACY, TUTOR_CURRENT, problems)
+    await check_bot("Бот родителя", parent_dp, PARENT_LEGACY, PARENT_CURRENT, problems)
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Кнопки старых сообщений обрабатываются, остальные получают ответ")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,191 @@
+"""
+Проверка очереди заявок репетитора на курсорах (tutor_bot/handlers/booking.py).
+
+1. Проход очереди из 200 заявок кнопками "▶️" и "◀️" выдает заявки в том же порядке,
+   что и выборка с OFFSET, по одной заявке на нажатие.
+2. Если заявки подтверждаются по ходу просмотра, "▶️" показывает следующую заявку,
+   а не пропускает ее, как сдвинувшийся номер страницы.
+3. Планы SQLite: подсчет заявок и выборка следующей заявки идут по индексу
+   ix_bookings_tutor_status_date, без полного просмотра таблицы и сортировки.
+4. Время прохода очереди: курсоры и OFFSET (на SQLite оба варианта упираются
+   в накладные расходы запроса, OFFSET по покрывающему индексу дешев).
+
+Запуск: python scripts/check_pending_queue.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import date, time as dt_time, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для импорта обработчиков, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import joinedload
+
+from common.database import init_db, engine, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+from common.query_budget import capture_queries
+from tutor_bot.handlers.booking import count_pending_bookings, fetch_pending_booking, tutor_pending_query, PENDING_ORDER
+
+TUTOR_USER_ID = 1001
+PENDING = 200
+OTHER_BOOKINGS = 5000
+SEED = 48
+
+
+async def seed() -> None:
+    rng = random.Random(SEED)
+    async with async_session_maker() as session:
+        tutors = [Tutor(telegram_id=TUTOR_USER_ID + i, name=f"Репетитор{i}", surname="Тестов", subjects=[], schedule={})
+                  for i in range(5)]
+        parent = Parent(telegram_id=2001, name="Родитель", surname="Тестов")
+        session.add_all(tutors + [parent])
+        await session.flush()
+        child = Child(parent_id=parent.id, name="Маша", surname="Петрова", gender=Gender.FEMALE, grade=7)
+        session.add(child)
+        await session.flush()
+
+        def booking(tutor: Tutor, status: BookingStatus) -> Booking:
+            # Мало различных дат и времени: в очереди много заявок с одинаковыми (дата, начало)
+            start = rng.randrange(9, 20)
+            return Booking(
+                parent_id=parent.id, child_id=child.id, tutor_id=tutor.id, subject_name="Математика",
+                lesson_type="standard", date=date.today() + timedelta(days=rng.randrange(10)),
+                start_time=dt_time(start), end_time=dt_time(start + 1), price=1500, status=status,
+            )
+
+        session.add_all(booking(tutors[0], BookingStatus.PENDING) for _ in range(PENDING))
+        # Остальные записи: заявки других репетиторов и обработанные записи этого репетитора
+        session.add_all(
+            booking(rng.choice(tutors[1:]), BookingStatus.PENDING) if rng.random() < 0.5
+            else booking(rng.choice(tutors), rng.choice([BookingStatus.APPROVED, BookingStatus.REJECTED]))
+            for _ in range(OTHER_BOOKINGS)
+        )
+        await session.commit()
+
+
+async def walk(direction: str, problems: list = None) -> list:
+    """Проходит очередь по курсору, возвращает id заявок; с problems проверяет число запросов на шаг"""
+    ids = []
+    async with async_session_maker() as session:
+        booking = await fetch_pending_booking(session, TUTOR_USER_ID, direction)
+        while booking is not None:
+            ids.append(booking.id)
+            with capture_queries() if problems is not None else nullcontext() as log:
+                await count_pending_bookings(session, TUTOR_USER_ID)
+                booking = await fetch_pending_booking(
+                    session, TUTOR_USER_ID, direction, (booking.date, booking.start_time, booking.id)
+                )
+            if problems is not None and log.count != 2:
+                problems.append(f"шаг очереди: {log.count} запросов вместо 2")
+                break
+    return ids
+
+
+async def walk_with_offset() -> list:
+    """Проход очереди как до перехода на курсоры: подсчет и заявка по номеру (OFFSET)"""
+    ids = []
+    async with async_session_maker() as session:
+        for offset in range(PENDING):
+            await count_pending_bookings(session, TUTOR_USER_ID)
+            booking = await session.scalar(
+                tutor_pending_query(select(Booking), TUTOR_USER_ID)
+                .order_by(*PENDING_ORDER)
+                .options(joinedload(Booking.child), joinedload(Booking.parent))
+                .offset(offset)
+                .limit(1)
+            )
+            ids.append(booking.id)
+    return ids
+
+
+async def walk_while_approving(expected: list, steps: int, problems: list) -> None:
+    """Подтверждает каждую показанную заявку и переходит к следующей"""
+    async with async_session_maker() as session:
+        booking = await fetch_pending_booking(session, TUTOR_USER_ID)
+        for position in range(steps):
+            if booking is None or booking.id != expected[position]:
+                problems.append(f"после подтверждения {position} заявок очередь показала не ту заявку")
+                return
+            booking.status = BookingStatus.APPROVED
+            await session.commit()
+            booking = await fetch_pending_booking(
+                session, TUTOR_USER_ID, "next", (booking.date, booking.start_time, booking.id)
+            )
+    print(f"Подтверждено по ходу просмотра: {steps}, заявки не пропущены")
+
+
+async def query_plans() -> dict:
+    """Планы SQLite для подсчета заявок и выборки следующей заявки"""
+    executed = []
+
+    def remember(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    async with async_session_maker() as session:
+        first = await fetch_pending_booking(session, TUTOR_USER_ID)
+        event.listen(engine.sync_engine, "after_cursor_execute", remember)
+        try:
+            await count_pending_bookings(session, TUTOR_USER_ID)
+            await fetch_pending_booking(session, TUTOR_USER_ID, "next", (first.date, first.start_time, first.id))
+        finally:
+            event.remove(engine.sync_engine, "after_cursor_execute", remember)
+
+    plans = {}
+    async with engine.connect() as conn:
+        for title, (statement, parameters) in zip(("count", "next"), executed):
+            rows = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            plans[title] = [row[-1] for row in rows.all()]
+    return plans
+
+
+async def main():
+    await init_db()
+    await seed()
+    problems = []
+
+    forward = await walk("next", problems)
+    backward = await walk("prev", problems)
+    started = time.perf_counter()
+    await walk("next")
+    cursor_time = time.perf_counter() - started
+    started = time.perf_counter()
+    expected = await walk_with_offset()
+    offset_time = time.perf_counter() - started
+
+    print(f"Заявок в очереди: {len(forward)}")
+    if forward != expected:
+        problems.append("порядок очереди на курсорах отличается от выборки с OFFSET")
+    if backward != list(reversed(expected)):
+        problems.append("обратный проход очереди отличается от прямого")
+    print(f"Проход очереди: курсоры {cursor_time * 1e3:.0f} мс, OFFSET {offset_time * 1e3:.0f} мс")
+
+    await walk_while_approving(expected, 20, problems)
+
+    for title, plan in (await query_plans()).items():
+        print(f"План {title}: {' | '.join(plan)}")
+        if not any("ix_bookings_tutor_status_date" in step for step in plan):
+            problems.append(f"{title}: запрос не использует индекс ix_bookings_tutor_status_date")
+        if any(step.startswith("SCAN bookings") or "TEMP B-TREE" in step for step in plan):
+            problems.append(f"{title}: полный просмотр bookings или сортировка")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Очередь заявок обходится точечными запросами по индексу")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,316 @@
+"""
+Проверка бюджетов SQL-запросов обработчиков (common/query_budget.py).
+
+На временной БД с тестовыми данными прогоняет типичные сценарии обоих ботов: меню,
+списки учеников, записей и репетиторов, расписание и запись на занятие по шагам
+(кнопки нажимаются из предыдущего ответа бота). Для каждого обработчика считает
+SQL-запросы и загруженные строки и ищет одинаковые по форме запросы (N+1).
+
+Ошибка (код выхода 1), если обработчик с @query_budget превысил бюджет или выполняет
+однотипные запросы в цикле. Обработчики без бюджета только попадают в отчет.
+Запросы к Bot API уходят в локальный имитатор, состояния FSM хранятся в памяти,
+чтобы считались только запросы самих обработчиков.
+
+Запуск: python scripts/check_query_budgets.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+from aiohttp import web
+from aiogram import Dispatcher
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from common.bots import get_session, get_tutor_bot, get_parent_bot, close_bots
+from common.callback_data import (
+    intern_strings,
+    SHOW_STUDENT,
+    PENDING_BOOKING_CURSOR,
+    STUDENTS_SORTED_PAGE,
+    BOOKINGS_PAGE,
+    FAVORITE_TUTOR_INFO,
+    BOOK_CHILD,
+    BOOK_TUTOR,
+    BOOK_SUBJECT,
+    BOOK_LESSON_TYPE,
+    BOOK_DATE,
+    BOOK_TIME,
+)
+from common.database import (
+    init_db,
+    async_session_maker,
+    Tutor,
+    Parent,
+    Child,
+    FavoriteTutor,
+    Booking,
+    BookingStatus,
+    Gender,
+)
+from common.query_budget import capture_queries, get_query_budget
+from tutor_bot.keyboards import SUBJECTS
+
+TUTOR_USER_ID = 1001
+PARENT_USER_ID = 2001
+BOOKINGS_PER_STATUS = 6
+
+# Шаги сценариев: ("message", текст), ("callback", callback_data) или
+# ("press", действие) - нажать первую кнопку действия из последнего ответа бота
+TUTOR_SCENARIO = [
+    ("message", "/start"),
+    ("callback", "my_profile"),
+    ("callback", "tutor_pending_bookings"),
+    ("press", PENDING_BOOKING_CURSOR),
+    ("callback", "my_students"),
+    ("callback", STUDENTS_SORTED_PAGE.pack("recent", 0)),
+    ("press", SHOW_STUDENT),
+    ("callback", "show_schedule"),
+    ("callback", "schedule:cancel:month"),
+    ("callback", "tutor_bulk_approve"),
+    ("callback", "tutor_bulk_approve_confirm"),
+]
+PARENT_SCENARIO = [
+    ("message", "/start"),
+    ("callback", "profile"),
+    ("callback", "my_bookings"),
+    ("press", BOOKINGS_PAGE),
+    ("callback", "show_rejected_bookings"),
+    ("callback", "children"),
+    ("callback", "tutors"),
+    ("press", FAVORITE_TUTOR_INFO),
+    ("callback", "start_booking"),
+    ("press", BOOK_CHILD),
+    ("press", BOOK_TUTOR),
+    ("press", BOOK_SUBJECT),
+    ("press", BOOK_LESSON_TYPE),
+    ("press", BOOK_DATE),
+    ("press", BOOK_TIME),
+    ("callback", "confirm_booking"),
+]
+
+
+class FakeTelegram:
+    """Имитатор Bot API: запоминает клавиатуру последнего ответа каждому чату"""
+
+    def __init__(self):
+        self.markups = {}  # chat_id -> reply_markup последнего сообщения
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+
+        if method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            chat_id = int(params.get("chat_id", 0))
+            if "reply_markup" in params:
+                self.markups[chat_id] = json.loads(params["reply_markup"])
+            result = {
+                "message_id": int(params.get("message_id", 1)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def find_button(self, chat_id: int, action) -> str:
+        keyboard = self.markups.get(chat_id, {}).get("inline_keyboard", [])
+        for row in keyboard:
+            for button in row:
+                data = button.get("callback_data") or ""
+                if data.startswith(action.prefix):
+                    return data
+        raise LookupError(f"в последнем ответе нет кнопки {action.prefix}...")
+
+
+async def seed_database() -> None:
+    """Репетитор с учениками и записями, родитель с двумя детьми и двумя репетиторами"""
+    schedule = {
+        day: {"active": True, "start": "09:00", "end": "20:00"}
+        for day in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+    }
+    subjects = [
+        {"name": name, "is_exam": True, "is_standard": True, "exam_price": 2000, "standard_price": 1500}
+        for name in SUBJECTS[:3]
+    ]
+    async with async_session_maker() as session:
+        tutors = [
+            Tutor(telegram_id=TUTOR_USER_ID + i, name=f"Репетитор{i}", surname="Тестов",
+                  subjects=subjects, schedule=schedule, description="Тестовый репетитор")
+            for i in range(2)
+        ]
+        parent = Parent(telegram_id=PARENT_USER_ID, name="Родитель", surname="Тестов", phone="+70000000000")
+        session.add_all(tutors + [parent])
+        await session.flush()
+
+        children = [
+            Child(parent_id=parent.id, name=f"Ребенок{i}", surname="Тестов",
+                  gender=Gender.MALE, grade=5 + i, textbook_info="-")
+            for i in range(2)
+        ]
+        session.add_all(children)
+        session.add_all(FavoriteTutor(parent_id=parent.id, tutor_id=tutor.id) for tutor in tutors)
+        await session.flush()
+
+        start = date.today() + timedelta(days=2)
+        for status in (BookingStatus.PENDING, BookingStatus.APPROVED):
+            for i in range(BOOKINGS_PER_STATUS):
+                session.add(Booking(
+                    parent_id=parent.id,
+                    child_id=children[i % 2].id,
+                    tutor_id=tutors[i // 2 % 2].id,
+                    subject_name=subjects[i % 3]["name"],
+                    lesson_type="standard",
+                    date=start + timedelta(days=i),
+                    start_time=dt_time(10 + (status == BookingStatus.APPROVED) * 3),
+                    end_time=dt_time(11 + (status == BookingStatus.APPROVED) * 3),
+                    price=1500,
+                    status=status,
+                    approved_at=datetime.now() if status == BookingStatus.APPROVED else None,
+                ))
+        await session.commit()
+
+
+def build_dispatcher(register_functions) -> tuple:
+    """Диспетчер с обработчиками бота; возвращает его и список выбранных обработчиков"""
+    dp = Dispatcher(storage=MemoryStorage())
+    selected = []
+
+    async def remember_handler(handler, event, data):
+        # Для callback-запросов обработчик выбирает CallbackRouter (common/callback_router.py)
+        route = data.get("callback_route")
+        selected.append(route.handler.callback if route is not None else data["handler"].callback)
+        return await handler(event, data)
+
+    dp.message.middleware(remember_handler)
+    dp.callback_query.middleware(remember_handler)
+    for register in register_functions:
+        register(dp)
+    return dp, selected
+
+
+def make_update(update_id: int, user_id: int, kind: str, value: str) -> Update:
+    user = {"id": user_id, "is_bot": False, "first_name": "Тест"}
+    chat = {"id": user_id, "type": "private"}
+    if kind == "message":
+        message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": user, "text": value}
+        if value.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(value)}]
+        return Update.model_validate({"update_id": update_id, "message": message})
+    return Update.model_validate({"update_id": update_id, "callback_query": {
+        "id": str(update_id),
+        "from": user,
+        "chat_instance": "1",
+        "data": value,
+        "message": {"message_id": 1, "date": int(time.time()), "chat": chat, "text": "меню"},
+    }})
+
+
+async def run_scenario(name, bot, dp, selected, fake, user_id, steps) -> list:
+    """Возвращает [(шаг, обработчик, QueryLog)]"""
+    results = []
+    for update_id, (kind, value) in enumerate(steps, start=1):
+        if kind == "press":
+            step = f"нажатие {value.prefix}..."
+            value = fake.find_button(user_id, value)
+            kind = "callback"
+        else:
+            step = value
+        selected.clear()
+        with capture_queries() as log:
+            await dp.feed_update(bot, make_update(update_id, user_id, kind, value))
+        handler = selected[-1] if selected else None
+        results.append((f"{name}: {step}", handler, log))
+    return results
+
+
+async def main():
+    from tutor_bot.handlers.common import register_common_handlers as tutor_common
+    from tutor_bot.handlers.profile import register_profile_handlers as tutor_profile
+    from tutor_bot.handlers.booking import register_booking_handlers as tutor_booking
+    from tutor_bot.handlers.students import register_students_handlers
+    from tutor_bot.handlers.schedule import register_schedule_handlers
+    from parent_bot.handlers.common import register_common_handlers as parent_common
+    from parent_bot.handlers.profile import register_profile_handlers as parent_profile
+    from parent_bot.handlers.children import register_children_handlers
+    from parent_bot.handlers.tutors import register_tutors_handlers
+    from parent_bot.handlers.booking import register_booking_handlers as parent_booking
+
+    await init_db()
+    await intern_strings(SUBJECTS)
+    await seed_database()
+
+    fake = FakeTelegram()
+    fake_app = web.Application()
+    fake_app.router.add_post("/bot{token}/{method}", fake.handle)
+    fake_runner = web.AppRunner(fake_app)
+    await fake_runner.setup()
+    site = web.TCPSite(fake_runner, "127.0.0.1", 0)
+    await site.start()
+    get_session().api = TelegramAPIServer.from_base(f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}")
+
+    tutor_dp, tutor_selected = build_dispatcher([
+        tutor_common, tutor_profile, tutor_booking, register_students_handlers, register_schedule_handlers
+    ])
+    parent_dp, parent_selected = build_dispatcher([
+        parent_common, parent_profile, register_children_handlers, register_tutors_handlers, parent_booking
+    ])
+
+    results = []
+    failures = []
+    try:
+        results += await run_scenario(
+            "tutor", get_tutor_bot(), tutor_dp, tutor_selected, fake, TUTOR_USER_ID, TUTOR_SCENARIO
+        )
+        results += await run_scenario(
+            "parent", get_parent_bot(), parent_dp, parent_selected, fake, PARENT_USER_ID, PARENT_SCENARIO
+        )
+    except LookupError as e:
+        failures.append(f"сценарий прерван: {e}")
+    finally:
+        await close_bots()
+        await fake_runner.cleanup()
+
+    print(f"{'Шаг':<42} {'Обработчик':<32} {'Запросов':>8} {'Строк':>6}  Бюджет")
+    for step, handler, log in results:
+        handler_name = handler.__name__ if handler else "-"
+        budget = get_query_budget(handler) if handler else None
+        budget_text = f"{budget.statements}/{budget.rows if budget.rows is not None else '-'}" if budget else "нет"
+        print(f"{step:<42} {handler_name:<32} {log.count:>8} {log.rows:>6}  {budget_text}")
+
+        if handler is None:
+            failures.append(f"{step}: обновление не обработано")
+            continue
+        repeated = log.repeated_shapes()
+        for shape, count in repeated:
+            print(f"    ⚠️ {count} раз: {shape[:150]}")
+        if budget is None:
+            continue
+        if log.count > budget.statements:
+            failures.append(f"{handler_name}: {log.count} запросов при бюджете {budget.statements}")
+        if budget.rows is not None and log.rows > budget.rows:
+            failures.append(f"{handler_name}: {log.rows} строк при бюджете {budget.rows}")
+        if repeated:
+            failures.append(f"{handler_name}: однотипные запросы в цикле (N+1)")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Обработчики укладываются в бюджеты запросов")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Проверка обработки напоминаний, пропущенных во время простоя планировщика
+(catch_up_missed_reminders в common/notifications.py).
+
+Создает занятия, у которых окно этапа "за 24 часа" уже прошло, и проверяет, что
+пропущенными считаются только этапы, окно которых закрылось после подтверждения
+занятия: занятие, подтвержденное за 10 часов до начала, не получает позднее
+напоминание "за 24 часа".
+
+Запуск: python scripts/check_reminder_catchup.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для настроек, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+
+from sqlalchemy import select
+
+from common import notifications
+from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+
+# (название, часов до занятия, за сколько часов до сейчас подтверждено или None, ожидаемый результат)
+CASES = [
+    ("подтверждено за 10 ч до начала", 10, 1, "не положено"),
+    ("подтверждено давно, опоздание 13.5 ч", 10, 72, "пропущено"),
+    ("подтверждено давно, опоздание 1.5 ч", 22, 48, "отправлено"),
+    ("подтверждено за 23 ч до начала", 22, 1, "не положено"),
+    ("время подтверждения неизвестно", 22, None, "отправлено"),
+]
+
+
+class RecordingBot:
+    """Заглушка бота, запоминающая получателей"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None, parse_mode=None):
+        self.sent.append(chat_id)
+
+
+async def seed(now: datetime) -> dict:
+    async with async_session_maker() as session:
+        tutor = Tutor(telegram_id=1, name="Анна", surname="Иванова", subjects=[], schedule={})
+        session.add(tutor)
+        bookings = {}
+        for i, (title, hours_left, approved_ago, _) in enumerate(CASES):
+            # У каждого занятия свой родитель, чтобы по chat_id можно было найти запись
+            parent = Parent(telegram_id=1000 + i, name="Тест", surname="Родитель")
+            child = Child(parent=parent, name="Тест", surname="Ученик", gender=Gender.MALE, grade=5)
+            starts_at = now + timedelta(hours=hours_left)
+            booking = Booking(
+                parent=parent, child=child, tutor=tutor, subject_name="Математика", lesson_type="standard",
+                date=starts_at.date(), start_time=starts_at.time(),
+                end_time=(starts_at + timedelta(hours=1)).time(), price=1000, status=BookingStatus.APPROVED,
+                approved_at=now - timedelta(hours=approved_ago) if approved_ago is not None else None,
+            )
+            session.add(booking)
+            bookings[title] = booking
+        await session.commit()
+        return {title: (booking.id, 1000 + i) for i, (title, booking) in enumerate(bookings.items())}
+
+
+async def main():
+    await init_db()
+    ids = await seed(datetime.now())
+    bot = RecordingBot()
+    notifications.get_tutor_bot = lambda: bot
+    notifications.get_parent_bot = lambda: bot
+
+    delivered, expired, failures = await notifications.catch_up_missed_reminders()
+    print(f"Отправлено с опозданием: {delivered}, пропущено: {expired}, ошибок: {len(failures)}")
+
+    problems = []
+    async with async_session_maker() as session:
+        sent_masks = dict((await session.execute(select(Booking.id, Booking.reminders_sent))).all())
+    for title, _, _, expected in CASES:
+        booking_id, chat_id = ids[title]
+        marked = bool((sent_masks[booking_id] or 0) & notifications.stage_mask(notifications.REMINDER_STAGES[0]))
+        result = "отправлено" if chat_id in bot.sent else "пропущено" if marked else "не положено"
+        print(f"{title}: {result}")
+        if result != expected:
+            problems.append(f"{title}: {result} вместо {expected}")
+    if (delivered, expired) != (2, 1):
+        problems.append(f"счетчики {delivered}/{expired} вместо 2/1")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Поздние напоминания отправляются только для этапов, пропущенных после подтверждения")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
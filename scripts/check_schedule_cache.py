@@ -0,0 +1,167 @@
+"""
+Проверка кэша расписания репетитора (tutor_bot/utils/schedule_cache.py).
+
+1. Повторное нажатие фильтра расписания стоит одного SQL-запроса (проверка версии)
+   и не меняет текст.
+2. Изменение статуса записи, новая запись (как из бота для родителей) и переименование
+   ученика сбрасывают кэш.
+3. На следующий день расписание отрисовывается заново.
+
+Запуск: python scripts/check_schedule_cache.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from sqlalchemy import select
+
+from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+from common.query_budget import capture_queries
+from tutor_bot.utils.schedule_cache import schedule_cache
+
+TUTOR_USER_ID = 1001
+
+
+class LastTextSession(BaseSession):
+    """Сессия Bot API без сети, запоминает текст последнего редактирования"""
+
+    def __init__(self):
+        super().__init__()
+        self.text = None
+
+    async def make_request(self, bot, method, timeout=None):
+        if method.__api_method__ == "editMessageText":
+            self.text = method.text
+        return self.check_response(
+            bot=bot, method=method, status_code=200, content=json.dumps({"ok": True, "result": True})
+        ).result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def make_callback(update_id: int, data: str) -> Update:
+    return Update.model_validate({"update_id": update_id, "callback_query": {
+        "id": str(update_id),
+        "from": {"id": TUTOR_USER_ID, "is_bot": False, "first_name": "Тест"},
+        "chat_instance": str(TUTOR_USER_ID),
+        "data": data,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": TUTOR_USER_ID, "type": "private"},
+            "text": "меню",
+        },
+    }})
+
+
+async def main():
+    from tutor_bot.handlers.schedule import register_schedule_handlers
+
+    await init_db()
+    async with async_session_maker() as db:
+        tutor = Tutor(telegram_id=TUTOR_USER_ID, name="Репетитор", surname="Тестов", subjects=[], schedule={})
+        parent = Parent(telegram_id=2001, name="Родитель", surname="Тестов")
+        db.add_all([tutor, parent])
+        await db.flush()
+        child = Child(parent_id=parent.id, name="Маша", surname="Петрова", gender=Gender.FEMALE, grade=7)
+        db.add(child)
+        await db.flush()
+        db.add_all(
+            Booking(
+                parent_id=parent.id, child_id=child.id, tutor_id=tutor.id, subject_name="Математика",
+                lesson_type="standard", date=date.today(), start_time=dt_time(20 + i // 2, 30 * (i % 2)),
+                end_time=dt_time(21 + i // 2, 30 * (i % 2)), price=1500, status=BookingStatus.PENDING,
+            )
+            for i in range(3)
+        )
+        await db.commit()
+        ids = (tutor.id, parent.id, child.id)
+    tutor_id, parent_id, child_id = ids
+
+    session = LastTextSession()
+    bot = Bot("111111:check-tutor", session=session)
+    dp = Dispatcher(storage=MemoryStorage())
+    register_schedule_handlers(dp)
+    update_ids = iter(range(1000))
+
+    async def tap(data: str = "schedule:today") -> tuple:
+        with capture_queries() as log:
+            await dp.feed_update(bot, make_callback(next(update_ids), data))
+        return log.count, session.text
+
+    problems = []
+
+    def expect(title: str, result: tuple, statements: int, previous_text=None, changed=None):
+        count, text = result
+        print(f"{title}: {count} SQL-запросов")
+        if count != statements:
+            problems.append(f"{title}: {count} запросов вместо {statements}")
+        if changed is True and text == previous_text:
+            problems.append(f"{title}: расписание не обновилось")
+        if changed is False and text != previous_text:
+            problems.append(f"{title}: текст расписания изменился")
+
+    first = await tap()
+    expect("Первое нажатие \"Сегодня\"", first, 2)
+    again = await tap()
+    expect("Повторное нажатие", again, 1, first[1], changed=False)
+    expect("Возврат к расписанию", await tap("schedule:back"), 1, first[1], changed=False)
+
+    async with async_session_maker() as db:
+        booking = await db.scalar(select(Booking).where(Booking.tutor_id == tutor_id).order_by(Booking.id))
+        booking.status = BookingStatus.APPROVED
+        await db.commit()
+    approved = await tap()
+    expect("После подтверждения записи", approved, 2, again[1], changed=True)
+
+    async with async_session_maker() as db:
+        db.add(Booking(
+            parent_id=parent_id, child_id=child_id, tutor_id=tutor_id, subject_name="Физика",
+            lesson_type="exam", date=date.today(), start_time=dt_time(23), end_time=dt_time(23, 59),
+            price=2000, status=BookingStatus.PENDING, created_at=datetime.now(),
+        ))
+        await db.commit()
+    added = await tap()
+    expect("После новой записи", added, 2, approved[1], changed=True)
+
+    async with async_session_maker() as db:
+        child = await db.get(Child, child_id)
+        child.name = "Мария"
+        await db.commit()
+    renamed = await tap()
+    expect("После переименования ученика", renamed, 2, added[1], changed=True)
+
+    # Граница дня: запись кэша сделана "вчера"
+    key = (tutor_id, "today")
+    (period_start, today, version), value = schedule_cache._entries[key]
+    schedule_cache._entries[key] = ((period_start, today - timedelta(days=1), version), value)
+    expect("На следующий день", await tap(), 2)
+
+    print(f"Кэш: попаданий {schedule_cache.hits}, промахов {schedule_cache.misses}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Повторные нажатия обслуживаются из кэша, изменения расписания сбрасывают его")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
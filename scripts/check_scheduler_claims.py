@@ -0,0 +1,269 @@
+"""
+Проверка захвата напоминаний несколькими экземплярами планировщика.
+
+Создает временную БД с подтвержденными занятиями и запускает несколько процессов,
+каждый из которых работает как scripts/notification_scheduler.py: периодические полные
+проверки, а между ними частые проверки зависших захватов. Отправка одной пачки длится
+дольше аренды, поэтому без продления аренды другие экземпляры перехватили бы записи
+посреди отправки.
+
+Сценарии:
+1. Все экземпляры работают: пачки распределяются между процессами, каждое напоминание
+   отправлено ровно один раз.
+2. Один экземпляр падает посреди рассылки (отправив первую пачку и захватив вторую):
+   его пачку после истечения аренды подхватывают остальные, каждое напоминание по-прежнему
+   отправлено ровно один раз, время восстановления - секунды, а не период полной проверки.
+3. У одного экземпляра посреди пачки перестает продлеваться аренда: он прекращает
+   отправку, не отмечает неотправленные напоминания отправленными, а освобождает записи,
+   и следующая полная проверка отправляет их только тем получателям, которые их не получили.
+
+Процесс падает в момент отправки сообщения, до того как оно ушло. Если процесс упадет
+после того, как Telegram принял сообщение, но до отметки пачки в БД, сообщения этой
+пачки (не больше REMINDER_DELIVERY_CHUNK_SIZE записей) будут отправлены повторно.
+
+Запуск: python scripts/check_scheduler_claims.py [количество_процессов] [количество_занятий]
+"""
+import asyncio
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Токены нужны только для настроек, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+
+LEASE_SECONDS = 2  # Аренда в проверке короче боевой, чтобы восстановление занимало секунды
+FAILOVER_INTERVAL = 0.5
+FULL_CHECK_INTERVAL = 1.5
+SEND_DELAY = 0.06  # Сообщения репетитору идут по одному: пачка отправляется дольше аренды
+CRASH_EXIT_CODE = 17
+RECOVERY_LIMIT = 15  # Секунд от падения экземпляра до отправки всех напоминаний
+
+
+class RecordingBot:
+    """Заглушка бота, записывающая отправленные сообщения в общий файл"""
+
+    def __init__(self, name: str, log_path: str, crash_after: int = None):
+        self.name = name
+        self.log_path = log_path
+        self.crash_after = crash_after
+
+    def __hash__(self):
+        return hash(self.name)
+
+    async def send_message(self, chat_id, text, reply_markup=None, parse_mode=None):
+        lesson = re.search(r"Ученик\d+", text).group()
+        if self.crash_after is not None:
+            if self.crash_after == 0:
+                # Экземпляр падает посреди рассылки, сообщение не отправлено
+                os._exit(CRASH_EXIT_CODE)
+            self.crash_after -= 1
+        # Имитируем задержку сети, чтобы процессы пересекались во времени
+        await asyncio.sleep(SEND_DELAY)
+        with open(self.log_path, 'a') as log:
+            log.write(f"send {chat_id} {lesson} {os.getpid()}\n")
+
+
+def fail_renewals_after(notifications, successful: int) -> None:
+    """После successful продлений аренды все следующие завершаются ошибкой (например, БД недоступна)"""
+    extend = notifications.extend_reminder_claims
+    calls = 0
+
+    async def failing_extend(session, booking_ids, mask):
+        nonlocal calls
+        calls += 1
+        if calls > successful:
+            raise RuntimeError("renewal failed")
+        return await extend(session, booking_ids, mask)
+
+    notifications.extend_reminder_claims = failing_extend
+
+
+def log_releases(notifications, log_path: str) -> None:
+    """Записывает в общий файл число освобожденных записей"""
+    release = notifications.release_reminders
+
+    async def logged_release(session, delivered_to):
+        await release(session, delivered_to)
+        if delivered_to:
+            with open(log_path, 'a') as log:
+                log.write(f"release {len(delivered_to)} - {os.getpid()}\n")
+
+    notifications.release_reminders = logged_release
+
+
+def run_scheduler(workdir: str, log_path: str, start_event, stop_event, crash_after, renewals):
+    os.chdir(workdir)
+    from common import notifications
+
+    notifications.REMINDER_CLAIM_LEASE_SECONDS = LEASE_SECONDS
+    bot = RecordingBot('bot', log_path, crash_after)
+    notifications.get_tutor_bot = lambda: bot
+    notifications.get_parent_bot = lambda: bot
+    if renewals is not None:
+        fail_renewals_after(notifications, renewals)
+    log_releases(notifications, log_path)
+
+    async def scheduler():
+        # Как scripts/notification_scheduler.py: полные проверки, между ними проверки зависших захватов
+        loop = asyncio.get_running_loop()
+        next_check = loop.time()
+        while not stop_event.is_set():
+            try:
+                if loop.time() >= next_check:
+                    await notifications.check_and_send_notifications()
+                    next_check = loop.time() + FULL_CHECK_INTERVAL
+                else:
+                    await notifications.check_and_send_notifications(stale_only=True)
+            except Exception as e:
+                print(f"Ошибка проверки напоминаний: {e}")
+            await asyncio.sleep(max(0, min(FAILOVER_INTERVAL, next_check - loop.time())))
+
+    start_event.wait()
+    asyncio.run(scheduler())
+
+
+async def seed(lessons: int):
+    from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus
+
+    await init_db()
+    now = datetime.now()
+    async with async_session_maker() as session:
+        tutor = Tutor(telegram_id=1, name='Тест', surname='Репетитор', subjects=[], schedule={})
+        session.add(tutor)
+        for i in range(lessons):
+            # У каждого занятия свой родитель, чтобы по chat_id можно было найти запись
+            parent = Parent(telegram_id=1000 + i, name='Тест', surname='Родитель')
+            # Номер в фамилии ученика отличает напоминания репетитору о разных занятиях
+            child = Child(name='Тест', surname=f'Ученик{i}', parent=parent, grade=5)
+            lesson_time = now + timedelta(hours=24)
+            session.add(Booking(
+                parent=parent,
+                child=child,
+                tutor=tutor,
+                subject_name='Математика',
+                lesson_type='standard',
+                date=lesson_time.date(),
+                start_time=lesson_time.time(),
+                end_time=(lesson_time + timedelta(hours=1)).time(),
+                price=1000,
+                status=BookingStatus.APPROVED
+            ))
+        await session.commit()
+
+
+def seed_database(workdir: str, lessons: int):
+    # Путь к БД движок фиксирует при импорте, поэтому у каждого сценария свой процесс
+    os.chdir(workdir)
+    asyncio.run(seed(lessons))
+
+
+def unsent_count(db_path: str) -> int:
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        return conn.execute("SELECT count(*) FROM bookings WHERE coalesce(reminders_sent, 0) & 1 = 0").fetchone()[0]
+
+
+def run_scenario(title: str, processes: int, lessons: int, crash: bool = False, renewals: int = None) -> list:
+    """Запускает экземпляры планировщика на новой БД, возвращает найденные проблемы"""
+    from common.config import REMINDER_DELIVERY_CHUNK_SIZE
+
+    workdir = tempfile.mkdtemp()
+    log_path = os.path.join(workdir, 'sent.log')
+    open(log_path, 'w').close()
+    ctx = multiprocessing.get_context('spawn')
+    seeder = ctx.Process(target=seed_database, args=(workdir, lessons))
+    seeder.start()
+    seeder.join()
+
+    # Падающий экземпляр успевает отправить первую пачку (репетитору и родителю по каждой записи)
+    crash_after = 2 * REMINDER_DELIVERY_CHUNK_SIZE if crash else None
+    start_event, stop_event = ctx.Event(), ctx.Event()
+    workers = [
+        ctx.Process(
+            target=run_scheduler,
+            args=(workdir, log_path, start_event, stop_event, *((crash_after, renewals) if i == 0 else (None, None)))
+        )
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    started = time.monotonic()
+    start_event.set()
+
+    problems = []
+    crashed_at = None
+    deadline = started + 120
+    while time.monotonic() < deadline:
+        if crash and crashed_at is None and workers[0].exitcode is not None:
+            crashed_at = time.monotonic()
+        if unsent_count(os.path.join(workdir, 'tutors.db')) == 0 and (not crash or crashed_at is not None):
+            break
+        time.sleep(0.1)
+    finished = time.monotonic()
+    stop_event.set()
+    for worker in workers:
+        worker.join()
+
+    with open(log_path) as log:
+        records = [line.split() for line in log if line.strip()]
+    lines = [(chat_id, lesson, pid) for kind, chat_id, lesson, pid in records if kind == 'send']
+    released = Counter(int(pid) for kind, count, _, pid in records for _ in range(int(count)) if kind == 'release')
+    # Каждое занятие: одно напоминание репетитору (chat_id 1) и одно своему родителю
+    sends = Counter((chat_id, lesson) for chat_id, lesson, _ in lines)
+    senders = Counter(int(pid) for _, _, pid in lines)
+    duplicates = sum(count - 1 for count in sends.values())
+    missing = 2 * lessons - len(sends)
+
+    print(f"{title}: процессов {processes}, занятий {lessons}, сообщений {len(lines)}, {finished - started:.1f} с")
+    print(f"  Распределение по процессам: {sorted(senders.values(), reverse=True)}")
+    if duplicates or missing:
+        problems.append(f"{title}: повторных напоминаний {duplicates}, не отправлено {missing}")
+    if len(senders) < 2:
+        problems.append(f"{title}: все напоминания отправил один процесс, пачки не распределились")
+    if crash:
+        victim = workers[0]
+        if victim.exitcode != CRASH_EXIT_CODE:
+            problems.append(f"{title}: экземпляр не упал посреди рассылки (код выхода {victim.exitcode})")
+        else:
+            recovery = finished - crashed_at
+            print(f"  Упавший экземпляр отправил {senders[victim.pid]} сообщений, "
+                  f"остальное разослано через {recovery:.1f} с после падения")
+            if recovery > RECOVERY_LIMIT:
+                problems.append(f"{title}: восстановление заняло {recovery:.1f} с")
+    if renewals is not None:
+        victim = workers[0]
+        print(f"  Экземпляр без продления аренды отправил {senders[victim.pid]} сообщений, "
+              f"освободил записей: {released[victim.pid]}")
+        if not released[victim.pid]:
+            problems.append(f"{title}: аренда не истекла посреди пачки, записи не освобождались")
+    return problems
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    lessons = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    problems = run_scenario("Без сбоев", processes, lessons)
+    problems += run_scenario("Падение экземпляра", processes, lessons, crash=True)
+    # Аренда продлевается каждые LEASE_SECONDS / 3 секунд: после одного продления она истекает
+    # через LEASE_SECONDS, раньше, чем репетитору уйдут все напоминания пачки
+    problems += run_scenario("Сбой продления аренды", processes, lessons, renewals=1)
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Каждое напоминание отправлено ровно один раз, в том числе после падения экземпляра и сбоя аренды")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Проверка списка и карточки учеников репетитора (tutor_bot/handlers/students.py).
+
+1. Статистика каждого ученика, посчитанная в SQL (всего, подтверждено, предстоит,
+   последнее занятие), совпадает с подсчетом по загруженным записям.
+2. Порядок "по имени" и "недавние", страницы без пропусков и повторов.
+3. Страница списка - два запроса без загрузки ORM-объектов записей, независимо
+   от числа записей учеников.
+4. Карточка ученика - один запрос по индексу (tutor_id, child_id): статистика
+   (в том числе отмененные и стоимость) только по записям к этому репетитору.
+
+Запуск: python scripts/check_student_roster.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для импорта обработчиков, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+
+from sqlalchemy import event, select
+
+from common.database import init_db, engine, async_session_maker, Tutor, Parent, Child, Booking, BookingStatus, Gender
+from common.query_budget import capture_queries
+from tutor_bot.handlers.students import (
+    STUDENTS_VIEW, STUDENTS_PAGE_SIZE, count_students, fetch_students, student_detail_query
+)
+
+TUTOR_USER_ID = 1001
+STUDENTS = 57
+BOOKINGS = 3000
+SEED = 49
+
+
+async def seed() -> None:
+    rng = random.Random(SEED)
+    async with async_session_maker() as session:
+        tutors = [Tutor(telegram_id=TUTOR_USER_ID + i, name=f"Репетитор{i}", surname="Тестов", subjects=[], schedule={})
+                  for i in range(3)]
+        parent = Parent(telegram_id=2001, name="Родитель", surname="Тестов")
+        session.add_all(tutors + [parent])
+        await session.flush()
+        children = [
+            Child(parent_id=parent.id, name=f"Ученик{i}", surname=rng.choice(["Иванов", "Петров", "Сидоров"]),
+                  gender=Gender.MALE, grade=5)
+            for i in range(STUDENTS)
+        ]
+        # Последний ученик занимается только у другого репетитора
+        children.append(Child(parent_id=parent.id, name="Чужой", surname="Ученик", gender=Gender.FEMALE, grade=9))
+        session.add_all(children)
+        await session.flush()
+        for _ in range(BOOKINGS):
+            start = rng.randrange(9, 20)
+            child = rng.choice(children)
+            session.add(Booking(
+                parent_id=parent.id, child_id=child.id,
+                tutor_id=tutors[1].id if child is children[-1] else rng.choice(tutors).id,
+                subject_name="Математика", lesson_type="standard",
+                date=date.today() + timedelta(days=rng.randrange(-60, 30)),
+                start_time=time(start), end_time=time(start + 1), price=1500,
+                status=rng.choice(list(BookingStatus)),
+                created_at=datetime.now() - timedelta(minutes=rng.randrange(100000)),
+            ))
+        await session.commit()
+
+
+async def expected_roster() -> dict:
+    """Статистика учеников, посчитанная по загруженным записям репетитора"""
+    now = datetime.now()
+    async with async_session_maker() as session:
+        tutor_id = await session.scalar(select(Tutor.id).where(Tutor.telegram_id == TUTOR_USER_ID))
+        bookings = (await session.execute(select(Booking).where(Booking.tutor_id == tutor_id))).scalars().all()
+    roster = {}
+    for booking in bookings:
+        stats = roster.setdefault(booking.child_id, {
+            "total": 0, "approved": 0, "upcoming": 0, "cancelled": 0, "revenue": 0, "last_lesson": None
+        })
+        stats["total"] += 1
+        if booking.status == BookingStatus.CANCELLED:
+            stats["cancelled"] += 1
+        if booking.status == BookingStatus.APPROVED:
+            stats["approved"] += 1
+            stats["revenue"] += booking.price
+            if booking.starts_at > now:
+                stats["upcoming"] += 1
+            elif stats["last_lesson"] is None or booking.date > stats["last_lesson"]:
+                stats["last_lesson"] = booking.date
+    return roster
+
+
+async def check_details(expected: dict, problems: list) -> None:
+    """Карточки учеников: статистика, число запросов и план запроса"""
+    empty = {"total": 0, "approved": 0, "upcoming": 0, "cancelled": 0, "revenue": 0, "last_lesson": None}
+    executed = []
+
+    def remember(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    async with async_session_maker() as session:
+        child_ids = (await session.execute(select(Child.id).order_by(Child.id))).scalars().all()
+        event.listen(engine.sync_engine, "after_cursor_execute", remember)
+        try:
+            for child_id in child_ids:
+                with capture_queries() as log:
+                    row = (await session.execute(student_detail_query(TUTOR_USER_ID, child_id))).one()
+                stats = {key: getattr(row, key) for key in empty}
+                if stats != expected.get(child_id, empty):
+                    problems.append(f"карточка ученика {child_id}: {stats} вместо {expected.get(child_id, empty)}")
+                    break
+                if log.count != 1 or log.rows != 1:
+                    problems.append(f"карточка ученика: {log.count} запросов, {log.rows} ORM-объектов")
+                    break
+        finally:
+            event.remove(engine.sync_engine, "after_cursor_execute", remember)
+        print(f"Карточка ученика, не занимающегося у репетитора: {stats}")
+
+    async with engine.connect() as conn:
+        statement, parameters = executed[-1]
+        plan = [row[-1] for row in (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)).all()]
+    print(f"План карточки: {' | '.join(plan)}")
+    if not any("ix_bookings_tutor_child" in step for step in plan):
+        problems.append("карточка ученика не использует индекс ix_bookings_tutor_child")
+
+
+async def main():
+    await init_db()
+    await seed()
+    problems = []
+    expected = await expected_roster()
+
+    async with async_session_maker() as session:
+        total = await count_students(session, TUTOR_USER_ID)
+        if total != len(expected):
+            problems.append(f"учеников {total} вместо {len(expected)}")
+
+        for order in ("name", "recent"):
+            rows = []
+            for offset in range(0, total, STUDENTS_PAGE_SIZE):
+                rows += await fetch_students(session, TUTOR_USER_ID, order, offset=offset, limit=STUDENTS_PAGE_SIZE)
+            if sorted(row.id for row in rows) != sorted(expected):
+                problems.append(f"{order}: страницы пропускают или повторяют учеников")
+            for row in rows:
+                keys = ("total", "approved", "upcoming", "last_lesson")
+                stats = {key: getattr(row, key) for key in keys}
+                if stats != {key: expected[row.id][key] for key in keys}:
+                    problems.append(f"{order}: ученик {row.id}: {stats} вместо {expected[row.id]}")
+                    break
+            if order == "name" and [(r.surname, r.name, r.id) for r in rows] != sorted((r.surname, r.name, r.id) for r in rows):
+                problems.append("порядок по имени нарушен")
+            if order == "recent":
+                lessons = [r.last_lesson for r in rows]
+                with_lessons = [d for d in lessons if d is not None]
+                if with_lessons != sorted(with_lessons, reverse=True) or lessons[:len(with_lessons)] != with_lessons:
+                    problems.append("порядок по недавним занятиям нарушен")
+                print(f"Недавние: {', '.join(f'{r.name} {r.surname} ({r.last_lesson})' for r in rows[:3])}")
+
+        with capture_queries() as log:
+            page = await STUDENTS_VIEW.load(session, TUTOR_USER_ID, "recent", page=1)
+        text, _ = STUDENTS_VIEW.render(page)
+        print(f"Страница 2 из {page.count}: {log.count} SQL-запроса, ORM-объектов {log.rows}")
+        print(text.splitlines()[2])
+        if log.count != 2 or log.rows:
+            problems.append(f"страница списка: {log.count} запросов, {log.rows} ORM-объектов")
+
+    await check_details(expected, problems)
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Список и карточки учеников считаются в SQL и совпадают с записями")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+"""
+Проверка очереди обновлений (common/update_limiter.py).
+
+1. Обновления нескольких пользователей: одновременно выполняется не больше
+   max_concurrent обработчиков, обновления одного пользователя - по одному и по порядку.
+2. Переполнение очереди: лишние обновления отклоняются, пользователи получают ответ,
+   в метриках видны отклоненные обновления.
+3. Двойное нажатие "✅ Подтвердить запись" в боте для родителей создает одну запись
+   (для сравнения печатается результат без очереди).
+
+Запуск: python scripts/check_update_limiter.py
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для создания объектов Bot, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:check-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:check-parent")
+
+from aiogram import Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from sqlalchemy import select, func
+
+from common import bots
+from common.database import init_db, async_session_maker, Tutor, Parent, Child, Booking, Gender
+from common.metrics import render_metrics
+from common.update_limiter import UpdateLimiter, UpdateLimiterMiddleware
+
+
+class RecordingSession(BaseSession):
+    """Сессия Bot API без сети, считает вызовы по методам"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[method.__api_method__] += 1
+        if method.__api_method__ in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": method.chat_id or 0, "type": "private"},
+                "text": method.text,
+            }
+        else:
+            result = True
+        return self.check_response(
+            bot=bot, method=method, status_code=200, content=json.dumps({"ok": True, "result": result})
+        ).result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def make_callback(update_id: int, user_id: int, data: str) -> Update:
+    return Update.model_validate({"update_id": update_id, "callback_query": {
+        "id": str(update_id),
+        "from": {"id": user_id, "is_bot": False, "first_name": "Тест"},
+        "chat_instance": str(user_id),
+        "data": data,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "text": "меню",
+        },
+    }})
+
+
+async def check_ordering(bot) -> list:
+    limiter = UpdateLimiter(max_concurrent=3, queue_size=100, user_queue_size=5)
+    dp = Dispatcher()
+    dp.update.outer_middleware(UpdateLimiterMiddleware("check", limiter))
+
+    active = {"total": 0, "max": 0}
+    user_active = Counter()
+    user_overlaps = 0
+    handled = defaultdict(list)
+
+    async def slow_handler(callback):
+        nonlocal user_overlaps
+        user_id = callback.from_user.id
+        active["total"] += 1
+        active["max"] = max(active["max"], active["total"])
+        user_active[user_id] += 1
+        if user_active[user_id] > 1:
+            user_overlaps += 1
+        await asyncio.sleep(0.01)
+        handled[user_id].append(int(callback.data))
+        user_active[user_id] -= 1
+        active["total"] -= 1
+
+    dp.callback_query.register(slow_handler)
+    updates = [make_callback(i, 100 + i % 10, str(i)) for i in range(50)]
+    await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+
+    problems = []
+    if active["max"] > limiter.max_concurrent:
+        problems.append(f"одновременно выполнялось {active['max']} обработчиков при ограничении {limiter.max_concurrent}")
+    if user_overlaps:
+        problems.append(f"обновления одного пользователя выполнялись параллельно ({user_overlaps} раз)")
+    if any(values != sorted(values) for values in handled.values()):
+        problems.append("нарушен порядок обновлений пользователя")
+    if sum(len(values) for values in handled.values()) != len(updates):
+        problems.append("обработаны не все обновления")
+    if limiter._users or limiter.waiting:
+        problems.append("после обработки очередь не пуста")
+    print(f"Порядок и ограничение: не больше {active['max']} одновременно, {len(updates)} обновлений обработано")
+    return problems
+
+
+async def check_overflow(bot, session) -> list:
+    limiter = UpdateLimiter(max_concurrent=2, queue_size=5, user_queue_size=2)
+    dp = Dispatcher()
+    dp.update.outer_middleware(UpdateLimiterMiddleware("overflow", limiter))
+    handled = []
+
+    async def slow_handler(callback):
+        await asyncio.sleep(0.05)
+        handled.append(callback.data)
+
+    dp.callback_query.register(slow_handler)
+    answered_before = session.calls["answerCallbackQuery"]
+    # Один пользователь с 4 обновлениями (2 лишних), затем 20 пользователей по одному обновлению
+    updates = [make_callback(100 + i, 999, "y") for i in range(4)]
+    updates += [make_callback(i, 200 + i, "x") for i in range(20)]
+    await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+
+    rejected = len(updates) - len(handled)
+    answered = session.calls["answerCallbackQuery"] - answered_before
+    metrics = render_metrics()
+    print(f"Переполнение: обработано {len(handled)}, отклонено {rejected}, ответов на отклоненные {answered}")
+
+    problems = []
+    # 2 выполняются + 5 ждут, остальные отклоняются
+    if len(handled) != limiter.max_concurrent + limiter.queue_size:
+        problems.append(f"обработано {len(handled)} обновлений вместо {limiter.max_concurrent + limiter.queue_size}")
+    if answered != rejected:
+        problems.append("не на все отклоненные callback-запросы отправлен ответ")
+    for reason in ("queue_full", "user_queue_full"):
+        if f'bot_updates_rejected_total{{bot="overflow",reason="{reason}"}}' not in metrics:
+            problems.append(f"в метриках нет обновлений, отклоненных по причине {reason}")
+    return problems
+
+
+async def count_double_tap_bookings(bot, with_limiter: bool) -> int:
+    from parent_bot.handlers.booking import register_booking_handlers, BookingStates
+
+    async with async_session_maker() as db:
+        tutor = Tutor(telegram_id=5000 + with_limiter, name="Репетитор", surname="Тестов", subjects=[], schedule={})
+        parent = Parent(telegram_id=6000 + with_limiter, name="Родитель", surname="Тестов")
+        db.add_all([tutor, parent])
+        await db.flush()
+        child = Child(parent_id=parent.id, name="Ребенок", surname="Тестов", gender=Gender.MALE, grade=5)
+        db.add(child)
+        await db.commit()
+        ids = (tutor.id, parent.id, child.id, parent.telegram_id)
+
+    tutor_id, parent_id, child_id, user_id = ids
+    dp = Dispatcher(storage=MemoryStorage())
+    if with_limiter:
+        dp.update.outer_middleware(UpdateLimiterMiddleware("double_tap", UpdateLimiter(10, 100, 5)))
+    register_booking_handlers(dp)
+
+    state = FSMContext(dp.storage, StorageKey(bot_id=bot.id, chat_id=user_id, user_id=user_id))
+    await state.set_state(BookingStates.confirmation)
+    await state.set_data({
+        "parent_id": parent_id,
+        "child_id": child_id,
+        "tutor_id": tutor_id,
+        "subject_name": "Математика",
+        "lesson_type": "standard",
+        "selected_date": date.today() + timedelta(days=3),
+        "start_time": "10:00",
+        "end_time": "11:00",
+        "price": 1500,
+    })
+    await asyncio.gather(*(
+        dp.feed_update(bot, make_callback(i, user_id, "confirm_booking")) for i in range(2)
+    ))
+
+    async with async_session_maker() as db:
+        return await db.scalar(select(func.count(Booking.id)).where(Booking.parent_id == parent_id))
+
+
+async def main():
+    # Отклоненные обновления пишутся в лог как предупреждения - здесь они ожидаемы
+    logging.getLogger("common.update_limiter").setLevel(logging.ERROR)
+    await init_db()
+    session = RecordingSession()
+    bots._session = session  # все боты процесса используют эту сессию
+    bot = bots.get_parent_bot()
+
+    problems = await check_ordering(bot)
+    problems += await check_overflow(bot, session)
+
+    without_limiter = await count_double_tap_bookings(bot, with_limiter=False)
+    with_limiter = await count_double_tap_bookings(bot, with_limiter=True)
+    print(f"Двойное нажатие подтверждения: без очереди записей {without_limiter}, с очередью {with_limiter}")
+    if with_limiter != 1:
+        problems.append(f"двойное нажатие создало {with_limiter} записей")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Очередь обновлений работает")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
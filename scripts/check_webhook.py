@@ -0,0 +1,172 @@
+"""
+Проверка webhook-режима на локальном имитаторе Telegram Bot API.
+
+Поднимает поддельный Bot API (запоминает вызванные методы и время их вызова),
+переключает на него оба бота и запускает приложение из common/webhook.py.
+Затем отправляет /start на пути обоих ботов и измеряет время от POST-запроса
+до ответа бота (sendMessage), а также проверяет, что запросы с неверным секретом
+отклоняются и что при запуске для каждого бота вызван setWebhook.
+
+Запуск: python scripts/check_webhook.py [обновлений_на_бота]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+from aiohttp import web, ClientSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from common.config import get_settings
+from common.database import init_db
+from common.webhook import build_webhook_app
+from common.bots import get_tutor_bot, get_parent_bot, close_bots
+from tutor_bot.main import setup_dispatcher as setup_tutor
+from parent_bot.main import setup_dispatcher as setup_parent
+
+HOST = "127.0.0.1"
+
+
+class FakeTelegram:
+    """Имитатор Bot API: отвечает успехом на любой метод и запоминает вызовы"""
+
+    def __init__(self):
+        self.calls = []  # (метод, время, параметры)
+        self.replies = asyncio.Queue()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls.append((method, time.perf_counter(), params))
+
+        if method == "sendMessage":
+            await self.replies.put((int(params["chat_id"]), time.perf_counter()))
+            result = {
+                "message_id": len(self.calls),
+                "date": int(time.time()),
+                "chat": {"id": int(params["chat_id"]), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+def make_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Тест"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+async def start_app(app: web.Application) -> tuple:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{HOST}:{port}"
+
+
+async def main():
+    updates_per_bot = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    settings = get_settings()
+
+    fake = FakeTelegram()
+    fake_app = web.Application()
+    fake_app.router.add_post("/bot{token}/{method}", fake.handle)
+    fake_runner, fake_url = await start_app(fake_app)
+
+    # Общая сессия ботов (common/bots.py) отправляет запросы имитатору
+    get_tutor_bot().session.api = TelegramAPIServer.from_base(fake_url)
+
+    await init_db()
+    tutor_dp = setup_tutor()
+    parent_dp = setup_parent()
+    app = build_webhook_app(
+        [
+            {"bot": get_tutor_bot(), "dispatcher": tutor_dp, "path": settings.webhook_tutor_path, "secret": settings.webhook_tutor_secret},
+            {"bot": get_parent_bot(), "dispatcher": parent_dp, "path": settings.webhook_parent_path, "secret": settings.webhook_parent_secret},
+        ],
+        base_url="https://bots.example.com",
+    )
+    runner, url = await start_app(app)
+
+    errors = []
+    webhooks = [params for method, _, params in fake.calls if method == "setWebhook"]
+    if {w["url"] for w in webhooks} != {
+        "https://bots.example.com" + settings.webhook_tutor_path,
+        "https://bots.example.com" + settings.webhook_parent_path,
+    } or any(not w.get("secret_token") for w in webhooks):
+        errors.append(f"setWebhook вызван с неожиданными параметрами: {webhooks}")
+
+    sent_at = {}
+    async with ClientSession() as http:
+        response = await http.post(
+            url + settings.webhook_tutor_path,
+            json=make_update(1, 1),
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+        )
+        if response.status != 401:
+            errors.append(f"Запрос с неверным секретом вернул {response.status}")
+
+        async def post(path: str, secret: str, update_id: int, user_id: int):
+            sent_at[user_id] = time.perf_counter()
+            response = await http.post(
+                url + path,
+                json=make_update(update_id, user_id),
+                headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+            )
+            if response.status != 200:
+                errors.append(f"Обновление {update_id} вернуло {response.status}")
+
+        await asyncio.gather(*(
+            post(path, secret, bot_index * updates_per_bot + i + 1, 10_000 * (bot_index + 1) + i)
+            for bot_index, (path, secret) in enumerate([
+                (settings.webhook_tutor_path, settings.webhook_tutor_secret),
+                (settings.webhook_parent_path, settings.webhook_parent_secret),
+            ])
+            for i in range(updates_per_bot)
+        ))
+
+        latencies = []
+        try:
+            for _ in range(updates_per_bot * 2):
+                chat_id, replied_at = await asyncio.wait_for(fake.replies.get(), timeout=10)
+                latencies.append((replied_at - sent_at[chat_id]) * 1000)
+        except asyncio.TimeoutError:
+            errors.append(f"Получено ответов: {len(latencies)} из {updates_per_bot * 2}")
+
+    await runner.cleanup()
+    await close_bots()
+    await fake_runner.cleanup()
+
+    if latencies:
+        latencies.sort()
+        print(f"Обновлений: {len(latencies)}")
+        print(f"Задержка до ответа: медиана {statistics.median(latencies):.1f} мс, "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} мс, максимум {latencies[-1]:.1f} мс")
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Оба бота отвечают через webhook, неверный секрет отклоняется")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,415 @@
+"""
+Нагрузочный тест записи на занятие.
+
+Симулирует родителей, которые проходят запись целиком (start_booking -> выбор ребенка,
+репетитора, предмета, типа занятия, даты и времени -> confirm_booking), и репетиторов,
+которые подтверждают новые записи (approve_booking) по кнопке из уведомления.
+Обновления подаются в диспетчеры ботов (parent_bot/main.py, tutor_bot/main.py - с тем же
+хранилищем FSM и метриками, что в работе) через Dispatcher.feed_update, кнопки нажимаются
+из предыдущего ответа бота. Запросы к Bot API принимает RecordingSession в том же процессе:
+сети нет, ответы разбираются так же, как ответы Telegram.
+
+Отчет: p50/p95/p99 времени обработки по шагам, пропускная способность (обновлений
+и завершенных записей в секунду), ошибки и итоговые статусы записей в БД.
+Генератор случайных чисел инициализируется --seed, поэтому прогон воспроизводим.
+
+Потолок производительности: --ramp 10,25,50,100,200 запускает прогон для каждого уровня
+одновременно активных родителей в отдельном процессе (с чистой БД) и показывает уровень,
+после которого пропускная способность перестает расти или p95 шага превышает --slo-ms.
+
+Запуск:
+    python scripts/load_test_booking.py [--parents 1000] [--concurrency 50] [--tutors 20]
+    python scripts/load_test_booking.py --ramp 10,25,50,100,200 --parents 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from datetime import datetime
+
+# Добавляем родительскую директорию в PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Временная БД: движок использует относительный путь tutors.db
+os.chdir(tempfile.mkdtemp())
+
+# Токены нужны только для создания объектов Bot, запросы в Telegram не уходят
+os.environ.setdefault("TUTOR_BOT_TOKEN", "111111:load-test-tutor")
+os.environ.setdefault("PARENT_BOT_TOKEN", "222222:load-test-parent")
+os.environ.setdefault("METRICS_PORT", "0")
+
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Update
+from sqlalchemy import select, func
+
+from common import bots
+from common.callback_data import (
+    intern_strings,
+    BOOK_CHILD,
+    BOOK_TUTOR,
+    BOOK_SUBJECT,
+    BOOK_LESSON_TYPE,
+    BOOK_DATE,
+    BOOK_TIME,
+    APPROVE_BOOKING,
+)
+from common.database import (
+    init_db,
+    async_session_maker,
+    Tutor,
+    Parent,
+    Child,
+    FavoriteTutor,
+    Booking,
+    Gender,
+)
+from common.metrics import ApiMetricsMiddleware
+from tutor_bot.keyboards import SUBJECTS
+
+TUTOR_ID_BASE = 1_000_000
+PARENT_ID_BASE = 2_000_000
+FAVORITES_PER_PARENT = 2
+DEFAULT_SLO_MS = 500
+
+# Шаги родителя: (название, callback_data или действие кнопки из последнего ответа)
+PARENT_STEPS = [
+    ("start_booking", "start_booking"),
+    ("child", BOOK_CHILD),
+    ("tutor", BOOK_TUTOR),
+    ("subject", BOOK_SUBJECT),
+    ("lesson_type", BOOK_LESSON_TYPE),
+    ("date", BOOK_DATE),
+    ("time", BOOK_TIME),
+    ("confirm_booking", "confirm_booking"),
+]
+STEP_NAMES = [name for name, _ in PARENT_STEPS] + ["approve"]
+
+
+class RecordingSession(BaseSession):
+    """
+    Сессия Bot API без сети: считает вызовы по методам, запоминает клавиатуру
+    последнего сообщения в каждом чате и передает уведомления репетиторам в очереди.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+        self.markups = {}  # chat_id -> последняя InlineKeyboardMarkup
+        self.tutor_inboxes = defaultdict(asyncio.Queue)  # chat_id репетитора -> callback_data кнопок подтверждения
+
+    async def make_request(self, bot, method, timeout=None):
+        api_method = method.__api_method__
+        self.calls[api_method] += 1
+        chat_id = getattr(method, "chat_id", None)
+        markup = getattr(method, "reply_markup", None)
+        if chat_id is not None and markup is not None and hasattr(markup, "inline_keyboard"):
+            self.markups[chat_id] = markup
+            if chat_id >= TUTOR_ID_BASE and chat_id < PARENT_ID_BASE:
+                for row in markup.inline_keyboard:
+                    for button in row:
+                        if button.callback_data and button.callback_data.startswith(APPROVE_BOOKING.prefix):
+                            self.tutor_inboxes[chat_id].put_nowait(button.callback_data)
+
+        if api_method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            result = {
+                "message_id": getattr(method, "message_id", None) or self.calls[api_method],
+                "date": int(time.time()),
+                "chat": {"id": chat_id or 0, "type": "private"},
+                "text": getattr(method, "text", None) or "",
+            }
+        else:
+            result = True
+        response = self.check_response(
+            bot=bot, method=method, status_code=200, content=json.dumps({"ok": True, "result": result})
+        )
+        return response.result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+    def buttons(self, chat_id: int, action) -> list:
+        markup = self.markups.get(chat_id)
+        if markup is None:
+            return []
+        return [
+            button.callback_data
+            for row in markup.inline_keyboard
+            for button in row
+            if button.callback_data and button.callback_data.startswith(action.prefix)
+        ]
+
+
+class LoadStats:
+    def __init__(self):
+        self.durations = defaultdict(list)  # шаг -> длительности, с
+        self.errors = Counter()  # шаг -> исключения при обработке
+        self.aborted = Counter()  # шаг -> родители, у которых не нашлось нужной кнопки
+        self.completed = 0
+        self.updates = 0
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class UpdateFactory:
+    def __init__(self):
+        self.update_id = 0
+
+    def callback(self, user_id: int, data: str) -> Update:
+        self.update_id += 1
+        user = {"id": user_id, "is_bot": False, "first_name": "Нагрузка"}
+        return Update.model_validate({"update_id": self.update_id, "callback_query": {
+            "id": str(self.update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "меню",
+            },
+        }})
+
+
+async def seed_database(parents: int, tutors: int, rng: random.Random) -> None:
+    schedule = {
+        day: {"active": True, "start": "09:00", "end": "21:00"}
+        for day in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+    }
+    async with async_session_maker() as session:
+        tutor_rows = [
+            Tutor(
+                telegram_id=TUTOR_ID_BASE + i,
+                name=f"Репетитор{i}",
+                surname="Нагрузочный",
+                subjects=[
+                    {"name": name, "is_exam": True, "is_standard": True, "exam_price": 2000, "standard_price": 1500}
+                    for name in rng.sample(SUBJECTS, 3)
+                ],
+                schedule=schedule,
+                description="Нагрузочный тест",
+            )
+            for i in range(tutors)
+        ]
+        parent_rows = [
+            Parent(telegram_id=PARENT_ID_BASE + i, name=f"Родитель{i}", surname="Нагрузочный", phone="+70000000000")
+            for i in range(parents)
+        ]
+        session.add_all(tutor_rows + parent_rows)
+        await session.flush()
+
+        for parent in parent_rows:
+            session.add(Child(
+                parent_id=parent.id, name="Ребенок", surname="Нагрузочный",
+                gender=Gender.FEMALE, grade=rng.randint(1, 11), textbook_info="-"
+            ))
+            for tutor in rng.sample(tutor_rows, min(FAVORITES_PER_PARENT, tutors)):
+                session.add(FavoriteTutor(parent_id=parent.id, tutor_id=tutor.id))
+        await session.commit()
+
+
+async def timed_feed(dp, bot, update: Update, step: str, stats: LoadStats) -> bool:
+    started = time.perf_counter()
+    try:
+        await dp.feed_update(bot, update)
+        ok = True
+    except Exception:
+        stats.errors[step] += 1
+        ok = False
+    stats.durations[step].append(time.perf_counter() - started)
+    stats.updates += 1
+    return ok
+
+
+async def simulate_parent(index, dp, bot, session, factory, stats, rng) -> None:
+    user_id = PARENT_ID_BASE + index
+    for step, target in PARENT_STEPS:
+        if isinstance(target, str):
+            data = target
+        else:
+            buttons = session.buttons(user_id, target)
+            if not buttons:
+                stats.aborted[step] += 1
+                return
+            data = rng.choice(buttons)
+        if not await timed_feed(dp, bot, factory.callback(user_id, data), step, stats):
+            return
+    stats.completed += 1
+
+
+async def simulate_tutor(chat_id, dp, bot, session, factory, stats) -> None:
+    inbox = session.tutor_inboxes[chat_id]
+    while True:
+        data = await inbox.get()
+        await timed_feed(dp, bot, factory.callback(chat_id, data), "approve", stats)
+        inbox.task_done()
+
+
+async def run_load(parents: int, concurrency: int, tutors: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    session = RecordingSession()
+    session.middleware(ApiMetricsMiddleware())
+    bots._session = session  # все боты процесса используют эту сессию
+
+    from parent_bot.main import setup_dispatcher as setup_parent
+    from tutor_bot.main import setup_dispatcher as setup_tutor
+
+    await init_db()
+    await intern_strings(SUBJECTS)
+    await seed_database(parents, tutors, rng)
+    parent_dp = setup_parent()
+    tutor_dp = setup_tutor()
+    parent_bot, tutor_bot = bots.get_parent_bot(), bots.get_tutor_bot()
+
+    stats = LoadStats()
+    factory = UpdateFactory()
+    tutor_tasks = [
+        asyncio.create_task(simulate_tutor(TUTOR_ID_BASE + i, tutor_dp, tutor_bot, session, factory, stats))
+        for i in range(tutors)
+    ]
+    # У каждого родителя свой генератор, чтобы выбор кнопок не зависел от порядка выполнения задач
+    parent_rngs = [random.Random(rng.random()) for _ in range(parents)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(index):
+        async with semaphore:
+            await simulate_parent(index, parent_dp, parent_bot, session, factory, stats, parent_rngs[index])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(parents)))
+    for i in range(tutors):
+        await session.tutor_inboxes[TUTOR_ID_BASE + i].join()
+    elapsed = time.perf_counter() - started
+
+    for task in tutor_tasks:
+        task.cancel()
+    await parent_dp.storage.close()
+    await tutor_dp.storage.close()
+
+    async with async_session_maker() as db:
+        statuses = dict((status.value, count) for status, count in (await db.execute(
+            select(Booking.status, func.count(Booking.id)).group_by(Booking.status)
+        )).all())
+
+    return {
+        "parents": parents,
+        "concurrency": concurrency,
+        "tutors": tutors,
+        "seed": seed,
+        "elapsed": elapsed,
+        "updates": stats.updates,
+        "completed": stats.completed,
+        "updates_per_second": stats.updates / elapsed,
+        "bookings_per_second": stats.completed / elapsed,
+        "steps": {
+            step: {
+                "count": len(stats.durations[step]),
+                "p50": percentile(stats.durations[step], 0.50) * 1000,
+                "p95": percentile(stats.durations[step], 0.95) * 1000,
+                "p99": percentile(stats.durations[step], 0.99) * 1000,
+                "errors": stats.errors[step],
+                "aborted": stats.aborted[step],
+            }
+            for step in STEP_NAMES
+        },
+        "api_calls": dict(session.calls),
+        "bookings": statuses,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(
+        f"Родителей: {result['parents']}, одновременно: {result['concurrency']}, "
+        f"репетиторов: {result['tutors']}, seed: {result['seed']}"
+    )
+    print(f"{'Шаг':<16} {'кол-во':>7} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} {'ошибок':>7} {'прервано':>9}")
+    for step in STEP_NAMES:
+        s = result["steps"][step]
+        print(
+            f"{step:<16} {s['count']:>7} {s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f} "
+            f"{s['errors']:>7} {s['aborted']:>9}"
+        )
+    print(
+        f"Время: {result['elapsed']:.1f} с, обновлений: {result['updates']} "
+        f"({result['updates_per_second']:.0f}/с), завершенных записей: {result['completed']} "
+        f"({result['bookings_per_second']:.1f}/с)"
+    )
+    print(f"Записи в БД: {result['bookings']}")
+    print(f"Запросы к Bot API: {result['api_calls']}")
+
+
+def run_ramp(args) -> None:
+    """Прогон для каждого уровня нагрузки в отдельном процессе; ищет потолок"""
+    results = []
+    for level in [int(value) for value in args.ramp.split(",")]:
+        command = [
+            sys.executable, os.path.abspath(__file__), "--json",
+            "--parents", str(args.parents), "--concurrency", str(level),
+            "--tutors", str(args.tutors), "--seed", str(args.seed),
+        ]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+        result = results[-1]
+        worst = max(result["steps"].values(), key=lambda s: s["p95"])
+        print(
+            f"одновременно {level:>5}: {result['updates_per_second']:7.0f} обновлений/с, "
+            f"{result['bookings_per_second']:6.1f} записей/с, худший p95 {worst['p95']:7.1f} мс"
+        )
+
+    ceiling = None
+    for previous, current in zip(results, results[1:]):
+        worst_p95 = max(s["p95"] for s in current["steps"].values())
+        if worst_p95 > args.slo_ms or current["updates_per_second"] < previous["updates_per_second"] * 1.05:
+            ceiling = previous
+            break
+    if ceiling is None:
+        print("Потолок не достигнут: увеличьте уровни --ramp")
+    else:
+        print(
+            f"Потолок: около {ceiling['concurrency']} одновременно активных родителей, "
+            f"{ceiling['updates_per_second']:.0f} обновлений/с (SLO p95 {args.slo_ms:.0f} мс)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест записи на занятие")
+    parser.add_argument("--parents", type=int, default=1000, help="сколько родителей проходят запись")
+    parser.add_argument("--concurrency", type=int, default=50, help="сколько родителей активны одновременно")
+    parser.add_argument("--tutors", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ramp", help="уровни одновременности через запятую, например 10,25,50,100")
+    parser.add_argument("--slo-ms", type=float, default=DEFAULT_SLO_MS, help="допустимый p95 шага для --ramp")
+    parser.add_argument("--json", action="store_true", help="вывести результат одной строкой JSON")
+    args = parser.parse_args()
+
+    if args.ramp:
+        run_ramp(args)
+        return
+
+    # Обработчики печатают отладочные сообщения на каждый шаг - на время прогона их скрываем
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        result = asyncio.run(run_load(args.parents, args.concurrency, args.tutors, args.seed))
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"Прогон {datetime.now():%Y-%m-%d %H:%M}")
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import sqlite3
+from datetime import datetime
+import shutil
+
+# Backup the current database
+shutil.copy('tutors.db', f'tutors_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
+
+# Connect to the database
+conn = sqlite3.connect('tutors.db')
+cursor = conn.cursor()
+
+# Add bitmask columns for reminder stages and the daily digest marker
+for table, column, definition in [
+    ('bookings', 'reminders_sent', 'INTEGER DEFAULT 0'),
+    ('tutors', 'reminders_muted', 'INTEGER DEFAULT 0'),
+    ('parents', 'reminders_muted', 'INTEGER DEFAULT 0'),
+    ('tutors', 'digest_sent_on', 'DATE'),
+    ('bookings', 'starts_at', 'DATETIME'),
+    ('bookings', 'reminder_claimed_by', 'VARCHAR'),
+    ('bookings', 'reminder_claim_expires_at', 'DATETIME'),
+    ('bookings', 'reminder_delivered_to', 'INTEGER DEFAULT 0'),
+    ('bookings', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+    ('tutors', 'schedule_version', 'INTEGER NOT NULL DEFAULT 0'),
+]:
+    try:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    except sqlite3.OperationalError:
+        print(f"Column {table}.{column} already exists")
+
+# Move per-stage flags into the bitmask (bit 0 - 24h, bit 1 - 1h)
+columns = [row[1] for row in cursor.execute('PRAGMA table_info(bookings)')]
+if 'notification_24h_sent' in columns and 'notification_1h_sent' in columns:
+    cursor.execute('''
+        UPDATE bookings
+        SET reminders_sent = COALESCE(reminders_sent, 0)
+            | (CASE WHEN notification_24h_sent THEN 1 ELSE 0 END)
+            | (CASE WHEN notification_1h_sent THEN 2 ELSE 0 END)
+    ''')
+
+# Fill lesson start timestamps and index them for reminder lookups
+cursor.execute('''
+    UPDATE bookings
+    SET starts_at = date || ' ' || start_time
+    WHERE starts_at IS NULL AND date IS NOT NULL AND start_time IS NOT NULL
+''')
+cursor.execute('CREATE INDEX IF NOT EXISTS ix_bookings_status_starts_at ON bookings (status, starts_at)')
+
+# Index tutor-day lookups (overlap checks) and the tutor's pending queue
+cursor.execute('DROP INDEX IF EXISTS ix_bookings_tutor_date_status')
+cursor.execute('CREATE INDEX IF NOT EXISTS ix_bookings_tutor_status_date ON bookings (tutor_id, status, date, start_time)')
+cursor.execute('CREATE INDEX IF NOT EXISTS ix_bookings_tutor_child ON bookings (tutor_id, child_id)')
+
+conn.commit()
+conn.close()
+
+print("Migration completed successfully!")
@@ -7,8 +7,9 @@ import os
 # Добавляем родительскую директорию в PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from common.notifications import check_and_send_notifications
+from common.notifications import check_and_send_notifications, send_daily_digests, catch_up_missed_reminders
 from common.database import init_db
+from common.config import get_settings
 
 # Настройка логирования
 logging.basicConfig(
@@ -27,17 +28,45 @@ async def main():
     try:
         # Инициализируем базу данных
         await init_db()
+
+        # Обрабатываем напоминания, пропущенные за время простоя
+        try:
+            delivered, expired, failures = await catch_up_missed_reminders()
+            logger.info(f"Missed reminders: {delivered} delivered late, {expired} expired")
+            for booking_id, errors in failures.items():
+                logger.warning(f"Failed to deliver reminders for booking {booking_id}: {'; '.join(errors)}")
+        except Exception as e:
+            logger.error(f"Error during missed reminders catch-up: {e}")
         
+        loop = asyncio.get_running_loop()
+        next_check = loop.time()
         while True:
-            try:
-                logger.info("Checking for notifications...")
-                await check_and_send_notifications()
-                logger.info("Notification check completed")
-            except Exception as e:
-                logger.error(f"Error during notification check: {e}")
-            
-            # Ждем 5 минут перед следующей проверкой
-            await asyncio.sleep(300)
+            settings = get_settings()
+            if loop.time() >= next_check:
+                try:
+                    logger.info("Checking for notifications...")
+                    failures = await check_and_send_notifications()
+                    for booking_id, errors in failures.items():
+                        logger.warning(f"Failed to deliver reminders for booking {booking_id}: {'; '.join(errors)}")
+
+                    failures = await send_daily_digests()
+                    for key, errors in failures.items():
+                        logger.warning(f"Failed to deliver daily digest ({key}): {'; '.join(errors)}")
+                    logger.info("Notification check completed")
+                except Exception as e:
+                    logger.error(f"Error during notification check: {e}")
+                # Следующая полная проверка (по умолчанию через 5 минут)
+                next_check = loop.time() + settings.notification_check_interval
+            else:
+                # Между полными проверками подхватываем напоминания упавших экземпляров
+                try:
+                    failures = await check_and_send_notifications(stale_only=True)
+                    for booking_id, errors in failures.items():
+                        logger.warning(f"Failed to deliver reminders for booking {booking_id}: {'; '.join(errors)}")
+                except Exception as e:
+                    logger.error(f"Error during stale reminder claims check: {e}")
+
+            await asyncio.sleep(max(0, min(settings.reminder_failover_interval, next_check - loop.time())))
     except KeyboardInterrupt:
         logger.info("Notification service stopped by user")
     except Exception as e:
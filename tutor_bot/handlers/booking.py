@@ -1,201 +1,178 @@
-from datetime import datetime
+from datetime import datetime, date
 from aiogram import types
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy import select, and_, or_
-from sqlalchemy.orm import selectinload, joinedload
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy import select, and_, or_, func, tuple_
+from sqlalchemy.orm import selectinload, joinedload, contains_eager, aliased
 
-from common.database import async_session_maker, Booking, BookingStatus, Tutor
-from parent_bot.main import bot as parent_bot
+from common.database import async_session_maker, Booking, BookingStatus, Tutor, update_tutor_bookings
+from common.query_budget import query_budget
+from common import booking_cards
+from common.booking_cards import render_card
+from common.callback_router import get_callback_router
+from common.callback_data import APPROVE_BOOKING, REJECT_BOOKING, PENDING_BOOKING_PAGE, PENDING_BOOKING_CURSOR
+from common.bots import get_parent_bot
+from common.notifications import deliver_messages
+from common.intervals import load_day_intervals
+from tutor_bot.utils.batch_approval import BatchPlan, plan_batch_approval, apply_batch_plan
+
+# Число отклоняемых заявок, которые перечисляются перед массовым подтверждением
+BULK_PREVIEW_LINES = 10
 
 class BookingStates(StatesGroup):
     """Состояния для работы с записями"""
     waiting_for_rejection_reason = State()  # Ожидание причины отклонения записи
 
-async def show_pending_bookings(callback_query: types.CallbackQuery):
-    """Показывает записи, ожидающие подтверждения"""
-    async with async_session_maker() as session:
-        # Сначала получаем данные о репетиторе
-        tutor = await session.execute(
-            select(Tutor).where(Tutor.telegram_id == callback_query.from_user.id)
-        )
-        tutor = tutor.scalar_one_or_none()
-        
-        if not tutor:
-            print(f"Tutor not found. Telegram ID: {callback_query.from_user.id}")
-            await callback_query.message.edit_text(
-                "❌ Ошибка: не удалось найти ваши данные.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-                ])
-            )
-            return
+def tutor_pending_query(query, telegram_id: int):
+    """Ограничивает запрос заявками репетитора, ожидающими подтверждения"""
+    return query.join(Booking.tutor).where(
+        Tutor.telegram_id == telegram_id,
+        Booking.status == BookingStatus.PENDING
+    )
 
-        print(f"Found tutor: ID={tutor.id}, telegram_id={tutor.telegram_id}")
-        
-        # Получаем все ожидающие записи для репетитора
-        pending_bookings = await session.execute(
-            select(Booking)
-            .where(
-                and_(
-                    Booking.tutor_id == tutor.id,  # Используем ID из базы данных
-                    Booking.status == BookingStatus.PENDING
-                )
-            )
-            .order_by(Booking.date, Booking.start_time)
-            .options(
-                joinedload(Booking.child),
-                joinedload(Booking.parent)
-            )
-        )
-        pending_bookings = pending_bookings.scalars().all()
-        
-        print(f"Found {len(pending_bookings)} pending bookings")
+async def count_pending_bookings(session, telegram_id: int) -> int:
+    return await session.scalar(tutor_pending_query(select(func.count(Booking.id)), telegram_id))
 
-        if not pending_bookings:
-            await callback_query.message.edit_text(
-                "У вас нет записей, ожидающих подтверждения.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-                ])
-            )
-            return
+# Порядок очереди заявок; ключ (дата, начало, id) - курсор в PENDING_BOOKING_CURSOR
+PENDING_ORDER = (Booking.date, Booking.start_time, Booking.id)
 
-        # Показываем первую запись
-        booking = pending_bookings[0]
-        total_count = len(pending_bookings)
-        
-        text = (
-            f"📋 Записи, ожидающие подтверждения ({1}/{total_count})\n\n"
-            f"📚 {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
-            f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-            f"👨‍👩‍👧‍👦 Родитель: {booking.parent.name} {booking.parent.surname}\n"
-            f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-            f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-            f"💰 Стоимость: {booking.price} ₽"
-        )
+async def fetch_pending_booking(session, telegram_id: int, direction: str = "at", cursor: tuple = None):
+    """
+    Одна заявка очереди относительно курсора (по индексу tutor_id, status, date, start_time)
 
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    text="✅ Подтвердить",
-                    callback_data=f"approve_booking_{booking.id}"
-                ),
-                InlineKeyboardButton(
-                    text="❌ Отклонить",
-                    callback_data=f"reject_booking_{booking.id}"
-                )
-            ]
-        ]
+    Args:
+        direction (str): "next" - следующая после курсора, "prev" - предыдущая,
+            "at" - заявка курсора или следующая, если ее уже обработали
+        cursor (tuple): (дата, начало, id) заявки; None - начало или конец очереди
+    """
+    query = tutor_pending_query(select(Booking), telegram_id).options(
+        joinedload(Booking.child),
+        joinedload(Booking.parent)
+    )
+    key = tuple_(*PENDING_ORDER)
+    if direction == "prev":
+        if cursor is not None:
+            query = query.where(key < tuple_(*cursor))
+        query = query.order_by(*(column.desc() for column in PENDING_ORDER))
+    else:
+        if cursor is not None:
+            query = query.where(key > tuple_(*cursor) if direction == "next" else key >= tuple_(*cursor))
+        query = query.order_by(*PENDING_ORDER)
+    return await session.scalar(query.limit(1))
 
-        if total_count > 1:
-            keyboard.append([
-                InlineKeyboardButton(
-                    text="➡️ Следующая запись",
-                    callback_data=f"next_pending_booking_1"
-                )
-            ])
+def pending_cursor_button(text: str, direction: str, index: int, booking: Booking) -> InlineKeyboardButton:
+    return InlineKeyboardButton(
+        text=text,
+        callback_data=PENDING_BOOKING_CURSOR.pack(direction, index, booking.date, booking.start_time, booking.id)
+    )
+
+def render_pending_booking(booking: Booking, index: int, total: int):
+    if booking is None:
+        return "У вас нет записей, ожидающих подтверждения.", []
 
+    text = (
+        f"📋 Записи, ожидающие подтверждения ({index + 1}/{total})\n\n"
+        + render_card(booking, booking_cards.TUTOR_PENDING)
+    )
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text="✅ Подтвердить",
+                callback_data=APPROVE_BOOKING.pack(booking.id)
+            ),
+            InlineKeyboardButton(
+                text="❌ Отклонить",
+                callback_data=REJECT_BOOKING.pack(booking.id)
+            )
+        ]
+    ]
+    if total > 1:
         keyboard.append([
-            InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")
+            InlineKeyboardButton(text="⚡ Подтвердить все без пересечений", callback_data="tutor_bulk_approve")
         ])
+        # Переход по кругу: с последней заявки "▶️" ведет на первую
+        keyboard.append([
+            pending_cursor_button("◀️", "prev", index, booking),
+            pending_cursor_button(f"{index + 1}/{total}", "at", index, booking),
+            pending_cursor_button("▶️", "next", index, booking)
+        ])
+    return text, keyboard
 
-        await callback_query.message.edit_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-        )
-
-async def show_next_pending_booking(callback_query: types.CallbackQuery):
-    """Показывает следующую запись, ожидающую подтверждения"""
-    current_index = int(callback_query.data.split('_')[-1])
-    
+async def show_pending_queue(callback_query: types.CallbackQuery, direction: str = "at", index: int = 0, cursor: tuple = None):
+    """Показывает заявку очереди: число заявок и одна заявка по курсору"""
     async with async_session_maker() as session:
-        # Сначала получаем данные о репетиторе
-        tutor = await session.execute(
-            select(Tutor).where(Tutor.telegram_id == callback_query.from_user.id)
-        )
-        tutor = tutor.scalar_one_or_none()
-        
-        if not tutor:
-            await callback_query.message.edit_text(
-                "❌ Ошибка: не удалось найти ваши данные.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-                ])
-            )
-            return
-
-        pending_bookings = await session.execute(
-            select(Booking)
-            .where(
-                and_(
-                    Booking.tutor_id == tutor.id,  # Используем ID из базы данных
-                    Booking.status == BookingStatus.PENDING
-                )
-            )
-            .order_by(Booking.date, Booking.start_time)
-            .options(
-                joinedload(Booking.child),
-                joinedload(Booking.parent)
-            )
-        )
-        pending_bookings = pending_bookings.scalars().all()
-        total_count = len(pending_bookings)
+        total = await count_pending_bookings(session, callback_query.from_user.id)
+        booking = None
+        if total:
+            booking = await fetch_pending_booking(session, callback_query.from_user.id, direction, cursor)
+            if booking is None:
+                # Конец очереди: переходим на другой край
+                booking = await fetch_pending_booking(session, callback_query.from_user.id, direction)
+                index = total - 1 if direction == "prev" else 0
+        # Номер заявки приблизителен, если очередь изменилась с момента нажатия
+        index = min(max(index, 0), max(total - 1, 0))
 
-        if current_index >= total_count:
-            # Если достигли конца списка, начинаем сначала
-            current_index = 0
+    text, keyboard = render_pending_booking(booking, index, total)
+    keyboard.append([InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")])
+    try:
+        await callback_query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
+    except TelegramBadRequest as e:
+        # Нажатие на номер текущей заявки: сообщение не изменилось
+        if "message is not modified" not in str(e):
+            raise
+        await callback_query.answer()
 
-        booking = pending_bookings[current_index]
-        
-        text = (
-            f"📋 Записи, ожидающие подтверждения ({current_index + 1}/{total_count})\n\n"
-            f"📚 {booking.subject_name} ({'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'})\n"
-            f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-            f"👨‍👩‍👧‍👦 Родитель: {booking.parent.name} {booking.parent.surname}\n"
-            f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-            f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-            f"💰 Стоимость: {booking.price} ₽"
-        )
+@query_budget(statements=2)
+async def show_pending_bookings(callback_query: types.CallbackQuery):
+    """Показывает записи, ожидающие подтверждения"""
+    await show_pending_queue(callback_query)
 
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    text="✅ Подтвердить",
-                    callback_data=f"approve_booking_{booking.id}"
-                ),
-                InlineKeyboardButton(
-                    text="❌ Отклонить",
-                    callback_data=f"reject_booking_{booking.id}"
-                )
-            ]
-        ]
+# В конце очереди - еще один запрос заявки с другого края
+@query_budget(statements=3)
+async def show_next_pending_booking(callback_query: types.CallbackQuery, callback_data):
+    """Показывает следующую (предыдущую) запись, ожидающую подтверждения"""
+    step = {"next": 1, "prev": -1}.get(callback_data.direction, 0)
+    await show_pending_queue(
+        callback_query,
+        callback_data.direction,
+        callback_data.index + step,
+        (callback_data.date, callback_data.start, callback_data.booking_id)
+    )
 
-        if total_count > 1:
-            keyboard.append([
-                InlineKeyboardButton(
-                    text="⬅️ Предыдущая",
-                    callback_data=f"next_pending_booking_{(current_index - 1) % total_count}"
-                ),
-                InlineKeyboardButton(
-                    text="➡️ Следующая",
-                    callback_data=f"next_pending_booking_{(current_index + 1) % total_count}"
-                )
-            ])
+@query_budget(statements=2)
+async def show_pending_booking_page(callback_query: types.CallbackQuery, callback_data):
+    """Кнопки страниц из сообщений до перехода на курсоры: очередь открывается с начала"""
+    await show_pending_queue(callback_query)
 
-        keyboard.append([
-            InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")
-        ])
+def approval_notification_text(booking: Booking) -> str:
+    """Уведомление родителя о подтверждении записи"""
+    return (
+        "✅ Запись подтверждена!\n\n"
+        f"📚 Предмет: {booking.subject_name}\n"
+        f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
+        f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
+        f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
+        f"💰 Стоимость: {booking.price} ₽"
+    )
 
-        await callback_query.message.edit_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-        )
+def rejection_notification_text(booking: Booking) -> str:
+    """Уведомление родителя об отклонении записи"""
+    return (
+        "❌ Репетитор отклонил запись\n\n"
+        f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
+        f"👨‍🏫 Репетитор: {booking.tutor.name} {booking.tutor.surname}\n"
+        f"📚 Предмет: {booking.subject_name}\n"
+        f"📝 Тип занятия: {'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'}\n"
+        f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
+        f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
+        f"❗️ Причина: {booking.rejection_reason}"
+    )
 
-async def approve_booking(callback_query: types.CallbackQuery):
+async def approve_booking(callback_query: types.CallbackQuery, callback_data):
     """Подтверждает запись"""
-    booking_id = int(callback_query.data.split('_')[-1])
+    booking_id = callback_data.booking_id
     
     async with async_session_maker() as session:
         try:
@@ -220,38 +197,8 @@ async def approve_booking(callback_query: types.CallbackQuery):
                 return
 
             # Проверяем, не занят ли этот слот другой подтвержденной записью
-            conflicting_booking = await session.execute(
-                select(Booking)
-                .where(
-                    and_(
-                        Booking.tutor_id == booking.tutor_id,
-                        Booking.date == booking.date,
-                        Booking.status == BookingStatus.APPROVED,
-                        or_(
-                            # Начало нового занятия попадает в интервал существующего
-                            and_(
-                                Booking.start_time <= booking.start_time,
-                                Booking.end_time > booking.start_time
-                            ),
-                            # Конец нового занятия попадает в интервал существующего
-                            and_(
-                                Booking.start_time < booking.end_time,
-                                Booking.end_time >= booking.end_time
-                            ),
-                            # Новое занятие полностью включает существующее
-                            and_(
-                                Booking.start_time >= booking.start_time,
-                                Booking.end_time <= booking.end_time
-                            )
-                        ),
-                        Booking.id != booking_id  # Исключаем текущую запись
-                    )
-                )
-                .options(
-                    joinedload(Booking.child)
-                )
-            )
-            conflicting_booking = conflicting_booking.scalar_one_or_none()
+            busy = await load_day_intervals(session, booking.tutor_id, booking.date)
+            conflicting_booking = busy.first_conflict(booking.start_time, booking.end_time, exclude_id=booking_id)
 
             if conflicting_booking:
                 # Если найдена конфликтующая запись, отправляем сообщение об ошибке
@@ -280,20 +227,9 @@ async def approve_booking(callback_query: types.CallbackQuery):
             await session.commit()
             
             # Уведомляем родителя о подтверждении записи
-            from parent_bot.main import bot as parent_bot
-            
-            success_text = (
-                "✅ Запись подтверждена!\n\n"
-                f"📚 Предмет: {booking.subject_name}\n"
-                f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-                f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-                f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-                f"💰 Стоимость: {booking.price} ₽"
-            )
-            
-            await parent_bot.send_message(
+            await get_parent_bot().send_message(
                 chat_id=booking.parent.telegram_id,
-                text=success_text
+                text=approval_notification_text(booking)
             )
             
             # Отправляем подтверждение репетитору
@@ -317,9 +253,139 @@ async def approve_booking(callback_query: types.CallbackQuery):
                 ])
             )
 
-async def reject_booking(callback_query: types.CallbackQuery, state: FSMContext):
+def batch_candidates_query(telegram_id: int):
+    """Заявки репетитора начиная с сегодняшнего дня и подтвержденные занятия в дни этих заявок"""
+    today = date.today()
+    requested = aliased(Booking)
+    requested_dates = select(requested.date).where(
+        requested.tutor_id == Booking.tutor_id,
+        requested.status == BookingStatus.PENDING,
+        requested.date >= today
+    )
+    return (
+        select(Booking)
+        .join(Booking.tutor)
+        .where(
+            Tutor.telegram_id == telegram_id,
+            Booking.date >= today,
+            or_(
+                Booking.status == BookingStatus.PENDING,
+                and_(Booking.status == BookingStatus.APPROVED, Booking.date.in_(requested_dates))
+            )
+        )
+        .options(
+            contains_eager(Booking.tutor),
+            joinedload(Booking.child),
+            joinedload(Booking.parent)
+        )
+    )
+
+async def load_batch_plan(session, telegram_id: int):
+    """Загружает заявки репетитора одним запросом и разбирает пересечения"""
+    result = await session.execute(batch_candidates_query(telegram_id))
+    bookings = result.unique().scalars().all()
+    return plan_batch_approval(
+        [b for b in bookings if b.status == BookingStatus.PENDING],
+        [b for b in bookings if b.status == BookingStatus.APPROVED]
+    )
+
+def format_bulk_line(booking: Booking) -> str:
+    return (
+        f"{booking.date.strftime('%d.%m')} {booking.start_time.strftime('%H:%M')}-{booking.end_time.strftime('%H:%M')} "
+        f"{booking.child.name} {booking.child.surname}"
+    )
+
+@query_budget(statements=1)
+async def show_bulk_approval(callback_query: types.CallbackQuery):
+    """Показывает, какие заявки будут подтверждены и отклонены при массовом подтверждении"""
+    async with async_session_maker() as session:
+        plan = await load_batch_plan(session, callback_query.from_user.id)
+
+    if not plan.approve and not plan.reject:
+        await callback_query.message.edit_text(
+            "У вас нет записей, ожидающих подтверждения.",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
+            ])
+        )
+        return
+
+    text = (
+        "⚡ Подтверждение всех заявок без пересечений\n\n"
+        f"✅ Будет подтверждено: {len(plan.approve)}\n"
+        f"❌ Будет отклонено из-за пересечений: {len(plan.reject)}\n"
+    )
+    if plan.reject:
+        text += "\nОтклоняемые заявки:\n" + "\n".join(
+            f"• {format_bulk_line(booking)} (пересекается с {conflict.start_time.strftime('%H:%M')}-{conflict.end_time.strftime('%H:%M')})"
+            for booking, conflict in plan.reject[:BULK_PREVIEW_LINES]
+        )
+        if len(plan.reject) > BULK_PREVIEW_LINES:
+            text += f"\n…и еще {len(plan.reject) - BULK_PREVIEW_LINES}"
+
+    await callback_query.message.edit_text(
+        text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="✅ Подтвердить", callback_data="tutor_bulk_approve_confirm")],
+            [InlineKeyboardButton(text="◀️ Назад", callback_data="tutor_pending_bookings")]
+        ])
+    )
+
+# Выборка заявок, подтверждение, отклонение (по UPDATE записей и версии расписания)
+@query_budget(statements=5)
+async def confirm_bulk_approval(callback_query: types.CallbackQuery):
+    """Подтверждает все заявки без пересечений и отклоняет пересекающиеся в одной транзакции"""
+    async with async_session_maker() as session:
+        try:
+            # Заявки разбираются заново: с момента показа могли появиться новые
+            plan = await load_batch_plan(session, callback_query.from_user.id)
+            applied, stale = BatchPlan(), []
+            decided = plan.approve + [b for b, _ in plan.reject]
+            if decided:
+                # Заявки, обработанные или отмененные после разбора, не меняются и не уведомляются
+                applied, stale = await apply_batch_plan(session, decided[0].tutor_id, plan)
+                await session.commit()
+        except Exception as e:
+            print(f"Error approving bookings: {str(e)}")
+            await callback_query.message.edit_text(
+                "❌ Произошла ошибка при подтверждении записей. Пожалуйста, попробуйте снова.",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
+                ])
+            )
+            return
+
+    # Уведомления родителям отправляются параллельно после фиксации транзакции
+    parent_bot = get_parent_bot()
+    outgoing = [
+        (parent_bot, b.parent.telegram_id, b.id, approval_notification_text(b), None) for b in applied.approve
+    ] + [
+        (parent_bot, b.parent.telegram_id, b.id, rejection_notification_text(b), None) for b, _ in applied.reject
+    ]
+    _, failures = await deliver_messages(outgoing)
+    for booking_id, errors in failures.items():
+        print(f"Error notifying parent about booking {booking_id}: {'; '.join(errors)}")
+
+    text = (
+        f"✅ Подтверждено заявок: {len(applied.approve)}\n"
+        f"❌ Отклонено из-за пересечений: {len(applied.reject)}"
+    )
+    if stale:
+        text += f"\n⚠️ Уже обработаны или отменены: {len(stale)}"
+    kept = len(plan.approve) + len(plan.reject) - len(applied.approve) - len(applied.reject) - len(stale)
+    if kept:
+        text += f"\n⏳ Остались в ожидании: {kept}"
+    await callback_query.message.edit_text(
+        text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="📋 Ожидающие записи", callback_data="tutor_pending_bookings")],
+            [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
+        ])
+    )
+
+async def reject_booking(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     """Начинает процесс отклонения записи"""
-    booking_id = int(callback_query.data.split('_')[-1])
+    booking_id = callback_data.booking_id
     
     async with async_session_maker() as session:
         # Получаем данные о репетиторе
@@ -438,20 +504,9 @@ async def process_rejection_reason(message: types.Message, state: FSMContext):
             await session.commit()
             
             # Уведомляем родителя об отклонении
-            notification_text = (
-                "❌ Репетитор отклонил запись\n\n"
-                f"👤 Ученик: {booking.child.name} {booking.child.surname}\n"
-                f"👨‍🏫 Репетитор: {booking.tutor.name} {booking.tutor.surname}\n"
-                f"📚 Предмет: {booking.subject_name}\n"
-                f"📝 Тип занятия: {'Подготовка к экзамену' if booking.lesson_type == 'exam' else 'Стандартное занятие'}\n"
-                f"📅 Дата: {booking.date.strftime('%d.%m.%Y')}\n"
-                f"🕒 Время: {booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}\n"
-                f"❗️ Причина: {booking.rejection_reason}"
-            )
-            
-            await parent_bot.send_message(
+            await get_parent_bot().send_message(
                 chat_id=booking.parent.telegram_id,
-                text=notification_text
+                text=rejection_notification_text(booking)
             )
             
             # Отправляем сообщение об успешном отклонении
@@ -488,9 +543,13 @@ async def cancel_rejection(callback_query: types.CallbackQuery, state: FSMContex
 
 def register_booking_handlers(dp):
     """Регистрирует обработчики для работы с записями"""
-    dp.callback_query.register(show_pending_bookings, lambda c: c.data == "tutor_pending_bookings")
-    dp.callback_query.register(show_next_pending_booking, lambda c: c.data.startswith("next_pending_booking_"))
-    dp.callback_query.register(approve_booking, lambda c: c.data.startswith("approve_booking_"))
-    dp.callback_query.register(reject_booking, lambda c: c.data.startswith("reject_booking_"))
-    dp.callback_query.register(cancel_rejection, lambda c: c.data == "cancel_rejection", BookingStates.waiting_for_rejection_reason)
+    router = get_callback_router(dp)
+    router.exact("tutor_pending_bookings", show_pending_bookings)
+    router.action(PENDING_BOOKING_CURSOR, show_next_pending_booking)
+    router.action(PENDING_BOOKING_PAGE, show_pending_booking_page)
+    router.action(APPROVE_BOOKING, approve_booking)
+    router.action(REJECT_BOOKING, reject_booking)
+    router.exact("tutor_bulk_approve", show_bulk_approval)
+    router.exact("tutor_bulk_approve_confirm", confirm_bulk_approval)
+    router.exact("cancel_rejection", cancel_rejection, BookingStates.waiting_for_rejection_reason)
     dp.message.register(process_rejection_reason, BookingStates.waiting_for_rejection_reason) 
\ No newline at end of file
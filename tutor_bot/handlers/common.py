@@ -4,8 +4,11 @@ from aiogram.fsm.context import FSMContext
 from sqlalchemy import select
 
 from common.database import Tutor, get_session
+from common.callback_router import get_callback_router
+from common.query_budget import query_budget
 from tutor_bot.keyboards import get_start_keyboard, get_main_menu_keyboard, DAY_NAMES
 
+@query_budget(statements=1, rows=1)
 async def cmd_start(message: types.Message):
     async for session in get_session():
         # Ищем репетитора по telegram_id
@@ -32,5 +35,29 @@ async def cmd_start(message: types.Message):
     )
     await message.answer(welcome_text, reply_markup=get_start_keyboard())
 
+@query_budget(statements=1, rows=1)
+async def show_stale_button_menu(callback_query: types.CallbackQuery):
+    """Нажатие кнопки без обработчика (например, из сообщения до обновления бота): показываем меню"""
+    await callback_query.answer("⌛ Кнопка устарела", show_alert=True)
+    async for session in get_session():
+        tutor = await session.scalar(
+            select(Tutor).where(Tutor.telegram_id == callback_query.from_user.id)
+        )
+
+    if tutor:
+        text, keyboard = "🎯 Используйте меню для управления профилем:", get_main_menu_keyboard()
+    else:
+        text, keyboard = "📝 Нажмите кнопку ниже, чтобы начать регистрацию.", get_start_keyboard()
+    try:
+        await callback_query.message.edit_text(text, reply_markup=keyboard)
+    except Exception as e:
+        # Сообщение могло стать недоступным для редактирования - отправляем меню заново
+        print(f"Error showing menu for stale button: {str(e)}")
+        await callback_query.message.answer(text, reply_markup=keyboard)
+
 def register_common_handlers(dp):
-    dp.message.register(cmd_start, Command("start")) 
\ No newline at end of file
+    dp.message.register(cmd_start, Command("start"))
+    router = get_callback_router(dp)
+    # Подписи в клавиатурах (заголовки, пустые клетки) - только снимаем индикатор загрузки
+    router.inert("price_header", "subject_name")
+    router.fallback(show_stale_button_menu) 
\ No newline at end of file
@@ -5,6 +5,10 @@ from sqlalchemy import select
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from common.database import Tutor, get_session
+from common.query_budget import query_budget
+from common.callback_router import get_callback_router
+from common.callback_data import PROFILE_TOGGLE_SUBJECT, PROFILE_EDIT_PRICE
+from common.notifications import get_reminder_settings_text, get_reminder_settings_keyboard, parse_reminder_toggle
 from tutor_bot.keyboards import (
     get_main_menu_keyboard,
     get_profile_menu_keyboard,
@@ -28,6 +32,7 @@ class ProfileEditing(StatesGroup):
     editing_description = State()
     editing_schedule = State()
 
+@query_budget(statements=1, rows=1)
 async def show_profile(callback_query: types.CallbackQuery):
     async for session in get_session():
         tutor = await session.execute(
@@ -241,24 +246,13 @@ async def edit_profile_subjects(callback_query: types.CallbackQuery, state: FSMC
             )
             await state.set_state(ProfileEditing.editing_subjects)
 
-async def process_subject_selection(callback_query: types.CallbackQuery, state: FSMContext):
+async def process_subject_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     current_state = await state.get_state()
     if current_state != ProfileEditing.editing_subjects.state:
         return
     
-    callback_data = callback_query.data
-    
-    # Игнорируем нажатие на название предмета
-    if callback_data.startswith("subject_name_"):
-        return
-        
-    # Обрабатываем выбор типа занятия
-    if not callback_data.startswith("profile_subject_"):
-        return
-        
-    # profile_subject_Математика_exam или profile_subject_Математика_standard
-    _, _, subject, type_str = callback_data.split("_", 3)
-    is_exam = type_str == "exam"
+    subject = callback_data.subject
+    is_exam = callback_data.lesson_type == "exam"
     
     data = await state.get_data()
     subjects = data.get("subjects", [])
@@ -566,13 +560,13 @@ async def edit_profile_prices(callback_query: types.CallbackQuery, state: FSMCon
             )
             await state.set_state(ProfileEditing.editing_prices)
 
-async def process_price_edit(callback_query: types.CallbackQuery, state: FSMContext):
+async def process_price_edit(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     current_state = await state.get_state()
     if current_state != ProfileEditing.editing_prices.state:
         return
         
-    # price_edit_Математика_exam или price_edit_Математика_standard
-    _, _, subject, price_type = callback_query.data.split("_", 3)
+    subject = callback_data.subject
+    price_type = callback_data.lesson_type
     
     await state.update_data(
         current_subject=subject,
@@ -687,48 +681,93 @@ async def save_profile_prices(callback_query: types.CallbackQuery, state: FSMCon
     )
     await state.clear()
 
+async def show_reminder_settings(callback_query: types.CallbackQuery):
+    async for session in get_session():
+        tutor = await session.execute(
+            select(Tutor).where(Tutor.telegram_id == callback_query.from_user.id)
+        )
+        tutor = tutor.scalar_one_or_none()
+
+        if not tutor:
+            await callback_query.answer("❌ Профиль не найден!")
+            return
+
+        await callback_query.message.edit_text(
+            get_reminder_settings_text(tutor.reminders_muted),
+            reply_markup=get_reminder_settings_keyboard(tutor.reminders_muted, "edit_profile")
+        )
+
+async def toggle_reminder_stage(callback_query: types.CallbackQuery):
+    bit = parse_reminder_toggle(callback_query.data)
+    if bit is None:
+        await callback_query.answer("Кнопка устарела, откройте настройки заново", show_alert=True)
+        return
+
+    async for session in get_session():
+        tutor = await session.execute(
+            select(Tutor).where(Tutor.telegram_id == callback_query.from_user.id)
+        )
+        tutor = tutor.scalar_one_or_none()
+
+        if not tutor:
+            await callback_query.answer("❌ Профиль не найден!")
+            return
+
+        tutor.reminders_muted = (tutor.reminders_muted or 0) ^ (1 << bit)
+        await session.commit()
+
+        await callback_query.message.edit_text(
+            get_reminder_settings_text(tutor.reminders_muted),
+            reply_markup=get_reminder_settings_keyboard(tutor.reminders_muted, "edit_profile")
+        )
+
 def register_profile_handlers(dp):
-    dp.callback_query.register(show_profile, lambda c: c.data == "my_profile")
-    dp.callback_query.register(show_edit_menu, lambda c: c.data == "edit_profile")
-    dp.callback_query.register(back_to_main_menu, lambda c: c.data == "back_to_main")
+    router = get_callback_router(dp)
+    router.exact("my_profile", show_profile)
+    router.exact("edit_profile", show_edit_menu)
+    router.exact("back_to_main", back_to_main_menu)
     
     # Обработчики для редактирования имени, фамилии и отчества
-    dp.callback_query.register(edit_profile_name, lambda c: c.data == "edit_profile_name")
-    dp.callback_query.register(process_edit_name, lambda c: c.data == "profile_edit_name")
-    dp.callback_query.register(process_edit_surname, lambda c: c.data == "profile_edit_surname")
-    dp.callback_query.register(process_edit_patronymic, lambda c: c.data == "profile_edit_patronymic")
-    dp.callback_query.register(cancel_patronymic_edit, lambda c: c.data == "profile_cancel_patronymic")
+    router.exact("edit_profile_name", edit_profile_name)
+    router.exact("profile_edit_name", process_edit_name)
+    router.exact("profile_edit_surname", process_edit_surname)
+    router.exact("profile_edit_patronymic", process_edit_patronymic)
+    router.exact("profile_cancel_patronymic", cancel_patronymic_edit)
     dp.message.register(process_name_input, ProfileEditing.editing_name)
     dp.message.register(process_surname_input, ProfileEditing.editing_surname)
     dp.message.register(process_patronymic_input, ProfileEditing.editing_patronymic)
-    dp.callback_query.register(save_profile_name_surname, lambda c: c.data == "profile_save_name_surname")
+    router.exact("profile_save_name_surname", save_profile_name_surname)
     
     # Обработчики для редактирования предметов
-    dp.callback_query.register(edit_profile_subjects, lambda c: c.data == "edit_profile_subjects")
-    dp.callback_query.register(process_subject_selection, lambda c: c.data.startswith("profile_subject_"))
-    dp.callback_query.register(save_profile_subjects, lambda c: c.data == "profile_save_subjects")
+    router.exact("edit_profile_subjects", edit_profile_subjects)
+    router.action(PROFILE_TOGGLE_SUBJECT, process_subject_selection)
+    router.exact("profile_save_subjects", save_profile_subjects)
     
     # Обработчики для редактирования описания
-    dp.callback_query.register(edit_profile_description, lambda c: c.data == "edit_profile_description")
-    dp.callback_query.register(cancel_description_edit, lambda c: c.data == "profile_cancel_description")
-    dp.callback_query.register(save_profile_description, lambda c: c.data == "profile_save_description")
+    router.exact("edit_profile_description", edit_profile_description)
+    router.exact("profile_cancel_description", cancel_description_edit)
+    router.exact("profile_save_description", save_profile_description)
     dp.message.register(process_description_input, ProfileEditing.editing_description)
     
     # Обработчики для редактирования расписания
-    dp.callback_query.register(edit_profile_schedule, lambda c: c.data == "edit_profile_schedule")
-    dp.callback_query.register(toggle_profile_day_status, lambda c: c.data.startswith("profile_toggle_"))
-    dp.callback_query.register(set_profile_start_time, lambda c: c.data.startswith("profile_set_start_"))
-    dp.callback_query.register(set_profile_end_time, lambda c: c.data.startswith("profile_set_end_"))
-    dp.callback_query.register(process_profile_hour, lambda c: c.data.startswith("profile_hour_"))
-    dp.callback_query.register(process_profile_minute, lambda c: c.data.startswith("profile_minute_"))
-    dp.callback_query.register(cancel_schedule_edit, lambda c: c.data == "profile_cancel_schedule")
-    dp.callback_query.register(cancel_time_edit, lambda c: c.data == "profile_cancel_time")
-    dp.callback_query.register(save_profile_schedule, lambda c: c.data == "profile_save_schedule")
+    router.exact("edit_profile_schedule", edit_profile_schedule)
+    router.prefix("profile_toggle_", toggle_profile_day_status)
+    router.prefix("profile_set_start_", set_profile_start_time)
+    router.prefix("profile_set_end_", set_profile_end_time)
+    router.prefix("profile_hour_", process_profile_hour)
+    router.prefix("profile_minute_", process_profile_minute)
+    router.exact("profile_cancel_schedule", cancel_schedule_edit)
+    router.exact("profile_cancel_time", cancel_time_edit)
+    router.exact("profile_save_schedule", save_profile_schedule)
     
     # Обработчики для редактирования цен
-    dp.callback_query.register(edit_profile_prices, lambda c: c.data == "edit_profile_prices")
-    dp.callback_query.register(process_price_edit, lambda c: c.data.startswith("price_edit_"))
-    dp.callback_query.register(cancel_price_input, lambda c: c.data == "price_cancel_edit")
-    dp.callback_query.register(cancel_prices_edit, lambda c: c.data == "price_cancel")
-    dp.callback_query.register(save_profile_prices, lambda c: c.data == "price_save")
-    dp.message.register(process_price_input, ProfileEditing.waiting_for_price_input) 
\ No newline at end of file
+    router.exact("edit_profile_prices", edit_profile_prices)
+    router.action(PROFILE_EDIT_PRICE, process_price_edit)
+    router.exact("price_cancel_edit", cancel_price_input)
+    router.exact("price_cancel", cancel_prices_edit)
+    router.exact("price_save", save_profile_prices)
+    dp.message.register(process_price_input, ProfileEditing.waiting_for_price_input)
+
+    # Настройки напоминаний
+    router.exact("reminders_settings", show_reminder_settings)
+    router.prefix("reminders_toggle_", toggle_reminder_stage) 
\ No newline at end of file
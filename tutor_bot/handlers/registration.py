@@ -5,6 +5,8 @@ from sqlalchemy import select
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from common.database import Tutor, get_session
+from common.callback_router import get_callback_router
+from common.callback_data import REGISTRATION_TOGGLE_SUBJECT, REGISTRATION_EDIT_PRICE
 from tutor_bot.keyboards import (
     get_registration_form_keyboard,
     get_subjects_keyboard,
@@ -104,24 +106,13 @@ async def process_finish_name_surname(callback_query: types.CallbackQuery, state
     )
     await state.set_state(TutorRegistration.waiting_for_subjects)
 
-async def process_subject_selection(callback_query: types.CallbackQuery, state: FSMContext):
+async def process_subject_selection(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     current_state = await state.get_state()
     if current_state != TutorRegistration.waiting_for_subjects.state:
         return
     
-    callback_data = callback_query.data
-    
-    # Игнорируем нажатие на название предмета
-    if callback_data.startswith("subject_name_"):
-        return
-        
-    # Обрабатываем выбор типа занятия
-    if not callback_data.startswith("subject_"):
-        return
-        
-    # subject_Математика_exam или subject_Математика_standard
-    _, subject, type_str = callback_data.split("_", 2)
-    is_exam = type_str == "exam"
+    subject = callback_data.subject
+    is_exam = callback_data.lesson_type == "exam"
     
     data = await state.get_data()
     subjects = data.get("subjects", [])
@@ -295,13 +286,13 @@ async def save_schedule(callback_query: types.CallbackQuery, state: FSMContext):
     await state.clear()
     await show_profile(callback_query)
 
-async def process_registration_price_edit(callback_query: types.CallbackQuery, state: FSMContext):
+async def process_registration_price_edit(callback_query: types.CallbackQuery, state: FSMContext, callback_data):
     current_state = await state.get_state()
     if current_state != TutorRegistration.setting_prices.state:
         return
         
-    # registration_price_edit_Математика_exam или registration_price_edit_Математика_standard
-    _, _, _, subject, price_type = callback_query.data.split("_", 4)
+    subject = callback_data.subject
+    price_type = callback_data.lesson_type
     
     await state.update_data(
         current_subject=subject,
@@ -427,28 +418,31 @@ async def skip_patronymic(callback_query: types.CallbackQuery, state: FSMContext
     await state.set_state(TutorRegistration.waiting_for_name_surname)
 
 def register_registration_handlers(dp):
-    dp.callback_query.register(process_start_registration, lambda c: c.data == "start_registration")
-    dp.callback_query.register(process_edit_name, lambda c: c.data == "edit_name")
-    dp.callback_query.register(process_edit_surname, lambda c: c.data == "edit_surname")
-    dp.callback_query.register(process_edit_patronymic, lambda c: c.data == "edit_patronymic")
+    router = get_callback_router(dp)
+    router.exact("start_registration", process_start_registration)
+    router.exact("edit_name", process_edit_name)
+    router.exact("edit_surname", process_edit_surname)
+    router.exact("edit_patronymic", process_edit_patronymic)
     dp.message.register(process_name_input, TutorRegistration.waiting_for_name_input)
     dp.message.register(process_surname_input, TutorRegistration.waiting_for_surname_input)
-    dp.callback_query.register(process_finish_name_surname, lambda c: c.data == "finish_name_surname")
-    dp.callback_query.register(process_subject_selection, lambda c: c.data.startswith("subject_"))
-    dp.callback_query.register(process_finish_subjects, lambda c: c.data == "registration_finish_subjects")
+    router.exact("finish_name_surname", process_finish_name_surname)
+    router.action(REGISTRATION_TOGGLE_SUBJECT, process_subject_selection)
+    router.exact("registration_finish_subjects", process_finish_subjects)
     dp.message.register(process_description, TutorRegistration.waiting_for_description)
-    dp.callback_query.register(toggle_day_status, lambda c: c.data.startswith("toggle_"))
-    dp.callback_query.register(process_hour, lambda c: c.data.startswith("set_start_hour_") or c.data.startswith("set_end_hour_"))
-    dp.callback_query.register(process_minute, lambda c: c.data.startswith("set_start_minute_") or c.data.startswith("set_end_minute_"))
-    dp.callback_query.register(set_start_time, lambda c: c.data.startswith("set_start_"))
-    dp.callback_query.register(set_end_time, lambda c: c.data.startswith("set_end_"))
-    dp.callback_query.register(back_to_schedule, lambda c: c.data == "back_to_schedule")
-    dp.callback_query.register(save_schedule, lambda c: c.data == "save_schedule")
-    dp.callback_query.register(process_registration_price_edit, lambda c: c.data.startswith("registration_price_edit_"))
-    dp.callback_query.register(cancel_registration_price_edit, lambda c: c.data == "registration_price_cancel_edit")
+    router.prefix("toggle_", toggle_day_status)
+    router.prefix("set_start_hour_", process_hour)
+    router.prefix("set_end_hour_", process_hour)
+    router.prefix("set_start_minute_", process_minute)
+    router.prefix("set_end_minute_", process_minute)
+    router.prefix("set_start_", set_start_time)
+    router.prefix("set_end_", set_end_time)
+    router.exact("back_to_schedule", back_to_schedule)
+    router.exact("save_schedule", save_schedule)
+    router.action(REGISTRATION_EDIT_PRICE, process_registration_price_edit)
+    router.exact("registration_price_cancel_edit", cancel_registration_price_edit)
     dp.message.register(process_registration_price_input, TutorRegistration.waiting_for_price_input)
-    dp.callback_query.register(save_registration_prices, lambda c: c.data == "registration_price_save")
-    dp.callback_query.register(back_to_subjects, lambda c: c.data == "registration_price_back")
-    dp.callback_query.register(back_to_prices, lambda c: c.data == "registration_description_back")
+    router.exact("registration_price_save", save_registration_prices)
+    router.exact("registration_price_back", back_to_subjects)
+    router.exact("registration_description_back", back_to_prices)
     dp.message.register(process_patronymic_input, TutorRegistration.waiting_for_patronymic_input)
-    dp.callback_query.register(skip_patronymic, lambda c: c.data == "skip_patronymic") 
\ No newline at end of file
+    router.exact("skip_patronymic", skip_patronymic) 
\ No newline at end of file
@@ -5,22 +5,32 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from tutor_bot.handlers.profile import back_to_main_menu
 
 from common.database import Booking, BookingStatus, async_session_maker, Tutor, Parent
+from common.query_budget import query_budget
+from common.intervals import load_day_intervals
+from common.pagination import Page, PagedView
+from common import booking_cards
+from common.booking_cards import render_card
+from common.callback_router import get_callback_router
+from common.callback_data import CANCEL_LESSON, CONFIRM_CANCEL_LESSON, CANCEL_LESSONS_PAGE, SCHEDULE_PERIODS
 from tutor_bot.schedule_kb import (
     get_schedule_filters_kb,
-    get_schedule_with_cancel_kb,
+    get_cancel_lesson_button,
     get_cancel_confirmation_kb
 )
 from tutor_bot.utils.schedule_utils import (
-    get_bookings_for_period,
+    get_tutor_bookings_for_period,
+    cancellable_lessons_query,
+    ScheduleStats,
     format_daily_schedule,
     format_weekly_schedule,
     format_monthly_schedule,
     format_date_with_month,
     format_month_title
 )
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from parent_bot.main import bot as parent_bot
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload, joinedload
+from common.bots import get_parent_bot
+from tutor_bot.utils.schedule_cache import schedule_cache
 
 def get_period_title(period: str, date: datetime = None) -> str:
     """Возвращает заголовок для периода"""
@@ -38,130 +48,130 @@ def get_period_title(period: str, date: datetime = None) -> str:
     else:  # month
         return f"месяц ({format_month_title(date.date())})"
 
+def format_schedule(bookings: list, period: str) -> tuple[str, ScheduleStats]:
+    """Форматирует расписание за период; статистика считается один раз для текста и клавиатуры"""
+    now = datetime.now()
+    stats = ScheduleStats(bookings, now)
+    if period == "today":
+        date_str = format_date_with_month(now.date())
+        text = format_daily_schedule(bookings, date_str, stats)
+    elif period == "tomorrow":
+        tomorrow = (now + timedelta(days=1)).date()
+        date_str = format_date_with_month(tomorrow)
+        text = format_daily_schedule(bookings, date_str, stats)
+    elif period == "week":
+        start_date = (now - timedelta(days=now.weekday())).date()
+        end_date = (start_date + timedelta(days=6))
+        week_range = f"{format_date_with_month(start_date)}-{format_date_with_month(end_date)}"
+        text = format_weekly_schedule(bookings, week_range, stats)
+    else:  # month
+        month_str = format_month_title(now.date())
+        text = format_monthly_schedule(bookings, month_str, stats)
+    return text, stats
+
+async def get_schedule_view(session, telegram_id: int, period: str) -> tuple[str, InlineKeyboardMarkup]:
+    """Возвращает текст и клавиатуру расписания за период, по возможности из кэша"""
+    # Версию читаем до записей: если расписание изменится между запросами,
+    # следующая проверка увидит новую версию и отрисует его заново
+    tutor = (await session.execute(
+        select(Tutor.id, Tutor.schedule_version).where(Tutor.telegram_id == telegram_id)
+    )).one_or_none()
+    if tutor is None:
+        print(f"Tutor not found for telegram_id: {telegram_id}")
+        text, stats = format_schedule([], period)
+        return text, get_schedule_filters_kb(stats, period)
+
+    tutor_id, version = tutor
+    view = schedule_cache.get(tutor_id, period, version)
+    if view is None:
+        bookings = await get_tutor_bookings_for_period(session, tutor_id, period)
+        text, stats = format_schedule(bookings, period)
+        view = (text, get_schedule_filters_kb(stats, period))
+        schedule_cache.put(tutor_id, period, version, view)
+    return view
+
+@query_budget(statements=2)
 async def show_schedule(callback_query: types.CallbackQuery):
     """Показывает расписание репетитора"""
+    # "show_schedule" и "schedule:back" показывают расписание на сегодня
     period = callback_query.data.split(':')[1] if ':' in callback_query.data else 'today'
+    if period not in SCHEDULE_PERIODS:
+        period = 'today'
     
     async with async_session_maker() as session:
-        # Получаем записи для выбранного периода
-        bookings = await get_bookings_for_period(
-            session,
-            callback_query.from_user.id,
-            period
-        )
-        
-        now = datetime.now()
-        if period == "today":
-            date_str = format_date_with_month(now.date())
-            text = format_daily_schedule(bookings, date_str)
-        elif period == "tomorrow":
-            tomorrow = (now + timedelta(days=1)).date()
-            date_str = format_date_with_month(tomorrow)
-            text = format_daily_schedule(bookings, date_str)
-        elif period == "week":
-            start_date = (now - timedelta(days=now.weekday())).date()
-            end_date = (start_date + timedelta(days=6))
-            week_range = f"{format_date_with_month(start_date)}-{format_date_with_month(end_date)}"
-            text = format_weekly_schedule(bookings, week_range)
-        else:  # month
-            month_str = format_month_title(now.date())
-            text = format_monthly_schedule(bookings, month_str)
-        
-        # Отправляем сообщение с основной клавиатурой
-        await callback_query.message.edit_text(
-            text,
-            reply_markup=get_schedule_filters_kb(bookings, period)
-        )
+        text, reply_markup = await get_schedule_view(session, callback_query.from_user.id, period)
+    
+    # Отправляем сообщение с основной клавиатурой
+    await callback_query.message.edit_text(text, reply_markup=reply_markup)
 
+@query_budget(statements=2)
 async def handle_schedule_filter(callback: types.CallbackQuery):
     """Обработчик фильтров расписания"""
     period = callback.data.split(":")[1]
     
     async with async_session_maker() as session:
-        bookings = await get_bookings_for_period(session, callback.from_user.id, period)
-        
-        now = datetime.now()
-        if period == "today":
-            date_str = format_date_with_month(now.date())
-            text = format_daily_schedule(bookings, date_str)
-        elif period == "tomorrow":
-            tomorrow = (now + timedelta(days=1)).date()
-            date_str = format_date_with_month(tomorrow)
-            text = format_daily_schedule(bookings, date_str)
-        elif period == "week":
-            start_date = (now - timedelta(days=now.weekday())).date()
-            end_date = (start_date + timedelta(days=6))
-            week_range = f"{format_date_with_month(start_date)}-{format_date_with_month(end_date)}"
-            text = format_weekly_schedule(bookings, week_range)
-        else:  # month
-            month_str = format_month_title(now.date())
-            text = format_monthly_schedule(bookings, month_str)
-        
-        await callback.message.edit_text(
-            text,
-            reply_markup=get_schedule_filters_kb(bookings, period)
-        )
+        text, reply_markup = await get_schedule_view(session, callback.from_user.id, period)
+    
+    await callback.message.edit_text(text, reply_markup=reply_markup)
 
 async def handle_schedule_back(callback: types.CallbackQuery):
     """Обработчик кнопки возврата к фильтрам расписания"""
     await show_schedule(callback)
 
+async def count_cancellable_lessons(session, telegram_id: int, period: str) -> int:
+    return await session.scalar(
+        cancellable_lessons_query(select(func.count(Booking.id)), telegram_id, period)
+    )
+
+async def fetch_cancellable_lessons(session, telegram_id: int, period: str, offset: int, limit: int):
+    result = await session.execute(
+        cancellable_lessons_query(select(Booking), telegram_id, period)
+        .options(joinedload(Booking.child))
+        .order_by(Booking.date, Booking.start_time, Booking.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+def render_cancellable_lessons(page: Page):
+    period, = page.args
+    text = [f"❌ Отмена занятий на {get_period_title(period)}\n\nВыберите занятие для отмены:\n"]
+    keyboard = []
+
+    for day, day_bookings in ScheduleStats(page.items).by_day.items():
+        # Для недели/месяца занятия разделяются по датам
+        if period in ["week", "month"]:
+            text.append(f"\n📅 {format_date_with_month(day)}")
+        for booking in day_bookings:
+            text.append("\n" + render_card(booking, booking_cards.CANCEL_LESSON_LINE))
+            keyboard.append([get_cancel_lesson_button(booking)])
+
+    if not page.items:
+        text.append("\nНет занятий, доступных для отмены")
+    return "\n".join(text), keyboard
+
+CANCEL_LESSONS_VIEW = PagedView(
+    CANCEL_LESSONS_PAGE,
+    count=count_cancellable_lessons,
+    fetch=fetch_cancellable_lessons,
+    render=render_cancellable_lessons,
+    footer=[[InlineKeyboardButton(text="🔙 Назад к расписанию", callback_data="schedule:back")]]
+)
+
+@query_budget(statements=2)
 async def handle_cancel_menu(callback: types.CallbackQuery):
     """Обработчик нажатия на кнопку отмены занятий"""
     period = callback.data.split(":")[2]  # schedule:cancel:period
-    
-    async with async_session_maker() as session:
-        # Получаем записи для выбранного периода
-        bookings = await get_bookings_for_period(session, callback.from_user.id, period)
-        
-        # Формируем текст с занятиями для отмены
-        text = [f"❌ Отмена занятий на {get_period_title(period)}\n\nВыберите занятие для отмены:\n"]
-        
-        now = datetime.now()
-        has_bookings = False
-        
-        # Сортируем занятия по дате и времени
-        sorted_bookings = sorted(
-            bookings,
-            key=lambda b: (b.date, b.start_time)
-        )
-        
-        current_date = None
-        for booking in sorted_bookings:
-            booking_datetime = datetime.combine(booking.date, booking.start_time)
-            
-            # Добавляем разделитель даты, если она изменилась
-            if period in ["week", "month"] and booking.date != current_date:
-                current_date = booking.date
-                text.append(f"\n📅 {format_date_with_month(current_date)}")
-            
-            if booking.status == BookingStatus.APPROVED:
-                if period in ["today", "tomorrow"] or (period in ["week", "month"] and booking_datetime > now):
-                    has_bookings = True
-                    text.append(
-                        f"\n⏰ {booking.start_time.strftime('%H:%M')}-{booking.end_time.strftime('%H:%M')} | "
-                        f"{booking.child.name} {booking.child.surname} ({booking.child.grade} класс) | "
-                        f"{booking.subject_name}"
-                    )
-            elif booking.status == BookingStatus.PENDING:
-                text.append(
-                    f"\n⚠️ {booking.child.name} {booking.child.surname} "
-                    f"({booking.start_time.strftime('%H:%M')}-{booking.end_time.strftime('%H:%M')}) - "
-                    "ожидает подтверждения"
-                )
-        
-        if not has_bookings:
-            text.append("\nНет занятий, доступных для отмены")
-        
-        # Отправляем сообщение с клавиатурой отмены
-        await callback.message.edit_text(
-            "\n".join(text),
-            reply_markup=get_schedule_with_cancel_kb(bookings, period)
-        )
+    await CANCEL_LESSONS_VIEW.show(callback, period)
+
+@query_budget(statements=2)
+async def handle_cancel_menu_page(callback: types.CallbackQuery, callback_data):
+    """Показывает страницу занятий, доступных для отмены"""
+    await CANCEL_LESSONS_VIEW.show(callback, callback_data.period, page=callback_data.page)
 
-async def handle_cancel_booking(callback: types.CallbackQuery, state: FSMContext):
+async def handle_cancel_booking(callback: types.CallbackQuery, state: FSMContext, callback_data):
     """Обработчик нажатия на кнопку отмены конкретного занятия"""
-    booking_id = int(callback.data.split(":")[2])
+    booking_id = callback_data.booking_id
     
     async with async_session_maker() as session:
         # Сначала получаем id репетитора из БД
@@ -284,6 +294,10 @@ async def handle_cancel_confirmation(callback: types.CallbackQuery, state: FSMCo
         booking.cancelled_at = datetime.now()
         booking.cancelled_by = "tutor"
         await session.commit()
+
+        # Заявки на освободившееся время, которые теперь можно подтвердить
+        waiting = await load_day_intervals(session, tutor.id, booking.date, BookingStatus.PENDING)
+        freed_for = waiting.conflicts(booking.start_time, booking.end_time)
         
         # Получаем telegram_id родителя
         parent = await session.get(Parent, booking_data["parent_id"])
@@ -305,7 +319,7 @@ async def handle_cancel_confirmation(callback: types.CallbackQuery, state: FSMCo
             f"🕒 Время: {booking_data['start_time']} - {booking_data['end_time']}"
         )
         
-        await parent_bot.send_message(
+        await get_parent_bot().send_message(
             chat_id=parent.telegram_id,
             text=notification_text
         )
@@ -315,26 +329,31 @@ async def handle_cancel_confirmation(callback: types.CallbackQuery, state: FSMCo
         
         # Возвращаемся к расписанию
         await show_schedule(callback)
-        await callback.answer("✅ Занятие успешно отменено")
+        if freed_for:
+            await callback.answer(
+                f"✅ Занятие успешно отменено\n\nНа освободившееся время есть заявки: {len(freed_for)}. "
+                "Их можно подтвердить в разделе ожидающих записей",
+                show_alert=True
+            )
+        else:
+            await callback.answer("✅ Занятие успешно отменено")
 
 def register_schedule_handlers(dp):
     """Регистрирует обработчики расписания"""
-    dp.callback_query.register(show_schedule, lambda c: c.data == "show_schedule")
-    dp.callback_query.register(
+    router = get_callback_router(dp)
+    router.exact("show_schedule", show_schedule)
+    router.prefix(
+        "schedule:",
         handle_schedule_filter,
-        lambda c: c.data.startswith("schedule:") and c.data.split(":")[1] in ["today", "tomorrow", "week", "month"]
+        predicate=lambda c: c.data.split(":")[1] in SCHEDULE_PERIODS
     )
-    dp.callback_query.register(
+    router.prefix(
+        "schedule:cancel:",
         handle_cancel_menu,
-        lambda c: c.data.startswith("schedule:cancel:") and c.data.split(":")[2] in ["today", "tomorrow", "week", "month"]
-    )
-    dp.callback_query.register(
-        handle_cancel_booking,
-        lambda c: c.data.startswith("schedule:cancel:") and c.data.split(":")[2].isdigit()
-    )
-    dp.callback_query.register(
-        handle_cancel_confirmation,
-        lambda c: c.data.startswith("schedule:confirm_cancel:")
+        predicate=lambda c: c.data.split(":")[2] in SCHEDULE_PERIODS
     )
-    dp.callback_query.register(handle_schedule_back, lambda c: c.data == "schedule:back")
-    dp.callback_query.register(back_to_main_menu, lambda c: c.data == "back_to_main")
\ No newline at end of file
+    router.action(CANCEL_LESSONS_PAGE, handle_cancel_menu_page)
+    router.action(CANCEL_LESSON, handle_cancel_booking)
+    router.action(CONFIRM_CANCEL_LESSON, handle_cancel_confirmation)
+    router.exact("schedule:back", handle_schedule_back)
+    router.exact("back_to_main", back_to_main_menu)
\ No newline at end of file
@@ -1,110 +1,184 @@
+from datetime import datetime
 from aiogram import types
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from sqlalchemy import select, distinct
-from sqlalchemy.orm import joinedload, contains_eager
+from sqlalchemy import select, distinct, func, case, and_
 
 from common.database import async_session_maker, Booking, Child, BookingStatus, Tutor
+from common.query_budget import query_budget
+from common.pagination import Page, PagedView
+from common.callback_router import get_callback_router
+from common.callback_data import SHOW_STUDENT, STUDENTS_PAGE, STUDENTS_SORTED_PAGE
 
-async def show_my_students(callback_query: types.CallbackQuery):
-    """Показывает список учеников, которые записывались к репетитору"""
-    async with async_session_maker() as session:
-        # Получаем уникальных учеников, у которых были записи к этому репетитору
-        query = (
-            select(Child)
-            .join(Child.bookings)
-            .join(Booking.tutor)
-            .where(Tutor.telegram_id == callback_query.from_user.id)
-            .options(contains_eager(Child.bookings))
-            .distinct()
-        )
-        
-        result = await session.execute(query)
-        students = result.unique().scalars().all()
-
-        if not students:
-            await callback_query.message.edit_text(
-                "У вас пока нет учеников.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]
-                ])
-            )
-            return
-
-        # Создаем клавиатуру со списком учеников
-        keyboard = []
-        for student in students:
-            keyboard.append([
-                InlineKeyboardButton(
-                    text=f"{student.name} {student.surname}",
-                    callback_data=f"show_student_{student.id}"
-                )
-            ])
+STUDENTS_PAGE_SIZE = 10
 
-        keyboard.append([InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")])
+# Подписи порядков списка учеников (STUDENT_ORDERS в common/callback_data.py)
+ORDER_TITLES = {"name": "🔤 По имени", "recent": "🕒 Недавние"}
 
-        await callback_query.message.edit_text(
-            "Выберите ученика, чтобы посмотреть информацию о нем:",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-        )
+async def count_students(session, telegram_id: int, order: str = "name") -> int:
+    return await session.scalar(
+        select(func.count(distinct(Booking.child_id)))
+        .join(Booking.tutor)
+        .where(Tutor.telegram_id == telegram_id)
+    )
 
-async def show_student_info(callback_query: types.CallbackQuery):
-    """Показывает подробную информацию об ученике"""
-    student_id = int(callback_query.data.split('_')[2])
+def booking_stats(now: datetime) -> dict:
+    """
+    Статистика записей ученика к репетитору для запроса с GROUP BY по ученику
 
-    async with async_session_maker() as session:
-        # Получаем данные об ученике и его записях к текущему репетитору
-        query = (
-            select(Child)
-            .options(joinedload(Child.bookings).joinedload(Booking.tutor))
-            .where(Child.id == student_id)
-        )
-        
-        result = await session.execute(query)
-        student = result.unique().scalar_one_or_none()
-
-        if not student:
-            await callback_query.message.edit_text(
-                "❌ Ученик не найден.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="◀️ Вернуться к списку учеников", callback_data="my_students")]
-                ])
-            )
-            return
+    Всего записей, подтвержденных, предстоящих подтвержденных занятий, отмененных,
+    стоимость подтвержденных занятий и дата последнего прошедшего занятия.
+    """
+    approved = Booking.status == BookingStatus.APPROVED
+    return {
+        "total": func.count(Booking.id),
+        "approved": func.coalesce(func.sum(case((approved, 1), else_=0)), 0),
+        "upcoming": func.coalesce(func.sum(case((and_(approved, Booking.starts_at > now), 1), else_=0)), 0),
+        "cancelled": func.coalesce(func.sum(case((Booking.status == BookingStatus.CANCELLED, 1), else_=0)), 0),
+        "revenue": func.coalesce(func.sum(case((approved, Booking.price), else_=0)), 0),
+        "last_lesson": func.max(case((and_(approved, Booking.starts_at <= now), Booking.date))),
+    }
 
-        # Фильтруем записи только для текущего репетитора
-        tutor_bookings = [
-            booking for booking in student.bookings 
-            if booking.tutor.telegram_id == callback_query.from_user.id
-        ]
+def roster_query(telegram_id: int, order: str = "name"):
+    """
+    Ученики репетитора со статистикой занятий (booking_stats), по строке на ученика
 
-        # Подсчитываем статистику по записям
-        total_bookings = len(tutor_bookings)
-        completed_bookings = sum(1 for b in tutor_bookings if b.status == BookingStatus.APPROVED)
-        upcoming_bookings = 0  # TODO: Add logic for upcoming bookings
-
-        # Формируем текст с информацией об ученике
-        text = (
-            f"👤 Ученик: {student.name} {student.surname}\n"
-            f"{'🧑' if student.gender.value == 'male' else '👧'} Пол: {'Мужской' if student.gender.value == 'male' else 'Женский'}\n"
-            f"📚 Класс: {student.grade}\n"
-            f"📖 Учебник: {student.textbook_info or 'Не указан'}\n\n"
-            f"📊 Статистика занятий с вами:\n"
-            f"• Всего занятий: {total_bookings}\n"
-            f"• Подтверждено: {completed_bookings}\n"
-            f"• Предстоит: {upcoming_bookings}"
+    order: "name" - по фамилии и имени, "recent" - сначала ученики с недавними занятиями.
+    """
+    stats = booking_stats(datetime.now())
+    query = (
+        select(
+            Child.id,
+            Child.name,
+            Child.surname,
+            *(stats[key].label(key) for key in ("total", "approved", "upcoming", "last_lesson"))
         )
+        .join(Booking, Booking.child_id == Child.id)
+        .join(Tutor, Booking.tutor_id == Tutor.id)
+        .where(Tutor.telegram_id == telegram_id)
+        .group_by(Child.id)
+    )
+    if order == "recent":
+        # Ученики без прошедших занятий - в конце, среди них сначала записавшиеся недавно
+        return query.order_by(stats["last_lesson"].desc(), func.max(Booking.created_at).desc(), Child.id)
+    return query.order_by(Child.surname, Child.name, Child.id)
+
+async def fetch_students(session, telegram_id: int, order: str = "name", offset: int = 0, limit: int = STUDENTS_PAGE_SIZE):
+    result = await session.execute(roster_query(telegram_id, order).offset(offset).limit(limit))
+    return result.all()
+
+def format_student_line(number: int, student) -> str:
+    last_lesson = student.last_lesson.strftime('%d.%m.%Y') if student.last_lesson else "еще не было"
+    return (
+        f"{number}. {student.name} {student.surname}\n"
+        f"   Занятий: {student.total}, подтверждено: {student.approved}, "
+        f"предстоит: {student.upcoming}, последнее: {last_lesson}"
+    )
+
+def render_students(page: Page):
+    if not page.items:
+        return "У вас пока нет учеников.", []
 
-        keyboard = [
-            [InlineKeyboardButton(text="◀️ Вернуться к списку учеников", callback_data="my_students")],
-            [InlineKeyboardButton(text="🏠 В главное меню", callback_data="back_to_main")]
+    order = page.args[0] if page.args else "name"
+    text = "Выберите ученика, чтобы посмотреть информацию о нем:\n\n" + "\n".join(
+        format_student_line(page.offset + i + 1, student) for i, student in enumerate(page.items)
+    )
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text=f"{student.name} {student.surname}",
+                callback_data=SHOW_STUDENT.pack(student.id)
+            )
         ]
+        for student in page.items
+    ]
+    # Переключение порядка списка (с первой страницы)
+    keyboard.append([
+        InlineKeyboardButton(
+            text=("• " if key == order else "") + title,
+            callback_data=STUDENTS_SORTED_PAGE.pack(key, 0)
+        )
+        for key, title in ORDER_TITLES.items()
+    ])
+    return text, keyboard
+
+STUDENTS_VIEW = PagedView(
+    STUDENTS_SORTED_PAGE,
+    count=count_students,
+    fetch=fetch_students,
+    render=render_students,
+    page_size=STUDENTS_PAGE_SIZE,
+    footer=[[InlineKeyboardButton(text="◀️ Вернуться в меню", callback_data="back_to_main")]]
+)
+
+@query_budget(statements=2, rows=0)
+async def show_my_students(callback_query: types.CallbackQuery):
+    """Показывает список учеников, которые записывались к репетитору"""
+    await STUDENTS_VIEW.show(callback_query, "name")
+
+@query_budget(statements=2, rows=0)
+async def show_students_page(callback_query: types.CallbackQuery, callback_data):
+    """Показывает страницу списка учеников (кнопки страниц из старых сообщений - по имени)"""
+    await STUDENTS_VIEW.show(callback_query, getattr(callback_data, "order", "name"), page=callback_data.page)
+
+def student_detail_query(telegram_id: int, student_id: int):
+    """Ученик и статистика его записей только к этому репетитору (по индексу tutor_id, child_id)"""
+    tutor_id = select(Tutor.id).where(Tutor.telegram_id == telegram_id).scalar_subquery()
+    stats = booking_stats(datetime.now())
+    return (
+        select(Child, *(column.label(key) for key, column in stats.items()))
+        .outerjoin(Booking, and_(Booking.child_id == Child.id, Booking.tutor_id == tutor_id))
+        .where(Child.id == student_id)
+        .group_by(Child.id)
+    )
 
+@query_budget(statements=1, rows=1)
+async def show_student_info(callback_query: types.CallbackQuery, callback_data):
+    """Показывает подробную информацию об ученике"""
+    async with async_session_maker() as session:
+        result = await session.execute(student_detail_query(callback_query.from_user.id, callback_data.child_id))
+        row = result.one_or_none()
+
+    if not row:
         await callback_query.message.edit_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+            "❌ Ученик не найден.",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="◀️ Вернуться к списку учеников", callback_data="my_students")]
+            ])
         )
+        return
+
+    student = row.Child
+    last_lesson = row.last_lesson.strftime('%d.%m.%Y') if row.last_lesson else "еще не было"
+
+    # Формируем текст с информацией об ученике
+    text = (
+        f"👤 Ученик: {student.name} {student.surname}\n"
+        f"{'🧑' if student.gender.value == 'male' else '👧'} Пол: {'Мужской' if student.gender.value == 'male' else 'Женский'}\n"
+        f"📚 Класс: {student.grade}\n"
+        f"📖 Учебник: {student.textbook_info or 'Не указан'}\n\n"
+        f"📊 Статистика занятий с вами:\n"
+        f"• Всего занятий: {row.total}\n"
+        f"• Подтверждено: {row.approved}\n"
+        f"• Предстоит: {row.upcoming}\n"
+        f"• Отменено: {row.cancelled}\n"
+        f"• Последнее занятие: {last_lesson}\n"
+        f"💰 Стоимость подтвержденных занятий: {row.revenue} ₽"
+    )
+
+    keyboard = [
+        [InlineKeyboardButton(text="◀️ Вернуться к списку учеников", callback_data="my_students")],
+        [InlineKeyboardButton(text="🏠 В главное меню", callback_data="back_to_main")]
+    ]
+
+    await callback_query.message.edit_text(
+        text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+    )
 
 def register_students_handlers(dp):
     """Регистрирует обработчики для работы со списком учеников"""
-    dp.callback_query.register(show_my_students, lambda c: c.data == "my_students")
-    dp.callback_query.register(show_student_info, lambda c: c.data.startswith("show_student_")) 
\ No newline at end of file
+    router = get_callback_router(dp)
+    router.exact("my_students", show_my_students)
+    router.action(STUDENTS_PAGE, show_students_page)
+    router.action(STUDENTS_SORTED_PAGE, show_students_page)
+    router.action(SHOW_STUDENT, show_student_info) 
\ No newline at end of file
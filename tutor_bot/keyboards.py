@@ -1,5 +1,12 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from common.callback_data import (
+    REGISTRATION_TOGGLE_SUBJECT,
+    PROFILE_TOGGLE_SUBJECT,
+    PROFILE_EDIT_PRICE,
+    REGISTRATION_EDIT_PRICE
+)
+
 DAY_NAMES = {
     'monday': 'Пн',
     'tuesday': 'Вт',
@@ -10,6 +17,7 @@ DAY_NAMES = {
     'sunday': 'Вс'
 }
 
+# Названия предметов интернируются при запуске ботов (см. common/callback_data.py)
 SUBJECTS = [
     "Математика",
     "Физика",
@@ -45,15 +53,15 @@ def get_subjects_keyboard(selected_subjects: list) -> InlineKeyboardMarkup:
         row = [
             InlineKeyboardButton(
                 text=f"{subject}",
-                callback_data=f"subject_name_{subject}"  # Неактивная кнопка с названием
+                callback_data="subject_name"  # Неактивная кнопка с названием
             ),
             InlineKeyboardButton(
                 text=f"{'✅' if subject_data['is_exam'] else '⬜'} ОГЭ/ЕГЭ",
-                callback_data=f"subject_{subject}_exam"
+                callback_data=REGISTRATION_TOGGLE_SUBJECT.pack(subject, "exam")
             ),
             InlineKeyboardButton(
                 text=f"{'✅' if subject_data['is_standard'] else '⬜'} Стандарт",
-                callback_data=f"subject_{subject}_standard"
+                callback_data=REGISTRATION_TOGGLE_SUBJECT.pack(subject, "standard")
             )
         ]
         keyboard.append(row)
@@ -148,6 +156,7 @@ def get_profile_menu_keyboard() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="💰 Изменить цены", callback_data="edit_profile_prices")],
         [InlineKeyboardButton(text="📝 Изменить описание", callback_data="edit_profile_description")],
         [InlineKeyboardButton(text="🕒 Изменить расписание", callback_data="edit_profile_schedule")],
+        [InlineKeyboardButton(text="🔔 Напоминания", callback_data="reminders_settings")],
         [InlineKeyboardButton(text="◀️ Вернуться в главное меню", callback_data="back_to_main")]
     ]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -196,15 +205,15 @@ def get_profile_subjects_keyboard(selected_subjects: list) -> InlineKeyboardMark
         row = [
             InlineKeyboardButton(
                 text=f"{subject}",
-                callback_data=f"subject_name_{subject}"  # Неактивная кнопка с названием
+                callback_data="subject_name"  # Неактивная кнопка с названием
             ),
             InlineKeyboardButton(
                 text=f"{'✅' if subject_data['is_exam'] else '⬜'} ОГЭ/ЕГЭ",
-                callback_data=f"profile_subject_{subject}_exam"
+                callback_data=PROFILE_TOGGLE_SUBJECT.pack(subject, "exam")
             ),
             InlineKeyboardButton(
                 text=f"{'✅' if subject_data['is_standard'] else '⬜'} Стандарт",
-                callback_data=f"profile_subject_{subject}_standard"
+                callback_data=PROFILE_TOGGLE_SUBJECT.pack(subject, "standard")
             )
         ]
         keyboard.append(row)
@@ -311,15 +320,15 @@ def get_profile_prices_keyboard(subjects: list) -> InlineKeyboardMarkup:
         row = [
             InlineKeyboardButton(
                 text=f"{subject}",
-                callback_data=f"price_subject_{subject}"
+                callback_data="price_header"
             ),
             InlineKeyboardButton(
                 text=f"{exam_price}₽" if isinstance(exam_price, int) else exam_price,
-                callback_data=f"price_edit_{subject}_exam" if subject_data["is_exam"] else "price_header"
+                callback_data=PROFILE_EDIT_PRICE.pack(subject, "exam") if subject_data["is_exam"] else "price_header"
             ),
             InlineKeyboardButton(
                 text=f"{standard_price}₽" if isinstance(standard_price, int) else standard_price,
-                callback_data=f"price_edit_{subject}_standard" if subject_data["is_standard"] else "price_header"
+                callback_data=PROFILE_EDIT_PRICE.pack(subject, "standard") if subject_data["is_standard"] else "price_header"
             )
         ]
         keyboard.append(row)
@@ -361,15 +370,15 @@ def get_registration_prices_keyboard(subjects: list) -> InlineKeyboardMarkup:
         row = [
             InlineKeyboardButton(
                 text=f"{subject}",
-                callback_data=f"registration_price_subject_{subject}"
+                callback_data="price_header"
             ),
             InlineKeyboardButton(
                 text=f"{exam_price}₽" if isinstance(exam_price, int) else exam_price,
-                callback_data=f"registration_price_edit_{subject}_exam" if subject_data["is_exam"] else "price_header"
+                callback_data=REGISTRATION_EDIT_PRICE.pack(subject, "exam") if subject_data["is_exam"] else "price_header"
             ),
             InlineKeyboardButton(
                 text=f"{standard_price}₽" if isinstance(standard_price, int) else standard_price,
-                callback_data=f"registration_price_edit_{subject}_standard" if subject_data["is_standard"] else "price_header"
+                callback_data=REGISTRATION_EDIT_PRICE.pack(subject, "standard") if subject_data["is_standard"] else "price_header"
             )
         ]
         keyboard.append(row)
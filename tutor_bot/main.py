@@ -1,39 +1,60 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram import Dispatcher
 
-from common.config import TUTOR_BOT_TOKEN, PARENT_BOT_TOKEN
+from common.bots import get_tutor_bot, close_bots
 from common.database import init_db
+from common.callback_data import intern_strings
+from common.fsm_storage import DatabaseStorage
+from common.metrics import setup_metrics, start_metrics_server, stop_metrics_server
+from common.update_limiter import setup_update_limiter
 from tutor_bot.handlers.common import register_common_handlers
 from tutor_bot.handlers.registration import register_registration_handlers
 from tutor_bot.handlers.profile import register_profile_handlers
 from tutor_bot.handlers.booking import register_booking_handlers
 from tutor_bot.handlers.students import register_students_handlers
 from tutor_bot.handlers.schedule import register_schedule_handlers
+from tutor_bot.keyboards import SUBJECTS
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 
-# Инициализация бота и диспетчера
-bot = Bot(token=TUTOR_BOT_TOKEN)
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
+def setup_dispatcher() -> Dispatcher:
+    """
+    Создает диспетчер и регистрирует обработчики (общая для polling и webhook)
 
-async def main():
-    # Инициализация базы данных
-    await init_db()
-    
-    # Регистрация обработчиков
+    Хранилище состояний читает настройки, поэтому диспетчер создается при запуске,
+    а не при импорте модуля (бот создается в common/bots.py при первом обращении)
+    """
+    dp = Dispatcher(storage=DatabaseStorage())
+    setup_update_limiter(dp, "tutor")
+    setup_metrics(dp, "tutor")
     register_common_handlers(dp)
     register_registration_handlers(dp)
     register_profile_handlers(dp)
     register_booking_handlers(dp)
     register_students_handlers(dp)
     register_schedule_handlers(dp)
+    return dp
+
+async def main():
+    # Инициализация базы данных
+    await init_db()
+    # id названий предметов для callback_data кнопок
+    await intern_strings(SUBJECTS)
+    
+    # Регистрация обработчиков
+    dp = setup_dispatcher()
     
-    # Запуск бота
-    await dp.start_polling(bot)
+    # Запуск бота (если до этого работал webhook, снимаем его, иначе getUpdates вернет ошибку)
+    bot = get_tutor_bot()
+    await bot.delete_webhook()
+    await start_metrics_server()
+    try:
+        await dp.start_polling(bot, close_bot_session=False)
+    finally:
+        await stop_metrics_server()
+        await close_bots()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
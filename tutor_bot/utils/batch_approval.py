@@ -0,0 +1,102 @@
+"""
+Массовое подтверждение заявок репетитора.
+
+Заявки, ожидающие подтверждения, разбираются по дням проходом по интервалам занятий
+[начало, конец): сначала отклоняются заявки, пересекающиеся с уже подтвержденными
+занятиями, затем из оставшихся жадно выбираются заявки в порядке времени окончания
+(при равенстве - более ранняя заявка). Такой выбор подтверждает наибольшее возможное
+число непересекающихся занятий; остальные заявки отклоняются с указанием занятия,
+с которым они пересекаются.
+
+План применяется в БД условными UPDATE (apply_batch_plan): между разбором и записью
+заявку могли отменить или обработать, такие заявки не меняются и не попадают в итог.
+"""
+from datetime import datetime
+from itertools import groupby
+from typing import List, Sequence, Tuple
+
+from common.database import Booking, BookingStatus, update_tutor_bookings
+from common.intervals import DayIntervals
+
+# Причина, которую видит родитель при автоматическом отклонении
+OVERLAP_REJECTION_REASON = "Время пересекается с другим занятием репетитора"
+
+
+class BatchPlan:
+    """Результат разбора заявок: подтверждаемые и отклоняемые с конфликтующей записью"""
+    __slots__ = ("approve", "reject")
+
+    def __init__(self):
+        self.approve: List[Booking] = []
+        self.reject: List[Tuple[Booking, Booking]] = []
+
+
+def _by_date(bookings: Sequence[Booking]):
+    return groupby(sorted(bookings, key=lambda b: b.date), key=lambda b: b.date)
+
+
+def plan_batch_approval(pending: Sequence[Booking], approved: Sequence[Booking]) -> BatchPlan:
+    """
+    Разбирает заявки репетитора на подтверждаемые и отклоняемые
+
+    Args:
+        pending: Заявки, ожидающие подтверждения
+        approved: Подтвержденные занятия репетитора в дни заявок
+
+    Returns:
+        BatchPlan: Заявки в порядке даты и времени окончания
+    """
+    plan = BatchPlan()
+    approved_by_date = {day: list(items) for day, items in _by_date(approved)}
+    for day, requests in _by_date(pending):
+        busy = DayIntervals(approved_by_date.get(day, ()))
+        last = None
+        for booking in sorted(requests, key=lambda b: (b.end_time, b.start_time, b.id)):
+            conflict = busy.first_conflict(booking.start_time, booking.end_time)
+            if conflict is None and last is not None and booking.start_time < last.end_time:
+                conflict = last
+            if conflict is None:
+                plan.approve.append(booking)
+                last = booking
+            else:
+                plan.reject.append((booking, conflict))
+    return plan
+
+
+async def apply_batch_plan(session, tutor_id: int, plan: BatchPlan) -> Tuple[BatchPlan, List[Booking]]:
+    """
+    Записывает план в БД двумя UPDATE (транзакцию фиксирует вызывающий код)
+
+    Меняются только заявки, все еще ожидающие подтверждения. Заявка отклоняется, только
+    если занятие, с которым она пересекается, действительно подтверждено; иначе она
+    остается в ожидании.
+
+    Returns:
+        Tuple[BatchPlan, List[Booking]]: Фактически подтвержденные и отклоненные заявки;
+        заявки из плана, которые уже были обработаны или отменены
+    """
+    applied = BatchPlan()
+    planned_ids = {b.id for b in plan.approve}
+    approved_ids = await update_tutor_bookings(
+        session, tutor_id, list(planned_ids),
+        Booking.status == BookingStatus.PENDING,
+        status=BookingStatus.APPROVED,
+        approved_at=datetime.now()
+    )
+    # Конфликт с заявкой, которую не удалось подтвердить, больше не причина для отказа
+    rejectable = [
+        (booking, conflict) for booking, conflict in plan.reject
+        if conflict.id in approved_ids or conflict.id not in planned_ids
+    ]
+    rejected_ids = await update_tutor_bookings(
+        session, tutor_id, [b.id for b, _ in rejectable],
+        Booking.status == BookingStatus.PENDING,
+        status=BookingStatus.REJECTED,
+        rejection_reason=OVERLAP_REJECTION_REASON
+    )
+    applied.approve = [b for b in plan.approve if b.id in approved_ids]
+    applied.reject = [(b, conflict) for b, conflict in rejectable if b.id in rejected_ids]
+    stale = [b for b in plan.approve if b.id not in approved_ids] + [
+        b for b, _ in rejectable if b.id not in rejected_ids
+    ]
+    return applied, stale
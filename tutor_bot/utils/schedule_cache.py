@@ -0,0 +1,60 @@
+"""
+Кэш отрисованного расписания репетитора.
+
+Повторное нажатие фильтра расписания ("Сегодня", "Завтра", "Неделя", "Месяц") не
+перечитывает записи и не форматирует расписание заново, если оно не изменилось.
+Запись кэша действительна, пока совпадают:
+- версия расписания репетитора (Tutor.schedule_version): ее увеличивают слушатели событий
+  в common/database.py при создании, удалении и изменении записей репетитора, в том числе
+  в процессе бота для родителей;
+- начало периода и текущая дата: кэш сбрасывается на границе дня.
+
+Проверка версии - один запрос одной строки вместо поиска репетитора, выборки записей
+и форматирования.
+"""
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Optional, Tuple
+
+from tutor_bot.utils.schedule_utils import get_date_range
+
+# Число расписаний (репетитор, период) в кэше
+SCHEDULE_CACHE_SIZE = 2048
+
+
+class ScheduleCache:
+    """LRU-кэш расписаний по (репетитор, период)"""
+
+    def __init__(self, max_entries: int = SCHEDULE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # (id репетитора, период) -> ((начало периода, дата, версия), значение)
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[tuple, Any]]" = OrderedDict()
+
+    @staticmethod
+    def _stamp(period: str, version: int) -> tuple:
+        return get_date_range(period)[0], date.today(), version
+
+    def get(self, tutor_id: int, period: str, version: int) -> Optional[Any]:
+        entry = self._entries.get((tutor_id, period))
+        if entry is None or entry[0] != self._stamp(period, version):
+            self.misses += 1
+            return None
+        self._entries.move_to_end((tutor_id, period))
+        self.hits += 1
+        return entry[1]
+
+    def put(self, tutor_id: int, period: str, version: int, value: Any) -> None:
+        key = (tutor_id, period)
+        self._entries[key] = (self._stamp(period, version), value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+schedule_cache = ScheduleCache()
@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Optional
-from sqlalchemy import select
+from sqlalchemy import select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 
 from common.database import Booking, BookingStatus, Tutor
 
@@ -80,13 +80,20 @@ async def get_bookings_for_period(
         print(f"Tutor not found for telegram_id: {telegram_id}")
         return []
     
+    return await get_tutor_bookings_for_period(session, tutor.id, period)
+
+async def get_tutor_bookings_for_period(
+    session: AsyncSession,
+    tutor_id: int,
+    period: str
+) -> List[Booking]:
+    """Получает записи репетитора (по id в БД) для заданного периода"""
     start_date, end_date = get_date_range(period)
     
     query = select(Booking).options(
-        selectinload(Booking.child),
-        selectinload(Booking.tutor)
+        joinedload(Booking.child)
     ).where(
-        Booking.tutor_id == tutor.id,
+        Booking.tutor_id == tutor_id,
         Booking.date >= start_date,
         Booking.date < end_date,
         Booking.status.in_([BookingStatus.APPROVED, BookingStatus.PENDING])
@@ -96,6 +103,24 @@ async def get_bookings_for_period(
 
     return list(result.scalars().all())
 
+def cancellable_lessons_query(query, telegram_id: int, period: str):
+    """Ограничивает запрос подтвержденными занятиями репетитора, которые можно отменить"""
+    start_date, end_date = get_date_range(period)
+    query = query.join(Booking.tutor).where(
+        Tutor.telegram_id == telegram_id,
+        Booking.date >= start_date,
+        Booking.date < end_date,
+        Booking.status == BookingStatus.APPROVED
+    )
+    if period in ["week", "month"]:
+        # Для недели/месяца - только занятия в будущем
+        now = datetime.now()
+        query = query.where(or_(
+            Booking.date > now.date(),
+            and_(Booking.date == now.date(), Booking.start_time > now.time())
+        ))
+    return query
+
 def format_booking_status(status: BookingStatus) -> str:
     """Форматирует статус записи для отображения"""
     if status == BookingStatus.APPROVED:
@@ -107,14 +132,86 @@ def format_booking_status(status: BookingStatus) -> str:
     else:
         return "🚫 Отменено"
 
-def format_daily_schedule(bookings: List[Booking], date_str: str) -> str:
+class ScheduleStats:
+    """
+    Статистика и группировки записей расписания, собранные за один проход.
+
+    Используется форматтерами расписания на день, неделю и месяц, клавиатурой
+    фильтров и меню отмены занятий, чтобы не перебирать записи заново для каждого
+    показателя. Недели собираются из дней (их не больше 31), а не из записей.
+    """
+    __slots__ = (
+        "total", "confirmed", "pending", "cancelled", "income", "upcoming_confirmed",
+        "by_day", "day_income", "subjects", "_by_week"
+    )
+
+    def __init__(self, bookings: List[Booking], now: Optional[datetime] = None):
+        now = now or datetime.now()
+        today, now_time = now.date(), now.time()
+        approved_status, pending_status, cancelled_status = (
+            BookingStatus.APPROVED, BookingStatus.PENDING, BookingStatus.CANCELLED
+        )
+        confirmed = pending = cancelled = upcoming = 0
+        by_day: Dict[date, List[Booking]] = {}
+        day_income: Dict[date, int] = {}
+        subjects: Dict[str, int] = {}
+
+        for booking in bookings:
+            day = booking.date
+            day_bookings = by_day.get(day)
+            if day_bookings is None:
+                by_day[day] = day_bookings = []
+                day_income[day] = 0
+            day_bookings.append(booking)
+
+            status = booking.status
+            if status is approved_status:
+                confirmed += 1
+                day_income[day] += booking.price
+                if day > today or (day == today and booking.start_time > now_time):
+                    upcoming += 1
+            elif status is pending_status:
+                pending += 1
+            elif status is cancelled_status:
+                cancelled += 1
+
+            subject = booking.subject_name
+            subjects[subject] = subjects.get(subject, 0) + 1
+
+        self.total = len(bookings)
+        self.confirmed = confirmed
+        self.pending = pending
+        self.cancelled = cancelled
+        self.upcoming_confirmed = upcoming  # Подтвержденные занятия, которые еще не начались
+        self.income = sum(day_income.values())
+        self.by_day = by_day
+        self.day_income = day_income
+        self.subjects = subjects
+        self._by_week = None
+
+    @property
+    def by_week(self) -> Dict[int, list]:
+        """Номер недели -> [занятий, доход, первый день, последний день]"""
+        if self._by_week is None:
+            self._by_week = {}
+            for day, day_bookings in self.by_day.items():
+                week_num = day.isocalendar()[1]
+                week = self._by_week.get(week_num)
+                if week is None:
+                    self._by_week[week_num] = [len(day_bookings), self.day_income[day], day, day]
+                else:
+                    week[0] += len(day_bookings)
+                    week[1] += self.day_income[day]
+                    week[2] = min(week[2], day)
+                    week[3] = max(week[3], day)
+        return self._by_week
+
+def format_daily_schedule(bookings: List[Booking], date_str: str, stats: Optional[ScheduleStats] = None) -> str:
     """Форматирует расписание на день"""
     if not bookings:
         return f"📅 Расписание на {date_str}\n\n🚫 Нет занятий"
     
-    total_confirmed = sum(1 for b in bookings if b.status == BookingStatus.APPROVED)
-    total_pending = sum(1 for b in bookings if b.status == BookingStatus.PENDING)
-    total_income = sum(b.price for b in bookings if b.status == BookingStatus.APPROVED)
+    stats = stats or ScheduleStats(bookings)
     
     text = [f"📅 Расписание на {date_str}\n"]
     
@@ -128,29 +225,20 @@ def format_daily_schedule(bookings: List[Booking], date_str: str) -> str:
     
     text.extend([
         "\n━━━━━━━━━━━━━━━━━━━━━━",
-        f"Всего занятий: {len(bookings)}",
-        f"Подтверждено: {total_confirmed} | Ожидает: {total_pending}",
-        f"Доход за день: {total_income} руб."
+        f"Всего занятий: {stats.total}",
+        f"Подтверждено: {stats.confirmed} | Ожидает: {stats.pending}",
+        f"Доход за день: {stats.income} руб."
     ])
     
     return "\n".join(text)
 
-def format_weekly_schedule(bookings: List[Booking], week_range: str) -> str:
+def format_weekly_schedule(bookings: List[Booking], week_range: str, stats: Optional[ScheduleStats] = None) -> str:
     """Форматирует расписание на неделю"""
     if not bookings:
         return f"📊 Расписание на неделю ({week_range})\n\n🚫 Нет занятий"
     
-    # Группируем записи по дням
-    bookings_by_day: Dict[date, List[Booking]] = {}
-    for booking in bookings:
-        if booking.date not in bookings_by_day:
-            bookings_by_day[booking.date] = []
-        bookings_by_day[booking.date].append(booking)
-    
-    # Статистика
-    total_confirmed = sum(1 for b in bookings if b.status == BookingStatus.APPROVED)
-    total_pending = sum(1 for b in bookings if b.status == BookingStatus.PENDING)
-    total_income = sum(b.price for b in bookings if b.status == BookingStatus.APPROVED)
+    stats = stats or ScheduleStats(bookings)
+    bookings_by_day = stats.by_day
     
     text = [f"📊 Расписание на неделю ({week_range})\n"]
     
@@ -171,9 +259,9 @@ def format_weekly_schedule(bookings: List[Booking], week_range: str) -> str:
     
     text.extend([
         "\n━━━━━━━━━━━━━━━━━━━━━━",
-        f"Всего занятий на неделю: {len(bookings)}",
-        f"Подтверждено: {total_confirmed} | Ожидает: {total_pending}",
-        f"Доход за неделю: {total_income} руб."
+        f"Всего занятий на неделю: {stats.total}",
+        f"Подтверждено: {stats.confirmed} | Ожидает: {stats.pending}",
+        f"Доход за неделю: {stats.income} руб."
     ])
     
     return "\n".join(text)
@@ -186,65 +274,42 @@ def format_month_title(d: date) -> str:
     """Форматирует название месяца в именительном падеже"""
     return f"{MONTHS_RU_NOMINATIVE[d.month]} {d.year}"
 
-def format_monthly_schedule(bookings: List[Booking], month_str: str) -> str:
+def format_monthly_schedule(bookings: List[Booking], month_str: str, stats: Optional[ScheduleStats] = None) -> str:
     """Форматирует расписание на месяц"""
     if not bookings:
         return f"🗓 Расписание на {month_str}\n\n🚫 Нет занятий"
     
-    # Статистика
-    total_confirmed = sum(1 for b in bookings if b.status == BookingStatus.APPROVED)
-    total_pending = sum(1 for b in bookings if b.status == BookingStatus.PENDING)
-    total_cancelled = sum(1 for b in bookings if b.status == BookingStatus.CANCELLED)
-    total_income = sum(b.price for b in bookings if b.status == BookingStatus.APPROVED)
-    
-    # Группируем записи по неделям
-    bookings_by_week: Dict[int, List[Booking]] = {}
-    for booking in bookings:
-        week_num = booking.date.isocalendar()[1]
-        if week_num not in bookings_by_week:
-            bookings_by_week[week_num] = []
-        bookings_by_week[week_num].append(booking)
-    
-    # Группируем записи по предметам
-    subjects: Dict[str, int] = {}
-    for booking in bookings:
-        if booking.subject_name not in subjects:
-            subjects[booking.subject_name] = 0
-        subjects[booking.subject_name] += 1
+    stats = stats or ScheduleStats(bookings)
     
     text = [
         f"🗓 Расписание на {month_str}\n",
         "\n📊 Статистика:",
-        f"- Всего занятий: {len(bookings)}",
-        f"- Подтверждено: {total_confirmed}",
-        f"- Ожидает подтверждения: {total_pending}",
-        f"- Отменено: {total_cancelled}",
-        f"- Доход за месяц: {total_income} руб.",
+        f"- Всего занятий: {stats.total}",
+        f"- Подтверждено: {stats.confirmed}",
+        f"- Ожидает подтверждения: {stats.pending}",
+        f"- Отменено: {stats.cancelled}",
+        f"- Доход за месяц: {stats.income} руб.",
         "\n📈 По неделям:"
     ]
     
-    for week_num in sorted(bookings_by_week.keys()):
-        week_bookings = bookings_by_week[week_num]
-        week_income = sum(b.price for b in week_bookings if b.status == BookingStatus.APPROVED)
-        # Находим первый и последний день недели
-        first_date = min(b.date for b in week_bookings)
-        last_date = max(b.date for b in week_bookings)
+    for week_num in sorted(stats.by_week.keys()):
+        week_count, week_income, first_date, last_date = stats.by_week[week_num]
         if first_date == last_date:
             text.append(
                 f"🗓 {format_date_with_month(first_date)}: "
-                f"{len(week_bookings)} занятий ({week_income} руб.)"
+                f"{week_count} занятий ({week_income} руб.)"
             )
         else:
             text.append(
                 f"🗓 {format_date_with_month(first_date)}-{format_date_with_month(last_date)}: "
-                f"{len(week_bookings)} занятий ({week_income} руб.)"
+                f"{week_count} занятий ({week_income} руб.)"
             )
     
     text.extend([
         "\n📚 По предметам:"
     ])
     
-    for subject, count in sorted(subjects.items(), key=lambda x: x[1], reverse=True):
+    for subject, count in sorted(stats.subjects.items(), key=lambda x: x[1], reverse=True):
         text.append(f"- {subject}: {count} занятий")
     
     return "\n".join(text) 
\ No newline at end of file